@@ -0,0 +1,38 @@
+"""Add project_scores table (persisted score breakdowns) — Sprint 24.
+
+Revision ID: sprint24_project_scores
+Revises: sprint23_agents
+Create Date: 2026-03-02
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision = "sprint24_project_scores"
+down_revision = "sprint23_agents"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "project_scores",
+        sa.Column(
+            "projet_id", UUID(as_uuid=True),
+            sa.ForeignKey("projets.id", ondelete="CASCADE"), primary_key=True,
+        ),
+        sa.Column("fingerprint", sa.String(64), nullable=False),
+        sa.Column("score", sa.Integer, nullable=False),
+        sa.Column("details", JSONB, nullable=False),
+        sa.Column("weights", JSONB, nullable=False),
+        sa.Column("data_sources", JSONB),
+        sa.Column("weights_version", sa.String(16)),
+        sa.Column("computed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_project_scores_fingerprint", "project_scores", ["fingerprint"])
+
+
+def downgrade():
+    op.drop_index("ix_project_scores_fingerprint")
+    op.drop_table("project_scores")
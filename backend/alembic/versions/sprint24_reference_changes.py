@@ -0,0 +1,40 @@
+"""Add reference_changes table (dataset change log for re-scoring) — Sprint 24.
+
+Revision ID: sprint24_reference_changes
+Revises: sprint24_project_scores
+Create Date: 2026-03-03
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from geoalchemy2 import Geometry
+
+revision = "sprint24_reference_changes"
+down_revision = "sprint24_project_scores"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "reference_changes",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("dataset", sa.String(30), nullable=False),
+        sa.Column("feature_key", sa.String(255), nullable=False),
+        sa.Column("change_type", sa.String(10), nullable=False),
+        sa.Column("geom", Geometry("GEOMETRY", srid=4326, spatial_index=False), nullable=False),
+        sa.Column("recorded_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("processed_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_reference_changes_dataset", "reference_changes", ["dataset"])
+    op.create_index("ix_reference_changes_processed_at", "reference_changes", ["processed_at"])
+    op.create_index(
+        "ix_reference_changes_geom", "reference_changes", ["geom"], postgresql_using="gist",
+    )
+
+
+def downgrade():
+    op.drop_index("ix_reference_changes_geom")
+    op.drop_index("ix_reference_changes_processed_at")
+    op.drop_index("ix_reference_changes_dataset")
+    op.drop_table("reference_changes")
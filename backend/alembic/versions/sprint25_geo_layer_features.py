@@ -0,0 +1,77 @@
+"""Store uploaded GeoJSON layers as PostGIS features — Sprint 25.
+
+geo_layer_features holds one row per feature (geometry + properties),
+GiST-indexed on geom and on the generated Lambert-93 column. Existing
+geo_layers.geojson_data blobs are exploded into it and then cleared;
+downgrade rebuilds the blobs from the features.
+
+Revision ID: sprint25_geo_layer_features
+Revises: sprint25_zone_subdivided
+Create Date: 2026-03-12
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from geoalchemy2 import Geometry
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision = "sprint25_geo_layer_features"
+down_revision = "sprint25_zone_subdivided"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "geo_layer_features",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column(
+            "layer_id", UUID(as_uuid=True),
+            sa.ForeignKey("geo_layers.id", ondelete="CASCADE"), nullable=False,
+        ),
+        sa.Column("geom", Geometry("GEOMETRY", srid=4326, spatial_index=False), nullable=False),
+        sa.Column("properties", JSONB, server_default="{}"),
+    )
+    op.execute("""
+        ALTER TABLE geo_layer_features
+        ADD COLUMN geom_l93 geometry(Geometry, 2154)
+        GENERATED ALWAYS AS (ST_Transform(geom, 2154)) STORED
+    """)
+    op.create_index("ix_geo_layer_features_layer_id", "geo_layer_features", ["layer_id"])
+    op.create_index("idx_geo_layer_features_geom", "geo_layer_features", ["geom"], postgresql_using="gist")
+    op.create_index("idx_geo_layer_features_geom_l93", "geo_layer_features", ["geom_l93"], postgresql_using="gist")
+
+    op.execute("""
+        INSERT INTO geo_layer_features (layer_id, geom, properties)
+        SELECT l.id,
+               ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(f -> 'geometry'), 4326)),
+               COALESCE(f -> 'properties', '{}'::jsonb)
+        FROM geo_layers l,
+             jsonb_array_elements(l.geojson_data -> 'features') AS f
+        WHERE l.layer_type = 'geojson'
+          AND jsonb_typeof(f -> 'geometry') = 'object'
+    """)
+    op.execute("UPDATE geo_layers SET geojson_data = NULL WHERE layer_type = 'geojson'")
+    op.execute("ANALYZE geo_layer_features")
+
+
+def downgrade():
+    op.execute("""
+        UPDATE geo_layers l
+        SET geojson_data = jsonb_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE((
+                SELECT jsonb_agg(jsonb_build_object(
+                    'type', 'Feature',
+                    'geometry', ST_AsGeoJSON(f.geom)::jsonb,
+                    'properties', f.properties
+                ) ORDER BY f.id)
+                FROM geo_layer_features f WHERE f.layer_id = l.id
+            ), '[]'::jsonb)
+        )
+        WHERE l.layer_type = 'geojson'
+    """)
+    op.drop_index("idx_geo_layer_features_geom_l93")
+    op.drop_index("idx_geo_layer_features_geom")
+    op.drop_index("ix_geo_layer_features_layer_id")
+    op.drop_table("geo_layer_features")
@@ -0,0 +1,44 @@
+"""Add generated Lambert-93 geometry columns with GiST indexes — Sprint 25.
+
+geom_l93 = ST_Transform(geom, 2154), stored, on postes_sources, natura2000,
+znieff and projets. Distance and radius predicates run planar in metres
+on these columns, so they are index-backed instead of casting to
+geography on the fly.
+
+Revision ID: sprint25_geom_l93
+Revises: sprint24_reference_changes
+Create Date: 2026-03-09
+"""
+
+from alembic import op
+
+revision = "sprint25_geom_l93"
+down_revision = "sprint24_reference_changes"
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    "postes_sources": "Point",
+    "natura2000": "MultiPolygon",
+    "znieff": "MultiPolygon",
+    "projets": "Point",
+}
+
+
+def upgrade():
+    for table, geom_type in TABLES.items():
+        op.execute(f"""
+            ALTER TABLE {table}
+            ADD COLUMN IF NOT EXISTS geom_l93 geometry({geom_type}, 2154)
+            GENERATED ALWAYS AS (ST_Transform(geom, 2154)) STORED
+        """)
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_geom_l93 ON {table} USING GIST (geom_l93)"
+        )
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(f"DROP INDEX IF EXISTS idx_{table}_geom_l93")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS geom_l93")
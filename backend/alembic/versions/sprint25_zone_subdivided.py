@@ -0,0 +1,64 @@
+"""Add subdivided and display geometries for protected zones — Sprint 25.
+
+natura2000_subdivided / znieff_subdivided hold ST_Subdivide'd,
+ST_MakeValid-repaired Lambert-93 pieces (GiST-indexed); geom_display is a
+simplified copy for map rendering. Both are backfilled here and then
+maintained by the importers (services.zone_subdivision).
+
+Revision ID: sprint25_zone_subdivided
+Revises: sprint25_geom_l93
+Create Date: 2026-03-10
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from geoalchemy2 import Geometry
+
+revision = "sprint25_zone_subdivided"
+down_revision = "sprint25_geom_l93"
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    "natura2000": ("natura2000_subdivided", "site_code", 20),
+    "znieff": ("znieff_subdivided", "code_mnhn", 30),
+}
+
+
+def upgrade():
+    for table, (sub_table, key_col, key_len) in TABLES.items():
+        op.create_table(
+            sub_table,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column(key_col, sa.String(key_len), nullable=False),
+            sa.Column("geom_l93", Geometry("POLYGON", srid=2154, spatial_index=False), nullable=False),
+        )
+        op.create_index(f"ix_{sub_table}_{key_col}", sub_table, [key_col])
+        op.create_index(f"idx_{sub_table}_geom_l93", sub_table, ["geom_l93"], postgresql_using="gist")
+        op.add_column(table, sa.Column("geom_display", Geometry("MULTIPOLYGON", srid=4326, spatial_index=False)))
+
+        op.execute(f"""
+            INSERT INTO {sub_table} ({key_col}, geom_l93)
+            SELECT key, (ST_Dump(piece)).geom
+            FROM (
+                SELECT {key_col} AS key,
+                       ST_Subdivide(ST_CollectionExtract(ST_MakeValid(geom_l93), 3), 256) AS piece
+                FROM {table}
+                WHERE geom_l93 IS NOT NULL
+            ) s
+        """)
+        op.execute(f"""
+            UPDATE {table}
+            SET geom_display = ST_Multi(ST_CollectionExtract(
+                ST_MakeValid(ST_SimplifyPreserveTopology(geom, 0.0005)), 3
+            ))
+        """)
+        op.execute(f"ANALYZE {sub_table}")
+
+
+def downgrade():
+    for table, (sub_table, key_col, _) in TABLES.items():
+        op.drop_column(table, "geom_display")
+        op.drop_index(f"idx_{sub_table}_geom_l93")
+        op.drop_index(f"ix_{sub_table}_{key_col}")
+        op.drop_table(sub_table)
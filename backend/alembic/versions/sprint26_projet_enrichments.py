@@ -0,0 +1,96 @@
+"""Move project enrichment out of projets.metadata — Sprint 26.
+
+projet_enrichments holds one row per enriched project: the components
+as JSONB detail columns and typed metric columns generated from them
+(GHI, productible, nearest poste distance/capacity, in-zone/nearby
+constraint counts), indexed for portfolio filters. Existing
+metadata.enrichment documents are copied into it and then removed;
+downgrade puts them back.
+
+Revision ID: sprint26_projet_enrichments
+Revises: sprint25_geo_layer_features
+Create Date: 2026-03-16
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision = "sprint26_projet_enrichments"
+down_revision = "sprint25_geo_layer_features"
+branch_labels = None
+depends_on = None
+
+METRICS = {
+    "ghi_kwh_m2_an": "double precision GENERATED ALWAYS AS ((pvgis ->> 'ghi_kwh_m2_an')::float8) STORED",
+    "productible_kwh_kwc_an": (
+        "double precision GENERATED ALWAYS AS ((pvgis ->> 'productible_kwh_kwc_an')::float8) STORED"
+    ),
+    "solar_source": "varchar(32) GENERATED ALWAYS AS ((pvgis ->> 'source')::varchar(32)) STORED",
+    "nearest_poste_km": (
+        "double precision GENERATED ALWAYS AS ((nearest_postes -> 0 ->> 'distance_km')::float8) STORED"
+    ),
+    "nearest_poste_capacite_mw": (
+        "double precision GENERATED ALWAYS AS "
+        "((nearest_postes -> 0 ->> 'capacite_disponible_mw')::float8) STORED"
+    ),
+    "constraints_in_zone": "integer GENERATED ALWAYS AS ((constraints #>> '{summary,in_zone}')::int) STORED",
+    "constraints_nearby": "integer GENERATED ALWAYS AS ((constraints #>> '{summary,nearby}')::int) STORED",
+}
+
+
+def upgrade():
+    op.create_table(
+        "projet_enrichments",
+        sa.Column(
+            "projet_id", UUID(as_uuid=True),
+            sa.ForeignKey("projets.id", ondelete="CASCADE"), primary_key=True,
+        ),
+        sa.Column("pvgis", JSONB),
+        sa.Column("constraints", JSONB),
+        sa.Column("nearest_postes", JSONB),
+        sa.Column("versions", JSONB, server_default="{}"),
+        sa.Column("enriched_at", sa.DateTime(timezone=True)),
+    )
+    for column, definition in METRICS.items():
+        op.execute(f"ALTER TABLE projet_enrichments ADD COLUMN {column} {definition}")
+    for column in ("ghi_kwh_m2_an", "productible_kwh_kwc_an", "nearest_poste_km"):
+        op.create_index(f"ix_projet_enrichments_{column}", "projet_enrichments", [column])
+    # "Good irradiation and outside every protected zone"
+    op.create_index(
+        "ix_projet_enrichments_ghi_no_zone", "projet_enrichments", ["ghi_kwh_m2_an"],
+        postgresql_where=sa.text("constraints_in_zone = 0"),
+    )
+
+    op.execute("""
+        INSERT INTO projet_enrichments (projet_id, pvgis, constraints, nearest_postes, versions, enriched_at)
+        SELECT id,
+               metadata #> '{enrichment,pvgis}',
+               metadata #> '{enrichment,constraints}',
+               metadata #> '{enrichment,nearest_postes}',
+               COALESCE(metadata #> '{enrichment,versions}', '{}'::jsonb),
+               (metadata #>> '{enrichment,enriched_at}')::timestamptz
+        FROM projets
+        WHERE jsonb_typeof(metadata -> 'enrichment') = 'object'
+    """)
+    op.execute("UPDATE projets SET metadata = metadata - 'enrichment' WHERE metadata ? 'enrichment'")
+    op.execute("ANALYZE projet_enrichments")
+
+
+def downgrade():
+    op.execute("""
+        UPDATE projets p
+        SET metadata = jsonb_set(
+            COALESCE(p.metadata, '{}'::jsonb), '{enrichment}',
+            jsonb_strip_nulls(jsonb_build_object(
+                'pvgis', e.pvgis,
+                'constraints', e.constraints,
+                'nearest_postes', e.nearest_postes,
+                'versions', e.versions,
+                'enriched_at', to_jsonb(e.enriched_at)
+            ))
+        )
+        FROM projet_enrichments e
+        WHERE e.projet_id = p.id
+    """)
+    op.drop_table("projet_enrichments")
@@ -4,7 +4,6 @@ Validates JWT Bearer tokens from Clerk, caches JWKS keys,
 and provides FastAPI dependencies for route protection.
 """
 import json
-import time
 from typing import Optional
 
 import httpx
@@ -18,32 +17,30 @@ from sqlalchemy.sql import func
 from app.config import settings
 from app.database import get_db
 from app.models.user import User
+from app.services.cache import TieredCache
 
-# JWKS cache: {keys: [...], fetched_at: float}
-_jwks_cache: dict = {"keys": [], "fetched_at": 0}
 JWKS_CACHE_TTL = 3600  # 1 hour
+JWKS_STALE_TTL = 24 * 3600  # keep serving the last keys while Clerk is unreachable
 
+_jwks_cache = TieredCache("jwks", JWKS_CACHE_TTL, max_entries=4, local_ttl=300, stale_ttl=JWKS_STALE_TTL)
+
+
+async def _fetch_jwks() -> list[dict]:
+    url = f"https://{settings.clerk_domain}/.well-known/jwks.json"
+    async with httpx.AsyncClient(timeout=10) as client:
+        resp = await client.get(url)
+        resp.raise_for_status()
+        return resp.json().get("keys", [])
 
-async def _get_jwks() -> list[dict]:
-    """Fetch and cache JWKS keys from Clerk."""
-    now = time.time()
-    if _jwks_cache["keys"] and (now - _jwks_cache["fetched_at"]) < JWKS_CACHE_TTL:
-        return _jwks_cache["keys"]
 
+async def _get_jwks() -> list[dict]:
+    """JWKS keys from Clerk, cached in process and in Redis."""
     if not settings.clerk_domain:
         return []
-
-    url = f"https://{settings.clerk_domain}/.well-known/jwks.json"
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            _jwks_cache["keys"] = data.get("keys", [])
-            _jwks_cache["fetched_at"] = now
-            return _jwks_cache["keys"]
+        return await _jwks_cache.get_or_load(settings.clerk_domain, _fetch_jwks)
     except Exception:
-        return _jwks_cache["keys"]  # Return stale cache on error
+        return []
 
 
 def _extract_token(request: Request) -> Optional[str]:
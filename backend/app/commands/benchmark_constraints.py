@@ -0,0 +1,139 @@
+"""Benchmark the per-point constraint query: geography casts vs Lambert-93.
+
+Usage:
+    cd backend
+    PYTHONPATH=. python -m app.commands.benchmark_constraints
+    PYTHONPATH=. python -m app.commands.benchmark_constraints --points 500 --seed 7
+
+"before" replays the legacy path: per table, an information_schema check
+then ST_DWithin/ST_Distance on geom::geography (4 round trips per point).
+"after" is get_constraints(): one query over the indexed geom_l93 columns.
+Both run on the same random points over metropolitan France; latency
+percentiles are reported in milliseconds, plus the EXPLAIN plan of one
+"after" query to confirm GiST index use.
+"""
+import argparse
+import logging
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import text
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+logger = logging.getLogger(__name__)
+
+# Metropolitan France bbox (lon/lat)
+BBOX = (-4.5, 42.5, 8.0, 51.0)
+
+_LEGACY_EXISTS = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.tables WHERE table_name = :table_name
+    ) AS exists
+""")
+
+_LEGACY_QUERY = """
+    SELECT {code_col} AS code, nom, type_zone, surface_ha,
+           ST_Intersects(geom, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)) AS intersects,
+           ROUND(ST_Distance(
+               geom::geography, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
+           )::numeric) AS distance_m
+    FROM {table}
+    WHERE ST_DWithin(
+        geom::geography, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography, :radius
+    )
+    ORDER BY distance_m ASC
+    LIMIT 10
+"""
+
+_LEGACY_TABLES = (("natura2000", "site_code"), ("znieff", "code_mnhn"))
+
+
+async def _legacy(db, lon: float, lat: float, radius_m: int) -> None:
+    for table, code_col in _LEGACY_TABLES:
+        exists = (await db.execute(_LEGACY_EXISTS, {"table_name": table})).scalar()
+        if exists:
+            await db.execute(
+                text(_LEGACY_QUERY.format(table=table, code_col=code_col)),
+                {"lon": lon, "lat": lat, "radius": radius_m},
+            )
+
+
+def _stats(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(ordered), 2),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+    }
+
+
+async def benchmark(points: int = 200, seed: int = 42, radius_m: int = 10_000) -> dict:
+    from app.database import async_session
+    from app.services.constraints import get_constraints, refresh_constraint_layers
+
+    rng = random.Random(seed)
+    coords = [
+        (rng.uniform(BBOX[0], BBOX[2]), rng.uniform(BBOX[1], BBOX[3])) for _ in range(points)
+    ]
+
+    async with async_session() as db:
+        await refresh_constraint_layers(db)
+        # Warm-up (plans, caches) on both paths
+        for lon, lat in coords[:5]:
+            await _legacy(db, lon, lat, radius_m)
+            await get_constraints(db, lon, lat, radius_m)
+
+        before, after = [], []
+        for lon, lat in coords:
+            t0 = time.perf_counter()
+            await _legacy(db, lon, lat, radius_m)
+            before.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            await get_constraints(db, lon, lat, radius_m)
+            after.append((time.perf_counter() - t0) * 1000)
+
+        lon, lat = coords[0]
+        plan = await db.execute(
+            text("""
+                EXPLAIN SELECT site_code FROM natura2000
+                WHERE ST_DWithin(geom_l93,
+                    ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154), :radius)
+            """),
+            {"lon": lon, "lat": lat, "radius": radius_m},
+        )
+        plan_lines = [row[0] for row in plan.all()]
+
+    result = {
+        "points": points,
+        "before_geography": _stats(before),
+        "after_l93": _stats(after),
+        "speedup": round(statistics.fmean(before) / max(statistics.fmean(after), 1e-9), 1),
+        "after_plan": plan_lines,
+    }
+    return result
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Benchmark per-point constraint queries")
+    parser.add_argument("--points", type=int, default=200, help="Number of random points")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--radius", type=int, default=10_000, help="Search radius (m)")
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(benchmark(args.points, args.seed, args.radius))
+    except Exception as e:
+        logger.error("Benchmark failed: %s", e)
+        sys.exit(1)
+
+    logger.info("Points: %d", result["points"])
+    logger.info("Before (geography casts, 4 round trips): %s", result["before_geography"])
+    logger.info("After  (geom_l93 + GiST, 1 query):        %s", result["after_l93"])
+    logger.info("Speedup (mean): x%s", result["speedup"])
+    for line in result["after_plan"]:
+        logger.info("  %s", line)
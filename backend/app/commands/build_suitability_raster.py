@@ -0,0 +1,42 @@
+"""Build or refresh the national suitability raster.
+
+Usage:
+    cd backend
+    PYTHONPATH=. python -m app.commands.build_suitability_raster            # incremental
+    PYTHONPATH=. python -m app.commands.build_suitability_raster --full
+    PYTHONPATH=. python -m app.commands.build_suitability_raster --resolution 500
+
+The first run (or a resolution change) builds every tile. Later runs only
+recompute tiles reached by added/moved/removed postes sources, and the
+zone layers only when Natura 2000 / ZNIEFF were re-imported.
+"""
+import argparse
+import logging
+import sys
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+logger = logging.getLogger(__name__)
+
+
+async def build(full: bool = False, resolution_m: float | None = None) -> dict:
+    from app.database import async_session
+    from app.services.suitability_raster import build_raster
+
+    async with async_session() as db:
+        return await build_raster(db, resolution_m=resolution_m, full=full)
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Build the national suitability raster")
+    parser.add_argument("--full", action="store_true", help="Rebuild every tile")
+    parser.add_argument("--resolution", type=float, default=None, help="Cell size in metres")
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(build(full=args.full, resolution_m=args.resolution))
+    except Exception as e:
+        logger.error("Raster build failed: %s", e)
+        sys.exit(1)
+    logger.info("Result: %s", result)
@@ -0,0 +1,68 @@
+"""Import the offline irradiation grid used for screening enrichment.
+
+Usage:
+    cd backend
+    PYTHONPATH=. python -m app.commands.import_irradiation_grid --cells pvgis_cells.csv
+    PYTHONPATH=. python -m app.commands.import_irradiation_grid --ghi-asc ghi_france.asc --resolution 0.1
+
+--cells takes pre-fetched PVGIS cells (CSV with lat, lon, ghi_kwh_m2_an,
+productible_kwh_kwc_an, temperature_moyenne); --ghi-asc an annual GHI
+raster in ESRI ASCII grid format (WGS84), the yield being derived from GHI.
+The grid is written to settings.irradiation_grid_dir and picked up by
+running workers on their next lookup.
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+logger = logging.getLogger(__name__)
+
+
+async def run(cells: str | None = None, ghi_asc: str | None = None, resolution_deg: float | None = None) -> dict:
+    from app.config import settings
+    from app.database import async_session
+    from app.services.irradiation_grid import (
+        grid_from_cells,
+        grid_from_ghi_ascii,
+        read_cells_csv,
+        record_import,
+        write_grid,
+    )
+
+    resolution_deg = resolution_deg or settings.pvgis_grid_deg
+    if cells:
+        lats, lons, values = read_cells_csv(Path(cells))
+        data = grid_from_cells(lats, lons, values, resolution_deg)
+        source = f"pvgis_cells:{Path(cells).name}"
+    else:
+        data = grid_from_ghi_ascii(Path(ghi_asc), resolution_deg)
+        source = f"ghi_raster:{Path(ghi_asc).name}"
+    manifest = write_grid(data, resolution_deg, source)
+
+    try:
+        async with async_session() as db:
+            await record_import(db, manifest["cells_with_data"])
+            await db.commit()
+    except Exception as e:
+        logger.warning("Grid written but data_source_statuses not updated: %s", e)
+    return manifest
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Import the offline irradiation grid")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--cells", help="CSV of pre-fetched PVGIS cells")
+    source.add_argument("--ghi-asc", help="Annual GHI raster (ESRI ASCII grid, WGS84)")
+    parser.add_argument("--resolution", type=float, default=None, help="Cell size in degrees (default: PVGIS grid)")
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(run(cells=args.cells, ghi_asc=args.ghi_asc, resolution_deg=args.resolution))
+    except Exception as e:
+        logger.error("Irradiation grid import failed: %s", e)
+        sys.exit(1)
+    logger.info("Result: %s", result)
@@ -82,9 +82,12 @@ async def import_natura2000(geojson_path: str, dry_run: bool = False) -> dict:
     from sqlalchemy import text
 
     from app.database import engine as async_engine
+    from app.services.reference_changes import record_changes, snapshot
+    from app.services.zone_subdivision import rebuild_zone_geometries
 
     inserted = 0
     async with async_engine.begin() as conn:
+        before = await snapshot(conn, "natura2000")
         for row in parsed:
             await conn.execute(
                 text("""
@@ -102,6 +105,10 @@ async def import_natura2000(geojson_path: str, dry_run: bool = False) -> dict:
                 row,
             )
             inserted += 1
+        # Log changed geometries for incremental re-scoring, then rebuild
+        # the subdivided/display geometries of the changed zones
+        changes = await record_changes(conn, "natura2000", before)
+        await rebuild_zone_geometries(conn, "natura2000", changes.pop("keys"))
 
     # Update DataSourceStatus
     async with async_engine.begin() as conn:
@@ -116,7 +123,7 @@ async def import_natura2000(geojson_path: str, dry_run: bool = False) -> dict:
         )
 
     logger.info("Inserted %d Natura 2000 zones", inserted)
-    return {"status": "ok", "inserted": inserted, "skipped": skipped}
+    return {"status": "ok", "inserted": inserted, "skipped": skipped, "changes": changes}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+"""Rescore projects affected by reference dataset changes.
+
+Usage:
+    cd backend
+    PYTHONPATH=. python -m app.commands.rescore_changes
+    PYTHONPATH=. python -m app.commands.rescore_changes --limit 500
+
+Processes the reference_changes rows logged by the postes / Natura 2000 /
+ZNIEFF importers and rescores only the projects near a changed feature.
+"""
+import argparse
+import logging
+import sys
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+logger = logging.getLogger(__name__)
+
+
+async def rescore(limit: int = 10_000) -> dict:
+    from app.database import async_session
+    from app.services.rescoring import rescore_changed
+
+    async with async_session() as db:
+        return await rescore_changed(db, limit=limit)
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Incremental rescoring after dataset imports")
+    parser.add_argument("--limit", type=int, default=10_000, help="Max change rows to process")
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(rescore(limit=args.limit))
+    except Exception as e:
+        logger.error("Rescoring failed: %s", e)
+        sys.exit(1)
+    logger.info("Result: %s", result)
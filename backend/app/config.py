@@ -37,6 +37,25 @@ class Settings(BaseSettings):
     clerk_publishable_key: str = ""
     clerk_secret_key: str = ""
 
+    # Suitability raster (precomputed national grid, Lambert-93)
+    suitability_raster_dir: str = "data/rasters/suitability"
+    suitability_raster_resolution_m: int = 250
+    suitability_raster_scoring: bool = False  # use raster distance in calculate_score
+
+    # Offline irradiation grid (screening-grade PVGIS values)
+    irradiation_grid_dir: str = "data/rasters/irradiation"
+
+    # WMS/WFS proxy (disk LRU cache of upstream tiles and features)
+    map_proxy_cache_dir: str = "data/cache/map_proxy"
+    map_proxy_cache_max_mb: int = 512
+    map_proxy_allowed_hosts: str = ""  # comma-separated, in addition to the catalog hosts
+
+    # PVGIS client
+    pvgis_base_url: str = "https://re.jrc.ec.europa.eu/api/v5_2"
+    pvgis_grid_deg: float = 0.05  # cache cell size; ~5 km, below PVGIS' own resolution
+    pvgis_max_connections: int = 16
+    pvgis_epoch: int = 1  # bump to invalidate cached and stored PVGIS values
+
     @property
     def database_url(self) -> str:
         return (
@@ -55,6 +74,10 @@ class Settings(BaseSettings):
     def cors_origins(self) -> list[str]:
         return [o.strip() for o in self.backend_cors_origins.split(",")]
 
+    @property
+    def map_proxy_hosts(self) -> list[str]:
+        return [h.strip() for h in self.map_proxy_allowed_hosts.split(",") if h.strip()]
+
     model_config = {"env_file": ".env", "extra": "ignore"}
 
 
@@ -1,3 +1,4 @@
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -15,12 +16,22 @@ from app.routes.geo_layers import router as geo_layers_router
 from app.routes.billing import router as billing_router
 from app.routes.agents import router as agents_router
 from app.routes.monitoring import router as monitoring_router
+from app.routes.tiles import router as tiles_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Schema managed by Alembic — run: alembic upgrade head
 
+    # Resolve constraint layer tables once (graceful if the DB is not up yet)
+    from app.database import async_session
+    from app.services.constraints import refresh_constraint_layers
+    try:
+        async with async_session() as db:
+            await refresh_constraint_layers(db)
+    except Exception as e:
+        logging.getLogger(__name__).warning("Constraint layers not resolved at startup: %s", e)
+
     # Start scheduler (Sprint 18 — veille active)
     from app.scheduler import start_scheduler, stop_scheduler
     start_scheduler()
@@ -28,6 +39,12 @@ async def lifespan(app: FastAPI):
     yield
 
     stop_scheduler()
+    from app.services.map_proxy import close_map_proxy
+    await close_map_proxy()
+    from app.services.pvgis import close_pvgis
+    from app.services.redis_pool import close_redis
+    await close_pvgis()
+    await close_redis()
     await engine.dispose()
 
 
@@ -76,6 +93,7 @@ app.include_router(admin.router, prefix="/api", tags=["admin"])
 app.include_router(veille.router, prefix="/api", tags=["veille"])
 app.include_router(data_health_router, prefix="/api", tags=["data-health"])
 app.include_router(geo_layers_router, prefix="/api", tags=["geo-layers"])
+app.include_router(tiles_router, prefix="/api", tags=["tiles"])
 app.include_router(billing_router, prefix="/api", tags=["billing"])
 app.include_router(agents_router, tags=["agents"])
 app.include_router(monitoring_router, tags=["monitoring"])
@@ -10,12 +10,15 @@ from app.models.source import SourceVeille
 from app.models.outil import Outil
 from app.models.competence import Competence
 from app.models.projet import Projet, ProjetPhase, ProjetRisque, ProjetDocument
+from app.models.projet_enrichment import ProjetEnrichment  # noqa: F401
 from app.models.poste_source import PosteSource
-from app.models.contrainte import Natura2000, Znieff
+from app.models.contrainte import Natura2000, Natura2000Subdivided, Znieff, ZnieffSubdivided
 from app.models.data_source_status import DataSourceStatus  # noqa: F401
-from app.models.geo_layer import GeoLayer  # noqa: F401
+from app.models.geo_layer import GeoLayer, GeoLayerFeature  # noqa: F401
 from app.models.subscription import Subscription, ApiKey, ProjectShare  # noqa: F401
 from app.models.agent_run import AgentRun, MlPrediction  # noqa: F401
+from app.models.project_score import ProjectScore  # noqa: F401
+from app.models.reference_change import ReferenceChange  # noqa: F401
 from app.models.relations import (
     PhaseLivrable,
     PhaseNorme,
@@ -46,16 +49,22 @@ __all__ = [
     "ProjetPhase",
     "ProjetRisque",
     "ProjetDocument",
+    "ProjetEnrichment",
     "PosteSource",
     "Natura2000",
+    "Natura2000Subdivided",
     "Znieff",
+    "ZnieffSubdivided",
     "DataSourceStatus",
     "GeoLayer",
+    "GeoLayerFeature",
     "Subscription",
     "ApiKey",
     "ProjectShare",
     "AgentRun",
     "MlPrediction",
+    "ProjectScore",
+    "ReferenceChange",
     "PhaseLivrable",
     "PhaseNorme",
     "PhaseRisque",
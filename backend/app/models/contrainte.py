@@ -2,9 +2,14 @@
 
 PostGIS tables for Natura 2000 and ZNIEFF zones.
 Used by constraints service for spatial intersection queries.
+
+*_subdivided tables hold ST_Subdivide'd, ST_MakeValid-repaired pieces of
+each zone (Lambert-93, ≤ 256 vertices each) so point/polygon tests cost
+an index lookup plus a few small polygons; geom_display is a simplified
+copy for map rendering. Both are maintained by services.zone_subdivision.
 """
 from geoalchemy2 import Geometry
-from sqlalchemy import Column, Integer, String, Text, Numeric
+from sqlalchemy import Column, Computed, Integer, String, Text, Numeric
 from sqlalchemy.dialects.postgresql import JSONB
 
 from app.database import Base
@@ -21,6 +26,8 @@ class Natura2000(Base):
     region = Column(String(100))
     departement = Column(String(10))
     geom = Column(Geometry("MULTIPOLYGON", srid=4326))
+    geom_l93 = Column(Geometry("MULTIPOLYGON", srid=2154), Computed("ST_Transform(geom, 2154)", persisted=True))
+    geom_display = Column(Geometry("MULTIPOLYGON", srid=4326))
     metadata_ = Column("metadata", JSONB, default={})
 
 
@@ -35,4 +42,22 @@ class Znieff(Base):
     region = Column(String(100))
     departement = Column(String(10))
     geom = Column(Geometry("MULTIPOLYGON", srid=4326))
+    geom_l93 = Column(Geometry("MULTIPOLYGON", srid=2154), Computed("ST_Transform(geom, 2154)", persisted=True))
+    geom_display = Column(Geometry("MULTIPOLYGON", srid=4326))
     metadata_ = Column("metadata", JSONB, default={})
+
+
+class Natura2000Subdivided(Base):
+    __tablename__ = "natura2000_subdivided"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    site_code = Column(String(20), nullable=False, index=True)
+    geom_l93 = Column(Geometry("POLYGON", srid=2154), nullable=False)
+
+
+class ZnieffSubdivided(Base):
+    __tablename__ = "znieff_subdivided"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    code_mnhn = Column(String(30), nullable=False, index=True)
+    geom_l93 = Column(Geometry("POLYGON", srid=2154), nullable=False)
@@ -2,7 +2,8 @@
 
 from uuid import uuid4
 
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from geoalchemy2 import Geometry
+from sqlalchemy import BigInteger, Column, Computed, DateTime, ForeignKey, Integer, String, Text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.sql import func
 
@@ -18,8 +19,20 @@ class GeoLayer(Base):
     description = Column(Text)
     layer_type = Column(String(20), nullable=False)  # geojson | wms | wfs
     source_url = Column(String(500))
-    geojson_data = Column(JSONB)
+    geojson_data = Column(JSONB)  # legacy; features live in geo_layer_features
     feature_count = Column(Integer, default=0)
     style = Column(JSONB)
     visible = Column(Integer, default=1)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class GeoLayerFeature(Base):
+    """One feature of an uploaded GeoJSON layer, with indexed geometry."""
+
+    __tablename__ = "geo_layer_features"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    layer_id = Column(UUID(as_uuid=True), ForeignKey("geo_layers.id", ondelete="CASCADE"), nullable=False, index=True)
+    geom = Column(Geometry("GEOMETRY", srid=4326), nullable=False)
+    geom_l93 = Column(Geometry("GEOMETRY", srid=2154), Computed("ST_Transform(geom, 2154)", persisted=True))
+    properties = Column(JSONB, default={})
@@ -1,5 +1,5 @@
 from geoalchemy2 import Geometry
-from sqlalchemy import Column, Integer, String, Text, Numeric, Date
+from sqlalchemy import Column, Computed, Integer, String, Text, Numeric, Date
 from sqlalchemy.dialects.postgresql import JSONB
 
 from app.database import Base
@@ -15,6 +15,7 @@ class PosteSource(Base):
     puissance_mw = Column(Numeric)
     capacite_disponible_mw = Column(Numeric)
     geom = Column(Geometry("POINT", srid=4326))
+    geom_l93 = Column(Geometry("POINT", srid=2154), Computed("ST_Transform(geom, 2154)", persisted=True))
     source_donnees = Column(String(50))
     date_maj = Column(Date)
     metadata_ = Column("metadata", JSONB, default={})
@@ -0,0 +1,26 @@
+"""Persisted score breakdowns — keyed by an input fingerprint.
+
+One row per project holding the last full scoring result (details,
+weights, data_sources). The fingerprint hashes every scoring input so a
+re-POST with unchanged inputs can return the stored result directly.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class ProjectScore(Base):
+    __tablename__ = "project_scores"
+
+    projet_id = Column(
+        UUID(as_uuid=True), ForeignKey("projets.id", ondelete="CASCADE"), primary_key=True
+    )
+    fingerprint = Column(String(64), nullable=False, index=True)
+    score = Column(Integer, nullable=False)  # 0-100
+    details = Column(JSONB, nullable=False)  # {criterion: 0-100}
+    weights = Column(JSONB, nullable=False)
+    data_sources = Column(JSONB)
+    weights_version = Column(String(16))
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
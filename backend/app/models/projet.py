@@ -1,7 +1,7 @@
 import uuid
 
 from geoalchemy2 import Geometry
-from sqlalchemy import Boolean, Column, Integer, String, Text, Numeric, ForeignKey, BigInteger, DateTime
+from sqlalchemy import Boolean, Column, Computed, Integer, String, Text, Numeric, ForeignKey, BigInteger, DateTime
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -20,6 +20,7 @@ class Projet(Base):
     puissance_mwc = Column(Numeric)
     surface_ha = Column(Numeric)
     geom = Column(Geometry("POINT", srid=4326))
+    geom_l93 = Column(Geometry("POINT", srid=2154), Computed("ST_Transform(geom, 2154)", persisted=True))
     emprise = Column(Geometry("POLYGON", srid=4326))
     commune = Column(String(100))
     departement = Column(String(3))
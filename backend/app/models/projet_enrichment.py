@@ -0,0 +1,44 @@
+"""Project enrichment — typed metrics plus per-component detail.
+
+One row per enriched project. The detail columns hold each enrichment
+component as computed (pvgis, constraints, nearest_postes); the metric
+columns are generated from them by PostgreSQL, so they can be indexed and
+filtered on without parsing JSONB and can never drift from the detail.
+"""
+from sqlalchemy import Column, Computed, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from app.database import Base
+
+
+class ProjetEnrichment(Base):
+    __tablename__ = "projet_enrichments"
+
+    projet_id = Column(
+        UUID(as_uuid=True), ForeignKey("projets.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Detail, one column per component
+    pvgis = Column(JSONB)
+    constraints = Column(JSONB)
+    nearest_postes = Column(JSONB)
+    versions = Column(JSONB, server_default="{}")  # {component: dependency version}
+    enriched_at = Column(DateTime(timezone=True))
+
+    # Metrics (generated)
+    ghi_kwh_m2_an = Column(Float, Computed("(pvgis ->> 'ghi_kwh_m2_an')::float8", persisted=True), index=True)
+    productible_kwh_kwc_an = Column(
+        Float, Computed("(pvgis ->> 'productible_kwh_kwc_an')::float8", persisted=True), index=True
+    )
+    solar_source = Column(String(32), Computed("(pvgis ->> 'source')::varchar(32)", persisted=True))
+    nearest_poste_km = Column(
+        Float, Computed("(nearest_postes -> 0 ->> 'distance_km')::float8", persisted=True), index=True
+    )
+    nearest_poste_capacite_mw = Column(
+        Float, Computed("(nearest_postes -> 0 ->> 'capacite_disponible_mw')::float8", persisted=True)
+    )
+    constraints_in_zone = Column(
+        Integer, Computed("(constraints #>> '{summary,in_zone}')::int", persisted=True)
+    )
+    constraints_nearby = Column(
+        Integer, Computed("(constraints #>> '{summary,nearby}')::int", persisted=True)
+    )
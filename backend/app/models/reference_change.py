@@ -0,0 +1,24 @@
+"""Reference dataset change log — geometries touched by an import.
+
+Importers of postes_sources / natura2000 / znieff diff the table before
+and after loading and record one row per added, updated or removed
+feature. The re-scoring job consumes unprocessed rows to rescore only
+projects near a changed feature.
+"""
+from geoalchemy2 import Geometry
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class ReferenceChange(Base):
+    __tablename__ = "reference_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    dataset = Column(String(30), nullable=False, index=True)  # postes_sources, natura2000, znieff
+    feature_key = Column(String(255), nullable=False)
+    change_type = Column(String(10), nullable=False)  # added, updated, removed
+    geom = Column(Geometry("GEOMETRY", srid=4326), nullable=False)  # old ∪ new footprint
+    recorded_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), index=True)
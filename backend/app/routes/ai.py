@@ -14,6 +14,7 @@ from app.config import settings
 from app.models import Projet
 from app.models.user import User
 from app.services.ai import analyze_project
+from app.services.enrichment_store import load_enrichment
 from app.services.scoring import calculate_score as compute_score
 from app.services.regulatory import analyze_regulatory
 from app.services.tier_limits import check_quota_or_raise, log_usage
@@ -117,8 +118,7 @@ async def analyze_projet(
     proj_result = await db.execute(select(Projet).where(Projet.id == projet_id))
     projet = proj_result.scalar_one_or_none()
     if projet:
-        metadata = projet.metadata_ or {}
-        enrichment_data = metadata.get("enrichment")
+        enrichment_data = await load_enrichment(db, projet.id)
 
         regulatory_data = analyze_regulatory(
             filiere=row["filiere"] or "solaire_sol",
@@ -2,17 +2,20 @@
 
 Endpoints:
   POST /api/projets/{id}/enrich       — enrich a single project
-  POST /api/projets/batch-enrich      — enrich multiple projects (max 20)
+  POST /api/projets/batch-enrich      — enrich multiple projects (max 10 000, chunked)
   GET  /api/projets/{id}/enrichment   — retrieve enrichment data
   GET  /api/projets/{id}/regulatory   — regulatory analysis with expert tips
   GET  /api/projets/{id}/financial    — financial estimation (CAPEX/OPEX/LCOE/TRI)
+  GET  /api/projets/{id}/financial/montecarlo — TRI/LCOE distribution (P10/P50/P90)
+  GET  /api/projets/{id}/financial/sensitivity — tornado ranking and 2-D scenario grid
+  GET  /api/projets/{id}/financial/cashflow — year-by-year cash flows (TRI, VAN, DSCR)
   POST /api/projets/{id}/report       — generate PDF feasibility report
 """
 import logging
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import Response
 from pydantic import BaseModel, Field, field_validator
 from sqlalchemy import select, text
@@ -22,10 +25,13 @@ from app.auth import require_user
 from app.database import get_db
 from app.models import Projet
 from app.models.user import User
-from app.services.pvgis import get_pvgis_data
-from app.services.constraints import get_constraints, get_nearest_postes
+from app.services.enrichment import enrich_projects
+from app.services.enrichment_store import load_enrichment
 from app.services.regulatory import analyze_regulatory
 from app.services.financial import estimate_financial
+from app.services.financial_cashflow import FLAT_ASSUMPTIONS, project_cashflows
+from app.services.financial_montecarlo import simulate_financial
+from app.services.financial_sensitivity import default_grid, sensitivity_analysis
 from app.services.tier_limits import check_feature_access, check_quota_or_raise, log_usage
 from app.routes.notifications import create_notification
 
@@ -34,54 +40,28 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-async def _extract_coords(db: AsyncSession, projet) -> tuple:
-    """Extract lon/lat from a project's PostGIS geometry."""
-    if projet.geom is None:
-        return None, None
-    coord_result = await db.execute(
-        text("SELECT ST_X(geom) as lon, ST_Y(geom) as lat FROM projets WHERE id = :id"),
-        {"id": str(projet.id)},
-    )
-    coord_row = coord_result.mappings().first()
-    if not coord_row:
-        return None, None
-    return float(coord_row["lon"]), float(coord_row["lat"])
-
-
-async def _enrich_project(db: AsyncSession, projet) -> dict:
-    """Enrich a single project with PVGIS data, constraints, and nearest postes."""
-    lon, lat = await _extract_coords(db, projet)
+async def _enrich_project(db: AsyncSession, projet, detailed: bool = True, force: bool = False) -> dict:
+    """Enrich a single project with PVGIS data, constraints, and nearest postes.
 
-    if lon is None or lat is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Projet sans coordonnees — enrichissement impossible",
-        )
-
-    # Fetch data in sequence (PVGIS is external, constraints are local)
-    pvgis_data = await get_pvgis_data(lat, lon)
-    constraints = await get_constraints(db, lon, lat)
-    nearest_postes = await get_nearest_postes(db, lon, lat, limit=3)
-
-    enrichment = {
-        "pvgis": pvgis_data,
-        "constraints": constraints,
-        "nearest_postes": nearest_postes,
-        "enriched_at": datetime.now(timezone.utc).isoformat(),
-    }
-
-    # Store in metadata JSONB
-    current_metadata = projet.metadata_ or {}
-    current_metadata["enrichment"] = enrichment
-    await db.execute(
-        text("UPDATE projets SET metadata = :meta WHERE id = :id"),
-        {"meta": __import__("json").dumps(current_metadata), "id": str(projet.id)},
-    )
+    PVGIS runs concurrently with the local PostGIS lookups (see
+    services.enrichment); detailed=False reads the offline irradiation grid.
+    Only components whose source data changed are recomputed unless force.
+    """
+    outcome = (await enrich_projects(
+        db, [str(projet.id)], commit=False, detailed=detailed, force=force,
+    ))[str(projet.id)]
+    if outcome["status"] == "error":
+        if outcome["error"] == "no coordinates":
+            raise HTTPException(
+                status_code=400,
+                detail="Projet sans coordonnees — enrichissement impossible",
+            )
+        raise HTTPException(status_code=502, detail=f"Enrichissement impossible : {outcome['error']}")
 
     return {
         "projet_id": str(projet.id),
         "projet_nom": projet.nom,
-        **enrichment,
+        **outcome["enrichment"],
     }
 
 
@@ -97,6 +77,8 @@ async def _check_project_ownership(db: AsyncSession, projet, user: User):
 @router.post("/projets/{projet_id}/enrich")
 async def enrich_project(
     projet_id: str,
+    detailed: bool = True,
+    force: bool = False,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(require_user),
 ):
@@ -104,7 +86,10 @@ async def enrich_project(
     and nearest electrical substations.
 
     Requires the project to have coordinates (geom).
-    Data is stored in the project's metadata JSONB field.
+    Data is stored in the project's projet_enrichments row, one JSONB column
+    per component.
+    detailed=false takes solar data from the offline irradiation grid;
+    components already computed from current data are kept unless force=true.
     """
     await check_quota_or_raise(db, user, "enrich")
 
@@ -115,7 +100,7 @@ async def enrich_project(
 
     await _check_project_ownership(db, projet, user)
 
-    enrichment = await _enrich_project(db, projet)
+    enrichment = await _enrich_project(db, projet, detailed=detailed, force=force)
     await db.commit()
 
     await log_usage(db, user, "enrich")
@@ -134,8 +119,15 @@ async def enrich_project(
 
 
 class BatchEnrichRequest(BaseModel):
-    """Request body for batch enrichment. Max 20 project IDs."""
-    projet_ids: list[str] = Field(..., min_length=1, max_length=20)
+    """Request body for batch enrichment. Max 10 000 project IDs.
+
+    Batches are screening: solar data comes from the offline irradiation
+    grid unless detailed is set (one PVGIS call per grid cell). Projects
+    whose enrichment is current are left unchanged unless force is set.
+    """
+    projet_ids: list[str] = Field(..., min_length=1, max_length=10_000)
+    detailed: bool = False
+    force: bool = False
 
     @field_validator("projet_ids")
     @classmethod
@@ -151,40 +143,37 @@ async def batch_enrich(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(require_user),
 ):
-    """Enrich multiple projects in one call (max 20).
+    """Enrich multiple projects in one call (max 10 000).
 
-    Each project is enriched independently — one failure doesn't block others.
+    Projects are processed in chunks of 200, each committed on its own:
+    constraints and nearest postes are resolved set-based, solar data
+    comes from the irradiation grid (PVGIS calls, run concurrently, with
+    detailed=true). One failure doesn't block others.
     Requires Pro tier or above.
     """
     await check_feature_access(user, "batch")
 
-    results = []
-    for pid in body.projet_ids:
-        try:
-            result = await db.execute(select(Projet).where(Projet.id == pid))
-            projet = result.scalar_one_or_none()
-            if not projet:
-                results.append({"projet_id": pid, "status": "error", "error": "not found"})
-                continue
-
-            enrichment = await _enrich_project(db, projet)
-            results.append({
-                "projet_id": pid,
-                "nom": projet.nom,
-                "status": "enriched",
-                "ghi": enrichment.get("pvgis", {}).get("ghi_kwh_m2_an"),
-                "productible": enrichment.get("pvgis", {}).get("productible_kwh_kwc_an"),
-                "constraints_count": enrichment.get("constraints", {}).get("summary", {}).get("total_constraints", 0),
-                "nearest_poste_km": (
-                    enrichment["nearest_postes"][0]["distance_km"]
-                    if enrichment.get("nearest_postes") else None
-                ),
-            })
-        except Exception as exc:
-            logger.warning("Batch enrichment failed for project %s: %s", pid, exc)
-            results.append({"projet_id": pid, "status": "error", "error": str(exc)})
+    outcomes = await enrich_projects(db, body.projet_ids, detailed=body.detailed, force=body.force)
 
-    await db.commit()
+    results = []
+    for pid, outcome in outcomes.items():
+        if outcome["status"] == "error":
+            results.append({"projet_id": pid, "status": "error", "error": outcome["error"]})
+            continue
+        enrichment = outcome["enrichment"]
+        results.append({
+            "projet_id": pid,
+            "nom": outcome["nom"],
+            "status": outcome["status"],
+            "ghi": enrichment.get("pvgis", {}).get("ghi_kwh_m2_an"),
+            "productible": enrichment.get("pvgis", {}).get("productible_kwh_kwc_an"),
+            "solar_source": enrichment.get("pvgis", {}).get("source"),
+            "constraints_count": enrichment.get("constraints", {}).get("summary", {}).get("total_constraints", 0),
+            "nearest_poste_km": (
+                enrichment["nearest_postes"][0]["distance_km"]
+                if enrichment.get("nearest_postes") else None
+            ),
+        })
 
     enriched = [r for r in results if r.get("status") == "enriched"]
     if enriched:
@@ -195,7 +184,8 @@ async def batch_enrich(
             message=f"Projets : {summary}",
         )
 
-    return {"enriched": len(enriched), "results": results}
+    unchanged = sum(1 for r in results if r.get("status") == "unchanged")
+    return {"enriched": len(enriched), "unchanged": unchanged, "results": results}
 
 
 # ─── Get enrichment data ───
@@ -215,8 +205,7 @@ async def get_enrichment(
 
     await _check_project_ownership(db, projet, user)
 
-    metadata = projet.metadata_ or {}
-    enrichment = metadata.get("enrichment")
+    enrichment = await load_enrichment(db, projet.id)
 
     if not enrichment:
         return {
@@ -255,8 +244,7 @@ async def get_regulatory(
     await _check_project_ownership(db, projet, user)
 
     # Load enrichment data if available
-    metadata = projet.metadata_ or {}
-    enrichment_data = metadata.get("enrichment")
+    enrichment_data = await load_enrichment(db, projet.id, ("constraints",))
 
     filiere = projet.filiere or "solaire_sol"
     puissance = float(projet.puissance_mwc) if projet.puissance_mwc else 1.0
@@ -302,8 +290,7 @@ async def get_financial(
 
     await _check_project_ownership(db, projet, user)
 
-    metadata = projet.metadata_ or {}
-    enrichment_data = metadata.get("enrichment")
+    enrichment_data = await load_enrichment(db, projet.id, ("pvgis", "nearest_postes"))
 
     filiere = projet.filiere or "solaire_sol"
     puissance = float(projet.puissance_mwc) if projet.puissance_mwc else 1.0
@@ -327,6 +314,148 @@ async def get_financial(
     }
 
 
+@router.get("/projets/{projet_id}/financial/montecarlo")
+async def get_financial_montecarlo(
+    projet_id: str,
+    samples: int = Query(10_000, ge=1, le=100_000),
+    seed: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_user),
+):
+    """Simulation Monte Carlo du business case.
+
+    Tire `samples` scenarios (CAPEX, productible, prix, OPEX, taux
+    d'actualisation) selon les lois de financial_constants.json et retourne
+    P10/P50/P90, histogrammes et probabilite que le TRI depasse le taux
+    d'actualisation. `seed` rend le resultat reproductible.
+    """
+    result = await db.execute(select(Projet).where(Projet.id == projet_id))
+    projet = result.scalar_one_or_none()
+    if not projet:
+        raise HTTPException(status_code=404, detail="Projet non trouve")
+
+    await _check_project_ownership(db, projet, user)
+
+    enrichment_data = await load_enrichment(db, projet.id, ("pvgis", "nearest_postes"))
+
+    filiere = projet.filiere or "solaire_sol"
+    puissance = float(projet.puissance_mwc) if projet.puissance_mwc else 1.0
+
+    try:
+        simulation = simulate_financial(filiere, puissance, enrichment_data, samples=samples, seed=seed)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return {
+        "projet_id": str(projet.id),
+        "projet_nom": projet.nom,
+        "filiere": filiere,
+        "puissance_mwc": puissance,
+        "enriched": enrichment_data is not None,
+        **simulation,
+    }
+
+
+@router.get("/projets/{projet_id}/financial/sensitivity")
+async def get_financial_sensitivity(
+    projet_id: str,
+    metric: str = "tri_pct",
+    x: Optional[str] = None,
+    y: Optional[str] = None,
+    steps: int = Query(5, ge=2, le=25),
+    variation_pct: float = Query(10.0, gt=0, lt=100),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_user),
+):
+    """Analyse de sensibilite deterministe du business case.
+
+    Fait varier capex, productible, prix, raccordement et duree de vie un a
+    un (tornado classe par amplitude) et `x` × `y` sur une grille
+    `steps` × `steps` (heatmap de `metric`). Sans x/y, la grille par
+    defaut de la filiere : capex × productible, capex × prix pour le BESS.
+    """
+    result = await db.execute(select(Projet).where(Projet.id == projet_id))
+    projet = result.scalar_one_or_none()
+    if not projet:
+        raise HTTPException(status_code=404, detail="Projet non trouve")
+
+    await _check_project_ownership(db, projet, user)
+
+    enrichment_data = await load_enrichment(db, projet.id, ("pvgis", "nearest_postes"))
+
+    filiere = projet.filiere or "solaire_sol"
+    puissance = float(projet.puissance_mwc) if projet.puissance_mwc else 1.0
+
+    try:
+        analysis = sensitivity_analysis(
+            filiere, puissance, enrichment_data,
+            metric=metric, grid=default_grid(filiere, x, y), steps=steps, variation_pct=variation_pct,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return {
+        "projet_id": str(projet.id),
+        "projet_nom": projet.nom,
+        "filiere": filiere,
+        "puissance_mwc": puissance,
+        "enriched": enrichment_data is not None,
+        **analysis,
+    }
+
+
+@router.get("/projets/{projet_id}/financial/cashflow")
+async def get_financial_cashflow(
+    projet_id: str,
+    flat: bool = False,
+    debt_share_pct: Optional[float] = Query(None, ge=0, le=100),
+    contract_years: Optional[float] = Query(None, ge=0, le=40),
+    indexation_pct: Optional[float] = Query(None, ge=-5, le=10),
+    degradation_pct: Optional[float] = Query(None, ge=0, le=10),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_user),
+):
+    """Business case annee par annee.
+
+    Production degradee, tarif CRE indexe puis prix marche, OPEX escalade,
+    dette et demantelement (bloc "cashflow" de financial_constants.json),
+    avec TRI projet/equity, VAN, LCOE, DSCR et payback. `flat=true` rend
+    le modele a cashflow constant de /financial ; les autres parametres
+    remplacent une hypothese.
+    """
+    result = await db.execute(select(Projet).where(Projet.id == projet_id))
+    projet = result.scalar_one_or_none()
+    if not projet:
+        raise HTTPException(status_code=404, detail="Projet non trouve")
+
+    await _check_project_ownership(db, projet, user)
+
+    enrichment_data = await load_enrichment(db, projet.id, ("pvgis", "nearest_postes"))
+
+    filiere = projet.filiere or "solaire_sol"
+    puissance = float(projet.puissance_mwc) if projet.puissance_mwc else 1.0
+
+    overrides = dict(FLAT_ASSUMPTIONS) if flat else {}
+    for name, value in (
+        ("debt_share_pct", debt_share_pct),
+        ("contract_years", contract_years),
+        ("indexation_pct", indexation_pct),
+        ("degradation_pct", degradation_pct),
+    ):
+        if value is not None:
+            overrides[name] = value
+    cashflows = project_cashflows(filiere, puissance, enrichment_data, **overrides)
+
+    return {
+        "projet_id": str(projet.id),
+        "projet_nom": projet.nom,
+        "filiere": filiere,
+        "puissance_mwc": puissance,
+        "enriched": enrichment_data is not None,
+        **cashflows,
+    }
+
+
 # ─── PDF Report ───
 
 
@@ -351,8 +480,7 @@ async def generate_report(
 
     await _check_project_ownership(db, projet, user)
 
-    metadata = projet.metadata_ or {}
-    enrichment_data = metadata.get("enrichment")
+    enrichment_data = await load_enrichment(db, projet.id)
 
     filiere = projet.filiere or "solaire_sol"
     puissance = float(projet.puissance_mwc) if projet.puissance_mwc else 1.0
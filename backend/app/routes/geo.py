@@ -1,16 +1,27 @@
 from typing import Optional
 import json
+import math
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth import get_current_user
 from app.database import get_db
 from app.models import PosteSource
+from app.models.user import User
+from app.services.vector_tiles import MAX_ZOOM, tile_size_m
 
 router = APIRouter()
 
+# Clustering: cells are ~64 px at the requested zoom, and the grid never
+# exceeds CLUSTER_MAX_CELLS_PER_SIDE² cells so the response stays bounded.
+CLUSTER_CELLS_PER_TILE = 4
+CLUSTER_MAX_CELLS_PER_SIDE = 32
+_MERCATOR_R = 6_378_137.0
+_MERCATOR_MAX_LAT = 85.05112878
+
 
 def _build_feature(row: dict) -> dict:
     """Build a GeoJSON Feature from a row containing geojson + property columns."""
@@ -36,6 +47,35 @@ def _build_feature_collection(rows) -> dict:
     return {"type": "FeatureCollection", "features": features}
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def _mercator(lon: float, lat: float) -> tuple[float, float]:
+    lat = max(-_MERCATOR_MAX_LAT, min(_MERCATOR_MAX_LAT, lat))
+    x = math.radians(lon) * _MERCATOR_R
+    y = math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) * _MERCATOR_R
+    return x, y
+
+
+def _bbox_zoom(west: float, east: float) -> int:
+    """Zoom at which the bbox width fills a ~1024 px viewport."""
+    width = max(east - west, 1e-9)
+    return max(0, min(MAX_ZOOM, int(math.floor(math.log2(360 / width))) + 2))
+
+
+def _cluster_cell_m(zoom: int, west: float, south: float, east: float, north: float) -> float:
+    """Grid cell size (Web Mercator metres) for clustering a bbox at a zoom."""
+    x0, y0 = _mercator(west, south)
+    x1, y1 = _mercator(east, north)
+    extent = max(abs(x1 - x0), abs(y1 - y0))
+    return max(tile_size_m(zoom) / CLUSTER_CELLS_PER_TILE, extent / CLUSTER_MAX_CELLS_PER_SIDE)
+
+
 @router.get("/postes-sources")
 async def list_postes(
     gestionnaire: Optional[str] = None,
@@ -53,6 +93,7 @@ async def list_postes(
 
 @router.get("/postes-sources/geojson")
 async def postes_geojson(
+    request: Request,
     gestionnaire: Optional[str] = None,
     tension_min: Optional[float] = None,
     capacite_min: Optional[float] = None,
@@ -60,14 +101,24 @@ async def postes_geojson(
 ):
     """Return ALL postes sources as a GeoJSON FeatureCollection for MapLibre GL.
 
-    Uses PostGIS ST_AsGeoJSON() for server-side geometry serialization (faster
-    than Python-side conversion).
+    The FeatureCollection is assembled by PostgreSQL (json_agg over
+    ST_AsGeoJSON(t.*)) and sent as-is. The ETag is derived from the
+    dataset version and the filters, so a client revalidating with
+    If-None-Match gets a 304 without the collection being queried.
 
     Filters:
         gestionnaire: Filter by grid operator (e.g. 'RTE', 'Enedis', 'ELD').
         tension_min:  Minimum tension in kV.
         capacite_min: Minimum available capacity in MW.
     """
+    from app.services.dataset_versions import dataset_version, version_token
+
+    version = await dataset_version(db, "postes_sources")
+    etag = f'"{version_token(version, gestionnaire, tension_min, capacite_min)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
     # Build query dynamically with optional filters
     conditions: list[str] = ["geom IS NOT NULL"]
     params: dict = {}
@@ -87,20 +138,26 @@ async def postes_geojson(
     where_clause = " AND ".join(conditions)
 
     query = text(f"""
-        SELECT id, nom, gestionnaire, tension_kv, puissance_mw,
-               capacite_disponible_mw,
-               ST_AsGeoJSON(geom) as geojson
-        FROM postes_sources
-        WHERE {where_clause}
+        SELECT json_build_object(
+                   'type', 'FeatureCollection',
+                   'features', COALESCE(json_agg(ST_AsGeoJSON(t.*, 'geom', 6)::json), '[]'::json)
+               )::text
+        FROM (
+            SELECT id, nom, gestionnaire,
+                   tension_kv::float8 AS tension_kv,
+                   puissance_mw::float8 AS puissance_mw,
+                   capacite_disponible_mw::float8 AS capacite_disponible_mw,
+                   geom
+            FROM postes_sources
+            WHERE {where_clause}
+        ) t
     """)
     result = await db.execute(query, params)
-    rows = result.mappings().all()
 
-    feature_collection = _build_feature_collection(rows)
-
-    return JSONResponse(
-        content=feature_collection,
+    return Response(
+        content=result.scalar(),
         media_type="application/geo+json",
+        headers=headers,
     )
 
 
@@ -111,13 +168,52 @@ async def postes_in_bbox(
     east: float = Query(...),
     north: float = Query(...),
     format: Optional[str] = Query(None, description="Response format: 'geojson' for GeoJSON FeatureCollection, omit for JSON list"),
+    cluster: bool = Query(False, description="Aggregate postes on a zoom-dependent grid"),
+    zoom: Optional[int] = Query(None, ge=0, le=MAX_ZOOM, description="Map zoom for clustering (default: derived from the bbox)"),
     db: AsyncSession = Depends(get_db),
 ):
     """Return postes sources within a bounding box.
 
     By default returns a flat JSON list. Pass `format=geojson` to get a GeoJSON
     FeatureCollection suitable for direct use in MapLibre GL.
+
+    With `cluster=true`, postes are snapped to a Web Mercator grid sized for
+    the zoom level and one entry per non-empty cell is returned (centroid,
+    count, summed capacite_disponible_mw). Single-poste cells keep their id
+    and name. The grid is capped at 32×32 cells whatever the bbox.
     """
+    params = {"west": west, "south": south, "east": east, "north": north}
+    if cluster:
+        z = zoom if zoom is not None else _bbox_zoom(west, east)
+        params["cell"] = _cluster_cell_m(z, west, south, east, north)
+        result = await db.execute(text("""
+            SELECT COUNT(*) AS count,
+                   AVG(ST_X(geom)) AS lon, AVG(ST_Y(geom)) AS lat,
+                   COALESCE(SUM(capacite_disponible_mw), 0)::float8 AS capacite_disponible_mw,
+                   MAX(tension_kv)::float8 AS tension_kv_max,
+                   CASE WHEN COUNT(*) = 1 THEN MIN(id) END AS id,
+                   CASE WHEN COUNT(*) = 1 THEN MIN(nom) END AS nom
+            FROM postes_sources
+            WHERE geom && ST_MakeEnvelope(:west, :south, :east, :north, 4326)
+            GROUP BY ST_SnapToGrid(ST_Transform(geom, 3857), CAST(:cell AS float8))
+            ORDER BY count DESC
+        """), params)
+        clusters = [dict(r) for r in result.mappings().all()]
+        if format != "geojson":
+            return clusters
+        features = [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [c.pop("lon"), c.pop("lat")]},
+                "properties": {**c, "cluster": c["count"] > 1},
+            }
+            for c in clusters
+        ]
+        return JSONResponse(
+            content={"type": "FeatureCollection", "features": features},
+            media_type="application/geo+json",
+        )
+
     if format == "geojson":
         query = text("""
             SELECT id, nom, gestionnaire, tension_kv, puissance_mw,
@@ -127,9 +223,7 @@ async def postes_in_bbox(
             WHERE geom && ST_MakeEnvelope(:west, :south, :east, :north, 4326)
             LIMIT 500
         """)
-        result = await db.execute(
-            query, {"west": west, "south": south, "east": east, "north": north}
-        )
+        result = await db.execute(query, params)
         rows = result.mappings().all()
 
         feature_collection = _build_feature_collection(rows)
@@ -148,9 +242,7 @@ async def postes_in_bbox(
         WHERE geom && ST_MakeEnvelope(:west, :south, :east, :north, 4326)
         LIMIT 500
     """)
-    result = await db.execute(
-        query, {"west": west, "south": south, "east": east, "north": north}
-    )
+    result = await db.execute(query, params)
     rows = result.mappings().all()
     return [dict(r) for r in rows]
 
@@ -162,14 +254,23 @@ async def nearest_poste(
     limit: int = Query(5, le=20),
     db: AsyncSession = Depends(get_db),
 ):
-    """Find nearest postes sources to a point."""
+    """Find nearest postes sources to a point (in-process index, PostGIS fallback)."""
+    from app.services.poste_index import get_poste_index
+
+    index = await get_poste_index(db)
+    if index is not None:
+        return [
+            {**poste, "distance_m": distance_m}
+            for poste, distance_m in index.nearest(lon, lat, k=limit)
+        ]
+
     query = text("""
         SELECT id, nom, gestionnaire, tension_kv, puissance_mw,
                capacite_disponible_mw,
                ST_X(geom) as lon, ST_Y(geom) as lat,
-               ST_Distance(geom::geography, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography) as distance_m
+               ST_Distance(geom_l93, ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154)) as distance_m
         FROM postes_sources
-        ORDER BY geom <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
+        ORDER BY geom_l93 <-> ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154)
         LIMIT :limit
     """)
     result = await db.execute(query, {"lon": lon, "lat": lat, "limit": limit})
@@ -177,6 +278,34 @@ async def nearest_poste(
     return [dict(r) for r in rows]
 
 
+@router.get("/geo/export/{layer}")
+async def export_layer(
+    layer: str,
+    format: str = Query("parquet", pattern="^(arrow|parquet)$", description="'arrow' (IPC stream) or 'parquet' (GeoParquet)"),
+    user: Optional[User] = Depends(get_current_user),
+):
+    """Download a layer (postes, natura2000, znieff, projets) as a columnar file.
+
+    Geometries are WKB (GeoArrow / GeoParquet metadata). The body is
+    streamed from a server-side cursor batch by batch. The project
+    portfolio requires authentication.
+    """
+    from app.services.geo_export import EXPORT_FORMATS, EXPORT_LAYERS, stream_export
+
+    export = EXPORT_LAYERS.get(layer)
+    if export is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export layer: {layer}")
+    if export.per_user and user is None:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(export, format, user_id=str(user.id) if user else None),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=proxiam-{layer}.{extension}"},
+    )
+
+
 # ── Spatial analysis endpoints (Sprint 21) ──
 
 
@@ -1,8 +1,9 @@
 """GeoJSON upload + WMS/WFS layer catalog — Sprint 21."""
 
-import json
+from urllib.parse import urlsplit
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -10,6 +11,16 @@ from app.auth import get_current_user, require_user
 from app.database import get_db
 from app.models.geo_layer import GeoLayer
 from app.models.user import User
+from app.services.constraints import SEARCH_RADIUS_M, get_constraints
+from app.services.map_proxy import MapProxy, ProxyError, get_map_proxy
+from app.services.user_layers import (
+    UploadError,
+    constraint_layer,
+    features_in_bbox,
+    load_features,
+    tile_layer,
+)
+from app.services.vector_tiles import MEDIA_TYPE, render_tile, valid_tile
 
 router = APIRouter()
 
@@ -67,39 +78,163 @@ async def upload_geojson(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(require_user),
 ):
-    """Upload a GeoJSON file as a new layer."""
+    """Upload a GeoJSON file as a new layer.
+
+    The file is stream-parsed and its features stored in
+    geo_layer_features (max 500 MB / 2 000 000 features).
+    """
     if not file.filename or not file.filename.endswith((".geojson", ".json")):
         raise HTTPException(400, "File must be .geojson or .json")
 
-    content = await file.read()
-    if len(content) > 10_000_000:
-        raise HTTPException(400, "File too large (max 10 MB)")
-
-    try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
-        raise HTTPException(400, "Invalid JSON")
-
-    if data.get("type") != "FeatureCollection" or "features" not in data:
-        raise HTTPException(400, "Must be a GeoJSON FeatureCollection")
-
-    feature_count = len(data.get("features", []))
-    if feature_count > 50_000:
-        raise HTTPException(400, "Too many features (max 50 000)")
-
     layer = GeoLayer(
         user_id=user.id,
         name=name,
         layer_type="geojson",
-        geojson_data=data,
-        feature_count=feature_count,
+        feature_count=0,
         style={"fillColor": "#6366f1", "fillOpacity": 0.3, "strokeColor": "#4f46e5", "strokeWidth": 2},
     )
     db.add(layer)
+    await db.flush()
+
+    try:
+        layer.feature_count = await load_features(db, layer.id, file)
+    except UploadError as exc:
+        await db.rollback()
+        raise HTTPException(400, str(exc))
     await db.commit()
     await db.refresh(layer)
 
-    return {"id": str(layer.id), "name": layer.name, "feature_count": feature_count}
+    return {"id": str(layer.id), "name": layer.name, "feature_count": layer.feature_count}
+
+
+async def _visible_layer(
+    db: AsyncSession, layer_id: str, user: User | None, layer_types: tuple[str, ...] = ("geojson",)
+) -> GeoLayer:
+    """A layer of the given types the user may read (system or own), else 404."""
+    try:
+        uid = UUID(layer_id)
+    except ValueError:
+        raise HTTPException(404, "Layer not found")
+    result = await db.execute(select(GeoLayer).where(
+        GeoLayer.id == uid,
+        GeoLayer.layer_type.in_(layer_types),
+        (GeoLayer.user_id.is_(None)) | (GeoLayer.user_id == (user.id if user else None)),
+    ))
+    layer = result.scalar_one_or_none()
+    if not layer:
+        raise HTTPException(404, "Layer not found")
+    return layer
+
+
+@router.get("/layers/constraints")
+async def layer_constraints(
+    lon: float = Query(...),
+    lat: float = Query(...),
+    layer_ids: list[str] = Query(..., max_length=20),
+    radius_m: int = Query(SEARCH_RADIUS_M, ge=100, le=50_000),
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """Constraints near a point, including the given uploaded layers.
+
+    Uploaded layer zones are listed under "layer:<id>" next to the
+    natura2000 / znieff lists.
+    """
+    layers = [await _visible_layer(db, layer_id, user) for layer_id in layer_ids]
+    return await get_constraints(
+        db, lon, lat, radius_m, extra_layers=[constraint_layer(l) for l in layers]
+    )
+
+
+@router.get("/layers/{layer_id}/features")
+async def layer_features(
+    layer_id: str,
+    west: float = Query(...),
+    south: float = Query(...),
+    east: float = Query(...),
+    north: float = Query(...),
+    limit: int = Query(5000, ge=1, le=50_000),
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """Features of an uploaded layer within a bounding box (GeoJSON)."""
+    layer = await _visible_layer(db, layer_id, user)
+    content = await features_in_bbox(db, layer.id, west, south, east, north, limit)
+    return Response(content=content, media_type="application/geo+json")
+
+
+@router.get("/layers/{layer_id}/tiles/{z}/{x}/{y}.mvt")
+async def layer_tile(
+    layer_id: str,
+    z: int,
+    x: int,
+    y: int,
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """Vector tile of an uploaded layer (source layer "layer"); 204 when empty."""
+    if not valid_tile(z, x, y):
+        raise HTTPException(400, "Invalid tile coordinates")
+    layer = await _visible_layer(db, layer_id, user)
+    tile = await render_tile(db, tile_layer(layer), z, x, y)
+    headers = {"Cache-Control": "private, max-age=3600"}
+    if not tile:
+        return Response(status_code=204, headers=headers)
+    return Response(content=tile, media_type=MEDIA_TYPE, headers=headers)
+
+
+# ── WMS/WFS caching proxy ──
+
+
+def _map_proxy() -> MapProxy:
+    return get_map_proxy(urlsplit(entry["url"]).hostname for entry in LAYER_CATALOG)
+
+
+def _proxy_cache_control(layer: GeoLayer, max_age: int) -> dict:
+    """Shared caches may only keep responses of layers not owned by a user."""
+    scope = "private" if layer.user_id else "public"
+    return {"Cache-Control": f"{scope}, max-age={max_age}"}
+
+
+@router.get("/layers/{layer_id}/proxy/tiles/{z}/{x}/{y}.png")
+async def proxy_wms_tile(
+    layer_id: str,
+    z: int,
+    x: int,
+    y: int,
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """XYZ tile of a registered WMS layer, fetched once and cached on disk."""
+    if not valid_tile(z, x, y):
+        raise HTTPException(400, "Invalid tile coordinates")
+    layer = await _visible_layer(db, layer_id, user, ("wms",))
+    try:
+        content_type, body = await _map_proxy().wms_tile(str(layer.id), layer.source_url, z, x, y)
+    except ProxyError as exc:
+        raise HTTPException(exc.status_code, exc.detail)
+    return Response(content=body, media_type=content_type, headers=_proxy_cache_control(layer, 86400))
+
+
+@router.get("/layers/{layer_id}/proxy/features")
+async def proxy_wfs_features(
+    layer_id: str,
+    west: float = Query(...),
+    south: float = Query(...),
+    east: float = Query(...),
+    north: float = Query(...),
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """Features of a registered WFS / GeoJSON URL within a bbox, cached on disk."""
+    layer = await _visible_layer(db, layer_id, user, ("wfs", "wms"))
+    try:
+        content_type, body = await _map_proxy().wfs_features(
+            str(layer.id), layer.source_url, (west, south, east, north)
+        )
+    except ProxyError as exc:
+        raise HTTPException(exc.status_code, exc.detail)
+    return Response(content=body, media_type=content_type, headers=_proxy_cache_control(layer, 3600))
 
 
 @router.post("/layers/wms")
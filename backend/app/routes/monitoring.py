@@ -14,6 +14,7 @@ from fastapi import APIRouter, Depends
 
 from app.auth import require_admin
 from app.config import settings
+from app.services.cache import cache_stats
 
 router = APIRouter(prefix="/api/monitoring", tags=["monitoring"])
 
@@ -129,6 +130,7 @@ async def monitoring_metrics():
         "uptime_seconds": _get_uptime(),
         "python_version": platform.python_version(),
         "app_version": APP_VERSION,
+        "caches": cache_stats(),
     }
 
 
@@ -9,6 +9,7 @@ import json
 import uuid
 from typing import Optional
 
+import numpy as np
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
@@ -20,7 +21,8 @@ from app.database import get_db
 from app.models import Projet
 from app.models.user import User
 from app.routes.notifications import create_notification
-from app.services.financial import estimate_financial
+from app.services.enrichment_store import filter_conditions, load_enrichments
+from app.services.financial import estimate_financial_batch, financial_inputs
 from app.services.regulatory import analyze_regulatory
 from app.services.tier_limits import check_project_limit
 
@@ -79,6 +81,11 @@ async def list_projets(
     region: Optional[str] = None,
     score_min: Optional[int] = Query(None, ge=0, le=100),
     score_max: Optional[int] = Query(None, ge=0, le=100),
+    ghi_min: Optional[float] = Query(None, ge=0),
+    productible_min: Optional[float] = Query(None, ge=0),
+    poste_max_km: Optional[float] = Query(None, ge=0),
+    capacite_min_mw: Optional[float] = Query(None, ge=0),
+    hors_zone: Optional[bool] = None,
     limit: int = Query(50, le=200),
     offset: int = Query(0, ge=0),
     db: AsyncSession = Depends(get_db),
@@ -108,6 +115,21 @@ async def list_projets(
         conditions.append("score_global <= :score_max")
         params["score_max"] = score_max
 
+    # Enrichment metrics: indexed columns of projet_enrichments
+    enrichment_filters = {
+        "ghi_min": ghi_min,
+        "productible_min": productible_min,
+        "poste_max_km": poste_max_km,
+        "capacite_min_mw": capacite_min_mw,
+    }
+    enrichment_conditions = filter_conditions(hors_zone=hors_zone, **enrichment_filters)
+    if enrichment_conditions:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM projet_enrichments e WHERE e.projet_id = projets.id AND "
+            + " AND ".join(enrichment_conditions) + ")"
+        )
+        params.update({k: v for k, v in enrichment_filters.items() if v is not None})
+
     where = " AND ".join(conditions)
     query = text(f"""
         SELECT id, nom, filiere, puissance_mwc, surface_ha,
@@ -339,32 +361,41 @@ async def compare_projects(
     if len(projet_ids) < 2:
         raise HTTPException(status_code=400, detail="Minimum 2 projets pour la comparaison")
 
-    projects = []
-    for pid in projet_ids:
-        query = text("""
+    try:
+        projet_ids = [str(uuid.UUID(pid)) for pid in projet_ids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Identifiant de projet invalide")
+
+    result = await db.execute(
+        text("""
             SELECT id, nom, filiere, puissance_mwc, surface_ha,
                    commune, departement, region, statut, score_global,
-                   ST_X(geom) as lon, ST_Y(geom) as lat, metadata
-            FROM projets WHERE id = :id
-        """)
-        result = await db.execute(query, {"id": pid})
-        row = result.mappings().first()
-        if not row:
-            continue
+                   ST_X(geom) as lon, ST_Y(geom) as lat
+            FROM projets WHERE id = ANY(CAST(:ids AS uuid[]))
+        """),
+        {"ids": projet_ids},
+    )
+    rows = {str(r["id"]): r for r in result.mappings().all()}
+    enrichments = await load_enrichments(db, list(rows))
+
+    found = [rows[pid] for pid in projet_ids if pid in rows]
+    filieres = [row["filiere"] or "solaire_sol" for row in found]
+    puissances = [float(row["puissance_mwc"]) if row["puissance_mwc"] else 1.0 for row in found]
+    inputs = [financial_inputs(enrichments.get(str(row["id"]))) for row in found]
+
+    # Financial estimation, all projects at once
+    financial = estimate_financial_batch(
+        filieres, puissances,
+        productibles=[productible for productible, _ in inputs],
+        distances_poste_km=[distance for _, distance in inputs],
+    )
 
-        filiere = row["filiere"] or "solaire_sol"
-        puissance = float(row["puissance_mwc"]) if row["puissance_mwc"] else 1.0
+    projects = []
+    for i, row in enumerate(found):
+        filiere = filieres[i]
+        puissance = puissances[i]
         surface = float(row["surface_ha"]) if row["surface_ha"] else None
-        metadata = row["metadata"] if row["metadata"] else {}
-        if isinstance(metadata, str):
-            metadata = json.loads(metadata)
-        enrichment_data = metadata.get("enrichment")
-
-        # Financial estimation
-        financial = estimate_financial(
-            filiere=filiere, puissance_mwc=puissance,
-            surface_ha=surface, enrichment_data=enrichment_data,
-        )
+        enrichment_data = enrichments.get(str(row["id"]))
 
         # Regulatory analysis
         regulatory = analyze_regulatory(
@@ -376,6 +407,7 @@ async def compare_projects(
         pvgis = enrichment_data.get("pvgis", {}) if enrichment_data else {}
         postes = enrichment_data.get("nearest_postes", []) if enrichment_data else []
         constraints = enrichment_data.get("constraints", {}) if enrichment_data else {}
+        payback = financial["payback_years"][i]
 
         projects.append({
             "id": str(row["id"]),
@@ -394,14 +426,14 @@ async def compare_projects(
             "distance_poste_km": postes[0]["distance_km"] if postes else None,
             "constraints_count": constraints.get("summary", {}).get("total_constraints", 0),
             # Financial
-            "capex_total_eur": financial["capex"]["total_eur"],
-            "capex_eur_kwc": financial["capex"]["eur_par_kwc"],
-            "opex_annuel_eur": financial["opex"]["annuel_eur"],
-            "revenu_annuel_eur": financial["revenus"]["annuel_eur"],
-            "lcoe_eur_mwh": financial["lcoe_eur_mwh"],
-            "tri_pct": financial["tri"]["tri_pct"],
-            "payback_years": financial["tri"]["payback_years"],
-            "rentable": financial["tri"]["rentable"],
+            "capex_total_eur": int(financial["capex_total_eur"][i]),
+            "capex_eur_kwc": int(financial["capex_eur_kwc"][i]),
+            "opex_annuel_eur": int(financial["opex_annuel_eur"][i]),
+            "revenu_annuel_eur": int(financial["revenu_annuel_eur"][i]),
+            "lcoe_eur_mwh": float(financial["lcoe_eur_mwh"][i]),
+            "tri_pct": float(financial["tri_pct"][i]),
+            "payback_years": None if np.isnan(payback) else float(payback),
+            "rentable": bool(financial["rentable"][i]),
             # Regulatory
             "risk_level": regulatory["risk_level"],
             "nb_obligations": regulatory["nb_obligations"],
@@ -1,14 +1,17 @@
 """Scoring API routes — Sprint 3 + Sprint 12 (batch scoring).
 
 Endpoints:
-  POST /api/projets/{id}/score   — calculate + persist score
-  GET  /api/projets/{id}/score   — retrieve last calculated score
+  POST /api/projets/{id}/score   — calculate + persist score (fingerprint-cached)
+  GET  /api/projets/{id}/score   — retrieve last score breakdown + staleness
   POST /api/projets/batch-score  — score multiple projects (max 20)
+  POST /api/projets/bulk-score   — portfolio scoring, set-based (max 10 000)
+  POST /api/scoring/what-if      — re-rank the portfolio under candidate weight vectors
   GET  /api/scoring/weights      — return weight configuration per filiere
 """
 import logging
 from typing import Optional
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field, field_validator
 from sqlalchemy import select, text
@@ -18,7 +21,27 @@ from app.auth import require_user
 from app.database import get_db
 from app.models import Projet
 from app.models.user import User
-from app.services.scoring import calculate_score as compute_score, WEIGHTS, DEFAULT_WEIGHTS
+from app.services.scoring import (
+    calculate_score as compute_score,
+    calculate_scores_bulk,
+    rank_columns,
+    scenario_weight_matrix,
+    weight_profile_index,
+    what_if_scores,
+    WEIGHT_PROFILES,
+    CRITERIA,
+    WEIGHTS,
+    DEFAULT_WEIGHTS,
+)
+from app.services.score_store import (
+    canonical_id,
+    get_stored_scores,
+    load_detail_matrix,
+    load_fingerprints,
+    persist_scores,
+    save_scores,
+    stored_to_result,
+)
 from app.services.tier_limits import check_feature_access, check_quota_or_raise, log_usage
 from app.routes.notifications import create_notification
 
@@ -44,8 +67,8 @@ async def _extract_coords(db: AsyncSession, projet) -> tuple[Optional[float], Op
     return float(coord_row["lon"]), float(coord_row["lat"])
 
 
-async def _score_and_persist(db: AsyncSession, projet, lon, lat) -> dict:
-    """Run scoring engine on a project and persist the result."""
+async def _score_and_persist(db: AsyncSession, projet, lon, lat, fingerprint: str) -> dict:
+    """Run scoring engine on a project and persist the result + breakdown."""
     score_result = await compute_score(
         db=db,
         projet_id=str(projet.id),
@@ -61,6 +84,7 @@ async def _score_and_persist(db: AsyncSession, projet, lon, lat) -> dict:
         text("UPDATE projets SET score_global = :score WHERE id = :id"),
         {"score": score_result["score"], "id": str(projet.id)},
     )
+    await save_scores(db, [score_result], {str(projet.id): fingerprint})
     return score_result
 
 
@@ -77,7 +101,9 @@ async def calculate_score(
 
     Reads the project from DB, extracts coordinates (geom), filiere,
     departement, surface_ha, puissance_mwc, then runs the scoring engine.
-    Persists the global score on the project row.
+    Persists the global score on the project row and the full breakdown in
+    project_scores. If the input fingerprint matches the stored breakdown,
+    that result is returned as-is (`cached: true`).
     """
     await check_quota_or_raise(db, user, "score")
 
@@ -88,8 +114,16 @@ async def calculate_score(
     if not projet:
         raise HTTPException(status_code=404, detail="Projet non trouve")
 
+    # Unchanged inputs → return the stored breakdown without touching PostGIS
+    pid = str(projet.id)
+    fingerprint = (await load_fingerprints(db, [pid]))[pid]
+    stored = (await get_stored_scores(db, [pid])).get(pid)
+    if stored and stored["fingerprint"] == fingerprint:
+        await log_usage(db, user, "score")
+        return {**stored_to_result(pid, stored), "cached": True}
+
     lon, lat = await _extract_coords(db, projet)
-    score_result = await _score_and_persist(db, projet, lon, lat)
+    score_result = await _score_and_persist(db, projet, lon, lat, fingerprint)
     await db.commit()
 
     await log_usage(db, user, "score")
@@ -101,7 +135,7 @@ async def calculate_score(
         entity_type="projet", entity_id=str(projet_id),
     )
 
-    return score_result
+    return {**score_result, "cached": False}
 
 
 @router.get("/projets/{projet_id}/score")
@@ -110,8 +144,10 @@ async def get_score(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(require_user),
 ):
-    """Retrieve the last calculated score for a project.
+    """Retrieve the last calculated score breakdown for a project.
 
+    Returns the stored details/weights/data_sources and a `stale` flag that
+    is true when any scoring input changed since the breakdown was computed.
     If no score has been calculated yet, returns score: null with a hint.
     """
     result = await db.execute(
@@ -121,6 +157,15 @@ async def get_score(
     if not projet:
         raise HTTPException(status_code=404, detail="Projet non trouve")
 
+    pid = str(projet.id)
+    stored = (await get_stored_scores(db, [pid])).get(pid)
+    if stored:
+        fingerprint = (await load_fingerprints(db, [pid])).get(pid)
+        return {
+            **stored_to_result(str(projet_id), stored),
+            "stale": stored["fingerprint"] != fingerprint,
+        }
+
     if projet.score_global is None:
         return {
             "projet_id": str(projet_id),
@@ -128,9 +173,11 @@ async def get_score(
             "message": "Score non calcule. Utilisez POST pour calculer.",
         }
 
+    # Legacy score persisted before breakdowns were stored
     return {
         "projet_id": str(projet_id),
         "score": projet.score_global,
+        "stale": True,
     }
 
 
@@ -149,6 +196,36 @@ class BatchScoreRequest(BaseModel):
         return v
 
 
+async def _score_batch(db: AsyncSession, projet_ids: list[str]) -> tuple[dict, set]:
+    """Score and persist projects set-based → ({projet_id: result}, failed ids).
+
+    If the bulk call fails, each project is retried on its own so that one
+    bad row only fails itself.
+    """
+    try:
+        scored = await calculate_scores_bulk(db, projet_ids)
+        await persist_scores(db, scored)
+        return {r["projet_id"]: r for r in scored}, set()
+    except Exception as exc:
+        logger.warning("Batch scoring failed, scoring projects one by one: %s", exc)
+        await db.rollback()
+
+    scored_by_id: dict = {}
+    failed: set = set()
+    for pid in projet_ids:
+        try:
+            scored = await calculate_scores_bulk(db, [pid])
+            await persist_scores(db, scored)
+            await db.commit()
+        except Exception as exc:
+            logger.warning("Batch scoring failed for project %s: %s", pid, exc)
+            await db.rollback()
+            failed.add(pid)
+            continue
+        scored_by_id.update({r["projet_id"]: r for r in scored})
+    return scored_by_id, failed
+
+
 @router.post("/projets/batch-score")
 async def batch_score(
     body: BatchScoreRequest,
@@ -158,26 +235,23 @@ async def batch_score(
     """Score multiple projects in one call (max 20). Returns per-project results.
 
     Security: Input validated via Pydantic (max 20 items, no duplicates).
-    Each project is scored independently — one failure doesn't block others.
+    Uses the set-based bulk engine; unknown IDs are reported as "not found".
+    If the bulk call fails, projects are scored independently — one failure
+    doesn't block others.
     Requires Pro tier or above.
     """
     await check_feature_access(user, "batch")
 
+    scored_by_id, failed = await _score_batch(db, body.projet_ids)
+
     results = []
     for pid in body.projet_ids:
-        try:
-            result = await db.execute(select(Projet).where(Projet.id == pid))
-            projet = result.scalar_one_or_none()
-            if not projet:
-                results.append({"projet_id": pid, "score": None, "error": "not found"})
-                continue
-
-            lon, lat = await _extract_coords(db, projet)
-            score_result = await _score_and_persist(db, projet, lon, lat)
-            results.append({"projet_id": pid, "nom": projet.nom, "score": score_result["score"]})
-        except Exception as exc:
-            logger.warning("Batch scoring failed for project %s: %s", pid, exc)
-            results.append({"projet_id": pid, "score": None, "error": "scoring_failed"})
+        scored = scored_by_id.get(pid)
+        if not scored:
+            error = "scoring_failed" if pid in failed else "not found"
+            results.append({"projet_id": pid, "score": None, "error": error})
+            continue
+        results.append({"projet_id": pid, "nom": scored["nom"], "score": scored["score"]})
 
     await db.commit()
     scored = [r for r in results if r.get("score") is not None]
@@ -191,6 +265,191 @@ async def batch_score(
     return {"scored": len(scored), "results": results}
 
 
+# ─── Bulk (portfolio) score ───
+
+
+class BulkScoreRequest(BaseModel):
+    """Request body for portfolio scoring. Max 10 000 project IDs.
+
+    force=True recomputes every project even if its stored breakdown is fresh.
+    """
+    projet_ids: list[str] = Field(..., min_length=1, max_length=10_000)
+    force: bool = False
+
+    @field_validator("projet_ids")
+    @classmethod
+    def validate_no_duplicates(cls, v: list[str]) -> list[str]:
+        if len(v) != len(set(v)):
+            raise ValueError("Duplicate projet_ids not allowed")
+        return v
+
+
+@router.post("/projets/bulk-score")
+async def bulk_score(
+    body: BulkScoreRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_user),
+):
+    """Re-score a whole portfolio (up to 10 000 projects) in a few queries.
+
+    Nearest-poste distances, risk aggregates and enrichment are loaded
+    set-based, criteria are evaluated vectorized, and all global scores
+    are written back with one UPDATE. Projects whose input fingerprint
+    matches their stored breakdown are returned from the store unless
+    `force` is set. Returns full per-criterion details.
+    Requires Pro tier or above.
+    """
+    await check_feature_access(user, "batch")
+
+    # Reuse stored breakdowns whose input fingerprint is unchanged
+    to_score = list(body.projet_ids)
+    reused: dict = {}
+    if not body.force:
+        fingerprints = await load_fingerprints(db, body.projet_ids)
+        stored = await get_stored_scores(db, list(fingerprints))
+        for pid in body.projet_ids:
+            try:
+                key = canonical_id(pid)
+            except ValueError:
+                continue
+            entry = stored.get(key)
+            if entry and entry["fingerprint"] == fingerprints.get(key):
+                reused[pid] = {**stored_to_result(pid, entry), "cached": True}
+        to_score = [pid for pid in body.projet_ids if pid not in reused]
+
+    computed = await calculate_scores_bulk(db, to_score) if to_score else []
+    await persist_scores(db, computed)
+    await db.commit()
+
+    computed_by_id = {r["projet_id"]: r for r in computed}
+    results = [
+        reused.get(pid) or computed_by_id[pid]
+        for pid in body.projet_ids
+        if pid in reused or pid in computed_by_id
+    ]
+    missing = [pid for pid in body.projet_ids if pid not in reused and pid not in computed_by_id]
+
+    if results:
+        await create_notification(
+            db, type="batch_scored",
+            title=f"Scoring portefeuille : {len(results)} projets scores",
+            message=f"Score moyen : {round(sum(r['score'] for r in results) / len(results))}/100",
+        )
+
+    return {
+        "scored": len(results),
+        "recomputed": len(computed),
+        "not_found": missing,
+        "results": results,
+    }
+
+
+# ─── Weight what-if ───
+
+
+class WhatIfScenario(BaseModel):
+    """Candidate weights, applied on top of each project's filiere weights.
+    Criteria left out share the remaining weight in proportion to those
+    weights; no weights at all reproduces the stored scores."""
+    name: Optional[str] = None
+    weights: dict[str, float] = Field(default_factory=dict)
+
+
+class WhatIfRequest(BaseModel):
+    """Weight scenarios to evaluate (max 100) over stored breakdowns.
+
+    projet_ids restricts the portfolio (max 10 000); omitted = every
+    scored project visible to the user.
+    """
+    scenarios: list[WhatIfScenario] = Field(..., min_length=1, max_length=100)
+    projet_ids: Optional[list[str]] = Field(None, min_length=1, max_length=10_000)
+    top: int = Field(10, ge=0, le=1000)
+
+
+@router.post("/scoring/what-if")
+async def what_if(
+    body: WhatIfRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_user),
+):
+    """Re-rank the portfolio under one or many candidate weight vectors.
+
+    Loads the stored per-criterion matrix (projects × 6) once and computes
+    every scenario's global scores in one batched product. Overrides are
+    applied per filiere, on top of the weights each project is scored
+    with, so an empty scenario gives back the stored scores. Nothing
+    is persisted. Projects without a stored breakdown are listed in
+    `missing` (run bulk-score first). Requires Pro tier or above.
+    """
+    await check_feature_access(user, "batch")
+
+    try:
+        vectors = np.stack([scenario_weight_matrix(s.weights) for s in body.scenarios])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    requested = None
+    invalid: list[str] = []
+    if body.projet_ids is not None:
+        requested = []
+        for pid in body.projet_ids:
+            try:
+                requested.append(canonical_id(pid))
+            except ValueError:
+                invalid.append(pid)
+
+    matrix = await load_detail_matrix(
+        db, requested, user_id=None if user.tier == "admin" else str(user.id),
+    )
+    ids = matrix["ids"]
+    missing = invalid + sorted(set(requested or []) - set(ids))
+
+    scores = what_if_scores(matrix["details"], vectors, weight_profile_index(matrix["filieres"]))
+    ranks = rank_columns(scores)
+    baseline_ranks = rank_columns(matrix["scores"])[:, 0]
+
+    scenarios = []
+    for j, scenario in enumerate(body.scenarios):
+        top = np.argsort(-scores[:, j], kind="stable")[:body.top]
+        scenarios.append({
+            "name": scenario.name or f"scenario_{j + 1}",
+            "weights": {
+                profile or "default": {c: round(float(w), 4) for c, w in zip(CRITERIA, row)}
+                for profile, row in zip(WEIGHT_PROFILES, vectors[j])
+            },
+            "mean_score": round(float(scores[:, j].mean()), 1) if len(ids) else None,
+            "top": [
+                {
+                    "projet_id": ids[i],
+                    "nom": matrix["noms"][i],
+                    "score": int(scores[i, j]),
+                    "rank": int(ranks[i, j]),
+                    "baseline_rank": int(baseline_ranks[i]),
+                }
+                for i in top
+            ],
+        })
+
+    return {
+        "criteria": CRITERIA,
+        "projects": len(ids),
+        "missing": missing,
+        "scenarios": scenarios,
+        "results": [
+            {
+                "projet_id": pid,
+                "nom": matrix["noms"][i],
+                "filiere": matrix["filieres"][i],
+                "baseline_score": int(matrix["scores"][i]),
+                "baseline_rank": int(baseline_ranks[i]),
+                "scores": scores[i].tolist(),
+                "ranks": ranks[i].tolist(),
+            }
+            for i, pid in enumerate(ids)
+        ],
+    }
+
+
 @router.get("/scoring/weights")
 async def get_weights():
     """Return the scoring weight configuration per filiere."""
@@ -0,0 +1,53 @@
+"""Vector tiles (MVT) for the map — postes, protected zones, projects."""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_user
+from app.database import get_db
+from app.models.user import User
+from app.services.vector_tiles import MAX_ZOOM, MEDIA_TYPE, TILE_LAYERS, render_tile, valid_tile
+
+router = APIRouter()
+
+
+@router.get("/tiles")
+async def list_tile_layers():
+    """Available vector tile layers with their zoom range and attributes."""
+    return [
+        {
+            "name": layer.name,
+            "url": f"/api/tiles/{layer.name}/{{z}}/{{x}}/{{y}}.mvt",
+            "minzoom": layer.min_zoom,
+            "maxzoom": MAX_ZOOM,
+            "attributes": list(layer.attributes),
+            "detail_zoom": layer.detail_zoom,
+            "detail_attributes": list(layer.detail_attributes),
+        }
+        for layer in TILE_LAYERS.values()
+    ]
+
+
+@router.get("/tiles/{layer}/{z}/{x}/{y}.mvt")
+async def get_tile(
+    layer: str,
+    z: int,
+    x: int,
+    y: int,
+    db: AsyncSession = Depends(get_db),
+    user: Optional[User] = Depends(get_current_user),
+):
+    """One Mapbox Vector Tile; 204 when the tile has no feature."""
+    tile_layer = TILE_LAYERS.get(layer)
+    if tile_layer is None:
+        raise HTTPException(status_code=404, detail=f"Unknown tile layer: {layer}")
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+
+    user_id = str(user.id) if user and tile_layer.per_user else None
+    tile = await render_tile(db, tile_layer, z, x, y, user_id=user_id)
+    cache_control = "private, max-age=60" if tile_layer.per_user else "public, max-age=3600"
+    if not tile:
+        return Response(status_code=204, headers={"Cache-Control": cache_control})
+    return Response(content=tile, media_type=MEDIA_TYPE, headers={"Cache-Control": cache_control})
@@ -5,6 +5,9 @@ Jobs:
   - scrape_all: daily at 02:00 — scrape all monitored sources
   - batch_analyze: daily at 03:00 — AI analysis of new content
   - cleanup_logs: Monday at 04:00 — purge old logs (>90 days)
+  - refresh_enrichments: daily at 04:15 — recompute enrichment components whose source data changed
+  - rescore_changes: daily at 04:30 — rescore projects near changed reference data
+  - suitability_raster: daily at 05:00 — incremental refresh of the suitability raster
 """
 import logging
 from datetime import datetime, timedelta, timezone
@@ -60,6 +63,42 @@ async def job_cleanup_logs():
         logger.error("[SCHEDULER] cleanup_logs failed: %s", e)
 
 
+async def job_refresh_enrichments():
+    """Nightly refresh of project enrichments computed from outdated data."""
+    logger.info("[SCHEDULER] Starting refresh_enrichments job at %s", datetime.now(timezone.utc))
+    try:
+        from app.services.enrichment import refresh_stale_enrichments
+        async with async_session() as db:
+            stats = await refresh_stale_enrichments(db)
+            logger.info("[SCHEDULER] refresh_enrichments completed: %s", stats)
+    except Exception as e:
+        logger.error("[SCHEDULER] refresh_enrichments failed: %s", e)
+
+
+async def job_rescore_changes():
+    """Nightly rescoring of projects affected by reference dataset imports."""
+    logger.info("[SCHEDULER] Starting rescore_changes job at %s", datetime.now(timezone.utc))
+    try:
+        from app.services.rescoring import rescore_changed
+        async with async_session() as db:
+            stats = await rescore_changed(db)
+            logger.info("[SCHEDULER] rescore_changes completed: %s", stats)
+    except Exception as e:
+        logger.error("[SCHEDULER] rescore_changes failed: %s", e)
+
+
+async def job_suitability_raster():
+    """Nightly incremental refresh of the national suitability raster."""
+    logger.info("[SCHEDULER] Starting suitability_raster job at %s", datetime.now(timezone.utc))
+    try:
+        from app.services.suitability_raster import build_raster
+        async with async_session() as db:
+            stats = await build_raster(db)
+            logger.info("[SCHEDULER] suitability_raster completed: %s", stats)
+    except Exception as e:
+        logger.error("[SCHEDULER] suitability_raster failed: %s", e)
+
+
 def setup_scheduler():
     """Register all scheduled jobs."""
     # Daily at 02:00 Paris time — scraping
@@ -89,7 +128,38 @@ def setup_scheduler():
         replace_existing=True,
     )
 
-    logger.info("[SCHEDULER] Jobs registered: scrape_all(02:00), batch_analyze(03:00), cleanup_logs(Mon 04:00)")
+    # Daily at 04:15 Paris time — stale enrichment components
+    scheduler.add_job(
+        job_refresh_enrichments,
+        CronTrigger(hour=4, minute=15),
+        id="refresh_enrichments",
+        name="Refresh stale project enrichments",
+        replace_existing=True,
+    )
+
+    # Daily at 04:30 Paris time — incremental rescoring
+    scheduler.add_job(
+        job_rescore_changes,
+        CronTrigger(hour=4, minute=30),
+        id="rescore_changes",
+        name="Rescore projects near changed reference data",
+        replace_existing=True,
+    )
+
+    # Daily at 05:00 Paris time — suitability raster (incremental)
+    scheduler.add_job(
+        job_suitability_raster,
+        CronTrigger(hour=5, minute=0),
+        id="suitability_raster",
+        name="Refresh suitability raster",
+        replace_existing=True,
+    )
+
+    logger.info(
+        "[SCHEDULER] Jobs registered: scrape_all(02:00), batch_analyze(03:00), "
+        "cleanup_logs(Mon 04:00), refresh_enrichments(04:15), rescore_changes(04:30), "
+        "suitability_raster(05:00)"
+    )
 
 
 def start_scheduler():
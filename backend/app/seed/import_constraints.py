@@ -105,6 +105,10 @@ async def import_natura2000(filepath: Path, db, dry: bool = False) -> int:
     if dry:
         return len(features)
 
+    from app.services.reference_changes import record_changes, snapshot
+    from app.services.zone_subdivision import rebuild_zone_geometries
+
+    before = await snapshot(db, "natura2000")
     count = 0
     batch_size = 100
     for i in range(0, len(features), batch_size):
@@ -140,6 +144,12 @@ async def import_natura2000(filepath: Path, db, dry: bool = False) -> int:
         await db.commit()
         logger.info("Natura 2000: %d/%d imported", count, len(features))
 
+    # Log changed geometries for incremental re-scoring, then rebuild
+    # the subdivided/display geometries of the changed zones
+    changes = await record_changes(db, "natura2000", before)
+    await rebuild_zone_geometries(db, "natura2000", changes["keys"])
+    await db.commit()
+
     # Create spatial index
     try:
         await db.execute(text(
@@ -170,6 +180,10 @@ async def import_znieff(filepath: Path, db, dry: bool = False) -> int:
     if dry:
         return len(features)
 
+    from app.services.reference_changes import record_changes, snapshot
+    from app.services.zone_subdivision import rebuild_zone_geometries
+
+    before = await snapshot(db, "znieff")
     count = 0
     batch_size = 100
     for i in range(0, len(features), batch_size):
@@ -205,6 +219,12 @@ async def import_znieff(filepath: Path, db, dry: bool = False) -> int:
         await db.commit()
         logger.info("ZNIEFF: %d/%d imported", count, len(features))
 
+    # Log changed geometries for incremental re-scoring, then rebuild
+    # the subdivided/display geometries of the changed zones
+    changes = await record_changes(db, "znieff", before)
+    await rebuild_zone_geometries(db, "znieff", changes["keys"])
+    await db.commit()
+
     # Create spatial index
     try:
         await db.execute(text(
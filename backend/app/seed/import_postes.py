@@ -156,7 +156,11 @@ async def import_postes():
     engine = create_async_engine(settings.database_url, echo=False)
     session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+    from app.services.reference_changes import record_changes, snapshot
+
     async with session_factory() as session:
+        before = await snapshot(session, "postes_sources")
+
         # Clear existing
         await session.execute(text("DELETE FROM postes_sources"))
         await session.commit()
@@ -181,6 +185,21 @@ async def import_postes():
             await session.commit()
             print(f"  Imported batch {i // batch_size + 1} ({min(i + batch_size, len(postes))}/{len(postes)})")
 
+        # Log changed geometries for incremental re-scoring
+        changes = await record_changes(session, "postes_sources", before)
+        await session.execute(
+            text("""
+                INSERT INTO data_source_statuses (source_name, display_name, category, record_count, last_updated, update_frequency_days, quality_score, status)
+                VALUES ('postes_sources', 'Postes sources (Enedis/RTE)', 'geospatial', :count, NOW(), 90, 80, 'ok')
+                ON CONFLICT (source_name) DO UPDATE SET
+                    record_count = :count, last_updated = NOW(), status = 'ok'
+            """),
+            {"count": len(postes)},
+        )
+        await session.commit()
+        changes.pop("keys")
+        print(f"Reference changes: {changes}")
+
     await engine.dispose()
     print(f"\nImport complete! {len(postes)} postes sources inserted.")
 
@@ -0,0 +1,247 @@
+"""Two-tier cache for external reference data (PVGIS, Clerk JWKS, ...).
+
+A bounded in-process LRU sits in front of Redis:
+
+  - fresh local entries are served without any Redis round trip,
+  - local misses, and local entries older than local_ttl, read Redis
+    (shared by all workers) and refill the LRU; without a newer Redis
+    copy the local value is kept until its TTL,
+  - entries past their TTL but within stale_ttl are served immediately
+    while one background task reloads them (stale-while-revalidate),
+  - a loader returning None is remembered for negative_ttl, so a missing
+    or failing upstream is not asked again on every request,
+  - when a reload fails, the last known value is served if there is one,
+  - concurrent loads of one key share a single call.
+
+Values must be JSON-serialisable and treated as read-only by callers.
+Each cache registers under its namespace; cache_stats() reports the
+counters of all of them.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from app.services.redis_pool import get_redis
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Any]]
+
+_COUNTERS = (
+    "local_hits", "redis_hits", "stale_hits", "negative_hits", "coalesced",
+    "misses", "loads", "load_errors", "evictions", "redis_errors",
+)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    loaded_at: float  # time.monotonic()
+    fresh_until: float
+    stale_until: float
+    negative: bool = False
+
+
+class TieredCache:
+    """In-process LRU with TTL in front of Redis, for one namespace."""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        *,
+        max_entries: int = 1024,
+        local_ttl: Optional[float] = None,
+        stale_ttl: float = 0,
+        negative_ttl: float = 0,
+        use_redis: bool = True,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_ttl = min(local_ttl, ttl) if local_ttl is not None else ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.use_redis = use_redis
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._refreshing: Set[asyncio.Task] = set()
+        self._counts: Dict[str, int] = dict.fromkeys(_COUNTERS, 0)
+        _registry[namespace] = self
+
+    def redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    # ── local tier ──
+
+    def _remember(self, key: str, value: Any, age: float = 0.0, negative: bool = False) -> None:
+        """Store locally; `age` is how long ago the value was loaded (Redis hits)."""
+        now = time.monotonic()
+        loaded_at = now - age
+        if negative:
+            fresh_until = stale_until = loaded_at + self.negative_ttl
+        else:
+            fresh_until = now + min(self.local_ttl, self.ttl - age)
+            stale_until = loaded_at + self.ttl + self.stale_ttl
+        self._entries[key] = _Entry(value, loaded_at, fresh_until, stale_until, negative)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counts["evictions"] += 1
+
+    # ── Redis tier ──
+
+    async def _redis_get(self, key: str) -> Optional[Tuple[Any, float, bool]]:
+        """(value, age in seconds, negative) of a Redis entry still fresh or stale."""
+        if not self.use_redis:
+            return None
+        try:
+            raw = await get_redis().get(self.redis_key(key))
+        except Exception as exc:
+            self._counts["redis_errors"] += 1
+            logger.debug("Cache %s: Redis read failed: %s", self.namespace, exc)
+            return None
+        if not raw:
+            return None
+        try:
+            envelope = json.loads(raw)
+            stored_at, value, negative = envelope["t"], envelope["v"], envelope.get("n", False)
+        except (ValueError, TypeError, KeyError):
+            return None
+        age = max(0.0, time.time() - stored_at)
+        if age >= (self.negative_ttl if negative else self.ttl + self.stale_ttl):
+            return None
+        return value, age, negative
+
+    async def _redis_set(self, key: str, value: Any, negative: bool = False) -> None:
+        if not self.use_redis:
+            return
+        ttl = self.negative_ttl if negative else self.ttl + self.stale_ttl
+        envelope = {"t": time.time(), "v": value}
+        if negative:
+            envelope["n"] = True
+        try:
+            await get_redis().setex(self.redis_key(key), max(1, int(ttl)), json.dumps(envelope))
+        except Exception as exc:
+            self._counts["redis_errors"] += 1
+            logger.debug("Cache %s: Redis write failed: %s", self.namespace, exc)
+
+    # ── loading ──
+
+    async def _load(self, key: str, loader: Loader) -> Any:
+        self._counts["loads"] += 1
+        value = await loader()
+        if value is None:
+            if self.negative_ttl > 0:
+                self._remember(key, None, negative=True)
+                await self._redis_set(key, None, negative=True)
+            else:
+                self._entries.pop(key, None)
+            return None
+        self._remember(key, value)
+        await self._redis_set(key, value)
+        return value
+
+    async def _refresh(self, key: str, loader: Loader) -> None:
+        try:
+            await self._flight.do(key, lambda: self._load(key, loader))
+        except Exception as exc:
+            self._counts["load_errors"] += 1
+            logger.warning("Cache %s: refresh of %s failed: %s", self.namespace, key, exc)
+
+    def _refresh_in_background(self, key: str, loader: Loader) -> None:
+        task = asyncio.create_task(self._refresh(key, loader))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def get_or_load(self, key: str, loader: Loader) -> Any:
+        """Cached value of `key`, calling `loader` when neither tier has it.
+
+        Returns None for negatively cached keys. Loader exceptions propagate
+        unless an older value is still held locally, which is then returned.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now < entry.fresh_until:
+            self._entries.move_to_end(key)
+            self._counts["negative_hits" if entry.negative else "local_hits"] += 1
+            return entry.value
+
+        # Past local_ttl another worker may have reloaded the key: prefer the
+        # newer of the two copies, and only reload once both are past ttl
+        remote = await self._redis_get(key)
+        source = "redis_hits"
+        if entry is not None and not entry.negative and now < entry.stale_until:
+            age = now - entry.loaded_at
+            if remote is None or remote[1] > age:
+                remote, source = (entry.value, age, False), "local_hits"
+        if remote is not None:
+            value, age, negative = remote
+            self._remember(key, value, age=age, negative=negative)
+            if negative:
+                self._counts["negative_hits"] += 1
+            elif age >= self.ttl:
+                self._counts["stale_hits"] += 1
+                self._refresh_in_background(key, loader)
+            else:
+                self._counts[source] += 1
+            return value
+
+        self._counts["misses"] += 1
+        leader = False
+
+        async def load() -> Any:
+            nonlocal leader
+            leader = True
+            return await self._load(key, loader)
+
+        try:
+            value = await self._flight.do(key, load)
+        except Exception:
+            if leader:
+                self._counts["load_errors"] += 1
+            if entry is not None and not entry.negative:
+                logger.warning("Cache %s: reload of %s failed, serving last value", self.namespace, key)
+                return entry.value
+            raise
+        if not leader:
+            self._counts["coalesced"] += 1
+        return value
+
+    async def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self.use_redis:
+            try:
+                await get_redis().delete(self.redis_key(key))
+            except Exception as exc:
+                self._counts["redis_errors"] += 1
+                logger.debug("Cache %s: Redis delete failed: %s", self.namespace, exc)
+
+    def clear_local(self) -> None:
+        self._entries.clear()
+
+    def reset_stats(self) -> None:
+        self._counts = dict.fromkeys(_COUNTERS, 0)
+
+    def stats(self) -> dict:
+        counts = self._counts
+        served = sum(counts[k] for k in ("local_hits", "redis_hits", "stale_hits", "negative_hits", "coalesced"))
+        lookups = served + counts["misses"] - counts["coalesced"]
+        return {
+            **counts,
+            "entries": len(self._entries),
+            "hit_rate": round(served / lookups, 4) if lookups else None,
+        }
+
+
+_registry: Dict[str, TieredCache] = {}
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Counters of every cache, by namespace."""
+    return {name: cache.stats() for name, cache in sorted(_registry.items())}
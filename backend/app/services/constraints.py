@@ -3,169 +3,360 @@
 Queries PostGIS tables (natura2000, znieff) to detect spatial
 intersections with project locations. Returns a list of constraints
 (zone name, type, distance) for a given point.
+
+Layers are declared in a registry (register_layer); their table
+existence is resolved once, at startup, and all available layers are
+evaluated in one UNION ALL / LATERAL query per point or batch of points.
 """
 import logging
-from typing import Optional
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.services.dataset_versions import DATASET_SOURCES, dataset_version, version_token
+from app.services.poste_index import get_poste_index
+
 logger = logging.getLogger(__name__)
 
 # Search radius for nearby constraints (meters)
 SEARCH_RADIUS_M = 10_000  # 10 km
 
 
-async def get_constraints(
-    db: AsyncSession,
-    lon: float,
-    lat: float,
-    radius_m: int = SEARCH_RADIUS_M,
-) -> dict:
-    """Get environmental constraints near a point.
+@dataclass(frozen=True)
+class ConstraintLayer:
+    """A PostGIS table evaluated as an environmental/regulatory constraint.
 
-    Returns:
-        dict with:
-            natura2000: list of intersecting/nearby Natura 2000 zones
-            znieff: list of intersecting/nearby ZNIEFF zones
-            summary: {total_constraints, in_zone, nearby}
+    `name` is the key of the layer's zone list in get_constraints() results.
+    `metric_geom_col` is an indexed EPSG:2154 column used for planar metre
+    predicates; None falls back to on-the-fly geography casts.
+    `subdivided_table` holds ST_Subdivide'd Lambert-93 pieces keyed by
+    `code_col`; when built, tests run on the pieces and are aggregated
+    back to the parent zone.
+    `filter_sql` restricts the rows of a shared table (e.g. one uploaded
+    layer in geo_layer_features).
     """
-    point_wkt = f"ST_SetSRID(ST_MakePoint({lon}, {lat}), 4326)"
+    name: str
+    table: str
+    code_col: str
+    name_col: str = "nom"
+    type_col: Optional[str] = "type_zone"
+    surface_col: Optional[str] = "surface_ha"
+    metric_geom_col: Optional[str] = "geom_l93"
+    subdivided_table: Optional[str] = None
+    filter_sql: Optional[str] = None
+    limit: int = 10
 
-    natura2000 = await _query_zones(
-        db, "natura2000", point_wkt, lon, lat, radius_m,
-        code_col="site_code", type_col="type_zone",
-    )
-    znieff = await _query_zones(
-        db, "znieff", point_wkt, lon, lat, radius_m,
-        code_col="code_mnhn", type_col="type_zone",
+
+CONSTRAINT_LAYERS: Dict[str, ConstraintLayer] = {}
+
+# Layers whose table exists — resolved once (startup or first use)
+_available_layers: Optional[List[ConstraintLayer]] = None
+
+
+def register_layer(layer: ConstraintLayer) -> None:
+    """Add (or replace) a constraint layer; its table is checked on next refresh."""
+    global _available_layers
+    CONSTRAINT_LAYERS[layer.name] = layer
+    _available_layers = None
+
+
+register_layer(ConstraintLayer(
+    "natura2000", "natura2000", code_col="site_code", subdivided_table="natura2000_subdivided",
+))
+register_layer(ConstraintLayer(
+    "znieff", "znieff", code_col="code_mnhn", subdivided_table="znieff_subdivided",
+))
+
+
+async def refresh_constraint_layers(db: AsyncSession) -> List[ConstraintLayer]:
+    """Resolve which registered layers have a table (one information_schema query).
+
+    Subdivided tables are only used once populated; otherwise the layer
+    is evaluated on its parent table.
+    """
+    global _available_layers
+    tables = [layer.table for layer in CONSTRAINT_LAYERS.values()]
+    tables += [l.subdivided_table for l in CONSTRAINT_LAYERS.values() if l.subdivided_table]
+    result = await db.execute(
+        text("""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_name = ANY(CAST(:tables AS text[]))
+        """),
+        {"tables": tables},
     )
+    existing = {row[0] for row in result.all()}
 
-    in_zone = sum(1 for z in natura2000 + znieff if z["intersects"])
-    nearby = sum(1 for z in natura2000 + znieff if not z["intersects"])
+    available = []
+    for layer in CONSTRAINT_LAYERS.values():
+        if layer.table not in existing:
+            continue
+        if layer.subdivided_table:
+            built = layer.subdivided_table in existing and (await db.execute(
+                text(f"SELECT EXISTS (SELECT 1 FROM {layer.subdivided_table})")
+            )).scalar()
+            if not built:
+                layer = replace(layer, subdivided_table=None)
+        available.append(layer)
+    _available_layers = available
+    missing = sorted(set(CONSTRAINT_LAYERS) - {l.name for l in _available_layers})
+    if missing:
+        logger.info("Constraint layers without table (skipped): %s", missing)
+    return _available_layers
 
+
+async def _layers(db: AsyncSession) -> List[ConstraintLayer]:
+    if _available_layers is None:
+        return await refresh_constraint_layers(db)
+    return _available_layers
+
+
+async def constraints_version(db: AsyncSession) -> str:
+    """Version token of the registry constraints: available layers and their datasets."""
+    parts = []
+    for layer in await _layers(db):
+        version = await dataset_version(db, layer.table) if layer.table in DATASET_SOURCES else ""
+        parts.append(f"{layer.name}={version}")
+    return version_token(*sorted(parts))
+
+
+async def resolved_layer(db: AsyncSession, name: str) -> Optional[ConstraintLayer]:
+    """The available layer `name` as resolved at startup (None if its table is missing)."""
+    return next((l for l in await _layers(db) if l.name == name), None)
+
+
+def _layer_sql(layer: ConstraintLayer) -> str:
+    """Sub-select of one layer, correlated to the point `pt` of the outer query."""
+    if layer.subdivided_table:
+        return _subdivided_layer_sql(layer)
+    type_expr = f"{layer.type_col}::text" if layer.type_col else "NULL::text"
+    surface_expr = f"{layer.surface_col}::float8" if layer.surface_col else "NULL::float8"
+    if layer.metric_geom_col:
+        distance = f"ST_Distance({layer.metric_geom_col}, pt.geom_l93)"
+        within = f"ST_DWithin({layer.metric_geom_col}, pt.geom_l93, :radius)"
+    else:
+        distance = "ST_Distance(geom::geography, pt.geom::geography)"
+        within = "ST_DWithin(geom::geography, pt.geom::geography, :radius)"
+    if layer.filter_sql:
+        within = f"{within} AND {layer.filter_sql}"
+    return f"""(
+        SELECT
+            '{layer.name}' AS layer,
+            {layer.code_col}::text AS code,
+            {layer.name_col}::text AS nom,
+            {type_expr} AS type_zone,
+            {surface_expr} AS surface_ha,
+            ST_Intersects(geom, pt.geom) AS intersects,
+            ROUND({distance}::numeric) AS distance_m
+        FROM {layer.table}
+        WHERE {within}
+        ORDER BY distance_m ASC
+        LIMIT {layer.limit}
+    )"""
+
+
+def _subdivided_layer_sql(layer: ConstraintLayer) -> str:
+    """Same columns as _layer_sql, tested on subdivided pieces then grouped per zone."""
+    type_expr = f"z.{layer.type_col}::text" if layer.type_col else "NULL::text"
+    surface_expr = f"z.{layer.surface_col}::float8" if layer.surface_col else "NULL::float8"
+    return f"""(
+        SELECT
+            '{layer.name}' AS layer,
+            s.key AS code,
+            z.{layer.name_col}::text AS nom,
+            {type_expr} AS type_zone,
+            {surface_expr} AS surface_ha,
+            s.intersects,
+            ROUND(s.distance_m::numeric) AS distance_m
+        FROM (
+            SELECT {layer.code_col}::text AS key,
+                   BOOL_OR(ST_Intersects(geom_l93, pt.geom_l93)) AS intersects,
+                   MIN(ST_Distance(geom_l93, pt.geom_l93)) AS distance_m
+            FROM {layer.subdivided_table}
+            WHERE ST_DWithin(geom_l93, pt.geom_l93, :radius)
+            GROUP BY {layer.code_col}
+        ) s
+        JOIN {layer.table} z ON z.{layer.code_col}::text = s.key
+        ORDER BY distance_m ASC
+        LIMIT {layer.limit}
+    )"""
+
+
+def _empty_result(extra_layers: Sequence[ConstraintLayer] = ()) -> Dict[str, list]:
+    return {name: [] for name in [*CONSTRAINT_LAYERS, *(l.name for l in extra_layers)]}
+
+
+def _summarize(zones: Dict[str, list]) -> dict:
+    all_zones = [z for layer_zones in zones.values() for z in layer_zones]
+    in_zone = sum(1 for z in all_zones if z["intersects"])
     return {
-        "natura2000": natura2000,
-        "znieff": znieff,
+        **zones,
         "summary": {
-            "total_constraints": len(natura2000) + len(znieff),
+            "total_constraints": len(all_zones),
             "in_zone": in_zone,
-            "nearby": nearby,
+            "nearby": len(all_zones) - in_zone,
         },
     }
 
 
-async def _query_zones(
+async def get_constraints_batch(
     db: AsyncSession,
-    table: str,
-    point_wkt: str,
-    lon: float,
-    lat: float,
-    radius_m: int,
-    code_col: str = "site_code",
-    type_col: str = "type_zone",
-) -> list[dict]:
-    """Query a spatial table for zones intersecting or near a point."""
-    # Check if table exists (graceful degradation if not yet seeded)
-    check_query = text("""
-        SELECT EXISTS (
-            SELECT 1 FROM information_schema.tables
-            WHERE table_name = :table_name
-        ) as exists
-    """)
-    result = await db.execute(check_query, {"table_name": table})
-    row = result.mappings().first()
-    if not row or not row["exists"]:
-        logger.debug("Table %s does not exist, skipping constraint check", table)
-        return []
+    points: Sequence[Tuple[float, float]],
+    radius_m: int = SEARCH_RADIUS_M,
+    extra_layers: Sequence[ConstraintLayer] = (),
+) -> List[dict]:
+    """Evaluate every constraint layer for many (lon, lat) points in one query.
+
+    `extra_layers` are evaluated in addition to the registry (e.g. a
+    user's uploaded layers). Returns one get_constraints()-shaped dict per
+    point, in input order.
+    """
+    layers = [*await _layers(db), *extra_layers]
+    zones = [_empty_result(extra_layers) for _ in points]
+    if not layers or not points:
+        return [_summarize(z) for z in zones]
 
+    union = "\n        UNION ALL\n        ".join(_layer_sql(layer) for layer in layers)
     query = text(f"""
-        SELECT
-            {code_col} as code,
-            nom,
-            {type_col} as type_zone,
-            surface_ha,
-            ST_Intersects(
-                geom,
-                ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
-            ) as intersects,
-            ROUND(
-                ST_Distance(
-                    geom::geography,
-                    ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
-                )::numeric
-            ) as distance_m
-        FROM {table}
-        WHERE ST_DWithin(
-            geom::geography,
-            ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
-            :radius
-        )
-        ORDER BY distance_m ASC
-        LIMIT 10
+        SELECT pt.ord, z.*
+        FROM unnest(CAST(:lons AS float8[]), CAST(:lats AS float8[]))
+             WITH ORDINALITY AS p(lon, lat, ord)
+        CROSS JOIN LATERAL (
+            SELECT ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326) AS geom,
+                   ST_Transform(ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326), 2154) AS geom_l93,
+                   p.ord
+        ) pt
+        CROSS JOIN LATERAL (
+        {union}
+        ) z
+        ORDER BY pt.ord, z.layer, z.distance_m
     """)
-
     try:
-        result = await db.execute(query, {"lon": lon, "lat": lat, "radius": radius_m})
+        result = await db.execute(query, {
+            "lons": [float(lon) for lon, _ in points],
+            "lats": [float(lat) for _, lat in points],
+            "radius": radius_m,
+        })
         rows = result.mappings().all()
     except Exception as exc:
-        logger.warning("Constraint query failed on %s: %s", table, exc)
-        return []
+        logger.warning("Constraint query failed: %s", exc)
+        return [_summarize(z) for z in zones]
 
-    return [
-        {
+    for row in rows:
+        zones[row["ord"] - 1][row["layer"]].append({
             "code": row["code"],
             "nom": row["nom"],
             "type_zone": row["type_zone"],
             "surface_ha": float(row["surface_ha"]) if row["surface_ha"] else None,
             "intersects": bool(row["intersects"]),
             "distance_m": int(row["distance_m"]),
-        }
-        for row in rows
-    ]
+        })
+    return [_summarize(z) for z in zones]
 
 
-async def get_nearest_postes(
+async def get_constraints(
     db: AsyncSession,
     lon: float,
     lat: float,
+    radius_m: int = SEARCH_RADIUS_M,
+    extra_layers: Sequence[ConstraintLayer] = (),
+) -> dict:
+    """Get environmental constraints near a point.
+
+    Returns:
+        dict with:
+            <layer name>: list of intersecting/nearby zones, for every
+                registered layer (natura2000, znieff, ...)
+            summary: {total_constraints, in_zone, nearby}
+    """
+    return (await get_constraints_batch(db, [(lon, lat)], radius_m, extra_layers))[0]
+
+
+def _index_poste(poste: dict, distance_m: float) -> dict:
+    distance = int(round(distance_m))
+    return {
+        "id": poste["id"],
+        "nom": poste["nom"],
+        "gestionnaire": poste["gestionnaire"],
+        "tension_kv": poste["tension_kv"] or None,
+        "puissance_mw": poste["puissance_mw"] or None,
+        "capacite_disponible_mw": poste["capacite_disponible_mw"] or None,
+        "distance_m": distance,
+        "distance_km": round(distance / 1000, 1),
+    }
+
+
+def _row_poste(row) -> dict:
+    return {
+        "id": row["id"],
+        "nom": row["nom"],
+        "gestionnaire": row["gestionnaire"],
+        "tension_kv": float(row["tension_kv"]) if row["tension_kv"] else None,
+        "puissance_mw": float(row["puissance_mw"]) if row["puissance_mw"] else None,
+        "capacite_disponible_mw": (
+            float(row["capacite_disponible_mw"])
+            if row["capacite_disponible_mw"] else None
+        ),
+        "distance_m": int(row["distance_m"]),
+        "distance_km": round(int(row["distance_m"]) / 1000, 1),
+    }
+
+
+async def get_nearest_postes_batch(
+    db: AsyncSession,
+    points: Sequence[Tuple[float, float]],
     limit: int = 3,
-) -> list[dict]:
-    """Get N nearest electrical substations with distance and capacity."""
+) -> List[list[dict]]:
+    """N nearest substations for many (lon, lat) points, in input order.
+
+    Served by the in-process poste index when available, otherwise by one
+    kNN LATERAL query over all points.
+    """
+    if not points:
+        return []
+    index = await get_poste_index(db)
+    if index is not None:
+        return [
+            [_index_poste(poste, d) for poste, d in index.nearest(lon, lat, k=limit)]
+            for lon, lat in points
+        ]
+
     query = text("""
-        SELECT
-            id,
-            nom,
-            gestionnaire,
-            tension_kv,
-            puissance_mw,
-            capacite_disponible_mw,
-            ROUND(
-                ST_Distance(
-                    geom::geography,
-                    ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
-                )::numeric
-            ) as distance_m
-        FROM postes_sources
-        ORDER BY geom <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
-        LIMIT :limit
+        SELECT p.ord, n.*
+        FROM unnest(CAST(:lons AS float8[]), CAST(:lats AS float8[]))
+             WITH ORDINALITY AS p(lon, lat, ord)
+        CROSS JOIN LATERAL (
+            SELECT ST_Transform(ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326), 2154) AS g
+        ) pt
+        CROSS JOIN LATERAL (
+            SELECT id, nom, gestionnaire, tension_kv, puissance_mw, capacite_disponible_mw,
+                   ROUND(ST_Distance(geom_l93, pt.g)::numeric) AS distance_m
+            FROM postes_sources
+            ORDER BY geom_l93 <-> pt.g
+            LIMIT :limit
+        ) n
+        ORDER BY p.ord, n.distance_m
     """)
-    result = await db.execute(query, {"lon": lon, "lat": lat, "limit": limit})
-    rows = result.mappings().all()
+    result = await db.execute(query, {
+        "lons": [float(lon) for lon, _ in points],
+        "lats": [float(lat) for _, lat in points],
+        "limit": limit,
+    })
+    postes: List[list[dict]] = [[] for _ in points]
+    for row in result.mappings().all():
+        postes[row["ord"] - 1].append(_row_poste(row))
+    return postes
 
-    return [
-        {
-            "id": row["id"],
-            "nom": row["nom"],
-            "gestionnaire": row["gestionnaire"],
-            "tension_kv": float(row["tension_kv"]) if row["tension_kv"] else None,
-            "puissance_mw": float(row["puissance_mw"]) if row["puissance_mw"] else None,
-            "capacite_disponible_mw": (
-                float(row["capacite_disponible_mw"])
-                if row["capacite_disponible_mw"] else None
-            ),
-            "distance_m": int(row["distance_m"]),
-            "distance_km": round(int(row["distance_m"]) / 1000, 1),
-        }
-        for row in rows
-    ]
+
+async def get_nearest_postes(
+    db: AsyncSession,
+    lon: float,
+    lat: float,
+    limit: int = 3,
+) -> list[dict]:
+    """Get N nearest electrical substations with distance and capacity.
+
+    Served by the in-process poste index when available, PostGIS otherwise.
+    """
+    return (await get_nearest_postes_batch(db, [(lon, lat)], limit))[0]
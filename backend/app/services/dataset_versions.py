@@ -0,0 +1,68 @@
+"""Version tokens for reference datasets.
+
+A version changes whenever a dataset is re-imported or its rows change,
+so it can key derived artefacts (vector tiles, exports, HTTP ETags)
+without hashing the data itself. It combines:
+
+  - data_source_statuses.last_updated (stamped by the importers),
+  - the latest reference_changes row for the dataset (geometry changes),
+  - the row count and max id of the table (manual inserts / deletes).
+
+Versions are memoized in-process for VERSION_TTL_S seconds; importers can
+call invalidate() to drop the memo right away.
+"""
+import hashlib
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+VERSION_TTL_S = 30.0
+
+# dataset → data_source_statuses.source_name
+DATASET_SOURCES: Dict[str, str] = {
+    "postes_sources": "postes_sources",
+    "natura2000": "natura2000",
+    "znieff": "znieff",
+}
+
+_memo: Dict[str, Tuple[float, str]] = {}
+
+
+def invalidate(dataset: Optional[str] = None) -> None:
+    """Forget the memoized version of one dataset (or all of them)."""
+    if dataset is None:
+        _memo.clear()
+    else:
+        _memo.pop(dataset, None)
+
+
+def version_token(*parts) -> str:
+    """Short stable token from the version components."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+async def dataset_version(db: AsyncSession, dataset: str) -> str:
+    """Current version token of a reference dataset (memoized)."""
+    if dataset not in DATASET_SOURCES:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    cached = _memo.get(dataset)
+    if cached and time.monotonic() - cached[0] < VERSION_TTL_S:
+        return cached[1]
+
+    result = await db.execute(
+        text(f"""
+            SELECT
+                (SELECT last_updated FROM data_source_statuses WHERE source_name = :source) AS updated,
+                (SELECT MAX(id) FROM reference_changes WHERE dataset = :dataset) AS change_id,
+                (SELECT COUNT(*) FROM {dataset}) AS n,
+                (SELECT MAX(id) FROM {dataset}) AS max_id
+        """),
+        {"source": DATASET_SOURCES[dataset], "dataset": dataset},
+    )
+    row = result.mappings().first()
+    version = version_token(row["updated"], row["change_id"], row["n"], row["max_id"])
+    _memo[dataset] = (time.monotonic(), version)
+    return version
@@ -0,0 +1,303 @@
+"""Project enrichment pipeline — PVGIS, constraints, nearest postes.
+
+Enrichments are stored in projet_enrichments (see services.enrichment_store).
+Each component is stamped, in versions, with the version of the data it
+was computed from:
+
+  pvgis           pvgis.pvgis_version() or irradiation_grid.grid_version()
+  constraints     constraints.constraints_version() (natura2000, znieff, ...)
+  nearest_postes  dataset_version("postes_sources")
+
+Re-enriching only recomputes the components whose version moved (all of
+them with force=True) and upserts them as a patch, leaving the other
+components as they are.
+
+Projects are processed in chunks of ENRICH_CHUNK. For each chunk:
+
+  - coordinates and stored enrichments are loaded in one query,
+  - constraints (one LATERAL query) and nearest postes (poste index or
+    one kNN LATERAL query) are computed for the projects that need them,
+  - solar data comes from the offline irradiation grid for screening;
+    PVGIS is only called for detailed studies and points the grid does
+    not cover, concurrently (at most PVGIS_CONCURRENCY in flight) while
+    the database part runs,
+  - all patches are written in one upsert.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Union
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.constraints import constraints_version, get_constraints_batch, get_nearest_postes_batch
+from app.services.dataset_versions import dataset_version
+from app.services.enrichment_store import COMPONENTS, enrichment_from_row, save_enrichments
+from app.services.irradiation_grid import get_grid, grid_version
+from app.services.pvgis import get_pvgis_data, pvgis_version
+
+logger = logging.getLogger(__name__)
+
+ENRICH_CHUNK = 200
+PVGIS_CONCURRENCY = 8
+
+
+async def current_versions(db: AsyncSession) -> Dict[str, Optional[str]]:
+    """Current dependency versions: one per component, plus the grid's."""
+    return {
+        "pvgis": pvgis_version(),
+        "irradiation_grid": grid_version(),
+        "constraints": await constraints_version(db),
+        "nearest_postes": await dataset_version(db, "postes_sources"),
+    }
+
+
+def solar_version(solar: dict, versions: Dict[str, Optional[str]]) -> Optional[str]:
+    """Version to stamp on a solar result; None (always stale) for the latitude fallback."""
+    source = solar.get("source")
+    if source == "pvgis_api":
+        return versions["pvgis"]
+    if source == "irradiation_grid":
+        return versions["irradiation_grid"]
+    return None
+
+
+def stale_components(
+    stored: Optional[dict], versions: Dict[str, Optional[str]], detailed: Optional[bool]
+) -> List[str]:
+    """Components of a stored enrichment to recompute.
+
+    The solar component is current when stamped with the PVGIS version,
+    or with the grid version unless a detailed study is requested.
+    """
+    if not stored:
+        return list(COMPONENTS)
+    stamped = stored.get("versions") or {}
+    accepted = {versions["pvgis"]}
+    if not detailed and versions["irradiation_grid"]:
+        accepted.add(versions["irradiation_grid"])
+    stale = [] if stamped.get("pvgis") in accepted else ["pvgis"]
+    stale += [c for c in ("constraints", "nearest_postes") if stamped.get(c) != versions[c]]
+    return stale
+
+
+async def _pvgis_many(points: Sequence[tuple], concurrency: int = PVGIS_CONCURRENCY) -> List[Any]:
+    """PVGIS data per (lon, lat), bounded concurrency; exceptions are returned, not raised."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(lon: float, lat: float) -> dict:
+        async with semaphore:
+            return await get_pvgis_data(lat, lon)
+
+    return await asyncio.gather(*(one(lon, lat) for lon, lat in points), return_exceptions=True)
+
+
+async def _solar_many(points: Sequence[tuple], detailed: Union[bool, Sequence[bool]]) -> List[Any]:
+    """Solar data per (lon, lat): grid values when screening, PVGIS for the rest."""
+    if isinstance(detailed, bool):
+        detailed = [detailed] * len(points)
+    solar: List[Any] = [None] * len(points)
+    screening = [i for i, d in enumerate(detailed) if not d]
+    grid = get_grid() if screening else None
+    if grid is not None:
+        lons, lats = np.array([points[i] for i in screening], dtype=np.float64).T
+        for i, value in zip(screening, grid.sample_records(lons, lats)):
+            solar[i] = value
+    missing = [i for i, s in enumerate(solar) if s is None]
+    if missing:
+        fetched = await _pvgis_many([points[i] for i in missing])
+        for i, value in zip(missing, fetched):
+            solar[i] = value
+    return solar
+
+
+async def _local_sources(
+    db: AsyncSession, constraint_points: Sequence[tuple], poste_points: Sequence[tuple]
+) -> tuple:
+    constraints = await get_constraints_batch(db, constraint_points) if constraint_points else []
+    nearest = await get_nearest_postes_batch(db, poste_points, limit=3) if poste_points else []
+    return constraints, nearest
+
+
+def _canonical_uuid(value: str) -> Optional[str]:
+    """Lower-case hyphenated form of a UUID string, None when invalid."""
+    try:
+        return str(UUID(value))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+async def _enrich_chunk(
+    db: AsyncSession,
+    projet_ids: Sequence[str],
+    versions: Dict[str, Optional[str]],
+    detailed: Optional[bool],
+    force: bool,
+) -> Dict[str, dict]:
+    result = await db.execute(
+        text("""
+            SELECT p.id, p.nom, ST_X(p.geom) AS lon, ST_Y(p.geom) AS lat,
+                   e.pvgis, e.constraints, e.nearest_postes, e.versions, e.enriched_at
+            FROM projets p
+            LEFT JOIN projet_enrichments e ON e.projet_id = p.id
+            WHERE p.id = ANY(CAST(:ids AS uuid[]))
+        """),
+        {"ids": [key for key in map(_canonical_uuid, projet_ids) if key]},
+    )
+    rows = {str(r["id"]): r for r in result.mappings().all()}
+
+    # Outcomes are keyed by the caller's ID string, whatever its case
+    outcomes: Dict[str, dict] = {}
+    todo = []  # (caller id, row, stored enrichment, components to compute, detailed)
+    first_spelling: Dict[str, str] = {}  # canonical id → first caller id
+    duplicates: Dict[str, str] = {}  # later spelling of the same project → first
+    for pid in projet_ids:
+        key = _canonical_uuid(pid)
+        if key in first_spelling:
+            duplicates[pid] = first_spelling[key]
+            continue
+        if key:
+            first_spelling[key] = pid
+        row = rows.get(key)
+        if row is None:
+            outcomes[pid] = {"status": "error", "error": "not found"}
+            continue
+        if row["lon"] is None or row["lat"] is None:
+            outcomes[pid] = {"status": "error", "error": "no coordinates", "nom": row["nom"]}
+            continue
+        stored = enrichment_from_row(row)
+        # Without an explicit mode, keep the one the solar data was computed with
+        row_detailed = detailed
+        if row_detailed is None:
+            row_detailed = ((stored or {}).get("pvgis") or {}).get("source") == "pvgis_api"
+        needed = list(COMPONENTS) if force else stale_components(stored, versions, row_detailed)
+        if needed:
+            todo.append((pid, row, stored, needed, row_detailed))
+        else:
+            outcomes[pid] = {"status": "unchanged", "nom": row["nom"], "enrichment": stored}
+    if todo:
+        await _compute(db, todo, versions, outcomes)
+    for pid, first in duplicates.items():
+        outcomes[pid] = outcomes[first]
+    return outcomes
+
+
+async def _compute(
+    db: AsyncSession, todo: List[tuple], versions: Dict[str, Optional[str]], outcomes: Dict[str, dict]
+) -> None:
+    """Compute and upsert the needed components of `todo`, filling `outcomes`."""
+
+    def points(component: str) -> List[tuple]:
+        return [(float(r["lon"]), float(r["lat"])) for _, r, _, needed, _ in todo if component in needed]
+
+    solar_modes = [d for _, _, _, needed, d in todo if "pvgis" in needed]
+    pvgis, (constraints, nearest) = await asyncio.gather(
+        _solar_many(points("pvgis"), solar_modes),
+        _local_sources(db, points("constraints"), points("nearest_postes")),
+    )
+    computed = {"pvgis": iter(pvgis), "constraints": iter(constraints), "nearest_postes": iter(nearest)}
+
+    enriched_at = datetime.now(timezone.utc).isoformat()
+    ids: List[str] = []
+    payloads: List[str] = []
+    for pid, row, stored, needed, _ in todo:
+        patch: Dict[str, Any] = {c: next(computed[c]) for c in needed}
+        solar = patch.get("pvgis")
+        if isinstance(solar, Exception):
+            logger.warning("PVGIS enrichment failed for project %s: %s", pid, solar)
+            outcomes[pid] = {"status": "error", "error": str(solar), "nom": row["nom"]}
+            continue
+        stamps = {c: versions[c] for c in needed if c != "pvgis"}
+        if "pvgis" in needed:
+            stamps["pvgis"] = solar_version(solar, versions)
+        patch["versions"] = stamps
+        patch["enriched_at"] = enriched_at
+
+        enrichment = {**(stored or {}), **patch}
+        enrichment["versions"] = {**((stored or {}).get("versions") or {}), **stamps}
+        outcomes[pid] = {
+            "status": "enriched", "nom": row["nom"], "enrichment": enrichment, "refreshed": needed,
+        }
+        ids.append(str(row["id"]))
+        payloads.append(json.dumps(patch))
+
+    await save_enrichments(db, ids, payloads)
+
+
+async def enrich_projects(
+    db: AsyncSession,
+    projet_ids: Sequence[str],
+    chunk_size: int = ENRICH_CHUNK,
+    commit: bool = True,
+    detailed: Optional[bool] = True,
+    force: bool = False,
+) -> Dict[str, dict]:
+    """Enrich any number of projects → {projet_id: outcome}, in input order.
+
+    Each outcome has a "status": "enriched" (with the stored "enrichment"
+    dict and the "refreshed" components), "unchanged" (every component
+    current, nothing written) or "error". With commit=True every chunk is
+    committed as soon as it is written.
+
+    detailed=False (screening) takes solar data from the irradiation grid
+    when it is imported; detailed=None keeps each project's previous mode.
+    force=True recomputes every component.
+    """
+    versions = await current_versions(db)
+    outcomes: Dict[str, dict] = {}
+    for start in range(0, len(projet_ids), chunk_size):
+        chunk = list(projet_ids[start:start + chunk_size])
+        outcomes.update(await _enrich_chunk(db, chunk, versions, detailed, force))
+        if commit:
+            await db.commit()
+    return {pid: outcomes[pid] for pid in projet_ids}
+
+
+async def refresh_stale_enrichments(db: AsyncSession, limit: Optional[int] = None) -> Dict[str, int]:
+    """Re-enrich the enriched projects whose stamped versions moved (nightly job).
+
+    Candidates are selected in SQL on the stamps; each keeps its
+    screening/detailed mode and only its stale components are recomputed.
+    """
+    versions = await current_versions(db)
+    solar_versions = [v for v in (versions["pvgis"], versions["irradiation_grid"]) if v]
+    result = await db.execute(
+        text("""
+            SELECT e.projet_id::text
+            FROM projet_enrichments e
+            JOIN projets p ON p.id = e.projet_id
+            WHERE p.geom IS NOT NULL
+              AND (
+                  e.versions ->> 'constraints' IS DISTINCT FROM :constraints
+                  OR e.versions ->> 'nearest_postes' IS DISTINCT FROM :postes
+                  OR NOT COALESCE(e.versions ->> 'pvgis' = ANY(CAST(:solar AS text[])), FALSE)
+              )
+            ORDER BY e.projet_id
+            LIMIT :limit
+        """),
+        {
+            "constraints": versions["constraints"],
+            "postes": versions["nearest_postes"],
+            "solar": solar_versions,
+            "limit": limit,
+        },
+    )
+    ids = [r[0] for r in result.all()]
+    outcomes = await enrich_projects(db, ids, detailed=None)
+
+    stats = {"candidates": len(ids), "unchanged": 0, "errors": 0}
+    stats.update({f"refreshed_{c}": 0 for c in COMPONENTS})
+    for outcome in outcomes.values():
+        if outcome["status"] == "enriched":
+            for component in outcome["refreshed"]:
+                stats[f"refreshed_{component}"] += 1
+        elif outcome["status"] == "unchanged":
+            stats["unchanged"] += 1
+        else:
+            stats["errors"] += 1
+    logger.info("Enrichment refresh: %s", stats)
+    return stats
@@ -0,0 +1,107 @@
+"""Project enrichment store — the projet_enrichments table.
+
+Each component (pvgis, constraints, nearest_postes) is a JSONB column;
+the metric columns (GHI, productible, nearest poste distance/capacity,
+in-zone/nearby constraint counts) are generated from them by PostgreSQL
+and indexed, so portfolio filters and bulk scoring read typed columns
+and readers only fetch the components they use.
+
+Writes are patches: a component missing from a patch keeps its stored
+value, versions stamps are merged key by key.
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+COMPONENTS = ("pvgis", "constraints", "nearest_postes")
+
+# Portfolio filters: query parameter → SQL condition on projet_enrichments e
+FILTERS = {
+    "ghi_min": "e.ghi_kwh_m2_an >= :ghi_min",
+    "productible_min": "e.productible_kwh_kwc_an >= :productible_min",
+    "poste_max_km": "e.nearest_poste_km <= :poste_max_km",
+    "capacite_min_mw": "e.nearest_poste_capacite_mw >= :capacite_min_mw",
+}
+
+
+def filter_conditions(hors_zone: Optional[bool] = None, **values: Any) -> List[str]:
+    """SQL conditions on projet_enrichments e for the given filter values (None = unset)."""
+    conditions = [FILTERS[name] for name, value in values.items() if value is not None]
+    if hors_zone is True:
+        conditions.append("e.constraints_in_zone = 0")
+    elif hors_zone is False:
+        conditions.append("e.constraints_in_zone > 0")
+    return conditions
+
+
+def enrichment_from_row(row, components: Sequence[str] = COMPONENTS) -> Optional[dict]:
+    """Enrichment document from projet_enrichments columns; None when the row is empty (LEFT JOIN miss)."""
+    if row["enriched_at"] is None and all(row[c] is None for c in components):
+        return None
+    enrichment: Dict[str, Any] = {}
+    for key in (*components, "versions"):
+        value = row[key]
+        if isinstance(value, str):
+            value = json.loads(value)
+        if value is not None:
+            enrichment[key] = value
+    enriched_at = row["enriched_at"]
+    enrichment["enriched_at"] = enriched_at.isoformat() if hasattr(enriched_at, "isoformat") else enriched_at
+    return enrichment
+
+
+async def load_enrichments(
+    db: AsyncSession, projet_ids: Sequence[Any], components: Sequence[str] = COMPONENTS
+) -> Dict[str, dict]:
+    """Stored enrichment of each project → {projet_id: {component..., versions, enriched_at}}.
+
+    Only the requested components are read; projects never enriched are absent.
+    """
+    if not projet_ids:
+        return {}
+    columns = ", ".join(c for c in COMPONENTS if c in components)
+    result = await db.execute(
+        text(f"""
+            SELECT projet_id, versions, enriched_at{", " + columns if columns else ""}
+            FROM projet_enrichments
+            WHERE projet_id = ANY(CAST(:ids AS uuid[]))
+        """),
+        {"ids": [str(pid) for pid in projet_ids]},
+    )
+    selected = [c for c in COMPONENTS if c in components]
+    return {str(row["projet_id"]): enrichment_from_row(row, selected) or {} for row in result.mappings().all()}
+
+
+async def load_enrichment(
+    db: AsyncSession, projet_id: Any, components: Sequence[str] = COMPONENTS
+) -> Optional[dict]:
+    """Stored enrichment of one project, or None when it was never enriched."""
+    return (await load_enrichments(db, [projet_id], components)).get(str(projet_id))
+
+
+async def save_enrichments(db: AsyncSession, ids: Sequence[str], payloads: Sequence[str]) -> None:
+    """Upsert enrichment patches (JSON text, one per project id) in one statement."""
+    if not ids:
+        return
+    await db.execute(
+        text("""
+            INSERT INTO projet_enrichments AS e
+                (projet_id, pvgis, constraints, nearest_postes, versions, enriched_at)
+            SELECT v.id,
+                   v.patch::jsonb -> 'pvgis',
+                   v.patch::jsonb -> 'constraints',
+                   v.patch::jsonb -> 'nearest_postes',
+                   COALESCE(v.patch::jsonb -> 'versions', '{}'::jsonb),
+                   (v.patch::jsonb ->> 'enriched_at')::timestamptz
+            FROM unnest(CAST(:ids AS uuid[]), CAST(:payloads AS text[])) AS v(id, patch)
+            ON CONFLICT (projet_id) DO UPDATE SET
+                pvgis = COALESCE(EXCLUDED.pvgis, e.pvgis),
+                constraints = COALESCE(EXCLUDED.constraints, e.constraints),
+                nearest_postes = COALESCE(EXCLUDED.nearest_postes, e.nearest_postes),
+                versions = COALESCE(e.versions, '{}'::jsonb) || EXCLUDED.versions,
+                enriched_at = COALESCE(EXCLUDED.enriched_at, e.enriched_at)
+        """),
+        {"ids": list(ids), "payloads": list(payloads)},
+    )
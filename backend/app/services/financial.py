@@ -9,11 +9,17 @@ Sources benchmarks :
 
 Note : Ce n'est PAS un business plan complet. C'est une estimation
 rapide pour le screening de sites (precision +/- 20%).
+
+estimate_financial() traite un projet ; estimate_financial_batch() evalue
+un portefeuille entier sur des tableaux NumPy et rend exactement les memes
+nombres (LCOE et TRI partagent les formes fermees _annuity / _irr).
 """
 import json
 import logging
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +60,63 @@ RACCORDEMENT_COST = _load_constants()["raccordement"]
 DISCOUNT_RATE = _load_constants()["discount_rate"]
 
 
+IRR_BRACKET = (-0.5, 1.0)  # TRI borne a [-50 %, 100 %]
+IRR_ITERATIONS = 48  # bissection : largeur finale ~5e-15
+
+
+# ─── Formes fermees (communes scalaire / batch) ──────────────────
+
+def _annuity(rate, years):
+    """Present value of 1 EUR/year over `years` years: (1 - (1+r)^-n) / r, n when r = 0.
+
+    Written with expm1/log1p so it stays exact near r = 0. Works on scalars and arrays.
+    """
+    rate = np.asarray(rate, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+    safe = np.where(rate == 0, 1.0, rate)
+    return np.where(rate == 0, years, -np.expm1(-years * np.log1p(safe)) / safe)
+
+
+def _irr(capex, cashflow, years):
+    """IRR of -capex followed by `years` constant positive cashflows.
+
+    Vectorized bisection on IRR_BRACKET: NPV is decreasing in the rate, so
+    each step moves the midpoint up where NPV(mid) > 0 and down elsewhere.
+    Roots outside the bracket converge to its bounds. The midpoints are
+    dyadic offsets from the bracket centre and never hit 0 exactly.
+    """
+    ratio = np.asarray(capex, dtype=np.float64) / np.asarray(cashflow, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+    low, high = IRR_BRACKET
+    mid = np.full(ratio.shape, (low + high) / 2)
+    half = (high - low) / 2
+    annuity = np.empty_like(mid)
+    for _ in range(IRR_ITERATIONS):
+        np.log1p(mid, out=annuity)
+        annuity *= -years
+        np.expm1(annuity, out=annuity)
+        annuity /= -mid
+        half /= 2
+        mid += np.where(annuity > ratio, half, -half)
+    return mid
+
+
+def _round(values, ndigits: int = 0) -> np.ndarray:
+    """Element-wise round() with Python's semantics.
+
+    np.round scales by 10**ndigits before rounding, which can move values
+    sitting on a decimal tie; those few are rounded by round() itself.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.round(values, ndigits)
+    if ndigits:
+        scaled = values * 10.0 ** ndigits
+        near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+        for i in np.flatnonzero(near_tie & np.isfinite(values)):
+            out.flat[i] = round(float(values.flat[i]), ndigits)
+    return out
+
+
 # ─── Calculs financiers ──────────────────────────────────────────
 
 def _calc_capex(filiere: str, puissance_mwc: float, distance_poste_km: Optional[float]) -> Dict:
@@ -161,13 +224,10 @@ def _calc_lcoe(
     if production_mwh_an <= 0:
         return 0.0
 
-    # Sum of discounted costs / sum of discounted production
-    total_cost = capex_total
-    total_prod = 0.0
-    for year in range(1, lifetime + 1):
-        factor = 1 / (1 + discount_rate) ** year
-        total_cost += opex_annuel * factor
-        total_prod += production_mwh_an * factor
+    # Discounted costs / discounted production (constant annuities)
+    annuity = float(_annuity(discount_rate, lifetime))
+    total_cost = capex_total + opex_annuel * annuity
+    total_prod = production_mwh_an * annuity
 
     if total_prod <= 0:
         return 0.0
@@ -185,24 +245,7 @@ def _calc_tri(
 
     payback = capex_total / cashflow_annuel if cashflow_annuel > 0 else None
 
-    # Newton-Raphson for IRR
-    irr = 0.05  # initial guess
-    for _ in range(100):
-        npv = -capex_total
-        d_npv = 0.0
-        for year in range(1, lifetime + 1):
-            factor = (1 + irr) ** year
-            npv += cashflow_annuel / factor
-            d_npv -= year * cashflow_annuel / (factor * (1 + irr))
-        if abs(d_npv) < 1e-10:
-            break
-        irr = irr - npv / d_npv
-        if irr < -0.5:
-            irr = -0.5
-            break
-        if irr > 1.0:
-            irr = 1.0
-            break
+    irr = float(_irr(capex_total, cashflow_annuel, lifetime))
 
     return {
         "tri_pct": round(irr * 100, 1),
@@ -214,6 +257,19 @@ def _calc_tri(
 
 # ─── API publique ─────────────────────────────────────────────────
 
+def financial_inputs(enrichment_data: Optional[Dict[str, Any]]) -> Tuple[Optional[float], Optional[float]]:
+    """(productible kWh/kWc/an, nearest poste distance km) from enrichment data, None when unknown."""
+    productible = None
+    distance_poste_km = None
+    if enrichment_data:
+        pvgis = enrichment_data.get("pvgis", {})
+        productible = pvgis.get("productible_kwh_kwc_an")
+        postes = enrichment_data.get("nearest_postes", [])
+        if postes:
+            distance_poste_km = postes[0].get("distance_km")
+    return productible, distance_poste_km
+
+
 def estimate_financial(
     filiere: str,
     puissance_mwc: float,
@@ -227,15 +283,7 @@ def estimate_financial(
 
     Returns: capex, opex, revenus, lcoe, tri, benchmarks, assumptions.
     """
-    # Extract enrichment values
-    productible = None
-    distance_poste_km = None
-    if enrichment_data:
-        pvgis = enrichment_data.get("pvgis", {})
-        productible = pvgis.get("productible_kwh_kwc_an")
-        postes = enrichment_data.get("nearest_postes", [])
-        if postes:
-            distance_poste_km = postes[0].get("distance_km")
+    productible, distance_poste_km = financial_inputs(enrichment_data)
 
     lifetime = LIFETIME.get(filiere, 25)
 
@@ -283,3 +331,141 @@ def estimate_financial(
             "Ne remplace pas un business plan detaille."
         ),
     }
+
+
+# ─── Portefeuille (NumPy) ─────────────────────────────────────────
+
+def _filiere_params(filiere: str) -> Dict[str, float]:
+    """Per-filiere constants with the same fallbacks as the scalar path."""
+    bench = CAPEX_BENCHMARKS.get(filiere, CAPEX_BENCHMARKS["solaire_sol"])
+    racc = RACCORDEMENT_COST.get(filiere, RACCORDEMENT_COST["solaire_sol"])
+    prix = PRIX_VENTE.get(filiere, PRIX_VENTE["solaire_sol"])
+    bess = filiere == "bess"
+    return {
+        "bess": bess,
+        "capex_median": bench["median"],
+        "racc_median": racc["median"],
+        "opex_pct": OPEX_PCT.get(filiere, 2.0),
+        "lifetime": LIFETIME.get(filiere, 25),
+        "facteur_charge": FACTEUR_CHARGE.get(filiere, 0.14),
+        "prix_cre_ao": np.nan if bess else prix["cre_ao"],
+        "prix_fcr": prix["fcr"] if bess else np.nan,
+        "prix_arbitrage": prix["arbitrage"] if bess else np.nan,
+        "prix_capacite": prix["capacite"] if bess else np.nan,
+    }
+
+
+def batch_columns(
+    filieres: Sequence[str],
+    puissances_mwc: Sequence[float],
+    productibles: Optional[Sequence[Optional[float]]] = None,
+    distances_poste_km: Optional[Sequence[Optional[float]]] = None,
+) -> Dict[str, np.ndarray]:
+    """Per-project input columns of evaluate_columns(), filiere constants included.
+
+    Callers may overwrite any column (e.g. capex_median, prix_cre_ao,
+    lifetime) before evaluating, to study perturbed cases.
+    """
+    codes: Dict[str, int] = {}
+    n = len(filieres)
+    inverse = np.fromiter((codes.setdefault(f, len(codes)) for f in filieres), dtype=np.intp, count=n)
+    table = [_filiere_params(f) for f in codes]
+    columns = {
+        name: np.array([t[name] for t in table] or [0.0], dtype=np.float64)[inverse]
+        for name in _filiere_params("solaire_sol")
+    }
+    columns["puissance_mwc"] = np.asarray(puissances_mwc, dtype=np.float64).reshape(n)
+    columns["productible"] = (
+        np.full(n, np.nan) if productibles is None else np.asarray(productibles, dtype=np.float64)
+    )
+    columns["distance_poste_km"] = (
+        np.full(n, np.nan) if distances_poste_km is None else np.asarray(distances_poste_km, dtype=np.float64)
+    )
+    return columns
+
+
+def evaluate_columns(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Vectorized estimate_financial() over input columns (see batch_columns)."""
+    n = len(columns["puissance_mwc"])
+    bess = columns["bess"].astype(bool)
+    lifetime = columns["lifetime"]
+    puissance = columns["puissance_mwc"]
+    productible = columns["productible"]
+    distance = columns["distance_poste_km"]
+    puissance_kwc = puissance * 1000
+
+    # CAPEX (BESS: EUR/kWh over 4 h of storage) + raccordement
+    base = np.where(bess, puissance_kwc * 4, puissance_kwc)
+    capex_median = columns["capex_median"] * base
+    racc_cost = columns["racc_median"] * puissance_kwc
+    far = distance > 5
+    racc_cost = np.where(far, racc_cost * (1 + (distance - 5) * 0.1), racc_cost)
+    capex_total = _round(capex_median + racc_cost)
+
+    # OPEX
+    opex = _round(capex_total * columns["opex_pct"] / 100)
+
+    # Revenus
+    measured = ~np.isnan(productible) & (productible != 0)
+    production_kwh = np.where(
+        measured, productible * puissance_kwc, puissance_kwc * columns["facteur_charge"] * 8760
+    )
+    production_mwh = production_kwh / 1000
+    revenu_bess = (
+        puissance * columns["prix_fcr"] * 8 * 365
+        + puissance * columns["prix_arbitrage"] * 4 * 365
+        + puissance * columns["prix_capacite"] * 8760
+    )
+    revenu = _round(np.where(bess, revenu_bess, production_mwh * columns["prix_cre_ao"]))
+    production_mwh_an = np.where(bess, np.nan, _round(production_mwh))
+
+    # LCOE
+    annuity = _annuity(DISCOUNT_RATE, lifetime)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_prod = production_mwh_an * annuity
+        lcoe_raw = (capex_total + opex * annuity) / total_prod
+    lcoe = np.where(~bess & (production_mwh_an > 0) & (total_prod > 0), _round(lcoe_raw, 1), 0.0)
+
+    # TRI
+    cashflow = revenu - opex
+    positive = cashflow > 0
+    irr = np.zeros(n)
+    irr[positive] = _irr(capex_total[positive], cashflow[positive], lifetime[positive])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback = capex_total / cashflow
+    payback = np.where(positive & (payback != 0), _round(payback, 1), np.nan)
+
+    return {
+        "capex_total_eur": capex_total,
+        "capex_eur_kwc": _round(columns["capex_median"] + columns["racc_median"]),
+        "raccordement_eur": _round(racc_cost),
+        "opex_annuel_eur": opex,
+        "revenu_annuel_eur": revenu,
+        "production_mwh_an": production_mwh_an,
+        "lcoe_eur_mwh": lcoe,
+        "tri_pct": np.where(positive, _round(irr * 100, 1), 0.0),
+        "payback_years": payback,
+        "rentable": positive & (irr > DISCOUNT_RATE),
+        "cashflow_annuel_eur": np.where(positive, _round(cashflow), np.nan),
+        "lifetime_years": lifetime,
+    }
+
+
+def estimate_financial_batch(
+    filieres: Sequence[str],
+    puissances_mwc: Sequence[float],
+    productibles: Optional[Sequence[Optional[float]]] = None,
+    distances_poste_km: Optional[Sequence[Optional[float]]] = None,
+) -> Dict[str, np.ndarray]:
+    """Estimate the financials of many projects at once.
+
+    Inputs are parallel sequences; a missing productible or distance is
+    None or NaN. Returns one float64 array per figure, equal element-wise
+    to the matching values of estimate_financial():
+
+      capex_total_eur, capex_eur_kwc, raccordement_eur, opex_annuel_eur,
+      revenu_annuel_eur, production_mwh_an (NaN for BESS), lcoe_eur_mwh,
+      tri_pct, payback_years and cashflow_annuel_eur (NaN when the project
+      has no positive cashflow), lifetime_years, and rentable (bool).
+    """
+    return evaluate_columns(batch_columns(filieres, puissances_mwc, productibles, distances_poste_km))
@@ -0,0 +1,298 @@
+"""Modele de cash-flows annee par annee — TRI, VAN, DSCR, payback.
+
+Construit, pour chaque projet, des tableaux annuels (bloc "cashflow" de
+financial_constants.json) :
+
+- production : annee 1 d'estimate_financial(), puis degradation annuelle
+  (degradation_annual_pct ; perte de capacite pour le BESS)
+- revenus : tarif CRE indexe pendant le contrat, puis prix marche
+  (le BESS reste sur ses revenus multi-flux, sans contrat)
+- OPEX : annee 1 puis escalade annuelle
+- service de la dette : annuites constantes sur la maturite
+- demantelement : % du CAPEX la derniere annee
+
+TRI projet et equity, VAN, LCOE, DSCR et payback sont calcules sur ces
+tableaux. Ils sont en float32 et alloues une seule fois, en un bloc
+(projets × annees), pour evaluer des milliers de projets sur 40 ans.
+Avec FLAT_ASSUMPTIONS (ni degradation, ni indexation, ni dette, contrat sur
+toute la duree de vie) on retrouve le modele a cashflow constant
+d'estimate_financial(), y compris sa convention : un TRI de 0 quand aucune
+annee n'a de cashflow positif.
+"""
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.services.financial import (
+    DISCOUNT_RATE,
+    IRR_BRACKET,
+    IRR_ITERATIONS,
+    PRIX_VENTE,
+    _annuity,
+    _load_constants,
+    _round,
+    batch_columns,
+    evaluate_columns,
+    financial_inputs,
+)
+
+ASSUMPTIONS = (
+    "degradation_pct",
+    "indexation_pct",
+    "opex_escalation_pct",
+    "contract_years",
+    "prix_marche",
+    "decommissioning_pct",
+    "debt_share_pct",
+    "debt_rate_pct",
+    "debt_tenor_years",
+    "discount_rate",
+)
+
+FLAT_ASSUMPTIONS = {
+    "degradation_pct": 0.0,
+    "indexation_pct": 0.0,
+    "opex_escalation_pct": 0.0,
+    "contract_years": np.inf,
+    "decommissioning_pct": 0.0,
+    "debt_share_pct": 0.0,
+}
+
+YEAR_SERIES = (
+    "production_mwh",
+    "revenue_eur",
+    "opex_eur",
+    "debt_service_eur",
+    "cashflow_eur",
+    "equity_cashflow_eur",
+)
+
+# Payback is reached when the cumulative cash flow covers the CAPEX to
+# within the float32 rounding of the year arrays
+PAYBACK_RTOL = 1e-5
+
+
+def cashflow_config() -> Dict[str, Any]:
+    return _load_constants()["cashflow"]
+
+
+def _cashflow_params(filiere: str) -> Dict[str, float]:
+    """Per-filiere cash-flow assumptions, solaire_sol as fallback like the rest of the model."""
+    constants = _load_constants()
+    cfg = constants["cashflow"]
+    debt = cfg["debt"]
+
+    def per_filiere(table: Dict[str, float]) -> float:
+        return float(table.get(filiere, table["solaire_sol"]))
+
+    return {
+        "degradation_pct": per_filiere(constants["degradation_annual_pct"]),
+        "indexation_pct": float(cfg["indexation_annual_pct"]),
+        "opex_escalation_pct": float(cfg["opex_escalation_annual_pct"]),
+        "contract_years": per_filiere(cfg["contract_years"]),
+        "prix_marche": np.nan if filiere == "bess" else float(
+            PRIX_VENTE.get(filiere, PRIX_VENTE["solaire_sol"])["marche"]
+        ),
+        "decommissioning_pct": per_filiere(cfg["decommissioning_pct_capex"]),
+        "debt_share_pct": float(debt["share_pct"]),
+        "debt_rate_pct": float(debt["rate_pct"]),
+        "debt_tenor_years": per_filiere(debt["tenor_years"]),
+        "discount_rate": DISCOUNT_RATE,
+    }
+
+
+def cashflow_columns(
+    filieres: Sequence[str],
+    puissances_mwc: Sequence[float],
+    productibles: Optional[Sequence[Optional[float]]] = None,
+    distances_poste_km: Optional[Sequence[Optional[float]]] = None,
+    **overrides: Any,
+) -> Dict[str, np.ndarray]:
+    """batch_columns() plus the cash-flow assumptions (ASSUMPTIONS).
+
+    Overrides are scalars or per-project sequences, e.g. debt_share_pct=0
+    or **FLAT_ASSUMPTIONS.
+    """
+    unknown = sorted(set(overrides) - set(ASSUMPTIONS))
+    if unknown:
+        raise ValueError(f"Unknown cash-flow assumption: {unknown[0]}")
+    columns = batch_columns(filieres, puissances_mwc, productibles, distances_poste_km)
+    n = len(filieres)
+    table = {f: _cashflow_params(f) for f in set(filieres)}
+    for name in ASSUMPTIONS:
+        if name in overrides:
+            columns[name] = np.broadcast_to(np.asarray(overrides[name], dtype=np.float64), (n,)).copy()
+        else:
+            columns[name] = np.fromiter((table[f][name] for f in filieres), dtype=np.float64, count=n)
+    return columns
+
+
+def _growth(rate_pct: np.ndarray, exponents: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """(1 + rate)^exponent per project (rows) and year (columns), written into `out`."""
+    return np.power((1 + rate_pct / 100).astype(np.float32)[:, None], exponents, out=out)
+
+
+def _discount(rate: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Discount factors (1 + rate)^-t for t = 1..T, written into `out` (float64)."""
+    out[:] = (1 / (1 + rate))[:, None]
+    return np.cumprod(out, axis=1, out=out)
+
+
+def _irr_flows(outlay: np.ndarray, flows: np.ndarray, factors: np.ndarray) -> np.ndarray:
+    """IRR of -outlay followed by yearly `flows` (projects × years).
+
+    Same bisection as financial._irr, with the NPV summed in float64 over
+    the year arrays; `factors` holds the discount factors. As in
+    estimate_financial(), the IRR is 0 when no year has a positive flow.
+    """
+    low, high = IRR_BRACKET
+    mid = np.full(len(outlay), (low + high) / 2)
+    half = (high - low) / 2
+    for _ in range(IRR_ITERATIONS):
+        npv = np.einsum("ij,ij->i", flows, _discount(mid, factors), dtype=np.float64) - outlay
+        half /= 2
+        mid += np.where(npv > 0, half, -half)
+    return np.where((flows > 0).any(axis=1), mid, 0.0)
+
+
+def evaluate_cashflows(columns: Dict[str, np.ndarray], keep_years: bool = False) -> Dict[str, np.ndarray]:
+    """Year-by-year cash flows and their metrics for every project in `columns`.
+
+    Returns float64 arrays: tri_project_pct, tri_equity_pct, npv_eur,
+    lcoe_eur_mwh (NaN for BESS), payback_years (NaN when never reached),
+    dscr_min / dscr_avg over the debt tenor (NaN without debt), plus
+    capex_total_eur, debt_eur and rentable. With keep_years, "years" holds the YEAR_SERIES arrays
+    (projects × years, float32, zero after each project's lifetime).
+    """
+    n = len(columns["puissance_mwc"])
+    year1 = evaluate_columns(columns)
+    lifetime = np.clip(np.round(columns["lifetime"]), 0, cashflow_config()["max_years"])
+    horizon = int(lifetime.max()) if n else 0
+    t = np.arange(1, horizon + 1, dtype=np.float32)
+
+    block = np.zeros((len(YEAR_SERIES) + 1, n, horizon), dtype=np.float32)
+    production, revenue, opex, debt_service, cashflow, equity, work = block
+    alive = t <= lifetime[:, None]
+    bess = columns["bess"].astype(bool)
+    capex = year1["capex_total_eur"]
+
+    # Production, with the degradation also applied to BESS revenues
+    _growth(-columns["degradation_pct"], t - 1, out=work)
+    work *= alive
+    np.multiply(work, np.nan_to_num(year1["production_mwh_an"]).astype(np.float32)[:, None], out=production)
+
+    # Revenus : tarif CRE indexe pendant le contrat, prix marche ensuite
+    _growth(columns["indexation_pct"], t - 1, out=revenue)
+    merchant = np.where(bess, 1.0, columns["prix_marche"] / columns["prix_cre_ao"]).astype(np.float32)
+    np.copyto(revenue, merchant[:, None], where=t > columns["contract_years"][:, None])
+    revenue *= work
+    revenue *= year1["revenu_annuel_eur"].astype(np.float32)[:, None]
+
+    # OPEX
+    _growth(columns["opex_escalation_pct"], t - 1, out=opex)
+    opex *= year1["opex_annuel_eur"].astype(np.float32)[:, None]
+    opex *= alive
+
+    # Dette : annuites constantes
+    debt = capex * columns["debt_share_pct"] / 100
+    tenor = np.minimum(columns["debt_tenor_years"], lifetime)
+    payment = np.where(tenor > 0, debt / _annuity(columns["debt_rate_pct"] / 100, np.maximum(tenor, 1)), 0.0)
+    np.multiply(payment.astype(np.float32)[:, None], t <= tenor[:, None], out=debt_service)
+
+    # DSCR sur les flux d'exploitation, avant demantelement
+    np.subtract(revenue, opex, out=cashflow)
+    serviced = debt_service > 0
+    ratios = np.divide(cashflow, debt_service, out=np.zeros_like(work), where=serviced)
+    debt_years = serviced.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        dscr_min = np.where(debt_years > 0, np.where(serviced, ratios, np.inf).min(axis=1, initial=np.inf), np.nan)
+        dscr_avg = ratios.sum(axis=1, dtype=np.float64) / debt_years
+
+    # Demantelement la derniere annee
+    decommissioning = capex * columns["decommissioning_pct"] / 100
+    last = lifetime.astype(np.intp) - 1
+    rows = np.flatnonzero(last >= 0)
+    cashflow[rows, last[rows]] -= decommissioning[rows].astype(np.float32)
+    np.subtract(cashflow, debt_service, out=equity)
+
+    # VAN et LCOE au taux d'actualisation. Les tableaux annuels restent en
+    # float32, les facteurs d'actualisation et les sommes sont en float64.
+    rate = columns["discount_rate"]
+    factors = _discount(rate, np.empty((n, horizon)))
+    npv = np.einsum("ij,ij->i", cashflow, factors, dtype=np.float64) - capex
+    costs = capex + np.einsum("ij,ij->i", opex, factors, dtype=np.float64)
+    costs += decommissioning * (1 + rate) ** -lifetime
+    discounted_mwh = np.einsum("ij,ij->i", production, factors, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lcoe = np.where(bess | (discounted_mwh <= 0), np.nan, costs / discounted_mwh)
+
+    # Payback : premiere annee ou le cumul couvre le CAPEX (interpolee)
+    cumulative = np.cumsum(cashflow, axis=1, dtype=np.float64, out=factors)
+    reached = cumulative >= (capex * (1 - PAYBACK_RTOL))[:, None]
+    k = reached.argmax(axis=1)
+    before = np.where(k > 0, cumulative[np.arange(n), k - 1], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback = np.where(
+            reached.any(axis=1), k + (capex - before) / cashflow[np.arange(n), k], np.nan
+        )
+
+    tri_project = _irr_flows(capex, cashflow, factors)
+    tri_equity = _irr_flows(capex - debt, equity, factors)
+
+    result = {
+        "tri_project_pct": _round(tri_project * 100, 1),
+        "tri_equity_pct": _round(tri_equity * 100, 1),
+        "npv_eur": _round(npv),
+        "lcoe_eur_mwh": _round(lcoe, 1),
+        "payback_years": _round(payback, 1),
+        "dscr_min": _round(dscr_min, 2),
+        "dscr_avg": _round(dscr_avg, 2),
+        "capex_total_eur": capex,
+        "debt_eur": _round(debt),
+        "rentable": tri_project > rate,
+    }
+    if keep_years:
+        result["years"] = dict(zip(YEAR_SERIES, block[:len(YEAR_SERIES)]))
+    return result
+
+
+def _value(x: float) -> Optional[float]:
+    return None if np.isnan(x) else float(x)
+
+
+def project_cashflows(
+    filiere: str,
+    puissance_mwc: float,
+    enrichment_data: Optional[Dict[str, Any]] = None,
+    **overrides: Any,
+) -> Dict[str, Any]:
+    """Year-by-year business case of one project (see evaluate_cashflows)."""
+    productible, distance = financial_inputs(enrichment_data)
+    columns = cashflow_columns([filiere], [puissance_mwc], [productible], [distance], **overrides)
+    result = evaluate_cashflows(columns, keep_years=True)
+    lifetime = int(result["years"]["cashflow_eur"].shape[1])
+
+    years = [
+        {"annee": year + 1, **{name: round(float(result["years"][name][0, year])) for name in YEAR_SERIES}}
+        for year in range(lifetime)
+    ]
+    if filiere == "bess":
+        for year in years:
+            year["production_mwh"] = None
+    return {
+        "tri_project_pct": _value(result["tri_project_pct"][0]),
+        "tri_equity_pct": _value(result["tri_equity_pct"][0]),
+        "npv_eur": _value(result["npv_eur"][0]),
+        "lcoe_eur_mwh": _value(result["lcoe_eur_mwh"][0]),
+        "payback_years": _value(result["payback_years"][0]),
+        "dscr_min": _value(result["dscr_min"][0]),
+        "dscr_avg": _value(result["dscr_avg"][0]),
+        "capex_total_eur": float(result["capex_total_eur"][0]),
+        "debt_eur": float(result["debt_eur"][0]),
+        "rentable": bool(result["rentable"][0]),
+        "assumptions": {
+            name: (None if np.isinf(columns[name][0]) or np.isnan(columns[name][0]) else float(columns[name][0]))
+            for name in ASSUMPTIONS
+        },
+        "years": years,
+    }
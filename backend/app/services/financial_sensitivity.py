@@ -0,0 +1,201 @@
+"""Analyse de sensibilite deterministe — tornado et grille 2-D.
+
+Fait varier les moteurs du business case autour du cas de base
+d'estimate_financial() :
+
+- capex : benchmark EUR/kWc (EUR/kWh pour le BESS) min → max
+- productible : +/- variation_pct autour de PVGIS (ou du benchmark)
+- prix : chaque mecanisme de PRIX_VENTE (cre_ao, ppa, marche) ;
+  BESS : tous les flux +/- variation_pct
+- raccordement : distance au poste de 0 a distance_max_km (ou a la
+  distance reelle si elle est plus grande)
+- lifetime : duree de vie +/- LIFETIME_DELTA ans
+
+un a un (tornado, classe par amplitude) et deux a deux (grille, par
+defaut capex × productible, capex × prix pour le BESS). Tous les
+cas sont evalues en une seule passe vectorisee (services.financial.
+evaluate_columns), sans rappeler estimate_financial() par cas.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.financial import (
+    CAPEX_BENCHMARKS,
+    PRIX_VENTE,
+    batch_columns,
+    evaluate_columns,
+    financial_inputs,
+)
+
+DRIVERS = ("capex", "productible", "prix", "raccordement", "lifetime")
+METRICS = ("tri_pct", "lcoe_eur_mwh", "payback_years", "capex_total_eur", "revenu_annuel_eur")
+PRICE_MECHANISMS = ("cre_ao", "ppa", "marche")
+LIFETIME_DELTA = 5
+DEFAULT_GRID = ("capex", "productible")
+DEFAULT_GRIDS = {"bess": ("capex", "prix")}  # filieres without a productible driver
+
+
+def default_grid(filiere: str, x: Optional[str] = None, y: Optional[str] = None) -> Tuple[str, str]:
+    """Grid drivers, the missing ones taken from the filiere's default grid."""
+    defaults = DEFAULT_GRIDS.get(filiere, DEFAULT_GRID)
+    x = x or next(d for d in defaults if d != y)
+    y = y or next(d for d in defaults if d != x)
+    return x, y
+
+
+def _driver_range(
+    driver: str, filiere: str, base: Dict[str, float], variation_pct: float, distance_max_km: float
+) -> Tuple[float, float, float]:
+    """(low, base, high) input values of a driver, in its own unit."""
+    v = variation_pct / 100
+    if driver == "capex":
+        bench = CAPEX_BENCHMARKS.get(filiere, CAPEX_BENCHMARKS["solaire_sol"])
+        return float(bench["min"]), float(bench["median"]), float(bench["max"])
+    if driver == "productible":
+        measured = base["productible"]
+        nominal = measured if measured and not np.isnan(measured) else base["facteur_charge"] * 8760
+        return nominal * (1 - v), nominal, nominal * (1 + v)
+    if driver == "prix":
+        if base["bess"]:
+            return 1 - v, 1.0, 1 + v  # multiplier on every BESS revenue stream
+        prix = PRIX_VENTE.get(filiere, PRIX_VENTE["solaire_sol"])
+        values = [float(prix[m]) for m in PRICE_MECHANISMS]
+        return min(values), float(prix["cre_ao"]), max(values)
+    if driver == "raccordement":
+        distance = 0.0 if np.isnan(base["distance_poste_km"]) else base["distance_poste_km"]
+        return 0.0, distance, max(float(distance_max_km), distance)
+    if driver == "lifetime":
+        lifetime = base["lifetime"]
+        return max(1.0, lifetime - LIFETIME_DELTA), lifetime, lifetime + LIFETIME_DELTA
+    raise ValueError(f"Unknown driver: {driver}")
+
+
+def _apply(columns: Dict[str, np.ndarray], rows: slice, driver: str, values: np.ndarray, base: Dict[str, float]):
+    """Set a driver's input values on the given rows of the case columns."""
+    if driver == "capex":
+        columns["capex_median"][rows] = values
+    elif driver == "productible":
+        columns["productible"][rows] = values
+    elif driver == "prix":
+        if base["bess"]:
+            for stream in ("prix_fcr", "prix_arbitrage", "prix_capacite"):
+                columns[stream][rows] = base[stream] * values
+        else:
+            columns["prix_cre_ao"][rows] = values
+    elif driver == "raccordement":
+        columns["distance_poste_km"][rows] = values
+    elif driver == "lifetime":
+        columns["lifetime"][rows] = np.round(values)
+
+
+def _grid_values(low: float, nominal: float, high: float, steps: int) -> np.ndarray:
+    """`steps` values from low to high, through the base value when steps is odd."""
+    t = np.linspace(-1.0, 1.0, steps)
+    return np.where(t < 0, nominal + t * (nominal - low), nominal + t * (high - nominal))
+
+
+def _value(x: float) -> Optional[float]:
+    return None if np.isnan(x) else float(x)
+
+
+def sensitivity_analysis(
+    filiere: str,
+    puissance_mwc: float,
+    enrichment_data: Optional[Dict[str, Any]] = None,
+    metric: str = "tri_pct",
+    grid: Optional[Tuple[str, str]] = None,
+    steps: int = 5,
+    variation_pct: float = 10.0,
+    distance_max_km: float = 30.0,
+    drivers: Sequence[str] = DRIVERS,
+) -> Dict[str, Any]:
+    """Tornado ranking and 2-D heatmap of `metric` for one project.
+
+    The tornado holds, per driver, the metric at its low and high inputs
+    (others at base), sorted by swing. The grid varies the two `grid`
+    drivers over `steps` values each, from low to high through the base
+    value; matrix[i][j] is the metric at y = y_values[i], x = x_values[j].
+    BESS projects have no productible driver; without `grid` they get
+    capex × prix instead of capex × productible.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    if filiere == "bess":
+        drivers = [d for d in drivers if d != "productible"]
+    grid = grid or default_grid(filiere)
+    unknown = [d for d in (*drivers, *grid) if d not in DRIVERS]
+    if unknown:
+        raise ValueError(f"Unknown driver: {unknown[0]}")
+    x_driver, y_driver = grid
+    if x_driver == y_driver or x_driver not in drivers or y_driver not in drivers:
+        raise ValueError("grid needs two distinct drivers applicable to this filiere")
+    if not 2 <= steps <= 25:
+        raise ValueError("steps must be between 2 and 25")
+
+    productible, distance = financial_inputs(enrichment_data)
+    base_columns = batch_columns([filiere], [puissance_mwc], [productible], [distance])
+    base = {name: float(col[0]) for name, col in base_columns.items()}
+    ranges = {d: _driver_range(d, filiere, base, variation_pct, distance_max_km) for d in drivers}
+
+    mechanisms: List[str] = [] if base["bess"] else list(PRICE_MECHANISMS) if "prix" in drivers else []
+    x_values = _grid_values(*ranges[x_driver], steps)
+    y_values = _grid_values(*ranges[y_driver], steps)
+    if x_driver == "lifetime":
+        x_values = np.round(x_values)
+    if y_driver == "lifetime":
+        y_values = np.round(y_values)
+
+    # Case layout: base | low/high per driver | price mechanisms | grid (y outer, x inner)
+    n_tornado = 2 * len(drivers)
+    n_cases = 1 + n_tornado + len(mechanisms) + steps * steps
+    columns = {name: np.repeat(col, n_cases) for name, col in base_columns.items()}
+    for k, driver in enumerate(drivers):
+        low, _, high = ranges[driver]
+        _apply(columns, slice(1 + 2 * k, 3 + 2 * k), driver, np.array([low, high]), base)
+    offset = 1 + n_tornado
+    if mechanisms:
+        prix = PRIX_VENTE.get(filiere, PRIX_VENTE["solaire_sol"])
+        _apply(columns, slice(offset, offset + len(mechanisms)), "prix",
+               np.array([prix[m] for m in mechanisms], dtype=np.float64), base)
+        offset += len(mechanisms)
+    grid_rows = slice(offset, n_cases)
+    _apply(columns, grid_rows, x_driver, np.tile(x_values, steps), base)
+    _apply(columns, grid_rows, y_driver, np.repeat(y_values, steps), base)
+
+    values = evaluate_columns(columns)[metric]
+    base_value = values[0]
+
+    tornado = []
+    for k, driver in enumerate(drivers):
+        low, nominal, high = ranges[driver]
+        v_low, v_high = values[1 + 2 * k], values[2 + 2 * k]
+        swing = abs(v_high - v_low)
+        tornado.append({
+            "driver": driver,
+            "low_input": round(low, 4),
+            "base_input": round(nominal, 4),
+            "high_input": round(high, 4),
+            "low_value": _value(v_low),
+            "high_value": _value(v_high),
+            "swing": None if np.isnan(swing) else round(float(swing), 2),
+        })
+    tornado.sort(key=lambda t: -1 if t["swing"] is None else t["swing"], reverse=True)
+
+    result: Dict[str, Any] = {
+        "metric": metric,
+        "base_value": _value(base_value),
+        "tornado": tornado,
+        "grid": {
+            "x_driver": x_driver,
+            "y_driver": y_driver,
+            "x_values": [round(float(v), 4) for v in x_values],
+            "y_values": [round(float(v), 4) for v in y_values],
+            "matrix": [[_value(v) for v in row] for row in values[grid_rows].reshape(steps, steps)],
+        },
+        "cases_evaluated": n_cases,
+    }
+    if mechanisms:
+        start = 1 + n_tornado
+        result["prix_mecanismes"] = {m: _value(values[start + i]) for i, m in enumerate(mechanisms)}
+    return result
@@ -0,0 +1,333 @@
+"""Offline irradiation grid — screening-grade PVGIS values without network.
+
+Metropolitan France (incl. Corse) is gridded in WGS84 at a configurable
+step (default 0.05°, the PVGIS client's cache cell). One memory-mapped
+float32 .npy array holds a band per value (NaN where there is no data):
+
+  ghi_kwh_m2_an           annual irradiation (kWh/m²/year)
+  productible_kwh_kwc_an  annual yield (kWh/kWc/year)
+  temperature_moyenne     mean temperature (°C)
+
+Two importers fill it:
+
+  - grid_from_cells: pre-fetched PVGIS cells (CSV lat, lon, values),
+  - grid_from_ghi_ascii: a GHI raster in ESRI ASCII grid format, the
+    yield being derived with PRODUCTIBLE_PER_GHI.
+
+Values are read with bilinear interpolation between cell centres
+(sample / sample_many): pure NumPy on a read-only memmap, microseconds
+per point. Enrichment uses the grid for screening and only calls PVGIS
+for detailed studies or points the grid does not cover.
+"""
+import csv
+import json
+import logging
+import math
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (west, south, east, north) of metropolitan France incl. Corse, degrees
+EXTENT_WGS84 = (-5.5, 41.0, 10.0, 51.5)
+BANDS = ("ghi_kwh_m2_an", "productible_kwh_kwc_an", "temperature_moyenne")
+SOURCE = "irradiation_grid"
+
+# Yield per unit of GHI for a south-facing fixed system with 14 % losses,
+# the ratio implied by pvgis._fallback_by_latitude (0.82 south – 0.87 north)
+PRODUCTIBLE_PER_GHI = 0.84
+
+GRID_FILE = "irradiation.npy"
+MANIFEST = "manifest.json"
+
+
+def grid_dir() -> Path:
+    path = Path(settings.irradiation_grid_dir)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent.parent.parent / path
+    return path
+
+
+def grid_shape(resolution_deg: float) -> Tuple[int, int]:
+    """(rows, cols) covering EXTENT_WGS84."""
+    west, south, east, north = EXTENT_WGS84
+    return math.ceil(round((north - south) / resolution_deg, 9)), math.ceil(round((east - west) / resolution_deg, 9))
+
+
+def cell_centers(resolution_deg: float) -> Tuple[np.ndarray, np.ndarray]:
+    """(lons, lats) of every cell centre as (rows, cols) arrays; row 0 is the northern edge."""
+    west, _, _, north = EXTENT_WGS84
+    rows, cols = grid_shape(resolution_deg)
+    lons = west + (np.arange(cols) + 0.5) * resolution_deg
+    lats = north - (np.arange(rows) + 0.5) * resolution_deg
+    return np.meshgrid(lons, lats)
+
+
+def bilinear(
+    grid: np.ndarray, west: float, north: float, step: float, lons: np.ndarray, lats: np.ndarray
+) -> np.ndarray:
+    """Bilinear interpolation of a north-up grid (cell-centred values) at lon/lat arrays.
+
+    NaN cells are left out and the remaining weights renormalised, so
+    coastal points still get a value. Points outside the grid get NaN;
+    points between the outermost cell centres and the grid edge take the
+    edge values.
+    """
+    rows, cols = grid.shape
+    fr = (north - lats) / step - 0.5
+    fc = (lons - west) / step - 0.5
+    inside = (fr > -0.5) & (fr < rows - 0.5) & (fc > -0.5) & (fc < cols - 0.5)
+    fr = np.clip(fr, 0, rows - 1)
+    fc = np.clip(fc, 0, cols - 1)
+    r0 = np.minimum(np.floor(fr).astype(np.int64), max(rows - 2, 0))
+    c0 = np.minimum(np.floor(fc).astype(np.int64), max(cols - 2, 0))
+    r1 = np.minimum(r0 + 1, rows - 1)
+    c1 = np.minimum(c0 + 1, cols - 1)
+    dr = fr - r0
+    dc = fc - c0
+
+    total = np.zeros(lons.shape, dtype=np.float64)
+    weight = np.zeros(lons.shape, dtype=np.float64)
+    for r, c, w in (
+        (r0, c0, (1 - dr) * (1 - dc)),
+        (r0, c1, (1 - dr) * dc),
+        (r1, c0, dr * (1 - dc)),
+        (r1, c1, dr * dc),
+    ):
+        values = grid[r, c].astype(np.float64)
+        valid = ~np.isnan(values)
+        total += np.where(valid, values * w, 0.0)
+        weight += np.where(valid, w, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = total / weight
+    out[~inside | (weight <= 1e-12)] = np.nan
+    return out
+
+
+# ─── Read side ───────────────────────────────────────────────────
+
+
+class IrradiationGrid:
+    """Read-only view over the memory-mapped grid."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.manifest = json.loads((path / MANIFEST).read_text())
+        self.resolution_deg = float(self.manifest["resolution_deg"])
+        self.bands = tuple(self.manifest.get("bands", BANDS))
+        self.data = np.load(path / GRID_FILE, mmap_mode="r")
+        self.shape = self.data.shape[1:]
+
+    def sample_many(self, lons, lats) -> Dict[str, np.ndarray]:
+        """Interpolated value arrays per band (NaN outside the grid or without data)."""
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        west, _, _, north = EXTENT_WGS84
+        return {
+            band: bilinear(self.data[i], west, north, self.resolution_deg, lons, lats)
+            for i, band in enumerate(self.bands)
+        }
+
+    def sample_records(self, lons, lats) -> List[Optional[Dict[str, Any]]]:
+        """PVGIS-shaped dicts per point, None where the grid has no GHI/yield."""
+        values = self.sample_many(lons, lats)
+        records: List[Optional[Dict[str, Any]]] = []
+        for i in range(len(values["ghi_kwh_m2_an"])):
+            ghi = values["ghi_kwh_m2_an"][i]
+            productible = values["productible_kwh_kwc_an"][i]
+            if math.isnan(ghi) or math.isnan(productible):
+                records.append(None)
+                continue
+            temp = values["temperature_moyenne"][i] if "temperature_moyenne" in values else math.nan
+            records.append({
+                "ghi_kwh_m2_an": round(float(ghi), 1),
+                "dni_kwh_m2_an": None,
+                "dhi_kwh_m2_an": None,
+                "productible_kwh_kwc_an": round(float(productible), 1),
+                "temperature_moyenne": None if math.isnan(temp) else round(float(temp), 1),
+                "source": SOURCE,
+                "grid_resolution_deg": self.resolution_deg,
+            })
+        return records
+
+    def sample(self, lon: float, lat: float) -> Optional[Dict[str, Any]]:
+        return self.sample_records(lon, lat)[0]
+
+
+_grid: Optional[IrradiationGrid] = None
+_grid_mtime: float = 0.0
+
+
+def get_grid() -> Optional[IrradiationGrid]:
+    """Return the loaded grid (reloaded when the manifest changes), or None if not imported."""
+    global _grid, _grid_mtime
+    manifest = grid_dir() / MANIFEST
+    try:
+        mtime = manifest.stat().st_mtime
+    except FileNotFoundError:
+        _grid = None
+        return None
+    if _grid is None or mtime != _grid_mtime:
+        try:
+            _grid = IrradiationGrid(grid_dir())
+            _grid_mtime = mtime
+        except Exception as exc:
+            logger.warning("Irradiation grid unavailable: %s", exc)
+            _grid = None
+    return _grid
+
+
+def grid_version() -> Optional[str]:
+    """Version stamped on values read from the grid (None when no grid is imported)."""
+    grid = get_grid()
+    return f"grid:{grid.manifest.get('built_at')}" if grid is not None else None
+
+
+# ─── Build side ──────────────────────────────────────────────────
+
+
+def grid_from_cells(
+    lats: Sequence[float], lons: Sequence[float], values: Dict[str, Sequence[float]], resolution_deg: float
+) -> np.ndarray:
+    """(bands, rows, cols) grid from point values, averaged per cell.
+
+    Points outside EXTENT_WGS84 are ignored; missing values may be NaN.
+    """
+    west, _, _, north = EXTENT_WGS84
+    rows, cols = grid_shape(resolution_deg)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    r = np.floor((north - lats) / resolution_deg).astype(np.int64)
+    c = np.floor((lons - west) / resolution_deg).astype(np.int64)
+    inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+
+    out = np.full((len(BANDS), rows, cols), np.nan, dtype=np.float32)
+    for i, band in enumerate(BANDS):
+        v = np.asarray(values.get(band, np.full(lats.shape, np.nan)), dtype=np.float64)
+        ok = inside & ~np.isnan(v)
+        total = np.zeros((rows, cols))
+        count = np.zeros((rows, cols))
+        np.add.at(total, (r[ok], c[ok]), v[ok])
+        np.add.at(count, (r[ok], c[ok]), 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[i] = np.where(count > 0, total / count, np.nan)
+    return out
+
+
+def read_cells_csv(path: Path) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """(lats, lons, values by band) from a CSV of pre-fetched PVGIS cells.
+
+    Columns: lat, lon, ghi_kwh_m2_an (or ghi), productible_kwh_kwc_an
+    (or productible / E_y), optional temperature_moyenne (or T2m).
+    """
+    aliases = {
+        "ghi_kwh_m2_an": ("ghi_kwh_m2_an", "ghi"),
+        "productible_kwh_kwc_an": ("productible_kwh_kwc_an", "productible", "E_y"),
+        "temperature_moyenne": ("temperature_moyenne", "T2m"),
+    }
+
+    def number(row: Dict[str, str], names: Sequence[str]) -> float:
+        for name in names:
+            raw = (row.get(name) or "").strip()
+            if raw:
+                try:
+                    return float(raw)
+                except ValueError:
+                    return math.nan
+        return math.nan
+
+    lats: List[float] = []
+    lons: List[float] = []
+    values: Dict[str, List[float]] = {band: [] for band in BANDS}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            lat, lon = number(row, ("lat",)), number(row, ("lon",))
+            if math.isnan(lat) or math.isnan(lon):
+                continue
+            lats.append(lat)
+            lons.append(lon)
+            for band, names in aliases.items():
+                values[band].append(number(row, names))
+    return np.array(lats), np.array(lons), {k: np.array(v) for k, v in values.items()}
+
+
+def read_esri_ascii(path: Path) -> Tuple[np.ndarray, float, float, float]:
+    """(grid, west, north, cell size) of an ESRI ASCII raster in WGS84; nodata → NaN."""
+    header: Dict[str, float] = {}
+    with open(path, encoding="utf-8") as f:
+        while len(header) < 6:
+            pos = f.tell()
+            line = f.readline()
+            key, _, value = line.strip().partition(" ")
+            if not key or not key[0].isalpha():
+                f.seek(pos)
+                break
+            header[key.lower()] = float(value)
+        grid = np.loadtxt(f, dtype=np.float64, ndmin=2)
+
+    rows, cols = int(header["nrows"]), int(header["ncols"])
+    if grid.shape != (rows, cols):
+        raise ValueError(f"Expected {rows}×{cols} values, got {grid.shape[0]}×{grid.shape[1]}")
+    size = header["cellsize"]
+    west = header["xllcorner"] if "xllcorner" in header else header["xllcenter"] - size / 2
+    south = header["yllcorner"] if "yllcorner" in header else header["yllcenter"] - size / 2
+    if "nodata_value" in header:
+        grid[grid == header["nodata_value"]] = np.nan
+    return grid, west, south + rows * size, size
+
+
+def grid_from_ghi_ascii(path: Path, resolution_deg: float) -> np.ndarray:
+    """(bands, rows, cols) grid resampled from an annual GHI raster (kWh/m²/year)."""
+    ghi, west, north, size = read_esri_ascii(path)
+    lons, lats = cell_centers(resolution_deg)
+    resampled = bilinear(ghi, west, north, size, lons, lats)
+    out = np.full((len(BANDS),) + resampled.shape, np.nan, dtype=np.float32)
+    out[BANDS.index("ghi_kwh_m2_an")] = resampled
+    out[BANDS.index("productible_kwh_kwc_an")] = resampled * PRODUCTIBLE_PER_GHI
+    return out
+
+
+def write_grid(data: np.ndarray, resolution_deg: float, source: str, path: Optional[Path] = None) -> Dict[str, Any]:
+    """Write the grid and its manifest (manifest last, so readers never see a partial grid)."""
+    out = path or grid_dir()
+    out.mkdir(parents=True, exist_ok=True)
+    tmp = out / f"{GRID_FILE}.tmp.npy"
+    np.save(tmp, data.astype(np.float32))
+    os.replace(tmp, out / GRID_FILE)
+
+    covered = int(np.count_nonzero(~np.isnan(data[BANDS.index("ghi_kwh_m2_an")])))
+    manifest = {
+        "resolution_deg": resolution_deg,
+        "extent_wgs84": list(EXTENT_WGS84),
+        "shape": list(data.shape[1:]),
+        "bands": list(BANDS),
+        "crs": "EPSG:4326",
+        "source": source,
+        "cells_with_data": covered,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+    tmp_manifest = out / f"{MANIFEST}.tmp"
+    tmp_manifest.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_manifest, out / MANIFEST)
+    logger.info("Irradiation grid written: %s", manifest)
+    return manifest
+
+
+async def record_import(db: AsyncSession, cells: int) -> None:
+    await db.execute(
+        text("""
+            INSERT INTO data_source_statuses (source_name, display_name, category, record_count, last_updated, update_frequency_days, quality_score, status)
+            VALUES ('irradiation_grid', 'Grille irradiation (PVGIS / GHI)', 'climate', :count, NOW(), 365, 80, 'ok')
+            ON CONFLICT (source_name) DO UPDATE SET
+                record_count = :count, last_updated = NOW(), status = 'ok'
+        """),
+        {"count": cells},
+    )
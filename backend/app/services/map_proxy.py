@@ -0,0 +1,282 @@
+"""Caching proxy for external WMS/WFS layers.
+
+Browsers used to hit INPN / IGN servers directly for every tile. The
+proxy fetches tiles (WMS GetMap on the XYZ grid, EPSG:3857) and feature
+windows (WFS GetFeature / GeoJSON exports) once, keeps them in a
+size-bounded LRU cache on disk, and coalesces concurrent identical
+requests so a burst of map clients costs a single upstream call.
+
+Only hosts of the layer catalog (plus settings.map_proxy_allowed_hosts)
+are proxied, so registered URLs cannot be used to reach internal services.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+import httpx
+
+from app.config import settings
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_TIMEOUT = 15.0
+TILE_SIZE = 256
+WEB_MERCATOR_HALF_WORLD_M = 20_037_508.342789244
+
+# Parameters the proxy sets itself; they are dropped from registered URLs
+_OWS_PARAMS = {
+    "service", "version", "request", "bbox", "crs", "srs", "width", "height",
+    "format", "transparent", "styles", "outputformat", "typename", "typenames", "layers",
+}
+
+CachedResponse = Tuple[str, bytes]  # (content type, body)
+
+
+class ProxyError(Exception):
+    """Upstream refused, failed or returned an unusable response."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class DiskLRUCache:
+    """Files under `directory`, evicted least-recently-used beyond max_bytes.
+
+    The recency index is rebuilt from file mtimes at start-up; reads touch
+    the file so the order survives restarts. get/set run in worker threads
+    (asyncio.to_thread): the index and size are only changed under _lock.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        files = sorted(
+            (p for p in self.directory.iterdir() if p.suffix == ".bin"),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for path in files:
+            self._entries[path.stem] = path.stat().st_size
+            self.size += path.stat().st_size
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.bin"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        name = self._name(key)
+        with self._lock:
+            if name not in self._entries:
+                return None
+        try:
+            raw = self._path(name).read_bytes()
+            os.utime(self._path(name))
+        except OSError:
+            with self._lock:
+                self._forget(name)
+            return None
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+        content_type, _, body = raw.partition(b"\n")
+        return content_type.decode(), body
+
+    def set(self, key: str, content_type: str, body: bytes) -> None:
+        name = self._name(key)
+        raw = content_type.encode() + b"\n" + body
+        if len(raw) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        with self._lock:
+            os.replace(tmp, self._path(name))
+            self._forget(name)
+            self._entries[name] = len(raw)
+            self.size += len(raw)
+            while self.size > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._forget(oldest)
+                self._path(oldest).unlink(missing_ok=True)
+
+    def _forget(self, name: str) -> None:
+        """Drop an entry from the index; caller holds _lock."""
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self.size -= size
+
+    def __contains__(self, key: str) -> bool:
+        return self._name(key) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def tile_bbox_3857(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """XYZ tile → (minx, miny, maxx, maxy) in Web Mercator metres."""
+    size = 2 * WEB_MERCATOR_HALF_WORLD_M / 2**z
+    minx = -WEB_MERCATOR_HALF_WORLD_M + x * size
+    maxy = WEB_MERCATOR_HALF_WORLD_M - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def _split_source(source_url: str) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    """Registered URL → (base URL, kept query params, OWS params by lower-case name)."""
+    parts = urlsplit(source_url)
+    base = urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+    kept: Dict[str, str] = {}
+    ows: Dict[str, str] = {}
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        if name.lower() in _OWS_PARAMS:
+            ows[name.lower()] = value
+        else:
+            kept[name] = value
+    return base, kept, ows
+
+
+def wms_getmap_request(source_url: str, z: int, x: int, y: int) -> Tuple[str, Dict[str, str]]:
+    """GetMap request for one XYZ tile of a registered WMS URL.
+
+    The WMS layer comes from the URL's LAYERS parameter, else from the
+    last path segment (e.g. .../WMS/119/natura2000).
+    """
+    base, params, ows = _split_source(source_url)
+    layers = ows.get("layers") or urlsplit(source_url).path.rstrip("/").rsplit("/", 1)[-1]
+    minx, miny, maxx, maxy = tile_bbox_3857(z, x, y)
+    params.update({
+        "SERVICE": "WMS",
+        "VERSION": "1.3.0",
+        "REQUEST": "GetMap",
+        "LAYERS": layers,
+        "STYLES": ows.get("styles", ""),
+        "CRS": "EPSG:3857",
+        "BBOX": f"{minx:.2f},{miny:.2f},{maxx:.2f},{maxy:.2f}",
+        "WIDTH": str(TILE_SIZE),
+        "HEIGHT": str(TILE_SIZE),
+        "FORMAT": "image/png",
+        "TRANSPARENT": "TRUE",
+    })
+    return base, params
+
+
+def wfs_request(
+    source_url: str, bbox: Tuple[float, float, float, float]
+) -> Tuple[str, Dict[str, str], bool]:
+    """Feature request for a bbox → (base URL, params, bbox applied).
+
+    Real WFS endpoints (SERVICE=WFS or a type name in the URL) get a
+    GetFeature with the bbox; other URLs (plain GeoJSON exports) are
+    fetched as registered and cached as a whole.
+    """
+    base, params, ows = _split_source(source_url)
+    type_name = ows.get("typenames") or ows.get("typename")
+    if ows.get("service", "").upper() != "WFS" and not type_name:
+        return source_url, {}, False
+    west, south, east, north = bbox
+    params.update({
+        "SERVICE": "WFS",
+        "VERSION": "2.0.0",
+        "REQUEST": "GetFeature",
+        "TYPENAMES": type_name or "",
+        "SRSNAME": "EPSG:4326",
+        "BBOX": f"{south:.5f},{west:.5f},{north:.5f},{east:.5f},urn:ogc:def:crs:EPSG::4326",
+        "OUTPUTFORMAT": "application/json",
+    })
+    return base, params, True
+
+
+class MapProxy:
+    def __init__(self, cache: DiskLRUCache, allowed_hosts: Iterable[str]):
+        self.cache = cache
+        self.allowed_hosts = {h.lower() for h in allowed_hosts if h}
+        self._flight = SingleFlight()
+        self._client: Optional[httpx.AsyncClient] = None
+        self.upstream_calls = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=UPSTREAM_TIMEOUT, follow_redirects=False)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def check_url(self, url: str) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or (parts.hostname or "").lower() not in self.allowed_hosts:
+            raise ProxyError(403, f"Host not allowed for proxying: {parts.hostname}")
+
+    async def _upstream(self, url: str, params: Dict[str, str], expect: Tuple[str, ...]) -> CachedResponse:
+        self.upstream_calls += 1
+        try:
+            response = await self._http().get(url, params=params)
+        except httpx.TimeoutException:
+            raise ProxyError(504, "Upstream timeout")
+        except httpx.HTTPError as exc:
+            raise ProxyError(502, f"Upstream unreachable: {exc}")
+        content_type = response.headers.get("content-type", "").split(";")[0].strip()
+        if response.status_code != 200 or not content_type.startswith(expect):
+            # WMS/WFS servers report errors as XML with a 200 status
+            raise ProxyError(502, f"Upstream returned {response.status_code} {content_type or '?'}")
+        return content_type, response.content
+
+    async def fetch(self, key: str, url: str, params: Dict[str, str], expect: Tuple[str, ...]) -> CachedResponse:
+        """Cached upstream GET; concurrent misses on the same key share one call."""
+        self.check_url(url)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached
+
+        async def load() -> CachedResponse:
+            content_type, body = await self._upstream(url, params, expect)
+            await asyncio.to_thread(self.cache.set, key, content_type, body)
+            return content_type, body
+
+        return await self._flight.do(key, load)
+
+    async def wms_tile(self, layer_key: str, source_url: str, z: int, x: int, y: int) -> CachedResponse:
+        url, params = wms_getmap_request(source_url, z, x, y)
+        return await self.fetch(f"wms:{layer_key}:{z}/{x}/{y}", url, params, ("image/",))
+
+    async def wfs_features(
+        self, layer_key: str, source_url: str, bbox: Tuple[float, float, float, float]
+    ) -> CachedResponse:
+        url, params, windowed = wfs_request(source_url, bbox)
+        window = ",".join(f"{v:.4f}" for v in bbox) if windowed else "all"
+        expect = ("application/json", "application/geo+json", "application/vnd.geo+json")
+        return await self.fetch(f"wfs:{layer_key}:{window}", url, params, expect)
+
+
+_proxy: Optional[MapProxy] = None
+
+
+def get_map_proxy(catalog_hosts: Iterable[str] = ()) -> MapProxy:
+    """Process-wide proxy (disk cache under settings.map_proxy_cache_dir)."""
+    global _proxy
+    if _proxy is None:
+        cache = DiskLRUCache(settings.map_proxy_cache_dir, settings.map_proxy_cache_max_mb * 1_000_000)
+        _proxy = MapProxy(cache, [*catalog_hosts, *settings.map_proxy_hosts])
+    return _proxy
+
+
+async def close_map_proxy() -> None:
+    if _proxy is not None:
+        await _proxy.aclose()
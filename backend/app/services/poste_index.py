@@ -0,0 +1,172 @@
+"""In-process spatial index over postes_sources.
+
+A few thousand static points do not need a PostgreSQL round trip per
+kNN. The index keeps them in a scipy cKDTree over unit-sphere (x, y, z)
+coordinates: chord order equals great-circle order, so nearest and
+within-radius answers are exact haversine results (spherical Earth,
+≤ 0.5 % off PostGIS spheroidal geography distances).
+
+The tree is rebuilt when the table signature (row count, id range, hash
+of coordinates) changes; the signature is re-checked at most every
+REFRESH_TTL_S seconds. Callers fall back to PostGIS when get_poste_index()
+returns None (empty table, scipy missing, query failure).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6_371_008.8
+REFRESH_TTL_S = 60.0
+
+_SIGNATURE_QUERY = text("""
+    SELECT COUNT(*) AS n, MIN(id) AS min_id, MAX(id) AS max_id,
+           md5(string_agg(id || ':' || ST_X(geom) || ':' || ST_Y(geom), ',' ORDER BY id)) AS coords
+    FROM postes_sources
+    WHERE geom IS NOT NULL
+""")
+
+_LOAD_QUERY = text("""
+    SELECT id, nom, gestionnaire, tension_kv, puissance_mw, capacite_disponible_mw,
+           ST_X(geom) AS lon, ST_Y(geom) AS lat
+    FROM postes_sources
+    WHERE geom IS NOT NULL
+    ORDER BY id
+""")
+
+
+def _unit_xyz(lon, lat) -> np.ndarray:
+    lon_r = np.radians(np.asarray(lon, dtype=np.float64))
+    lat_r = np.radians(np.asarray(lat, dtype=np.float64))
+    cos_lat = np.cos(lat_r)
+    return np.stack([cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)], axis=-1)
+
+
+def chord_to_m(chord) -> np.ndarray:
+    """Unit-sphere chord length → great-circle distance in metres."""
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def m_to_chord(distance_m: float) -> float:
+    """Great-circle distance in metres → unit-sphere chord length."""
+    return 2 * np.sin(min(distance_m / EARTH_RADIUS_M, np.pi) / 2)
+
+
+def _num(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+class PosteIndex:
+    """KD-tree over postes sources with their attributes."""
+
+    def __init__(self, rows: List[Dict[str, Any]], signature: Tuple = ()):
+        from scipy.spatial import cKDTree
+
+        self.signature = signature
+        self.ids = np.array([r["id"] for r in rows], dtype=np.int64)
+        self.lon = np.array([r["lon"] for r in rows], dtype=np.float64)
+        self.lat = np.array([r["lat"] for r in rows], dtype=np.float64)
+        self.attrs = [
+            {
+                "id": r["id"],
+                "nom": r["nom"],
+                "gestionnaire": r["gestionnaire"],
+                "tension_kv": _num(r["tension_kv"]),
+                "puissance_mw": _num(r["puissance_mw"]),
+                "capacite_disponible_mw": _num(r["capacite_disponible_mw"]),
+                "lon": float(r["lon"]),
+                "lat": float(r["lat"]),
+            }
+            for r in rows
+        ]
+        self.tree = cKDTree(_unit_xyz(self.lon, self.lat))
+
+    def __len__(self) -> int:
+        return len(self.attrs)
+
+    def nearest(self, lon: float, lat: float, k: int = 1) -> List[Tuple[Dict[str, Any], float]]:
+        """k nearest postes → [(attributes, distance_m)], closest first."""
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        chord, idx = self.tree.query(_unit_xyz(lon, lat), k=k)
+        chord, idx = np.atleast_1d(chord), np.atleast_1d(idx)
+        return [(self.attrs[i], float(d)) for i, d in zip(idx, chord_to_m(chord))]
+
+    def nearest_many(self, lons, lats) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest poste for many points → (distance_m array, poste id array).
+
+        NaN coordinates yield NaN distance and id -1.
+        """
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        valid = ~(np.isnan(lons) | np.isnan(lats))
+        dist = np.full(lons.shape, np.nan)
+        ids = np.full(lons.shape, -1, dtype=np.int64)
+        if valid.any() and len(self):
+            chord, idx = self.tree.query(_unit_xyz(lons[valid], lats[valid]), k=1)
+            dist[valid] = chord_to_m(chord)
+            ids[valid] = self.ids[idx]
+        return dist, ids
+
+    def within(self, lon: float, lat: float, radius_m: float) -> List[Tuple[Dict[str, Any], float]]:
+        """Postes within radius_m → [(attributes, distance_m)], closest first."""
+        idx = self.tree.query_ball_point(_unit_xyz(lon, lat), r=m_to_chord(radius_m))
+        if not idx:
+            return []
+        idx = np.asarray(idx)
+        dist = chord_to_m(np.linalg.norm(self.tree.data[idx] - _unit_xyz(lon, lat), axis=1))
+        order = np.argsort(dist, kind="stable")
+        return [(self.attrs[idx[i]], float(dist[i])) for i in order]
+
+    def count_within_many(self, lons, lats, radius_m: float) -> np.ndarray:
+        """Number of postes within radius_m of each point (vectorized)."""
+        pts = _unit_xyz(np.atleast_1d(lons), np.atleast_1d(lats))
+        return np.asarray(
+            self.tree.query_ball_point(pts, r=m_to_chord(radius_m), return_length=True),
+            dtype=np.int64,
+        )
+
+
+_index: Optional[PosteIndex] = None
+_checked_at: float = 0.0
+_lock = asyncio.Lock()
+
+
+def invalidate() -> None:
+    """Force a signature check on the next get_poste_index() call."""
+    global _checked_at
+    _checked_at = 0.0
+
+
+async def get_poste_index(db: AsyncSession) -> Optional[PosteIndex]:
+    """Return the shared index, rebuilding it if postes_sources changed.
+
+    Returns None when the index cannot be used (empty table or error) so
+    callers can fall back to PostGIS.
+    """
+    global _index, _checked_at
+    if _index is not None and time.monotonic() - _checked_at < REFRESH_TTL_S:
+        return _index
+
+    async with _lock:
+        if _index is not None and time.monotonic() - _checked_at < REFRESH_TTL_S:
+            return _index
+        try:
+            sig_row = (await db.execute(_SIGNATURE_QUERY)).mappings().first()
+            signature = tuple(sig_row.values()) if sig_row else ()
+            if _index is None or _index.signature != signature:
+                rows = (await db.execute(_LOAD_QUERY)).mappings().all()
+                _index = PosteIndex([dict(r) for r in rows], signature) if rows else None
+                logger.info("Poste index rebuilt: %d postes", len(rows))
+            _checked_at = time.monotonic()
+        except Exception as exc:
+            logger.warning("Poste index unavailable, using PostGIS: %s", exc)
+            _index = None
+    return _index
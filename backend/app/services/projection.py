@@ -0,0 +1,63 @@
+"""Lambert-93 (EPSG:2154) projection helpers — vectorized with NumPy.
+
+Closed-form Lambert Conformal Conic (2 standard parallels) on the GRS80
+ellipsoid, following IGN notes ALG0001-ALG0004. Used for in-process
+metric computations (rasters, KD-trees) so they agree with PostGIS
+ST_Transform(geom, 2154) to well under a metre over metropolitan France.
+"""
+import math
+
+import numpy as np
+
+# GRS80 ellipsoid
+_A = 6_378_137.0
+_E = 0.08181919104281579
+
+# Lambert-93 parameters
+_LON0 = math.radians(3.0)
+_LAT0 = math.radians(46.5)
+_LAT1 = math.radians(44.0)
+_LAT2 = math.radians(49.0)
+_X0 = 700_000.0
+_Y0 = 6_600_000.0
+
+
+def _m(lat: float) -> float:
+    return math.cos(lat) / math.sqrt(1 - (_E * math.sin(lat)) ** 2)
+
+
+def _t(lat):
+    sin = np.sin(lat)
+    return np.tan(np.pi / 4 - lat / 2) / ((1 - _E * sin) / (1 + _E * sin)) ** (_E / 2)
+
+
+_N = (math.log(_m(_LAT1)) - math.log(_m(_LAT2))) / (math.log(_t(_LAT1)) - math.log(_t(_LAT2)))
+_F = _m(_LAT1) / (_N * _t(_LAT1) ** _N)
+_RHO0 = _A * _F * _t(_LAT0) ** _N
+
+
+def to_lambert93(lon, lat):
+    """Project WGS84 lon/lat (degrees, scalars or arrays) to Lambert-93 metres."""
+    lon_r = np.radians(np.asarray(lon, dtype=np.float64))
+    lat_r = np.radians(np.asarray(lat, dtype=np.float64))
+    rho = _A * _F * _t(lat_r) ** _N
+    theta = _N * (lon_r - _LON0)
+    x = _X0 + rho * np.sin(theta)
+    y = _Y0 + _RHO0 - rho * np.cos(theta)
+    return x, y
+
+
+def from_lambert93(x, y, iterations: int = 8):
+    """Inverse projection: Lambert-93 metres → WGS84 lon/lat (degrees)."""
+    dx = np.asarray(x, dtype=np.float64) - _X0
+    dy = _RHO0 - (np.asarray(y, dtype=np.float64) - _Y0)
+    rho = np.sign(_N) * np.hypot(dx, dy)
+    t = (rho / (_A * _F)) ** (1 / _N)
+    theta = np.arctan2(dx, dy)
+
+    lon = theta / _N + _LON0
+    lat = np.pi / 2 - 2 * np.arctan(t)
+    for _ in range(iterations):
+        sin = np.sin(lat)
+        lat = np.pi / 2 - 2 * np.arctan(t * ((1 - _E * sin) / (1 + _E * sin)) ** (_E / 2))
+    return np.degrees(lon), np.degrees(lat)
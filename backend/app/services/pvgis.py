@@ -1,59 +1,80 @@
 """PVGIS service — Sprint 13.
 
 Fetches solar irradiation data from the EU PVGIS API v5.2.
-Includes Redis caching (30-day TTL) and latitude-based fallback.
+Results are cached 30 days in a two-tier cache (services.cache), with a
+latitude-based fallback when the API fails.
+
+Requests are snapped to a grid (settings.pvgis_grid_deg) and go through
+one pooled HTTP client; concurrent requests for the same cell share a
+single in-flight PVGIS call.
 
 API docs: https://re.jrc.ec.europa.eu/pvg_tools/en/
 """
-import json
 import logging
-from typing import Optional
+import math
+from typing import Optional, Tuple
 
 import httpx
-import redis.asyncio as aioredis
 
 from app.config import settings
+from app.services.cache import TieredCache
 
 logger = logging.getLogger(__name__)
 
-PVGIS_BASE_URL = "https://re.jrc.ec.europa.eu/api/v5_2"
 PVGIS_TIMEOUT = 30.0
 CACHE_TTL = 30 * 24 * 3600  # 30 days
-CACHE_PREFIX = "pvgis:"
+CACHE_STALE_TTL = 7 * 24 * 3600  # irradiation is climatological, stale data is fine
+FAILURE_TTL = 300  # cells whose call failed use the fallback for 5 minutes
+
+_http: Optional[httpx.AsyncClient] = None
+_cache = TieredCache(
+    "pvgis", CACHE_TTL, max_entries=20_000, stale_ttl=CACHE_STALE_TTL, negative_ttl=FAILURE_TTL
+)
+
+
+def _get_http() -> httpx.AsyncClient:
+    """Long-lived client, so PVGIS connections (and TLS sessions) are reused."""
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            base_url=settings.pvgis_base_url,
+            timeout=PVGIS_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.pvgis_max_connections,
+                max_keepalive_connections=settings.pvgis_max_connections,
+            ),
+        )
+    return _http
 
 
-def _get_redis() -> aioredis.Redis:
-    return aioredis.Redis(
-        host=settings.redis_host,
-        port=settings.redis_port,
-        password=settings.redis_password or None,
-        decode_responses=True,
-    )
+async def close_pvgis() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
 
 
-def _cache_key(lat: float, lon: float) -> str:
-    return f"{CACHE_PREFIX}{lat:.4f}:{lon:.4f}"
+def snap_to_grid(lat: float, lon: float, step: Optional[float] = None) -> Tuple[float, float]:
+    """Centre of the irradiation grid cell containing (lat, lon).
 
+    Irradiation varies little within a few kilometres, so all projects in
+    a cell share one PVGIS call and one cache entry.
+    """
+    step = step or settings.pvgis_grid_deg
+    return (
+        round((math.floor(lat / step) + 0.5) * step, 6),
+        round((math.floor(lon / step) + 0.5) * step, 6),
+    )
 
-async def _get_cached(lat: float, lon: float) -> Optional[dict]:
-    try:
-        r = _get_redis()
-        raw = await r.get(_cache_key(lat, lon))
-        await r.aclose()
-        if raw:
-            return json.loads(raw)
-    except Exception as exc:
-        logger.debug("Redis cache miss: %s", exc)
-    return None
 
+def pvgis_version() -> str:
+    """Version stamped on stored PVGIS values (API, grid step, epoch)."""
+    return f"pvgis:v5_2:{settings.pvgis_grid_deg:g}:{settings.pvgis_epoch}"
 
-async def _set_cached(lat: float, lon: float, data: dict) -> None:
-    try:
-        r = _get_redis()
-        await r.setex(_cache_key(lat, lon), CACHE_TTL, json.dumps(data))
-        await r.aclose()
-    except Exception as exc:
-        logger.debug("Redis cache write failed: %s", exc)
+
+def _cache_key(lat: float, lon: float) -> str:
+    cell_lat, cell_lon = snap_to_grid(lat, lon)
+    return f"{settings.pvgis_epoch}:{settings.pvgis_grid_deg:g}:{cell_lat:.4f}:{cell_lon:.4f}"
 
 
 def _fallback_by_latitude(lat: float) -> dict:
@@ -92,7 +113,7 @@ def _fallback_by_latitude(lat: float) -> dict:
 
 
 async def get_pvgis_data(lat: float, lon: float) -> dict:
-    """Fetch PVGIS solar data for given coordinates.
+    """Fetch PVGIS solar data for the grid cell containing the given coordinates.
 
     Returns:
         dict with keys:
@@ -103,65 +124,65 @@ async def get_pvgis_data(lat: float, lon: float) -> dict:
             temperature_moyenne: Average temperature (C)
             source: "pvgis_api" or "fallback_latitude"
     """
-    # Check cache first
-    cached = await _get_cached(lat, lon)
-    if cached:
-        logger.debug("PVGIS cache hit for (%.4f, %.4f)", lat, lon)
-        return cached
+    try:
+        solar = await _cache.get_or_load(_cache_key(lat, lon), lambda: _fetch_cell(lat, lon))
+    except Exception as exc:
+        logger.warning("PVGIS response unusable for (%.4f, %.4f): %s — using fallback", lat, lon, exc)
+        solar = None
+    if solar is None:
+        return _fallback_by_latitude(lat)
+    return dict(solar)  # cached values are shared
 
-    # Call PVGIS API
+
+async def _fetch_cell(lat: float, lon: float) -> Optional[dict]:
+    """Call PVGIS for the centre of the grid cell of (lat, lon); None when it fails."""
+    cell_lat, cell_lon = snap_to_grid(lat, lon)
     try:
-        async with httpx.AsyncClient(timeout=PVGIS_TIMEOUT) as client:
-            resp = await client.get(
-                f"{PVGIS_BASE_URL}/PVcalc",
-                params={
-                    "lat": lat,
-                    "lon": lon,
-                    "peakpower": 1,
-                    "loss": 14,
-                    "outputformat": "json",
-                },
-            )
-            resp.raise_for_status()
-            raw = resp.json()
-
-        outputs = raw.get("outputs", {})
-        totals = outputs.get("totals", {}).get("fixed", {})
-
-        # E_y = annual energy production (kWh/kWc/year)
-        productible = totals.get("E_y")
-        # H(i)_y = irradiation on inclined plane (kWh/m2/year)
-        ghi_inclined = totals.get("H(i)_y")
-        # SD_y = standard deviation (not used directly)
-
-        # Monthly data for GHI/DNI/DHI
-        monthly = outputs.get("monthly", {}).get("fixed", [])
-        ghi_total = None
-        temp_avg = None
-        if monthly:
-            # Sum H(i)_m for annual irradiation
-            ghi_total = round(sum(m.get("H(i)_m", 0) for m in monthly), 1)
-            temp_avg = round(sum(m.get("T2m", 0) for m in monthly) / len(monthly), 1)
-
-        result = {
-            "ghi_kwh_m2_an": ghi_total or (round(ghi_inclined, 1) if ghi_inclined else None),
-            "dni_kwh_m2_an": None,
-            "dhi_kwh_m2_an": None,
-            "productible_kwh_kwc_an": round(productible, 1) if productible else None,
-            "temperature_moyenne": temp_avg,
-            "source": "pvgis_api",
-        }
-
-        # Cache the result
-        await _set_cached(lat, lon, result)
-
-        logger.info(
-            "PVGIS data fetched for (%.4f, %.4f): GHI=%s, prod=%s",
-            lat, lon, result["ghi_kwh_m2_an"], result["productible_kwh_kwc_an"],
+        resp = await _get_http().get(
+            "/PVcalc",
+            params={
+                "lat": cell_lat,
+                "lon": cell_lon,
+                "peakpower": 1,
+                "loss": 14,
+                "outputformat": "json",
+            },
         )
-        return result
-
+        resp.raise_for_status()
+        raw = resp.json()
     except Exception as exc:
-        logger.warning("PVGIS API failed for (%.4f, %.4f): %s — using fallback", lat, lon, exc)
-        fallback = _fallback_by_latitude(lat)
-        return fallback
+        logger.warning("PVGIS API failed for cell (%.4f, %.4f): %s — using fallback", cell_lat, cell_lon, exc)
+        return None
+
+    outputs = raw.get("outputs", {})
+    totals = outputs.get("totals", {}).get("fixed", {})
+
+    # E_y = annual energy production (kWh/kWc/year)
+    productible = totals.get("E_y")
+    # H(i)_y = irradiation on inclined plane (kWh/m2/year)
+    ghi_inclined = totals.get("H(i)_y")
+    # SD_y = standard deviation (not used directly)
+
+    # Monthly data for GHI/DNI/DHI
+    monthly = outputs.get("monthly", {}).get("fixed", [])
+    ghi_total = None
+    temp_avg = None
+    if monthly:
+        # Sum H(i)_m for annual irradiation
+        ghi_total = round(sum(m.get("H(i)_m", 0) for m in monthly), 1)
+        temp_avg = round(sum(m.get("T2m", 0) for m in monthly) / len(monthly), 1)
+
+    result = {
+        "ghi_kwh_m2_an": ghi_total or (round(ghi_inclined, 1) if ghi_inclined else None),
+        "dni_kwh_m2_an": None,
+        "dhi_kwh_m2_an": None,
+        "productible_kwh_kwc_an": round(productible, 1) if productible else None,
+        "temperature_moyenne": temp_avg,
+        "source": "pvgis_api",
+    }
+
+    logger.info(
+        "PVGIS data fetched for cell (%.4f, %.4f): GHI=%s, prod=%s",
+        cell_lat, cell_lon, result["ghi_kwh_m2_an"], result["productible_kwh_kwc_an"],
+    )
+    return result
@@ -0,0 +1,39 @@
+"""Shared Redis clients.
+
+redis.asyncio clients own a connection pool, so one long-lived client per
+decoding mode is enough for the whole process; services must not open a
+connection per cache read.
+"""
+from typing import Dict, Optional
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+MAX_CONNECTIONS = 32
+SOCKET_TIMEOUT = 2.0
+
+_clients: Dict[bool, aioredis.Redis] = {}
+
+
+def get_redis(decode_responses: bool = True) -> aioredis.Redis:
+    """Process-wide client (text or binary values)."""
+    client: Optional[aioredis.Redis] = _clients.get(decode_responses)
+    if client is None:
+        client = aioredis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            password=settings.redis_password or None,
+            decode_responses=decode_responses,
+            max_connections=MAX_CONNECTIONS,
+            socket_timeout=SOCKET_TIMEOUT,
+            socket_connect_timeout=SOCKET_TIMEOUT,
+        )
+        _clients[decode_responses] = client
+    return client
+
+
+async def close_redis() -> None:
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
@@ -0,0 +1,111 @@
+"""Change capture for reference datasets (postes sources, Natura 2000, ZNIEFF).
+
+Importers call snapshot() before loading and record_changes() after:
+
+    before = await snapshot(db, "natura2000")
+    ... import ...
+    stats = await record_changes(db, "natura2000", before)
+
+Features are matched on their business key (site_code, code_mnhn, or the
+poste name since postes are re-inserted with fresh ids). Each added,
+updated (geometry hash differs) or removed feature is written to
+reference_changes with a footprint covering its old bbox and new geometry,
+which the re-scoring job uses as the spatial selector.
+"""
+import logging
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# dataset → business key column
+DATASETS: Dict[str, str] = {
+    "postes_sources": "nom",
+    "natura2000": "site_code",
+    "znieff": "code_mnhn",
+}
+
+# key → (geometry hash, bbox WKT)
+Snapshot = Dict[str, Tuple[str, str]]
+
+
+async def snapshot(db: AsyncSession, dataset: str) -> Snapshot:
+    """Hash every feature geometry of a dataset, keyed by business key.
+
+    Duplicated keys are folded into one entry (hash of all their geometries).
+    Returns an empty snapshot when the table does not exist yet.
+    """
+    key_col = DATASETS[dataset]
+    exists = await db.execute(
+        text("SELECT to_regclass(:table) IS NOT NULL"), {"table": dataset}
+    )
+    if not exists.scalar():
+        return {}
+    result = await db.execute(text(f"""
+        SELECT {key_col}::text AS key,
+               md5(string_agg(md5(ST_AsEWKB(geom)), ',' ORDER BY md5(ST_AsEWKB(geom)))) AS hash,
+               ST_AsText(ST_Envelope(ST_Collect(geom))) AS bbox
+        FROM {dataset}
+        WHERE geom IS NOT NULL AND {key_col} IS NOT NULL
+        GROUP BY {key_col}
+    """))
+    return {row["key"]: (row["hash"], row["bbox"]) for row in result.mappings().all()}
+
+
+def diff_snapshots(before: Snapshot, after: Snapshot) -> Dict[str, Tuple[str, str | None]]:
+    """Compare two snapshots → {key: (change_type, old bbox WKT or None)}."""
+    changes: Dict[str, Tuple[str, str | None]] = {}
+    for key, (old_hash, old_bbox) in before.items():
+        if key not in after:
+            changes[key] = ("removed", old_bbox)
+        elif after[key][0] != old_hash:
+            changes[key] = ("updated", old_bbox)
+    for key in after.keys() - before.keys():
+        changes[key] = ("added", None)
+    return changes
+
+
+async def record_changes(db: AsyncSession, dataset: str, before: Snapshot) -> Dict[str, Any]:
+    """Diff the dataset against `before` and log changed footprints.
+
+    The caller commits. Returns counts per change type plus the list of
+    changed keys under "keys".
+    """
+    key_col = DATASETS[dataset]
+    after = await snapshot(db, dataset)
+    changes = diff_snapshots(before, after)
+    stats = {"added": 0, "updated": 0, "removed": 0}
+    for change_type, _ in changes.values():
+        stats[change_type] += 1
+    if not changes:
+        logger.info("%s: no geometry change", dataset)
+        return {**stats, "keys": []}
+
+    keys = list(changes)
+    await db.execute(
+        text(f"""
+            INSERT INTO reference_changes (dataset, feature_key, change_type, geom)
+            SELECT :dataset, v.key, v.change_type,
+                   CASE
+                       WHEN v.old_bbox IS NULL THEN n.geom
+                       WHEN n.geom IS NULL THEN ST_GeomFromText(v.old_bbox, 4326)
+                       ELSE ST_Collect(ST_GeomFromText(v.old_bbox, 4326), n.geom)
+                   END
+            FROM unnest(CAST(:keys AS text[]), CAST(:types AS text[]), CAST(:bboxes AS text[]))
+                 AS v(key, change_type, old_bbox)
+            LEFT JOIN LATERAL (
+                SELECT ST_Collect(geom) AS geom FROM {dataset}
+                WHERE {key_col}::text = v.key AND geom IS NOT NULL
+            ) n ON TRUE
+        """),
+        {
+            "dataset": dataset,
+            "keys": keys,
+            "types": [changes[k][0] for k in keys],
+            "bboxes": [changes[k][1] for k in keys],
+        },
+    )
+    logger.info("%s changes recorded: %s", dataset, stats)
+    return {**stats, "keys": keys}
@@ -0,0 +1,152 @@
+"""Incremental re-scoring after reference dataset imports.
+
+Consumes unprocessed rows of reference_changes (written by the importers,
+see services.reference_changes) and rescores only the projects a change
+can influence:
+
+  - postes_sources: projects within 80 km of a changed poste. Beyond
+    80 km the proximite_reseau score is flat (5), so a farther poste can
+    neither become nor stop being a score-relevant nearest poste.
+  - natura2000 / znieff: projects within the constraint search radius
+    (10 km) of a changed zone footprint.
+
+Enriched projects get the stale parts of their enrichment refreshed
+first (constraints and/or nearest_postes), then all affected projects are
+rescored in bulk and the changes are marked processed.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.constraints import (
+    SEARCH_RADIUS_M,
+    get_constraints_batch,
+    get_nearest_postes_batch,
+    refresh_constraint_layers,
+)
+from app.services.enrichment import ENRICH_CHUNK
+from app.services.enrichment_store import save_enrichments
+from app.services.poste_index import invalidate as invalidate_poste_index
+from app.services.score_store import persist_scores
+from app.services.scoring import calculate_scores_bulk
+
+logger = logging.getLogger(__name__)
+
+RESCORE_RADIUS_M: Dict[str, int] = {
+    "postes_sources": 80_000,
+    "natura2000": SEARCH_RADIUS_M,
+    "znieff": SEARCH_RADIUS_M,
+}
+ZONE_DATASETS = {"natura2000", "znieff"}
+
+
+async def affected_projects(db: AsyncSession, change_ids: List[int]) -> Dict[str, Set[str]]:
+    """Projects near the given changes → {projet_id: {dataset, ...}}."""
+    if not change_ids:
+        return {}
+    radius_case = " ".join(
+        f"WHEN '{dataset}' THEN {radius}" for dataset, radius in RESCORE_RADIUS_M.items()
+    )
+    result = await db.execute(
+        text(f"""
+            WITH changes AS (
+                SELECT id, dataset, ST_Transform(geom, 2154) AS geom_l93,
+                       CASE dataset {radius_case} ELSE {SEARCH_RADIUS_M} END AS radius_m
+                FROM reference_changes
+                WHERE id = ANY(CAST(:ids AS int[]))
+            )
+            SELECT p.id, array_agg(DISTINCT c.dataset) AS datasets
+            FROM changes c
+            JOIN projets p ON ST_DWithin(p.geom_l93, c.geom_l93, c.radius_m)
+            GROUP BY p.id
+        """),
+        {"ids": change_ids},
+    )
+    return {str(row["id"]): set(row["datasets"]) for row in result.mappings().all()}
+
+
+async def _refresh_enrichment(db: AsyncSession, affected: Dict[str, Set[str]]) -> int:
+    """Recompute the enrichment parts derived from changed datasets.
+
+    Only projects already enriched are touched; enriched_at is kept so the
+    PVGIS part is not considered refreshed. Constraints and nearest postes
+    are computed with the batch queries, ENRICH_CHUNK projects at a time.
+    Returns the number of updated projects.
+    """
+    result = await db.execute(
+        text("""
+            SELECT p.id, ST_X(p.geom) AS lon, ST_Y(p.geom) AS lat
+            FROM projets p
+            JOIN projet_enrichments e ON e.projet_id = p.id
+            WHERE p.id = ANY(CAST(:ids AS uuid[]))
+              AND p.geom IS NOT NULL
+        """),
+        {"ids": list(affected)},
+    )
+    rows = result.mappings().all()
+    for start in range(0, len(rows), ENRICH_CHUNK):
+        chunk = rows[start:start + ENRICH_CHUNK]
+        zones = [r for r in chunk if affected[str(r["id"])] & ZONE_DATASETS]
+        postes = [r for r in chunk if "postes_sources" in affected[str(r["id"])]]
+        constraints = await get_constraints_batch(db, [(r["lon"], r["lat"]) for r in zones]) if zones else []
+        nearest = await get_nearest_postes_batch(db, [(r["lon"], r["lat"]) for r in postes], limit=3)
+
+        patches: Dict[str, Dict[str, Any]] = {str(r["id"]): {} for r in chunk}
+        for row, value in zip(zones, constraints):
+            patches[str(row["id"])]["constraints"] = value
+        for row, value in zip(postes, nearest):
+            patches[str(row["id"])]["nearest_postes"] = value
+        await save_enrichments(db, list(patches), [json.dumps(patch) for patch in patches.values()])
+    return len(rows)
+
+
+async def rescore_changed(db: AsyncSession, limit: int = 10_000) -> Dict[str, Any]:
+    """Process pending reference changes: refresh, rescore and mark them done.
+
+    Commits on success. `limit` bounds the number of change rows per run.
+    """
+    pending = await db.execute(
+        text("""
+            SELECT id, dataset FROM reference_changes
+            WHERE processed_at IS NULL
+            ORDER BY id
+            LIMIT :limit
+        """),
+        {"limit": limit},
+    )
+    changes = pending.mappings().all()
+    if not changes:
+        return {"changes": 0, "projects": 0, "enriched_refreshed": 0, "rescored": 0}
+
+    change_ids = [row["id"] for row in changes]
+    if any(row["dataset"] == "postes_sources" for row in changes):
+        invalidate_poste_index()
+    if any(row["dataset"] in ZONE_DATASETS for row in changes):
+        await refresh_constraint_layers(db)  # pick up freshly built subdivided tables
+    affected = await affected_projects(db, change_ids)
+    refreshed = await _refresh_enrichment(db, affected) if affected else 0
+
+    scored = await calculate_scores_bulk(db, list(affected))
+    await persist_scores(db, scored)
+
+    await db.execute(
+        text("UPDATE reference_changes SET processed_at = NOW() WHERE id = ANY(CAST(:ids AS int[]))"),
+        {"ids": change_ids},
+    )
+    await db.commit()
+
+    by_dataset: Dict[str, int] = {}
+    for row in changes:
+        by_dataset[row["dataset"]] = by_dataset.get(row["dataset"], 0) + 1
+    stats = {
+        "changes": len(change_ids),
+        "changes_by_dataset": by_dataset,
+        "projects": len(affected),
+        "enriched_refreshed": refreshed,
+        "rescored": len(scored),
+    }
+    logger.info("Incremental rescoring: %s", stats)
+    return stats
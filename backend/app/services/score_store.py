@@ -0,0 +1,242 @@
+"""Persistent score breakdown store with input fingerprinting.
+
+Every scoring result is saved in project_scores together with a SHA-256
+fingerprint of the inputs that produced it:
+
+  - coordinates (lon/lat, 6 decimals)
+  - filiere, departement, surface_ha, puissance_mwc
+  - enrichment timestamp (projet_enrichments.enriched_at)
+  - linked risk set (risque_id:severite pairs)
+  - WEIGHTS_VERSION (weights + engine version)
+
+Fingerprints are computed from plain column reads (no kNN), so a POST
+whose fingerprint matches the stored one can skip PostGIS entirely, and
+a GET can flag the stored breakdown as stale when any input moved.
+"""
+import hashlib
+import json
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.scoring import CRITERIA, WEIGHTS_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def compute_fingerprint(inputs: Dict[str, Any]) -> str:
+    """Hash scoring inputs into a stable 64-char hex fingerprint."""
+    def _num(value: Any) -> Optional[str]:
+        # Decimal/float/int → canonical string so 10 == 10.0 == Decimal("10")
+        return None if value is None else f"{float(value):.6f}"
+
+    canonical = {
+        "lon": _num(inputs.get("lon")),
+        "lat": _num(inputs.get("lat")),
+        "filiere": inputs.get("filiere"),
+        "departement": inputs.get("departement"),
+        "surface_ha": _num(inputs.get("surface_ha")),
+        "puissance_mwc": _num(inputs.get("puissance_mwc")),
+        "enriched_at": inputs.get("enriched_at"),
+        "risk_set": inputs.get("risk_set") or "",
+        "weights_version": WEIGHTS_VERSION,
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def canonical_id(projet_id: Any) -> str:
+    """Normalize a project id to the lowercase hyphenated form PostgreSQL returns."""
+    return str(uuid.UUID(str(projet_id)))
+
+
+async def load_fingerprints(db: AsyncSession, projet_ids: Sequence[str]) -> Dict[str, str]:
+    """Compute the current input fingerprint of each project (one query)."""
+    if not projet_ids:
+        return {}
+    result = await db.execute(
+        text("""
+            SELECT
+                p.id,
+                ST_X(p.geom) AS lon,
+                ST_Y(p.geom) AS lat,
+                p.filiere,
+                p.departement,
+                p.surface_ha,
+                p.puissance_mwc,
+                CAST(e.enriched_at AS text) AS enriched_at,
+                (
+                    SELECT string_agg(pr.risque_id || ':' || COALESCE(r.severite, 0), ','
+                                      ORDER BY pr.risque_id)
+                    FROM projet_risques pr
+                    JOIN risques r ON r.id = pr.risque_id
+                    WHERE pr.projet_id = p.id
+                ) AS risk_set
+            FROM projets p
+            LEFT JOIN projet_enrichments e ON e.projet_id = p.id
+            WHERE p.id = ANY(CAST(:ids AS uuid[]))
+        """),
+        {"ids": [str(pid) for pid in projet_ids]},
+    )
+    return {str(row["id"]): compute_fingerprint(dict(row)) for row in result.mappings().all()}
+
+
+async def load_detail_matrix(
+    db: AsyncSession,
+    projet_ids: Optional[Sequence[str]] = None,
+    user_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Load stored per-criterion breakdowns as an n × 6 matrix (CRITERIA order).
+
+    Args:
+        projet_ids: Restrict to these projects (None = every stored score).
+        user_id: Restrict to projects owned by this user or unowned.
+
+    Returns:
+        {"ids": [...], "noms": [...], "filieres": [...], "scores": n array,
+         "details": n × 6 array}
+    """
+    conditions = []
+    params: Dict[str, Any] = {}
+    if projet_ids is not None:
+        conditions.append("ps.projet_id = ANY(CAST(:ids AS uuid[]))")
+        params["ids"] = [str(pid) for pid in projet_ids]
+    if user_id is not None:
+        conditions.append("(p.user_id = :user_id OR p.user_id IS NULL)")
+        params["user_id"] = str(user_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    select_details = ", ".join(
+        f"COALESCE((ps.details ->> '{c}')::float8, 0)" for c in CRITERIA
+    )
+
+    result = await db.execute(
+        text(f"""
+            SELECT ps.projet_id, p.nom, p.filiere, ps.score,
+                   ARRAY[{select_details}] AS details
+            FROM project_scores ps
+            JOIN projets p ON p.id = ps.projet_id
+            {where}
+            ORDER BY ps.projet_id
+        """),
+        params,
+    )
+    rows = result.mappings().all()
+    return {
+        "ids": [str(r["projet_id"]) for r in rows],
+        "noms": [r["nom"] for r in rows],
+        "filieres": [r["filiere"] for r in rows],
+        "scores": np.array([r["score"] for r in rows], dtype=np.int64),
+        "details": np.array([r["details"] for r in rows], dtype=np.float64).reshape(
+            len(rows), len(CRITERIA)
+        ),
+    }
+
+
+async def get_stored_scores(db: AsyncSession, projet_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """Return stored breakdowns keyed by project id."""
+    if not projet_ids:
+        return {}
+    result = await db.execute(
+        text("""
+            SELECT ps.projet_id, p.nom, p.filiere, ps.fingerprint, ps.score, ps.details,
+                   ps.weights, ps.data_sources, ps.weights_version, ps.computed_at
+            FROM project_scores ps
+            JOIN projets p ON p.id = ps.projet_id
+            WHERE ps.projet_id = ANY(CAST(:ids AS uuid[]))
+        """),
+        {"ids": [str(pid) for pid in projet_ids]},
+    )
+    stored = {}
+    for row in result.mappings().all():
+        entry = dict(row)
+        for key in ("details", "weights", "data_sources"):
+            if isinstance(entry[key], str):
+                entry[key] = json.loads(entry[key])
+        stored[str(row["projet_id"])] = entry
+    return stored
+
+
+def stored_to_result(projet_id: str, stored: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a project_scores row like a calculate_score() result."""
+    return {
+        "projet_id": projet_id,
+        "nom": stored["nom"],
+        "score": stored["score"],
+        "details": stored["details"],
+        "weights": stored["weights"],
+        "filiere": stored["filiere"],
+        "data_sources": stored["data_sources"] or {},
+        "computed_at": stored["computed_at"].isoformat() if stored.get("computed_at") else None,
+    }
+
+
+async def save_scores(
+    db: AsyncSession,
+    score_results: List[Dict[str, Any]],
+    fingerprints: Dict[str, str],
+) -> None:
+    """Upsert full breakdowns for many projects in one statement.
+
+    Results whose project has no fingerprint (deleted meanwhile) are skipped.
+    """
+    rows = [
+        (str(r["projet_id"]), fingerprints.get(canonical_id(r["projet_id"])), r)
+        for r in score_results
+    ]
+    rows = [(pid, fp, r) for pid, fp, r in rows if fp]
+    if not rows:
+        return
+
+    await db.execute(
+        text("""
+            INSERT INTO project_scores
+                (projet_id, fingerprint, score, details, weights, data_sources,
+                 weights_version, computed_at)
+            SELECT v.projet_id, v.fingerprint, v.score, v.details::jsonb, v.weights::jsonb,
+                   v.data_sources::jsonb, :weights_version, NOW()
+            FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:fingerprints AS text[]), CAST(:scores AS int[]),
+                CAST(:details AS text[]), CAST(:weights AS text[]), CAST(:data_sources AS text[])
+            ) AS v(projet_id, fingerprint, score, details, weights, data_sources)
+            ON CONFLICT (projet_id) DO UPDATE SET
+                fingerprint = EXCLUDED.fingerprint,
+                score = EXCLUDED.score,
+                details = EXCLUDED.details,
+                weights = EXCLUDED.weights,
+                data_sources = EXCLUDED.data_sources,
+                weights_version = EXCLUDED.weights_version,
+                computed_at = EXCLUDED.computed_at
+        """),
+        {
+            "ids": [pid for pid, _, _ in rows],
+            "fingerprints": [fp for _, fp, _ in rows],
+            "scores": [r["score"] for _, _, r in rows],
+            "details": [json.dumps(r["details"]) for _, _, r in rows],
+            "weights": [json.dumps(r["weights"]) for _, _, r in rows],
+            "data_sources": [json.dumps(r.get("data_sources") or {}) for _, _, r in rows],
+            "weights_version": WEIGHTS_VERSION,
+        },
+    )
+
+
+async def persist_scores(db: AsyncSession, score_results: List[Dict[str, Any]]) -> None:
+    """Persist many global scores (one UPDATE ... FROM unnest()) and their breakdowns."""
+    if not score_results:
+        return
+    await db.execute(
+        text("""
+            UPDATE projets p SET score_global = v.score
+            FROM unnest(CAST(:ids AS uuid[]), CAST(:scores AS int[])) AS v(id, score)
+            WHERE p.id = v.id
+        """),
+        {
+            "ids": [r["projet_id"] for r in score_results],
+            "scores": [r["score"] for r in score_results],
+        },
+    )
+    fingerprints = await load_fingerprints(db, [r["projet_id"] for r in score_results])
+    await save_scores(db, score_results, fingerprints)
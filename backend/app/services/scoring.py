@@ -15,15 +15,28 @@ Criteria:
   6. risques           — aggregated risk score from linked project risks
 
 Weights are configurable per filiere.
+
+Bulk mode (calculate_scores_bulk) loads every input for thousands of
+projects in a few set-based queries (LATERAL kNN + grouped risk
+aggregate) and evaluates the six criteria as vectorized NumPy maps that
+reproduce the scalar functions exactly.
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence
 
+import hashlib
+import json
 import logging
 import math
+import uuid
 
+import numpy as np
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.services.enrichment_store import load_enrichment
+from app.services.poste_index import get_poste_index
+
 logger = logging.getLogger(__name__)
 
 # ─── Weights per filiere ─────────────────────────────────────────
@@ -64,6 +77,20 @@ DEFAULT_WEIGHTS: Dict[str, float] = {
     "risques": 0.15,
 }
 
+CRITERIA: List[str] = list(DEFAULT_WEIGHTS.keys())
+
+# Bump when a criterion function changes; weights are hashed automatically.
+SCORING_ENGINE_VERSION = 1
+WEIGHTS_VERSION: str = hashlib.sha256(
+    json.dumps(
+        {"engine": SCORING_ENGINE_VERSION, "filieres": WEIGHTS, "default": DEFAULT_WEIGHTS},
+        sort_keys=True,
+    ).encode()
+).hexdigest()[:12]
+
+# Projects per set-based query in bulk mode
+BULK_CHUNK_SIZE = 1000
+
 # ─── Scoring functions ───────────────────────────────────────────
 
 
@@ -77,14 +104,30 @@ async def _score_proximite_reseau(
     20 km → 50
     50 km → 20
     >80 km → 5
+
+    With settings.suitability_raster_scoring, the distance is read from
+    the precomputed raster (cell-centre resolution) instead of PostGIS.
     """
+    if settings.suitability_raster_scoring:
+        from app.services.suitability_raster import get_raster
+
+        raster = get_raster()
+        cell = raster.lookup(lon, lat) if raster else None
+        if cell is not None:
+            return _proximite_from_distance_km(cell["nearest_poste_m"] / 1000.0)
+
+    index = await get_poste_index(db)
+    if index is not None:
+        _, distance_m = index.nearest(lon, lat)[0]
+        return _proximite_from_distance_km(distance_m / 1000.0)
+
     query = text("""
         SELECT ST_Distance(
-            geom::geography,
-            ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
+            geom_l93,
+            ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154)
         ) as distance_m
         FROM postes_sources
-        ORDER BY geom <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
+        ORDER BY geom_l93 <-> ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154)
         LIMIT 1
     """)
     result = await db.execute(query, {"lon": lon, "lat": lat})
@@ -93,8 +136,11 @@ async def _score_proximite_reseau(
     if not row:
         return 0
 
-    distance_km = row["distance_m"] / 1000.0
+    return _proximite_from_distance_km(row["distance_m"] / 1000.0)
+
 
+def _proximite_from_distance_km(distance_km: float) -> int:
+    """Map a nearest-poste distance (km) to the proximite_reseau score."""
     if distance_km <= 1:
         return 100
     elif distance_km <= 5:
@@ -200,6 +246,15 @@ def _score_environnement(
     return max(0, min(100, score))
 
 
+def _irradiation_source(has_ghi: bool, source: Optional[str]) -> str:
+    """data_sources label of the irradiation criterion."""
+    if not has_ghi:
+        return "heuristic_latitude"
+    if source == "irradiation_grid":
+        return "irradiation_grid"
+    return "pvgis_real"
+
+
 def _score_irradiation(
     lat: Optional[float],
     filiere: Optional[str],
@@ -336,6 +391,332 @@ async def _score_risques(
     return max(0, min(100, int(severity_score - count_penalty)))
 
 
+# ─── Vectorized criteria (bulk mode) ─────────────────────────────
+#
+# Each *_vec function mirrors its scalar counterpart above on NumPy arrays
+# and must return exactly the same integers. Missing values are encoded as
+# NaN (floats) or -1 (departement number); np.trunc reproduces int().
+
+FILIERE_CODES: Dict[str, int] = {"solaire_sol": 0, "eolien_onshore": 1, "bess": 2}
+_OTHER_FILIERE = -1
+
+_DEPT_MOUNTAIN = (4, 5, 6, 64, 65, 66, 73, 74)
+_DEPT_PLAINS = (28, 36, 37, 41, 45, 51, 52)
+
+
+def _dept_number(departement: Optional[str]) -> int:
+    """Encode a departement like the scalar path: -1 if missing, 0 if non-numeric."""
+    if not departement:
+        return -1
+    return int(departement) if departement.isdigit() else 0
+
+
+def _filiere_code(filiere: Optional[str]) -> int:
+    return FILIERE_CODES.get(filiere or "", _OTHER_FILIERE)
+
+
+def _score_proximite_reseau_vec(distance_km: np.ndarray) -> np.ndarray:
+    """Vectorized _proximite_from_distance_km; NaN (no poste/no coords) → 0."""
+    d = np.asarray(distance_km, dtype=np.float64)
+    out = np.select(
+        [d <= 1, d <= 5, d <= 20, d <= 50, d <= 80],
+        [
+            100.0,
+            np.trunc(100 - (d - 1) * 5),
+            np.trunc(80 - (d - 5) * 2),
+            np.trunc(50 - (d - 20) * 1),
+            np.trunc(20 - (d - 50) * 0.5),
+        ],
+        default=5.0,
+    )
+    return np.where(np.isnan(d), 0, out).astype(np.int64)
+
+
+def _score_urbanisme_vec(dept_num: np.ndarray, surface_ha: np.ndarray) -> np.ndarray:
+    """Vectorized _score_urbanisme."""
+    surface = np.asarray(surface_ha, dtype=np.float64)
+    dept = np.asarray(dept_num, dtype=np.int64)
+    score = np.full(surface.shape, 60, dtype=np.int64)
+
+    score += np.select(
+        [np.isnan(surface), surface < 5, surface < 20, surface < 50],
+        [0, 15, 10, 5],
+        default=-5,
+    )
+    score += np.select(
+        [dept < 0, (dept >= 1) & (dept < 20), (dept >= 30) & (dept < 50), (dept >= 60) & (dept < 80)],
+        [0, 5, 15, 10],
+        default=8,
+    )
+    return np.clip(score, 0, 100)
+
+
+def _score_environnement_vec(
+    dept_num: np.ndarray,
+    filiere_code: np.ndarray,
+    has_summary: np.ndarray,
+    in_zone: np.ndarray,
+    nearby: np.ndarray,
+) -> np.ndarray:
+    """Vectorized _score_environnement (enriched summary or departement heuristic)."""
+    dept = np.asarray(dept_num, dtype=np.int64)
+    fil = np.asarray(filiere_code, dtype=np.int64)
+    wind = fil == FILIERE_CODES["eolien_onshore"]
+    bess = fil == FILIERE_CODES["bess"]
+
+    enriched = (
+        90
+        - np.asarray(in_zone, dtype=np.int64) * 25
+        - np.asarray(nearby, dtype=np.int64) * 5
+        - np.where(wind, 5, 0)
+        + np.where(bess, 5, 0)
+    )
+
+    heuristic = 70 - np.where(wind, 10, 0) + np.where(bess, 10, 0)
+    heuristic = heuristic + np.select(
+        [np.isin(dept, _DEPT_MOUNTAIN), np.isin(dept, _DEPT_PLAINS)],
+        [-15, 10],
+        default=0,
+    )
+
+    score = np.where(np.asarray(has_summary, dtype=bool), enriched, heuristic)
+    return np.clip(score, 0, 100)
+
+
+def _score_irradiation_vec(
+    lat: np.ndarray,
+    filiere_code: np.ndarray,
+    ghi: np.ndarray,
+) -> np.ndarray:
+    """Vectorized _score_irradiation (PVGIS GHI when present, latitude proxy otherwise)."""
+    lat = np.asarray(lat, dtype=np.float64)
+    ghi = np.asarray(ghi, dtype=np.float64)
+    fil = np.asarray(filiere_code, dtype=np.int64)
+    wind = fil == FILIERE_CODES["eolien_onshore"]
+    bess = fil == FILIERE_CODES["bess"]
+    has_ghi = ~np.isnan(ghi) & (ghi != 0)
+
+    with np.errstate(invalid="ignore"):
+        ghi_score = np.select(
+            [ghi >= 1700, ghi >= 1600, ghi >= 1400, ghi >= 1200, ghi >= 1000],
+            [
+                100.0,
+                np.trunc(95 + (ghi - 1600) * 0.05),
+                np.trunc(75 + (ghi - 1400) * 0.1),
+                np.trunc(55 + (ghi - 1200) * 0.1),
+                np.trunc(35 + (ghi - 1000) * 0.1),
+            ],
+            default=np.maximum(20, np.trunc(35 - (1000 - ghi) * 0.03)),
+        )
+        wind_score = np.select(
+            [lat >= 48, lat >= 45],
+            [
+                np.minimum(100, np.trunc(60 + (lat - 48) * 10)),
+                np.trunc(50 + (lat - 45) * 3.3),
+            ],
+            default=np.trunc(40 + (lat - 41) * 2.5),
+        )
+        solar_score = np.select(
+            [lat <= 43, lat <= 45, lat <= 47, lat <= 49],
+            [
+                95.0,
+                np.trunc(95 - (lat - 43) * 7.5),
+                np.trunc(80 - (lat - 45) * 7.5),
+                np.trunc(65 - (lat - 47) * 7.5),
+            ],
+            default=np.maximum(35, np.trunc(50 - (lat - 49) * 5)),
+        )
+
+    latitude_score = np.select(
+        [np.isnan(lat), wind, bess],
+        [50.0, wind_score, 70.0],
+        default=solar_score,
+    )
+    # Wind ignores GHI and falls through to the latitude proxy
+    real_score = np.where(bess, 70.0, ghi_score)
+    out = np.where(has_ghi & ~wind, real_score, latitude_score)
+    return out.astype(np.int64)
+
+
+def _score_accessibilite_vec(surface_ha: np.ndarray, puissance_mwc: np.ndarray) -> np.ndarray:
+    """Vectorized _score_accessibilite."""
+    surface = np.asarray(surface_ha, dtype=np.float64)
+    puissance = np.asarray(puissance_mwc, dtype=np.float64)
+    score = np.full(surface.shape, 65, dtype=np.int64)
+
+    score += np.select(
+        [np.isnan(surface), surface < 5, surface < 20, surface < 50, surface > 100],
+        [0, 15, 10, 5, -10],
+        default=0,
+    )
+    score += np.select(
+        [np.isnan(puissance), puissance > 50, puissance > 10],
+        [0, 5, 3],
+        default=0,
+    )
+    return np.clip(score, 0, 100)
+
+
+def _score_risques_vec(avg_severite: np.ndarray, risk_count: np.ndarray) -> np.ndarray:
+    """Vectorized _score_risques; projects without linked risks get 75."""
+    avg = np.nan_to_num(np.asarray(avg_severite, dtype=np.float64))
+    count = np.asarray(risk_count, dtype=np.int64)
+
+    severity_score = np.maximum(0, 100 - (avg * 20))
+    count_penalty = np.minimum(count, 10) * 2
+    score = np.clip(np.trunc(severity_score - count_penalty), 0, 100).astype(np.int64)
+    return np.where(count == 0, 75, score)
+
+
+def _weight_matrix(filieres: Sequence[Optional[str]]) -> np.ndarray:
+    """Stack per-project weight vectors (n × 6, CRITERIA order)."""
+    return np.array(
+        [
+            [WEIGHTS.get(f or "", DEFAULT_WEIGHTS)[c] for c in CRITERIA]
+            for f in filieres
+        ],
+        dtype=np.float64,
+    ).reshape(len(filieres), len(CRITERIA))
+
+
+def _global_scores(details: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted global score per project, summed criterion by criterion.
+
+    Accumulating in CRITERIA order keeps the float result bit-identical to
+    the scalar sum() so that round() ties break the same way.
+    """
+    total = np.zeros(details.shape[0], dtype=np.float64)
+    for j in range(details.shape[1]):
+        total = total + details[:, j] * weights[:, j]
+    return np.clip(np.round(total), 0, 100).astype(np.int64)
+
+
+def score_arrays(
+    *,
+    distance_km: np.ndarray,
+    lat: np.ndarray,
+    dept_num: np.ndarray,
+    filiere_code: np.ndarray,
+    surface_ha: np.ndarray,
+    puissance_mwc: np.ndarray,
+    has_summary: np.ndarray,
+    in_zone: np.ndarray,
+    nearby: np.ndarray,
+    ghi: np.ndarray,
+    avg_severite: np.ndarray,
+    risk_count: np.ndarray,
+) -> np.ndarray:
+    """Evaluate the six criteria for n projects. Returns an (n × 6) int matrix."""
+    return np.column_stack([
+        _score_proximite_reseau_vec(distance_km),
+        _score_urbanisme_vec(dept_num, surface_ha),
+        _score_environnement_vec(dept_num, filiere_code, has_summary, in_zone, nearby),
+        _score_irradiation_vec(lat, filiere_code, ghi),
+        _score_accessibilite_vec(surface_ha, puissance_mwc),
+        _score_risques_vec(avg_severite, risk_count),
+    ])
+
+
+def scenario_weight_vector(
+    overrides: Dict[str, float], base: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """Build a full 6-criteria weight vector (CRITERIA order, sums to 1).
+
+    Criteria given in `overrides` keep their value; the others share the
+    remaining mass in proportion to `base` (DEFAULT_WEIGHTS by default).
+    No override returns `base` itself. A complete vector is simply
+    normalized.
+
+    Raises:
+        ValueError: unknown criterion, negative weight, or weights that
+            cannot be normalized (sum > 1 for a partial vector, or 0).
+    """
+    base = base or DEFAULT_WEIGHTS
+    unknown = set(overrides) - set(CRITERIA)
+    if unknown:
+        raise ValueError(f"Unknown criteria: {sorted(unknown)}")
+    if any(v < 0 for v in overrides.values()):
+        raise ValueError("Weights must be >= 0")
+    if not overrides:
+        return np.array([base[c] for c in CRITERIA], dtype=np.float64)
+
+    given = sum(overrides.values())
+    rest = [c for c in CRITERIA if c not in overrides]
+    if not rest:
+        if given <= 0:
+            raise ValueError("Weights must not all be 0")
+        return np.array([overrides[c] / given for c in CRITERIA], dtype=np.float64)
+    if given > 1:
+        raise ValueError("Partial weights must sum to <= 1")
+
+    rest_base = sum(base[c] for c in rest)
+    return np.array(
+        [
+            overrides[c] if c in overrides else base[c] * (1 - given) / rest_base
+            for c in CRITERIA
+        ],
+        dtype=np.float64,
+    )
+
+
+WEIGHT_PROFILES: List[Optional[str]] = [*WEIGHTS, None]  # None = DEFAULT_WEIGHTS
+
+
+def weight_profile_index(filieres: Sequence[Optional[str]]) -> np.ndarray:
+    """Row of WEIGHT_PROFILES whose weights each project is scored with."""
+    profiles = {f: i for i, f in enumerate(WEIGHTS)}
+    return np.array(
+        [profiles.get(f or "", len(WEIGHTS)) for f in filieres], dtype=np.intp,
+    ).reshape(len(filieres))
+
+
+def scenario_weight_matrix(overrides: Dict[str, float]) -> np.ndarray:
+    """Scenario weights per profile (len(WEIGHT_PROFILES) × 6).
+
+    Overrides apply on top of each filiere's own weights, so criteria left
+    out keep that filiere's proportions (see scenario_weight_vector).
+    """
+    return np.vstack([
+        scenario_weight_vector(overrides, WEIGHTS[f] if f else DEFAULT_WEIGHTS)
+        for f in WEIGHT_PROFILES
+    ])
+
+
+def what_if_scores(details: np.ndarray, scenarios: np.ndarray, profiles: np.ndarray) -> np.ndarray:
+    """Global scores for every (project, scenario) pair in one batched product.
+
+    Args:
+        details: n × 6 criterion scores (CRITERIA order).
+        scenarios: k × profiles × 6 weights (scenario_weight_matrix per scenario).
+        profiles: n weight-profile rows (weight_profile_index).
+
+    Returns:
+        n × k int matrix of global scores (rounded, clipped to 0-100).
+        Accumulated criterion by criterion like _global_scores(), so the
+        filiere weights give back the stored scores exactly.
+    """
+    details = np.asarray(details, dtype=np.float64)
+    scenarios = np.asarray(scenarios, dtype=np.float64)
+    total = np.zeros((details.shape[0], scenarios.shape[1], scenarios.shape[0]), dtype=np.float64)
+    for j in range(details.shape[1]):
+        total = total + details[:, j, None, None] * scenarios[:, :, j].T
+    product = total[np.arange(details.shape[0]), np.asarray(profiles, dtype=np.intp)]
+    return np.clip(np.round(product), 0, 100).astype(np.int64)
+
+
+def rank_columns(scores: np.ndarray) -> np.ndarray:
+    """Competition ranks (1 = best, ties share a rank) of each column of an n × k matrix."""
+    scores = np.asarray(scores)
+    if scores.ndim == 1:
+        scores = scores[:, None]
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    n = scores.shape[0]
+    for j in range(scores.shape[1]):
+        ordered = np.sort(scores[:, j])
+        ranks[:, j] = 1 + n - np.searchsorted(ordered, scores[:, j], side="right")
+    return ranks
+
+
 # ─── Public API ──────────────────────────────────────────────────
 
 
@@ -372,17 +753,7 @@ async def calculate_score(
     # Auto-load enrichment from DB if not provided
     if enrichment_data is None:
         try:
-            meta_result = await db.execute(
-                text("SELECT metadata FROM projets WHERE id = :id"),
-                {"id": projet_id},
-            )
-            meta_row = meta_result.mappings().first()
-            if meta_row and meta_row["metadata"]:
-                metadata = meta_row["metadata"]
-                if isinstance(metadata, str):
-                    import json
-                    metadata = json.loads(metadata)
-                enrichment_data = metadata.get("enrichment")
+            enrichment_data = await load_enrichment(db, projet_id, ("pvgis", "constraints"))
         except Exception as exc:
             logger.debug("Could not load enrichment data: %s", exc)
 
@@ -409,10 +780,8 @@ async def calculate_score(
 
     # 4. Irradiation / resource (real PVGIS if enriched)
     details["irradiation"] = _score_irradiation(lat, filiere, enrichment_data)
-    if enrichment_data and enrichment_data.get("pvgis", {}).get("ghi_kwh_m2_an"):
-        data_sources["irradiation"] = "pvgis_real"
-    else:
-        data_sources["irradiation"] = "heuristic_latitude"
+    pvgis = (enrichment_data or {}).get("pvgis") or {}
+    data_sources["irradiation"] = _irradiation_source(bool(pvgis.get("ghi_kwh_m2_an")), pvgis.get("source"))
 
     # 5. Accessibilite
     details["accessibilite"] = _score_accessibilite(surface_ha, puissance_mwc)
@@ -436,3 +805,165 @@ async def calculate_score(
         "filiere": filiere,
         "data_sources": data_sources,
     }
+
+
+_BULK_INPUTS_SQL = """
+    SELECT
+        p.id,
+        p.nom,
+        p.filiere,
+        p.departement,
+        p.surface_ha,
+        p.puissance_mwc,
+        ST_X(p.geom) AS lon,
+        ST_Y(p.geom) AS lat,
+        /*distance_column*/,
+        rk.avg_severite,
+        COALESCE(rk.risk_count, 0) AS risk_count,
+        COALESCE(
+            jsonb_typeof(e.constraints) = 'object' AND e.constraints <> '{}'::jsonb,
+            FALSE
+        ) AS has_constraints,
+        COALESCE(
+            jsonb_typeof(e.constraints -> 'summary') = 'object'
+            AND e.constraints -> 'summary' <> '{}'::jsonb,
+            FALSE
+        ) AS has_summary,
+        COALESCE(e.constraints_in_zone, 0) AS in_zone,
+        COALESCE(e.constraints_nearby, 0) AS nearby,
+        e.ghi_kwh_m2_an AS ghi,
+        e.solar_source AS ghi_source
+    FROM projets p
+    LEFT JOIN projet_enrichments e ON e.projet_id = p.id
+    /*nearest_join*/
+    LEFT JOIN (
+        SELECT pr.projet_id,
+               AVG(r.severite) AS avg_severite,
+               COUNT(pr.risque_id) AS risk_count
+        FROM projet_risques pr
+        JOIN risques r ON r.id = pr.risque_id
+        WHERE pr.projet_id = ANY(CAST(:ids AS uuid[]))
+        GROUP BY pr.projet_id
+    ) rk ON rk.projet_id = p.id
+    WHERE p.id = ANY(CAST(:ids AS uuid[]))
+"""
+
+_NEAREST_POSTE_JOIN = """LEFT JOIN LATERAL (
+        SELECT ST_Distance(ps.geom_l93, p.geom_l93) AS distance_m
+        FROM postes_sources ps
+        WHERE p.geom_l93 IS NOT NULL
+        ORDER BY ps.geom_l93 <-> p.geom_l93
+        LIMIT 1
+    ) np ON TRUE"""
+
+_BULK_INPUTS_QUERY = text(
+    _BULK_INPUTS_SQL
+    .replace("/*distance_column*/", "np.distance_m")
+    .replace("/*nearest_join*/", _NEAREST_POSTE_JOIN)
+)
+# With the in-process poste index, distances are computed in Python
+_BULK_INPUTS_QUERY_NO_KNN = text(
+    _BULK_INPUTS_SQL
+    .replace("/*distance_column*/", "NULL::float8 AS distance_m")
+    .replace("/*nearest_join*/", "")
+)
+
+
+def _as_float(value: Any) -> float:
+    """Decimal/None → float (NaN for missing or zero, like `float(x) if x else None`)."""
+    return float(value) if value else math.nan
+
+
+async def _load_bulk_inputs(db: AsyncSession, projet_ids: Sequence[str]) -> List[Dict[str, Any]]:
+    """Fetch scoring inputs for many projects, BULK_CHUNK_SIZE ids per query."""
+    index = await get_poste_index(db)
+    query = _BULK_INPUTS_QUERY_NO_KNN if index is not None else _BULK_INPUTS_QUERY
+
+    rows: List[Dict[str, Any]] = []
+    for i in range(0, len(projet_ids), BULK_CHUNK_SIZE):
+        chunk = [str(pid) for pid in projet_ids[i:i + BULK_CHUNK_SIZE]]
+        result = await db.execute(query, {"ids": chunk})
+        rows.extend(dict(r) for r in result.mappings().all())
+
+    if index is not None and rows:
+        distances, _ = index.nearest_many(
+            [r["lon"] if r["lon"] is not None else math.nan for r in rows],
+            [r["lat"] if r["lat"] is not None else math.nan for r in rows],
+        )
+        for row, distance in zip(rows, distances):
+            row["distance_m"] = None if math.isnan(distance) else float(distance)
+    return rows
+
+
+async def calculate_scores_bulk(
+    db: AsyncSession,
+    projet_ids: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """Score many projects with set-based queries and vectorized criteria.
+
+    Produces, for every project found, the same dict as calculate_score()
+    (plus "nom"), keyed by the ID as given. Unknown or malformed IDs are
+    simply absent from the result; order follows the input list.
+
+    Args:
+        db: Database session.
+        projet_ids: Project UUIDs (thousands are fine — queried in chunks).
+
+    Returns:
+        List of score dicts in input order.
+    """
+    requested: List[tuple] = []
+    for pid in projet_ids:
+        try:
+            requested.append((str(pid), str(uuid.UUID(str(pid)))))
+        except ValueError:
+            continue  # Not a UUID — cannot match any project
+
+    rows = await _load_bulk_inputs(db, [canonical for _, canonical in requested])
+    if not rows:
+        return []
+
+    by_id = {str(r["id"]): r for r in rows}
+    found = [(pid, by_id[canonical]) for pid, canonical in requested if canonical in by_id]
+    ordered = [row for _, row in found]
+
+    filieres = [r["filiere"] for r in ordered]
+    details = score_arrays(
+        distance_km=np.array(
+            [r["distance_m"] / 1000.0 if r["distance_m"] is not None else math.nan for r in ordered]
+        ),
+        lat=np.array([float(r["lat"]) if r["lat"] is not None else math.nan for r in ordered]),
+        dept_num=np.array([_dept_number(r["departement"]) for r in ordered]),
+        filiere_code=np.array([_filiere_code(f) for f in filieres]),
+        surface_ha=np.array([_as_float(r["surface_ha"]) for r in ordered]),
+        puissance_mwc=np.array([_as_float(r["puissance_mwc"]) for r in ordered]),
+        has_summary=np.array([bool(r["has_summary"]) for r in ordered]),
+        in_zone=np.array([r["in_zone"] for r in ordered]),
+        nearby=np.array([r["nearby"] for r in ordered]),
+        ghi=np.array([float(r["ghi"]) if r["ghi"] is not None else math.nan for r in ordered]),
+        avg_severite=np.array(
+            [float(r["avg_severite"]) if r["avg_severite"] is not None else 0.0 for r in ordered]
+        ),
+        risk_count=np.array([int(r["risk_count"]) for r in ordered]),
+    )
+    scores = _global_scores(details, _weight_matrix(filieres))
+
+    results: List[Dict[str, Any]] = []
+    for i, (pid, row) in enumerate(found):
+        filiere = row["filiere"]
+        has_ghi = row["ghi"] is not None and row["ghi"] != 0
+        results.append({
+            "projet_id": pid,
+            "nom": row["nom"],
+            "score": int(scores[i]),
+            "details": {c: int(details[i, j]) for j, c in enumerate(CRITERIA)},
+            "weights": WEIGHTS.get(filiere or "", DEFAULT_WEIGHTS),
+            "filiere": filiere,
+            "data_sources": {
+                "environnement": (
+                    "enrichment_real" if row["has_constraints"] else "heuristic_departement"
+                ),
+                "irradiation": _irradiation_source(has_ghi, row.get("ghi_source")),
+            },
+        })
+    return results
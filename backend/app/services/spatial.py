@@ -1,4 +1,8 @@
-"""Spatial analysis service using PostGIS — Sprint 21."""
+"""Spatial analysis service using PostGIS — Sprint 21.
+
+Metric predicates run on the generated Lambert-93 columns (geom_l93,
+GiST-indexed) rather than casting geom to geography per row.
+"""
 
 import json
 
@@ -6,22 +10,64 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+async def _natura2000_pieces(db: AsyncSession) -> str:
+    """Table to run Natura 2000 predicates on: subdivided pieces once built."""
+    from app.services.constraints import resolved_layer
+
+    layer = await resolved_layer(db, "natura2000")
+    return layer.subdivided_table if layer and layer.subdivided_table else "natura2000"
+
+
 async def buffer_analysis(db: AsyncSession, lon: float, lat: float, radius_km: float) -> dict:
-    """Analyze what's within a radius around a point."""
+    """Analyze what's within a radius around a point.
+
+    Postes figures come from the in-process poste index when available;
+    only the Natura 2000 count then needs PostGIS.
+    """
+    from app.services.poste_index import get_poste_index
+
+    n2k = await _natura2000_pieces(db)
+    index = await get_poste_index(db)
+    if index is not None:
+        result = await db.execute(
+            text(f"""
+                SELECT COUNT(DISTINCT site_code) FROM {n2k}
+                WHERE ST_DWithin(
+                    geom_l93,
+                    ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154),
+                    :radius_m
+                )
+            """),
+            {"lon": lon, "lat": lat, "radius_m": radius_km * 1000},
+        )
+        nearest = index.nearest(lon, lat)
+        return {
+            "center": {"lon": lon, "lat": lat},
+            "radius_km": radius_km,
+            "postes_in_radius": len(index.within(lon, lat, radius_km * 1000)),
+            "natura2000_in_radius": result.scalar() or 0,
+            "nearest_poste_m": round(nearest[0][1], 1) if nearest else None,
+            "nearest_poste_name": nearest[0][0]["nom"] if nearest else None,
+        }
+
     result = await db.execute(
-        text("""
+        text(f"""
             WITH point AS (
-                SELECT ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography AS geog
+                SELECT ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154) AS g
+            ),
+            nearest AS (
+                SELECT nom, ST_Distance(geom_l93, point.g) AS distance_m
+                FROM postes_sources, point
+                ORDER BY geom_l93 <-> point.g
+                LIMIT 1
             )
             SELECT
                 (SELECT COUNT(*) FROM postes_sources
-                 WHERE ST_DWithin(geom::geography, point.geog, :radius_m)) AS postes_count,
-                (SELECT COUNT(*) FROM natura2000
-                 WHERE ST_DWithin(geom::geography, point.geog, :radius_m)) AS natura2000_count,
-                (SELECT MIN(ST_Distance(geom::geography, point.geog))
-                 FROM postes_sources) AS nearest_poste_m,
-                (SELECT nom FROM postes_sources
-                 ORDER BY geom::geography <-> point.geog LIMIT 1) AS nearest_poste_name
+                 WHERE ST_DWithin(geom_l93, point.g, :radius_m)) AS postes_count,
+                (SELECT COUNT(DISTINCT site_code) FROM {n2k}
+                 WHERE ST_DWithin(geom_l93, point.g, :radius_m)) AS natura2000_count,
+                (SELECT distance_m FROM nearest) AS nearest_poste_m,
+                (SELECT nom FROM nearest) AS nearest_poste_name
             FROM point
         """),
         {"lon": lon, "lat": lat, "radius_m": radius_km * 1000},
@@ -40,19 +86,26 @@ async def buffer_analysis(db: AsyncSession, lon: float, lat: float, radius_km: f
 async def intersection_analysis(db: AsyncSession, geojson: dict) -> dict:
     """Check what a GeoJSON geometry intersects with."""
     geojson_str = json.dumps(geojson)
+    n2k = await _natura2000_pieces(db)
     result = await db.execute(
-        text("""
+        text(f"""
             WITH input_geom AS (
-                SELECT ST_SetSRID(ST_GeomFromGeoJSON(:geojson), 4326) AS geom
+                SELECT g AS geom, ST_Transform(g, 2154) AS geom_l93
+                FROM (SELECT ST_SetSRID(ST_GeomFromGeoJSON(:geojson), 4326) AS g) src
+            ),
+            hits AS (
+                SELECT z.nom FROM natura2000 z
+                WHERE z.site_code IN (
+                    SELECT n.site_code FROM {n2k} n, input_geom
+                    WHERE ST_Intersects(n.geom_l93, input_geom.geom_l93)
+                )
             )
             SELECT
-                (SELECT COUNT(*) FROM natura2000
-                 WHERE ST_Intersects(natura2000.geom, input_geom.geom)) AS n2k_count,
-                (SELECT COALESCE(array_agg(nom), '{}') FROM natura2000
-                 WHERE ST_Intersects(natura2000.geom, input_geom.geom)) AS n2k_names,
+                (SELECT COUNT(*) FROM hits) AS n2k_count,
+                (SELECT COALESCE(array_agg(nom), '{{}}') FROM hits) AS n2k_names,
                 (SELECT COUNT(*) FROM postes_sources
-                 WHERE ST_DWithin(postes_sources.geom::geography,
-                                  input_geom.geom::geography, 10000)) AS postes_10km,
+                 WHERE ST_DWithin(postes_sources.geom_l93,
+                                  input_geom.geom_l93, 10000)) AS postes_10km,
                 ST_Area(input_geom.geom::geography) / 10000 AS area_ha
             FROM input_geom
         """),
@@ -87,9 +140,36 @@ def _env_risk_label(count: int) -> str:
     return "low"
 
 
+def _raster_buffer(lon: float, lat: float) -> dict | None:
+    """10 km buffer figures read from the precomputed suitability raster, if built."""
+    from app.services.suitability_raster import get_raster
+
+    raster = get_raster()
+    cell = raster.lookup(lon, lat) if raster else None
+    if cell is None:
+        return None
+    return {
+        "center": {"lon": lon, "lat": lat},
+        "radius_km": 10,
+        "postes_in_radius": cell["postes_10km"],
+        "natura2000_in_radius": cell["natura2000_10km"],
+        "nearest_poste_m": round(cell["nearest_poste_m"], 1),
+        "nearest_poste_name": cell["nearest_poste_name"],
+        "resolution_m": cell["resolution_m"],
+    }
+
+
 async def geographic_score(db: AsyncSession, lon: float, lat: float) -> dict:
-    """Compute a geographic suitability score for a location."""
-    buf = await buffer_analysis(db, lon, lat, radius_km=10)
+    """Compute a geographic suitability score for a location.
+
+    Reads the precomputed suitability raster when available (no DB round
+    trip), otherwise falls back to the live PostGIS buffer analysis.
+    """
+    buf = _raster_buffer(lon, lat)
+    source = "raster"
+    if buf is None:
+        buf = await buffer_analysis(db, lon, lat, radius_km=10)
+        source = "postgis"
 
     score = 50  # baseline
 
@@ -128,4 +208,5 @@ async def geographic_score(db: AsyncSession, lon: float, lat: float) -> dict:
             "grid_density": "dense" if buf["postes_in_radius"] > 5 else "moderate" if buf["postes_in_radius"] > 2 else "sparse",
         },
         "details": buf,
+        "source": source,
     }
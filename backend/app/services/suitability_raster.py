@@ -0,0 +1,468 @@
+"""Precomputed national suitability raster — point scoring by array lookup.
+
+Metropolitan France is gridded in Lambert-93 at a configurable resolution
+(default 250 m). Each layer is a memory-mapped .npy grid:
+
+  dist_poste_m   float32  distance from cell centre to nearest poste source
+  poste_id       int32    id of that poste (-1 if none)
+  postes_10km    uint16   postes sources within 10 km
+  n2k_10km       uint8    Natura 2000 sites within 10 km
+  in_zone        uint8    1 if the cell centre lies in a Natura 2000 / ZNIEFF zone
+  irradiation    uint8    solar irradiation score (scoring._score_irradiation proxy)
+
+The grid is processed in square tiles. The builder (build_raster) keeps a
+snapshot of the postes it was built from, matched on (nom, coordinates)
+since re-imports renumber them; on the next run only tiles that an
+added/moved/removed poste can influence are recomputed, and zone layers
+are only rebuilt when the natura2000/znieff dataset versions moved.
+
+Lookups (lookup / lookup_many) are pure NumPy indexing on read-only
+memmaps: microseconds per point, no database round trip.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.services.dataset_versions import dataset_version, invalidate, version_token
+from app.services.projection import from_lambert93, to_lambert93
+
+logger = logging.getLogger(__name__)
+
+# Lambert-93 extent of metropolitan France incl. Corse (metres)
+EXTENT_L93 = (75_000.0, 6_020_000.0, 1_275_000.0, 7_140_000.0)
+TILE_SIZE = 128  # cells per tile side
+RADIUS_M = 10_000  # neighbourhood used by postes_10km / n2k_10km
+
+LAYERS: Dict[str, Any] = {
+    "dist_poste_m": np.float32,
+    "poste_id": np.int32,
+    "postes_10km": np.uint16,
+    "n2k_10km": np.uint8,
+    "in_zone": np.uint8,
+    "irradiation": np.uint8,
+}
+_POSTE_LAYERS = ("dist_poste_m", "poste_id", "postes_10km")
+_ZONE_LAYERS = ("n2k_10km", "in_zone")
+
+MANIFEST = "manifest.json"
+POSTES_SNAPSHOT = "postes_snapshot.npz"
+
+
+def raster_dir() -> Path:
+    path = Path(settings.suitability_raster_dir)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent.parent.parent / path
+    return path
+
+
+def grid_shape(resolution_m: float) -> Tuple[int, int]:
+    """(rows, cols) covering EXTENT_L93, rounded up to whole tiles."""
+    xmin, ymin, xmax, ymax = EXTENT_L93
+    cols = math.ceil((xmax - xmin) / resolution_m / TILE_SIZE) * TILE_SIZE
+    rows = math.ceil((ymax - ymin) / resolution_m / TILE_SIZE) * TILE_SIZE
+    return rows, cols
+
+
+def tile_cell_centers(resolution_m: float, ty: int, tx: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Lambert-93 centres of every cell of tile (ty, tx), as (TILE_SIZE, TILE_SIZE) arrays.
+
+    Row 0 is the northern edge of the extent.
+    """
+    xmin, _, _, ymax = EXTENT_L93
+    cols = xmin + (tx * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) * resolution_m
+    rows = ymax - (ty * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) * resolution_m
+    return np.meshgrid(cols, rows)
+
+
+def tile_bounds(resolution_m: float, ty: int, tx: int) -> Tuple[float, float, float, float]:
+    """(xmin, ymin, xmax, ymax) of a tile in Lambert-93."""
+    xmin, _, _, ymax = EXTENT_L93
+    span = TILE_SIZE * resolution_m
+    x0 = xmin + tx * span
+    y1 = ymax - ty * span
+    return x0, y1 - span, x0 + span, y1
+
+
+# ─── Read side ───────────────────────────────────────────────────
+
+
+class SuitabilityRaster:
+    """Read-only view over the memory-mapped grids."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.manifest = json.loads((path / MANIFEST).read_text())
+        self.resolution_m = float(self.manifest["resolution_m"])
+        self.grids = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r") for name in LAYERS
+        }
+        self.shape = self.grids["dist_poste_m"].shape
+        self.poste_names: Dict[int, str] = {}
+        snapshot = path / POSTES_SNAPSHOT
+        if snapshot.exists():
+            with np.load(snapshot) as snap:
+                self.poste_names = dict(zip(snap["ids"].tolist(), snap["names"].tolist()))
+
+    def cell_index(self, lon, lat) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Row/col indices for lon/lat arrays plus a mask of points inside the grid."""
+        x, y = to_lambert93(lon, lat)
+        xmin, _, _, ymax = EXTENT_L93
+        col = np.floor((x - xmin) / self.resolution_m).astype(np.int64)
+        row = np.floor((ymax - y) / self.resolution_m).astype(np.int64)
+        inside = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+        return np.where(inside, row, 0), np.where(inside, col, 0), inside
+
+    def lookup_many(self, lons, lats) -> Dict[str, np.ndarray]:
+        """Vectorized lookup of every layer. Points outside the grid get an
+        `inside` flag of False (their layer values are meaningless)."""
+        row, col, inside = self.cell_index(np.atleast_1d(lons), np.atleast_1d(lats))
+        out = {name: grid[row, col] for name, grid in self.grids.items()}
+        out["inside"] = inside
+        return out
+
+    def lookup(self, lon: float, lat: float) -> Optional[Dict[str, Any]]:
+        """Single-point lookup; None outside the covered extent or where no poste was rasterized."""
+        values = self.lookup_many(lon, lat)
+        if not values["inside"][0] or values["poste_id"][0] < 0:
+            return None
+        poste_id = int(values["poste_id"][0])
+        return {
+            "nearest_poste_m": float(values["dist_poste_m"][0]),
+            "nearest_poste_id": poste_id,
+            "nearest_poste_name": self.poste_names.get(poste_id),
+            "postes_10km": int(values["postes_10km"][0]),
+            "natura2000_10km": int(values["n2k_10km"][0]),
+            "in_zone": bool(values["in_zone"][0]),
+            "irradiation_score": int(values["irradiation"][0]),
+            "resolution_m": self.resolution_m,
+        }
+
+
+_raster: Optional[SuitabilityRaster] = None
+_raster_mtime: float = 0.0
+
+
+def get_raster() -> Optional[SuitabilityRaster]:
+    """Return the loaded raster (reloaded when the manifest changes), or None if not built."""
+    global _raster, _raster_mtime
+    manifest = raster_dir() / MANIFEST
+    try:
+        mtime = manifest.stat().st_mtime
+    except FileNotFoundError:
+        _raster = None
+        return None
+    if _raster is None or mtime != _raster_mtime:
+        try:
+            _raster = SuitabilityRaster(raster_dir())
+            _raster_mtime = mtime
+        except Exception as exc:
+            logger.warning("Suitability raster unavailable: %s", exc)
+            _raster = None
+    return _raster
+
+
+# ─── Build side ──────────────────────────────────────────────────
+
+
+async def _load_postes(db: AsyncSession) -> Dict[str, np.ndarray]:
+    result = await db.execute(text("""
+        SELECT id, nom, ST_X(geom) AS lon, ST_Y(geom) AS lat
+        FROM postes_sources
+        WHERE geom IS NOT NULL
+        ORDER BY id
+    """))
+    rows = result.mappings().all()
+    ids = np.array([r["id"] for r in rows], dtype=np.int32)
+    x, y = to_lambert93(
+        np.array([r["lon"] for r in rows], dtype=np.float64),
+        np.array([r["lat"] for r in rows], dtype=np.float64),
+    )
+    names = np.array([r["nom"] or "" for r in rows], dtype=str)
+    return {"ids": ids, "x": np.atleast_1d(x), "y": np.atleast_1d(y), "names": names}
+
+
+async def _zones_version(db: AsyncSession) -> Optional[str]:
+    """Combined dataset_version() of the zone tables present, None without any.
+
+    It moves with the reference_changes rows that seed/import_constraints.py
+    logs, so zone layers are rebuilt after each import that changed a zone.
+    """
+    tables = await _existing_zone_tables(db)
+    if not tables:
+        return None
+    versions = []
+    for table in sorted(tables):
+        invalidate(table)  # a build must not miss an import of the last few seconds
+        versions.append(await dataset_version(db, table))
+    return version_token(*versions)
+
+
+PosteKey = Tuple[str, float, float]
+
+
+def _poste_keys(snap: Dict[str, np.ndarray]) -> Dict[PosteKey, int]:
+    """Snapshot postes keyed by (nom, L93 x, y) → id.
+
+    Importers delete and re-insert postes_sources, so ids are not stable
+    across imports; the business key is (see reference_changes.snapshot).
+    """
+    return {
+        (str(name), float(x), float(y)): int(pid)
+        for pid, name, x, y in zip(snap["ids"], snap["names"], snap["x"], snap["y"])
+    }
+
+
+def _changed_postes(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray]) -> np.ndarray:
+    """L93 coordinates (k × 2) of postes added, removed, moved or renamed between snapshots."""
+    old_keys, new_keys = _poste_keys(old), _poste_keys(new)
+    changed = [(x, y) for _, x, y in old_keys.keys() ^ new_keys.keys()]
+    return np.array(sorted(changed), dtype=np.float64).reshape(-1, 2)
+
+
+def _remap_poste_ids(grid: np.ndarray, old: Dict[str, np.ndarray], new: Dict[str, np.ndarray]) -> None:
+    """Rewrite the poste_id layer from old to new ids of unchanged postes, in place.
+
+    Ids of changed postes are left as they are: the tiles that reference
+    them are affected tiles and get rebuilt.
+    """
+    old_keys, new_keys = _poste_keys(old), _poste_keys(new)
+    pairs = sorted((old_keys[k], new_keys[k]) for k in old_keys.keys() & new_keys.keys())
+    if all(a == b for a, b in pairs):
+        return
+    old_ids, new_ids = (np.array(col, dtype=np.int32) for col in zip(*pairs))
+    for start in range(0, grid.shape[0], TILE_SIZE):
+        block = grid[start:start + TILE_SIZE]
+        idx = np.minimum(np.searchsorted(old_ids, block), len(old_ids) - 1)
+        hit = old_ids[idx] == block
+        block[hit] = new_ids[idx[hit]]
+
+
+def _affected_tiles(grids: Dict[str, np.ndarray], resolution_m: float, changed: np.ndarray) -> List[Tuple[int, int]]:
+    """Tiles whose nearest-poste or 10 km count can change because of `changed` postes.
+
+    A changed poste p can only matter for a tile if its distance to the tile
+    bbox is ≤ max(current nearest distance in the tile, RADIUS_M).
+    """
+    if changed.size == 0:
+        return []
+    rows, cols = grids["dist_poste_m"].shape
+    ty_n, tx_n = rows // TILE_SIZE, cols // TILE_SIZE
+    tile_max = (
+        np.asarray(grids["dist_poste_m"])
+        .reshape(ty_n, TILE_SIZE, tx_n, TILE_SIZE)
+        .max(axis=(1, 3))
+    )
+    reach = np.maximum(np.nan_to_num(tile_max, nan=np.inf), RADIUS_M)
+
+    xmin, _, _, ymax = EXTENT_L93
+    span = TILE_SIZE * resolution_m
+    tx0 = xmin + np.arange(tx_n) * span
+    ty1 = ymax - np.arange(ty_n) * span
+    affected = np.zeros((ty_n, tx_n), dtype=bool)
+    for px, py in changed:
+        dx = np.maximum(0, np.maximum(tx0 - px, px - (tx0 + span)))
+        dy = np.maximum(0, np.maximum((ty1 - span) - py, py - ty1))
+        dist = np.hypot(dy[:, None], dx[None, :])
+        affected |= dist <= reach
+    return [(int(ty), int(tx)) for ty, tx in zip(*np.nonzero(affected))]
+
+
+def _fill_poste_tile(grids, resolution_m: float, ty: int, tx: int, tree, ids: np.ndarray) -> None:
+    xs, ys = tile_cell_centers(resolution_m, ty, tx)
+    sl = (slice(ty * TILE_SIZE, (ty + 1) * TILE_SIZE), slice(tx * TILE_SIZE, (tx + 1) * TILE_SIZE))
+    if tree is None:
+        grids["dist_poste_m"][sl] = np.inf
+        grids["poste_id"][sl] = -1
+        grids["postes_10km"][sl] = 0
+        return
+    pts = np.column_stack([xs.ravel(), ys.ravel()])
+    dist, idx = tree.query(pts, k=1)
+    counts = tree.query_ball_point(pts, r=RADIUS_M, return_length=True)
+    grids["dist_poste_m"][sl] = dist.reshape(xs.shape)
+    grids["poste_id"][sl] = ids[idx].reshape(xs.shape)
+    grids["postes_10km"][sl] = np.minimum(counts, np.iinfo(np.uint16).max).reshape(xs.shape)
+
+
+async def _existing_zone_tables(db: AsyncSession) -> List[str]:
+    result = await db.execute(text("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_name IN ('natura2000', 'znieff')
+    """))
+    return [r[0] for r in result.all()]
+
+
+async def _fill_zone_tile(db: AsyncSession, grids, resolution_m: float, ty: int, tx: int, tables: List[str]) -> None:
+    sl = (slice(ty * TILE_SIZE, (ty + 1) * TILE_SIZE), slice(tx * TILE_SIZE, (tx + 1) * TILE_SIZE))
+    grids["n2k_10km"][sl] = 0
+    grids["in_zone"][sl] = 0
+    if not tables:
+        return
+
+    xmin, ymin, xmax, ymax = tile_bounds(resolution_m, ty, tx)
+    zones_sql = " UNION ALL ".join(
+        f"""SELECT '{t}' AS layer, geom_l93 AS g FROM {t}
+            WHERE geom_l93 && ST_Expand(ST_MakeEnvelope(:xmin, :ymin, :xmax, :ymax, 2154), :radius)"""
+        for t in tables
+    )
+    # Cheap pre-check: skip tiles with no zone in reach
+    nearby = await db.execute(text(f"SELECT EXISTS ({zones_sql}) AS any"), {
+        "xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax, "radius": RADIUS_M,
+    })
+    if not nearby.scalar():
+        return
+
+    xs, ys = tile_cell_centers(resolution_m, ty, tx)
+    result = await db.execute(
+        text(f"""
+            WITH zones AS ({zones_sql}),
+            cells AS (
+                SELECT c.ord, ST_SetSRID(ST_MakePoint(c.x, c.y), 2154) AS g
+                FROM unnest(CAST(:xs AS float8[]), CAST(:ys AS float8[]))
+                     WITH ORDINALITY AS c(x, y, ord)
+            )
+            SELECT c.ord,
+                   COUNT(*) FILTER (WHERE z.layer = 'natura2000') AS n2k_10km,
+                   BOOL_OR(ST_Intersects(z.g, c.g)) AS in_zone
+            FROM cells c
+            JOIN zones z ON ST_DWithin(z.g, c.g, :radius)
+            GROUP BY c.ord
+        """),
+        {
+            "xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax, "radius": RADIUS_M,
+            "xs": xs.ravel().tolist(), "ys": ys.ravel().tolist(),
+        },
+    )
+    n2k = np.zeros(TILE_SIZE * TILE_SIZE, dtype=np.uint8)
+    in_zone = np.zeros(TILE_SIZE * TILE_SIZE, dtype=np.uint8)
+    for row in result.mappings().all():
+        i = int(row["ord"]) - 1
+        n2k[i] = min(int(row["n2k_10km"]), 255)
+        in_zone[i] = 1 if row["in_zone"] else 0
+    grids["n2k_10km"][sl] = n2k.reshape(TILE_SIZE, TILE_SIZE)
+    grids["in_zone"][sl] = in_zone.reshape(TILE_SIZE, TILE_SIZE)
+
+
+def _fill_irradiation(grids, resolution_m: float) -> None:
+    """Solar irradiation score from cell-centre latitude (same proxy as the scoring engine)."""
+    from app.services.scoring import FILIERE_CODES, _score_irradiation_vec
+
+    rows, cols = grids["irradiation"].shape
+    for ty in range(rows // TILE_SIZE):
+        for tx in range(cols // TILE_SIZE):
+            xs, ys = tile_cell_centers(resolution_m, ty, tx)
+            _, lat = from_lambert93(xs, ys)
+            score = _score_irradiation_vec(
+                lat, np.full(lat.shape, FILIERE_CODES["solaire_sol"]), np.full(lat.shape, np.nan),
+            )
+            grids["irradiation"][
+                ty * TILE_SIZE:(ty + 1) * TILE_SIZE, tx * TILE_SIZE:(tx + 1) * TILE_SIZE
+            ] = score
+
+
+async def build_raster(
+    db: AsyncSession,
+    resolution_m: Optional[float] = None,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """Build or incrementally refresh the raster in raster_dir().
+
+    Returns stats: mode (full/incremental), tiles rebuilt per layer group.
+    """
+    from scipy.spatial import cKDTree
+
+    resolution_m = float(resolution_m or settings.suitability_raster_resolution_m)
+    out = raster_dir()
+    out.mkdir(parents=True, exist_ok=True)
+    manifest_path = out / MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else None
+    if manifest and float(manifest["resolution_m"]) != resolution_m:
+        full = True
+    full = full or manifest is None
+
+    shape = grid_shape(resolution_m)
+    ty_n, tx_n = shape[0] // TILE_SIZE, shape[1] // TILE_SIZE
+
+    # Build in a staging directory and swap files in: readers keep their
+    # mapping of the previous files and never see a truncated grid.
+    staging = Path(tempfile.mkdtemp(prefix=".build-", dir=out))
+    try:
+        if not full:
+            for name in LAYERS:
+                shutil.copyfile(out / f"{name}.npy", staging / f"{name}.npy")
+        mode = "w+" if full else "r+"
+        grids = {
+            name: np.lib.format.open_memmap(
+                staging / f"{name}.npy", mode=mode, dtype=dtype, shape=shape if full else None
+            )
+            for name, dtype in LAYERS.items()
+        }
+
+        postes = await _load_postes(db)
+        tree = cKDTree(np.column_stack([postes["x"], postes["y"]])) if postes["ids"].size else None
+        all_tiles = [(ty, tx) for ty in range(ty_n) for tx in range(tx_n)]
+
+        if full:
+            poste_tiles = all_tiles
+        else:
+            with np.load(out / POSTES_SNAPSHOT) as snap:
+                old = {k: snap[k] for k in ("ids", "x", "y", "names")}
+            poste_tiles = _affected_tiles(grids, resolution_m, _changed_postes(old, postes))
+            _remap_poste_ids(grids["poste_id"], old, postes)
+        for ty, tx in poste_tiles:
+            _fill_poste_tile(grids, resolution_m, ty, tx, tree, postes["ids"])
+
+        zones_version = await _zones_version(db)
+        zone_tiles: List[Tuple[int, int]] = []
+        if full or zones_version != manifest.get("zones_version"):
+            zone_tiles = all_tiles
+            tables = await _existing_zone_tables(db)
+            for ty, tx in zone_tiles:
+                await _fill_zone_tile(db, grids, resolution_m, ty, tx, tables)
+
+        if full:
+            _fill_irradiation(grids, resolution_m)
+
+        for grid in grids.values():
+            grid.flush()
+        del grids
+        np.savez(staging / POSTES_SNAPSHOT, **postes)
+        for name in [f"{layer}.npy" for layer in LAYERS] + [POSTES_SNAPSHOT]:
+            os.replace(staging / name, out / name)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    # Manifest last: get_raster() reloads when it changes
+    new_manifest = {
+        "resolution_m": resolution_m,
+        "extent_l93": list(EXTENT_L93),
+        "shape": list(shape),
+        "tile_size": TILE_SIZE,
+        "crs": "EPSG:2154",
+        "postes_count": int(postes["ids"].size),
+        "zones_version": zones_version,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+    tmp = manifest_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(new_manifest, indent=2))
+    os.replace(tmp, manifest_path)
+
+    stats = {
+        "mode": "full" if full else "incremental",
+        "resolution_m": resolution_m,
+        "tiles_total": len(all_tiles),
+        "poste_tiles_rebuilt": len(poste_tiles),
+        "zone_tiles_rebuilt": len(zone_tiles),
+    }
+    logger.info("Suitability raster built: %s", stats)
+    return stats
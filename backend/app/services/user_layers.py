@@ -0,0 +1,208 @@
+"""Uploaded GeoJSON layers stored as PostGIS features.
+
+Uploads are stream-parsed with ijson: features are decoded one at a time
+from the (disk-spooled) upload and inserted in batches into
+geo_layer_features, so memory use does not grow with the file size.
+Stored layers can then be read by bbox, rendered as vector tiles and
+evaluated as constraint layers next to Natura 2000 / ZNIEFF.
+"""
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+from uuid import UUID
+
+import ijson
+from ijson.common import ObjectBuilder
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.geo_layer import GeoLayer
+from app.services.constraints import ConstraintLayer
+from app.services.vector_tiles import TileLayer
+
+MAX_UPLOAD_BYTES = 500_000_000
+MAX_FEATURES = 2_000_000
+INSERT_BATCH = 2000
+
+_INSERT_FEATURES = text("""
+    INSERT INTO geo_layer_features (layer_id, geom, properties)
+    SELECT CAST(:layer_id AS uuid),
+           ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(v.geometry), 4326)),
+           CAST(v.properties AS jsonb)
+    FROM unnest(CAST(:geometries AS text[]), CAST(:properties AS text[])) AS v(geometry, properties)
+""")
+
+
+_CHECK_GEOMETRY = text("SELECT ST_MakeValid(ST_GeomFromGeoJSON(:geometry))")
+
+
+class UploadError(ValueError):
+    """The uploaded file is not an acceptable GeoJSON FeatureCollection."""
+
+
+class _LimitedReader:
+    """Async reader over an upload that fails past max_bytes."""
+
+    def __init__(self, upload, max_bytes: int):
+        self._upload = upload
+        self._max_bytes = max_bytes
+        self.bytes_read = 0
+
+    async def read(self, size: int = 65536) -> bytes:
+        chunk = await self._upload.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self._max_bytes:
+            raise UploadError(f"File too large (max {self._max_bytes // 1_000_000} MB)")
+        return chunk
+
+
+async def iter_features(reader) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the features of a GeoJSON FeatureCollection read from `reader`.
+
+    Raises UploadError on invalid JSON or when the document is not a
+    FeatureCollection (checked once the top-level "type" has been seen).
+    """
+    builder: Optional[ObjectBuilder] = None
+    doc_type = None
+    try:
+        async for prefix, event, value in ijson.parse_async(reader, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == "features.item" and event == "end_map":
+                    yield builder.value
+                    builder = None
+            elif prefix == "features.item" and event == "start_map":
+                builder = ObjectBuilder()
+                builder.event(event, value)
+            elif prefix == "type" and event == "string":
+                doc_type = value
+                if doc_type != "FeatureCollection":
+                    break
+    except ijson.JSONError:
+        raise UploadError("Invalid JSON")
+    if doc_type != "FeatureCollection":
+        raise UploadError("Must be a GeoJSON FeatureCollection")
+
+
+async def load_features(
+    db: AsyncSession,
+    layer_id: UUID,
+    upload,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    max_features: int = MAX_FEATURES,
+) -> int:
+    """Stream an upload into geo_layer_features; returns the feature count.
+
+    Features without geometry are skipped. A geometry PostGIS cannot read
+    rolls the session back and raises UploadError with its feature index.
+    The caller commits (or rolls back on UploadError).
+    """
+    count = 0
+    geometries: List[str] = []
+    properties: List[str] = []
+    indices: List[int] = []  # position of each buffered feature in the collection
+
+    async def flush():
+        if not geometries:
+            return
+        try:
+            await db.execute(_INSERT_FEATURES, {
+                "layer_id": str(layer_id),
+                "geometries": geometries,
+                "properties": properties,
+            })
+        except DBAPIError as exc:
+            await db.rollback()
+            bad = await _first_invalid_geometry(db, geometries)
+            await db.rollback()
+            where = f"feature {indices[bad]}" if bad is not None else f"features {indices[0]}-{indices[-1]}"
+            raise UploadError(f"Invalid geometry in {where}") from exc
+        geometries.clear()
+        properties.clear()
+        indices.clear()
+
+    index = -1
+    async for feature in iter_features(_LimitedReader(upload, max_bytes)):
+        index += 1
+        geometry = feature.get("geometry") if isinstance(feature, dict) else None
+        if not isinstance(geometry, dict) or "type" not in geometry:
+            continue
+        count += 1
+        if count > max_features:
+            raise UploadError(f"Too many features (max {max_features})")
+        geometries.append(json.dumps(geometry))
+        properties.append(json.dumps(feature.get("properties") or {}))
+        indices.append(index)
+        if len(geometries) >= INSERT_BATCH:
+            await flush()
+    await flush()
+    return count
+
+
+async def _first_invalid_geometry(db: AsyncSession, geometries: List[str]) -> Optional[int]:
+    """Position of the first geometry PostGIS rejects (one query each, error path only)."""
+    for i, geometry in enumerate(geometries):
+        try:
+            await db.execute(_CHECK_GEOMETRY, {"geometry": geometry})
+        except DBAPIError:
+            return i
+    return None
+
+
+def feature_filter(layer_id: UUID) -> str:
+    # layer_id is a parsed UUID, safe to inline
+    return f"layer_id = '{UUID(str(layer_id))}'"
+
+
+def constraint_layer(layer: GeoLayer) -> ConstraintLayer:
+    """An uploaded layer as a constraint layer, keyed "layer:<id>" in results."""
+    return ConstraintLayer(
+        name=f"layer:{layer.id}",
+        table="geo_layer_features",
+        code_col="id",
+        name_col="COALESCE(properties->>'nom', properties->>'name', properties->>'NOM', id::text)",
+        type_col=None,
+        surface_col=None,
+        filter_sql=feature_filter(layer.id),
+    )
+
+
+def tile_layer(layer: GeoLayer) -> TileLayer:
+    """An uploaded layer as a vector tile layer (properties expanded by ST_AsMVT)."""
+    return TileLayer(
+        name="layer",
+        table="geo_layer_features",
+        attributes={"id": "t.id"},
+        detail_zoom=0,
+        detail_attributes={"properties": "t.properties"},
+        cache_version=f"{layer.id}-{layer.feature_count}",
+        filter_sql=f"t.{feature_filter(layer.id)}",
+    )
+
+
+async def features_in_bbox(
+    db: AsyncSession, layer_id: UUID, west: float, south: float, east: float, north: float, limit: int
+) -> str:
+    """GeoJSON FeatureCollection (text, assembled in PostgreSQL) of a layer's features in a bbox."""
+    result = await db.execute(
+        text(f"""
+            SELECT json_build_object(
+                       'type', 'FeatureCollection',
+                       'features', COALESCE(json_agg(json_build_object(
+                           'type', 'Feature',
+                           'id', t.id,
+                           'geometry', ST_AsGeoJSON(t.geom, 6)::json,
+                           'properties', t.properties
+                       )), '[]'::json)
+                   )::text
+            FROM (
+                SELECT id, geom, properties FROM geo_layer_features
+                WHERE {feature_filter(layer_id)}
+                  AND geom && ST_MakeEnvelope(:west, :south, :east, :north, 4326)
+                ORDER BY id
+                LIMIT :limit
+            ) t
+        """),
+        {"west": west, "south": south, "east": east, "north": north, "limit": limit},
+    )
+    return result.scalar()
@@ -0,0 +1,202 @@
+"""Mapbox Vector Tiles for postes sources, protected zones and projects.
+
+Tiles are rendered by PostGIS (ST_AsMVTGeom + ST_AsMVT) in Web Mercator.
+Each layer declares what it needs per zoom level:
+
+  - min_zoom: below it the layer is not rendered (empty tile),
+  - attributes: always sent; detail_attributes only from detail_zoom on,
+  - polygon layers read the pre-simplified geom_display column and are
+    further simplified to about one screen pixel below detail_zoom.
+
+Reference layers are cached in Redis under their dataset version
+(services.dataset_versions), so a re-import naturally switches to fresh
+keys and stale tiles simply expire; uploaded layers are immutable and
+use a fixed version. Project tiles are per user and change constantly,
+they are rendered on every request.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.dataset_versions import dataset_version
+from app.services.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+MAX_ZOOM = 20
+EXTENT = 4096
+BUFFER = 64
+WEB_MERCATOR_WORLD_M = 40_075_016.685578488
+CACHE_TTL = 30 * 24 * 3600  # keys are versioned, TTL only reclaims space
+CACHE_PREFIX = "tiles:"
+MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+@dataclass(frozen=True)
+class TileLayer:
+    """A table exposed as a vector tile layer."""
+
+    name: str
+    table: str
+    polygons: bool = False
+    min_zoom: int = 0
+    detail_zoom: int = 10
+    attributes: Dict[str, str] = field(default_factory=dict)
+    detail_attributes: Dict[str, str] = field(default_factory=dict)
+    dataset: Optional[str] = None  # dataset_versions key
+    cache_version: Optional[str] = None  # fixed version for immutable layers
+    filter_sql: Optional[str] = None
+    per_user: bool = False
+
+
+TILE_LAYERS: Dict[str, TileLayer] = {
+    "postes": TileLayer(
+        name="postes",
+        table="postes_sources",
+        attributes={
+            "id": "t.id",
+            "tension_kv": "t.tension_kv::float8",
+            "capacite_disponible_mw": "t.capacite_disponible_mw::float8",
+        },
+        detail_zoom=8,
+        detail_attributes={
+            "nom": "t.nom",
+            "gestionnaire": "t.gestionnaire",
+            "puissance_mw": "t.puissance_mw::float8",
+        },
+        dataset="postes_sources",
+    ),
+    "natura2000": TileLayer(
+        name="natura2000",
+        table="natura2000",
+        polygons=True,
+        min_zoom=5,
+        attributes={"site_code": "t.site_code", "type_zone": "t.type_zone"},
+        detail_attributes={"nom": "t.nom", "surface_ha": "t.surface_ha::float8"},
+        dataset="natura2000",
+    ),
+    "znieff": TileLayer(
+        name="znieff",
+        table="znieff",
+        polygons=True,
+        min_zoom=5,
+        attributes={"code_mnhn": "t.code_mnhn", "type_zone": "t.type_zone"},
+        detail_attributes={"nom": "t.nom", "surface_ha": "t.surface_ha::float8"},
+        dataset="znieff",
+    ),
+    "projets": TileLayer(
+        name="projets",
+        table="projets",
+        attributes={
+            "id": "t.id::text",
+            "filiere": "t.filiere",
+            "statut": "t.statut",
+            "score_global": "t.score_global",
+        },
+        detail_zoom=9,
+        detail_attributes={"nom": "t.nom", "puissance_mwc": "t.puissance_mwc::float8"},
+        per_user=True,
+    ),
+}
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def tile_size_m(z: int) -> float:
+    """Width of a tile at zoom z in Web Mercator metres."""
+    return WEB_MERCATOR_WORLD_M / 2**z
+
+
+def simplify_tolerance_m(z: int) -> float:
+    """About one pixel of a 512 px rendered tile."""
+    return tile_size_m(z) / 512
+
+
+def tile_sql(layer: TileLayer, z: int, user_filter: bool = False) -> str:
+    """SELECT returning the encoded tile (bytea) for bound :z, :x, :y."""
+    attrs = dict(layer.attributes)
+    if z >= layer.detail_zoom:
+        attrs.update(layer.detail_attributes)
+    columns = ",\n               ".join(f"{expr} AS {alias}" for alias, expr in attrs.items())
+
+    if layer.polygons and z < layer.detail_zoom:
+        geom = (
+            "ST_SimplifyPreserveTopology(ST_Transform(COALESCE(t.geom_display, t.geom), 3857), "
+            "CAST(:tolerance AS float8))"
+        )
+    else:
+        geom = "ST_Transform(t.geom, 3857)"
+    where = "AND (t.user_id = :user_id OR t.user_id IS NULL)" if user_filter else ""
+    if layer.filter_sql:
+        where = f"{where} AND {layer.filter_sql}"
+
+    return f"""
+        WITH bounds AS (SELECT ST_TileEnvelope(:z, :x, :y) AS env),
+        features AS (
+            SELECT ST_AsMVTGeom({geom}, bounds.env, {EXTENT}, {BUFFER}, true) AS geom,
+               {columns}
+            FROM {layer.table} t, bounds
+            WHERE t.geom && ST_Transform(ST_Expand(bounds.env, CAST(:margin AS float8)), 4326)
+              {where}
+        )
+        SELECT ST_AsMVT(features.*, '{layer.name}', {EXTENT}, 'geom')
+        FROM features
+        WHERE geom IS NOT NULL
+    """
+
+
+def cache_key(layer: str, version: str, z: int, x: int, y: int) -> str:
+    return f"{CACHE_PREFIX}{layer}:{version}:{z}/{x}/{y}"
+
+
+async def _get_cached(key: str) -> Optional[bytes]:
+    try:
+        return await get_redis(decode_responses=False).get(key)
+    except Exception as exc:
+        logger.debug("Tile cache miss: %s", exc)
+    return None
+
+
+async def _set_cached(key: str, tile: bytes) -> None:
+    try:
+        await get_redis(decode_responses=False).setex(key, CACHE_TTL, tile)
+    except Exception as exc:
+        logger.debug("Tile cache write failed: %s", exc)
+
+
+async def render_tile(
+    db: AsyncSession, layer: TileLayer, z: int, x: int, y: int, user_id: Optional[str] = None
+) -> bytes:
+    """Encoded MVT for one tile (b"" when empty), served from cache when possible."""
+    if z < layer.min_zoom:
+        return b""
+
+    key = None
+    if layer.cache_version or layer.dataset:
+        version = layer.cache_version or await dataset_version(db, layer.dataset)
+        key = cache_key(layer.name, version, z, x, y)
+        cached = await _get_cached(key)
+        if cached is not None:
+            return cached
+
+    user_filter = layer.per_user and user_id is not None
+    params = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "margin": tile_size_m(z) * BUFFER / EXTENT,
+        "tolerance": simplify_tolerance_m(z),
+    }
+    if user_filter:
+        params["user_id"] = user_id
+    result = await db.execute(text(tile_sql(layer, z, user_filter)), params)
+    tile = bytes(result.scalar() or b"")
+
+    if key:
+        await _set_cached(key, tile)
+    return tile
@@ -0,0 +1,83 @@
+"""Subdivided and simplified protected-zone geometries.
+
+Natura 2000 / ZNIEFF polygons can carry hundreds of thousands of
+vertices, so ST_Intersects / ST_DWithin against them is dominated by
+vertex count. After each import this module rebuilds, for the changed
+zones only:
+
+  - <table>_subdivided: ST_MakeValid-repaired, ST_Subdivide'd pieces
+    (≤ MAX_VERTICES each) in Lambert-93 with their own GiST index;
+    tests run against pieces and are aggregated back to the parent code.
+  - <table>.geom_display: ST_SimplifyPreserveTopology copy for maps.
+"""
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# dataset → (subdivided table, key column)
+SUBDIVIDED_TABLES: Dict[str, Tuple[str, str]] = {
+    "natura2000": ("natura2000_subdivided", "site_code"),
+    "znieff": ("znieff_subdivided", "code_mnhn"),
+}
+
+MAX_VERTICES = 256
+DISPLAY_TOLERANCE_DEG = 0.0005  # ≈ 50 m
+
+
+def _key_filter(column: str, keys: Optional[Sequence[str]]) -> str:
+    return f"WHERE {column} = ANY(CAST(:keys AS text[]))" if keys is not None else ""
+
+
+async def rebuild_zone_geometries(
+    db: AsyncSession,
+    dataset: str,
+    keys: Optional[Sequence[str]] = None,
+) -> Dict[str, int]:
+    """Rebuild subdivided pieces and display geometry of a zone dataset.
+
+    Args:
+        dataset: "natura2000" or "znieff".
+        keys: Zone codes to rebuild (added, updated or removed ones);
+            None rebuilds the whole dataset.
+
+    The caller commits. Returns {"zones": n, "pieces": m}.
+    """
+    sub_table, key_col = SUBDIVIDED_TABLES[dataset]
+    params = {"keys": list(keys)} if keys is not None else {}
+    if keys is not None and not keys:
+        return {"zones": 0, "pieces": 0}
+
+    await db.execute(text(f"DELETE FROM {sub_table} {_key_filter(key_col, keys)}"), params)
+    inserted = await db.execute(
+        text(f"""
+            INSERT INTO {sub_table} ({key_col}, geom_l93)
+            SELECT key, (ST_Dump(piece)).geom
+            FROM (
+                SELECT {key_col} AS key,
+                       ST_Subdivide(
+                           ST_CollectionExtract(ST_MakeValid(geom_l93), 3), :max_vertices
+                       ) AS piece
+                FROM {dataset}
+                {_key_filter(key_col, keys)}
+                {"AND" if keys is not None else "WHERE"} geom_l93 IS NOT NULL
+            ) s
+        """),
+        {**params, "max_vertices": MAX_VERTICES},
+    )
+    updated = await db.execute(
+        text(f"""
+            UPDATE {dataset}
+            SET geom_display = ST_Multi(ST_CollectionExtract(
+                ST_MakeValid(ST_SimplifyPreserveTopology(geom, :tolerance)), 3
+            ))
+            {_key_filter(key_col, keys)}
+        """),
+        {**params, "tolerance": DISPLAY_TOLERANCE_DEG},
+    )
+    stats = {"zones": updated.rowcount, "pieces": inserted.rowcount}
+    logger.info("%s subdivided geometries rebuilt: %s", dataset, stats)
+    return stats
@@ -0,0 +1,203 @@
+"""Tests for the two-tier (in-process LRU + Redis) cache."""
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.cache import TieredCache, cache_stats
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def redis():
+    fake = FakeRedis()
+    with patch("app.services.cache.get_redis", return_value=fake):
+        yield fake
+
+
+def counting_loader(value="v"):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return value
+
+    return load, calls
+
+
+class TestTiers:
+    async def test_local_hit_skips_redis(self, redis):
+        cache = TieredCache("t-local", 60)
+        load, calls = counting_loader()
+        assert await cache.get_or_load("k", load) == "v"
+        gets = redis.gets
+        assert await cache.get_or_load("k", load) == "v"
+        assert redis.gets == gets
+        assert len(calls) == 1
+        assert cache.stats()["local_hits"] == 1
+
+    async def test_redis_hit_fills_local(self, redis):
+        writer = TieredCache("t-shared", 60)
+        await writer.get_or_load("k", counting_loader({"a": 1})[0])
+
+        reader = TieredCache("t-shared", 60)  # another worker
+        load, calls = counting_loader()
+        assert await reader.get_or_load("k", load) == {"a": 1}
+        assert await reader.get_or_load("k", load) == {"a": 1}
+        assert calls == []
+        assert reader.stats()["redis_hits"] == 1
+        assert reader.stats()["local_hits"] == 1
+
+    async def test_expired_redis_entry_is_ignored(self, redis):
+        cache = TieredCache("t-old", 60)
+        redis.data["t-old:k"] = json.dumps({"t": time.time() - 120, "v": "old"})
+        assert await cache.get_or_load("k", counting_loader("new")[0]) == "new"
+
+    async def test_works_without_redis(self):
+        cache = TieredCache("t-down", 60)
+        with patch("app.services.cache.get_redis", side_effect=ConnectionError("down")):
+            assert await cache.get_or_load("k", counting_loader()[0]) == "v"
+            assert await cache.get_or_load("k", counting_loader()[0]) == "v"
+        assert cache.stats()["redis_errors"] >= 1
+        assert cache.stats()["local_hits"] == 1
+
+    async def test_local_ttl_does_not_reload_before_ttl(self):
+        cache = TieredCache("t-local-ttl", 3600, local_ttl=0.01, use_redis=False)
+        load, calls = counting_loader()
+        await cache.get_or_load("k", load)
+        await asyncio.sleep(0.02)
+        assert await cache.get_or_load("k", load) == "v"
+        await asyncio.sleep(0.02)
+        assert len(calls) == 1
+        assert cache.stats()["local_hits"] == 1
+        assert cache.stats()["stale_hits"] == 0
+
+    async def test_local_ttl_rereads_redis(self, redis):
+        cache = TieredCache("t-reread", 3600, local_ttl=0.01)
+        load, calls = counting_loader("v1")
+        await cache.get_or_load("k", load)
+        gets = redis.gets
+        assert await cache.get_or_load("k", load) == "v1"
+        assert redis.gets == gets
+        await asyncio.sleep(0.02)
+        redis.data["t-reread:k"] = json.dumps({"t": time.time(), "v": "v2"})  # reloaded by another worker
+        assert await cache.get_or_load("k", load) == "v2"
+        assert len(calls) == 1
+
+    async def test_lru_eviction(self):
+        cache = TieredCache("t-lru", 60, max_entries=2, use_redis=False)
+        for key in ("a", "b"):
+            await cache.get_or_load(key, counting_loader(key)[0])
+        await cache.get_or_load("a", counting_loader()[0])  # a becomes most recent
+        await cache.get_or_load("c", counting_loader("c")[0])
+
+        load, calls = counting_loader("b2")
+        assert await cache.get_or_load("a", load) == "a"
+        assert await cache.get_or_load("b", load) == "b2"
+        assert cache.stats()["evictions"] >= 1
+
+
+class TestLoading:
+    async def test_concurrent_misses_share_one_load(self):
+        cache = TieredCache("t-flight", 60, use_redis=False)
+        load, calls = counting_loader()
+        assert await asyncio.gather(*(cache.get_or_load("k", load) for _ in range(5))) == ["v"] * 5
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert stats["coalesced"] == 4
+        assert stats["hit_rate"] == pytest.approx(0.8)
+
+    async def test_stale_while_revalidate(self):
+        cache = TieredCache("t-swr", 0.05, stale_ttl=60, use_redis=False)
+        await cache.get_or_load("k", counting_loader("v1")[0])
+        await asyncio.sleep(0.06)
+
+        load, calls = counting_loader("v2")
+        assert await cache.get_or_load("k", load) == "v1"  # served stale at once
+        await asyncio.sleep(0.03)
+        assert len(calls) == 1
+        assert await cache.get_or_load("k", load) == "v2"
+        assert cache.stats()["stale_hits"] == 1
+
+    async def test_negative_caching(self):
+        cache = TieredCache("t-neg", 60, negative_ttl=60, use_redis=False)
+        load, calls = counting_loader(None)
+        assert await cache.get_or_load("k", load) is None
+        assert await cache.get_or_load("k", load) is None
+        assert len(calls) == 1
+        assert cache.stats()["negative_hits"] == 1
+
+    async def test_none_is_not_cached_without_negative_ttl(self):
+        cache = TieredCache("t-none", 60, use_redis=False)
+        load, calls = counting_loader(None)
+        await cache.get_or_load("k", load)
+        await cache.get_or_load("k", load)
+        assert len(calls) == 2
+
+    async def test_failed_reload_serves_last_value(self):
+        cache = TieredCache("t-err", 0.01, use_redis=False)
+        await cache.get_or_load("k", counting_loader("v1")[0])
+        await asyncio.sleep(0.02)
+
+        async def failing():
+            raise RuntimeError("upstream down")
+
+        assert await cache.get_or_load("k", failing) == "v1"
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("other", failing)
+        assert cache.stats()["load_errors"] == 2
+
+    async def test_invalidate(self, redis):
+        cache = TieredCache("t-inv", 60)
+        await cache.get_or_load("k", counting_loader("v1")[0])
+        await cache.invalidate("k")
+        assert "t-inv:k" not in redis.data
+        assert await cache.get_or_load("k", counting_loader("v2")[0]) == "v2"
+
+
+class TestRegistry:
+    def test_stats_by_namespace(self):
+        TieredCache("t-registry", 60, use_redis=False)
+        stats = cache_stats()
+        assert stats["t-registry"]["hit_rate"] is None
+        assert stats["t-registry"]["entries"] == 0
+
+
+class TestJwks:
+    async def test_jwks_cached_and_kept_when_clerk_fails(self):
+        from app import auth
+
+        auth._jwks_cache.clear_local()
+        fetch = patch("app.auth._fetch_jwks", side_effect=[[{"kid": "k1"}], RuntimeError("down")])
+        with (
+            patch.object(auth.settings, "clerk_domain", "clerk.example"),
+            patch.object(auth._jwks_cache, "use_redis", False),
+            fetch as fetch_jwks,
+        ):
+            assert await auth._get_jwks() == [{"kid": "k1"}]
+            assert await auth._get_jwks() == [{"kid": "k1"}]
+            assert fetch_jwks.call_count == 1
+
+            auth._jwks_cache._entries["clerk.example"].fresh_until = 0
+            auth._jwks_cache._entries["clerk.example"].stale_until = 0
+            assert await auth._get_jwks() == [{"kid": "k1"}]
+            assert fetch_jwks.call_count == 2
+        auth._jwks_cache.clear_local()
@@ -0,0 +1,85 @@
+"""Tests for the constraint layer registry (no DB)."""
+import pytest
+
+from app.services import constraints
+from app.services.constraints import (
+    CONSTRAINT_LAYERS,
+    ConstraintLayer,
+    _layer_sql,
+    _summarize,
+    register_layer,
+)
+
+
+class TestRegistry:
+    def test_default_layers(self):
+        assert CONSTRAINT_LAYERS["natura2000"].code_col == "site_code"
+        assert CONSTRAINT_LAYERS["znieff"].code_col == "code_mnhn"
+
+    def test_register_resets_availability(self, monkeypatch):
+        monkeypatch.setattr(constraints, "CONSTRAINT_LAYERS", dict(CONSTRAINT_LAYERS))
+        monkeypatch.setattr(constraints, "_available_layers", [])
+        register_layer(ConstraintLayer("monuments", "monuments_historiques", code_col="ref"))
+        assert "monuments" in constraints.CONSTRAINT_LAYERS
+        assert constraints._available_layers is None
+
+
+class TestLayerSql:
+    def test_columns_are_normalized(self):
+        sql = _layer_sql(ConstraintLayer("plu", "plu_zones", code_col="id", type_col=None, surface_col=None))
+        assert "'plu' AS layer" in sql
+        assert "NULL::text AS type_zone" in sql
+        assert "NULL::float8 AS surface_ha" in sql
+        assert "FROM plu_zones" in sql
+        assert "LIMIT 10" in sql
+
+
+class TestSummary:
+    def test_summary_counts_all_layers(self):
+        zones = {
+            "natura2000": [{"intersects": True}, {"intersects": False}],
+            "znieff": [{"intersects": False}],
+        }
+        result = _summarize(zones)
+        assert result["summary"] == {"total_constraints": 3, "in_zone": 1, "nearby": 2}
+        assert result["natura2000"] is zones["natura2000"]
+
+    @pytest.mark.asyncio
+    async def test_batch_without_layers_keeps_structure(self, monkeypatch):
+        monkeypatch.setattr(constraints, "_available_layers", [])
+        results = await constraints.get_constraints_batch(None, [(2.35, 48.85), (5.0, 45.0)])
+        assert len(results) == 2
+        for r in results:
+            assert r["natura2000"] == [] and r["znieff"] == []
+            assert r["summary"]["total_constraints"] == 0
+
+
+class TestMetricPredicates:
+    def test_default_layers_use_l93_column(self):
+        sql = _layer_sql(CONSTRAINT_LAYERS["natura2000"])
+        assert "ST_DWithin(geom_l93, pt.geom_l93, :radius)" in sql
+        assert "::geography" not in sql
+
+    def test_layer_without_metric_column_falls_back_to_geography(self):
+        sql = _layer_sql(ConstraintLayer("flood", "zones_inondables", code_col="id", metric_geom_col=None))
+        assert "geom::geography" in sql
+
+
+class TestSubdividedLayers:
+    def test_default_layers_declare_subdivided_tables(self):
+        assert CONSTRAINT_LAYERS["natura2000"].subdivided_table == "natura2000_subdivided"
+        assert CONSTRAINT_LAYERS["znieff"].subdivided_table == "znieff_subdivided"
+
+    def test_pieces_are_aggregated_to_parent(self):
+        sql = _layer_sql(CONSTRAINT_LAYERS["znieff"])
+        assert "FROM znieff_subdivided" in sql
+        assert "GROUP BY code_mnhn" in sql
+        assert "BOOL_OR(ST_Intersects(geom_l93, pt.geom_l93))" in sql
+        assert "MIN(ST_Distance(geom_l93, pt.geom_l93))" in sql
+        assert "JOIN znieff z ON z.code_mnhn::text = s.key" in sql
+
+    def test_unbuilt_subdivision_uses_parent_table(self):
+        from dataclasses import replace
+        sql = _layer_sql(replace(CONSTRAINT_LAYERS["natura2000"], subdivided_table=None))
+        assert "_subdivided" not in sql
+        assert "FROM natura2000" in sql
@@ -7,6 +7,7 @@ import json
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from app.services import pvgis
 from app.services.pvgis import get_pvgis_data, _fallback_by_latitude
 from app.services.scoring import (
     _score_irradiation,
@@ -55,6 +56,16 @@ class TestPvgisFallback:
 # ─── PVGIS API mock tests ────────────────────────────────────
 
 
+@pytest.fixture
+def local_pvgis_cache():
+    """PVGIS cache without Redis, emptied around the test."""
+    pvgis._cache.clear_local()
+    with patch.object(pvgis._cache, "use_redis", False):
+        yield pvgis._cache
+    pvgis._cache.clear_local()
+
+
+@pytest.mark.usefixtures("local_pvgis_cache")
 class TestPvgisService:
     """Test PVGIS API integration with mocked HTTP and Redis."""
 
@@ -78,20 +89,14 @@ class TestPvgisService:
             }
         }
 
-        with (
-            patch("app.services.pvgis._get_cached", new_callable=AsyncMock, return_value=None),
-            patch("app.services.pvgis._set_cached", new_callable=AsyncMock),
-            patch("app.services.pvgis.httpx.AsyncClient") as mock_client_cls,
-        ):
+        with patch("app.services.pvgis._get_http") as mock_get_http:
             mock_client = AsyncMock()
             mock_resp = MagicMock()
             mock_resp.status_code = 200
             mock_resp.json.return_value = mock_response
             mock_resp.raise_for_status = MagicMock()
             mock_client.get = AsyncMock(return_value=mock_resp)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_client_cls.return_value = mock_client
+            mock_get_http.return_value = mock_client
 
             result = await get_pvgis_data(43.6, 3.87)
 
@@ -110,7 +115,7 @@ class TestPvgisService:
             "source": "pvgis_api",
         }
 
-        with patch("app.services.pvgis._get_cached", new_callable=AsyncMock, return_value=cached):
+        with patch.object(pvgis._cache, "get_or_load", new_callable=AsyncMock, return_value=cached):
             result = await get_pvgis_data(43.6, 3.87)
 
         assert result == cached
@@ -118,15 +123,10 @@ class TestPvgisService:
     @pytest.mark.anyio
     async def test_pvgis_api_failure_uses_fallback(self):
         """When PVGIS API fails, should use latitude fallback."""
-        with (
-            patch("app.services.pvgis._get_cached", new_callable=AsyncMock, return_value=None),
-            patch("app.services.pvgis.httpx.AsyncClient") as mock_client_cls,
-        ):
+        with patch("app.services.pvgis._get_http") as mock_get_http:
             mock_client = AsyncMock()
             mock_client.get = AsyncMock(side_effect=Exception("API timeout"))
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=False)
-            mock_client_cls.return_value = mock_client
+            mock_get_http.return_value = mock_client
 
             result = await get_pvgis_data(43.6, 3.87)
 
@@ -244,3 +244,283 @@ class TestScoringPreservation:
     def test_irradiation_none_lat(self):
         score = _score_irradiation(None, "solaire_sol")
         assert score == 50
+
+
+# ─── Batch enrichment pipeline ────────────────────────────────
+
+
+class _PipelineDb:
+    """Fake session: serves projects with their stored enrichment and records the upsert."""
+
+    def __init__(self, projets):
+        self.projets = projets
+        self.updates = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        result = MagicMock()
+        if sql.lstrip().startswith("SELECT p.id, p.nom"):
+            stored = dict.fromkeys(("pvgis", "constraints", "nearest_postes", "versions", "enriched_at"))
+            rows = [{**stored, **p} for p in self.projets if str(p["id"]) in params["ids"]]
+            result.mappings.return_value.all.return_value = rows
+        else:
+            self.updates.append(params)
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+
+VERSIONS = {
+    "pvgis": "pvgis:v5_2:0.05:1",
+    "irradiation_grid": "grid:2026-01-01T00:00:00+00:00",
+    "constraints": "c1",
+    "nearest_postes": "p1",
+}
+
+
+@pytest.fixture
+def versions():
+    from app.services import enrichment
+
+    current = dict(VERSIONS)
+    with patch.object(enrichment, "current_versions", AsyncMock(return_value=current)):
+        yield current
+
+
+@pytest.mark.usefixtures("versions")
+class TestEnrichmentPipeline:
+    """Set-based, chunked enrichment with concurrent PVGIS calls."""
+
+    IDS = [
+        "00000000-0000-0000-0000-00000000000%d" % i for i in range(1, 6)
+    ]
+
+    def _db(self):
+        projets = [
+            {"id": pid, "nom": f"P{i}", "lon": 2.0 + i, "lat": 45.0}
+            for i, pid in enumerate(self.IDS[:4])
+        ]
+        projets[3]["lon"] = projets[3]["lat"] = None
+        return _PipelineDb(projets)
+
+    @pytest.mark.asyncio
+    async def test_chunks_and_single_update_per_chunk(self):
+        from app.services import enrichment
+
+        constraints_calls = []
+
+        async def constraints_batch(db, points):
+            constraints_calls.append(len(points))
+            return [{"summary": {"total_constraints": 0}} for _ in points]
+
+        async def nearest_batch(db, points, limit=3):
+            return [[{"distance_km": 1.0}] for _ in points]
+
+        async def pvgis(lat, lon):
+            return {"ghi_kwh_m2_an": 1300, "lon": lon}
+
+        db = self._db()
+        with patch.object(enrichment, "get_constraints_batch", constraints_batch), \
+             patch.object(enrichment, "get_nearest_postes_batch", nearest_batch), \
+             patch.object(enrichment, "get_pvgis_data", pvgis):
+            outcomes = await enrichment.enrich_projects(db, self.IDS, chunk_size=2)
+
+        assert list(outcomes) == self.IDS
+        assert [o["status"] for o in outcomes.values()] == ["enriched"] * 3 + ["error"] * 2
+        assert outcomes[self.IDS[3]]["error"] == "no coordinates"
+        assert outcomes[self.IDS[4]]["error"] == "not found"
+        assert constraints_calls == [2, 1]
+        assert [len(u["ids"]) for u in db.updates] == [2, 1]
+        assert db.commits == 3
+        stored = json.loads(db.updates[0]["payloads"][1])
+        assert stored["pvgis"]["lon"] == 3.0
+
+    @pytest.mark.asyncio
+    async def test_uppercase_ids_keep_the_caller_spelling(self):
+        from app.services import enrichment
+
+        async def constraints_batch(db, points):
+            return [{"summary": {"total_constraints": 0}} for _ in points]
+
+        async def nearest_batch(db, points, limit=3):
+            return [[{"distance_km": 1.0}] for _ in points]
+
+        async def pvgis(lat, lon):
+            return {"ghi_kwh_m2_an": 1300}
+
+        upper = "9818D1C0-0000-4000-8000-00000000000A"
+        db = _PipelineDb([{"id": upper.lower(), "nom": "P", "lon": 2.0, "lat": 45.0}])
+        ids = [upper, upper.lower(), "not-a-uuid"]
+        with patch.object(enrichment, "get_constraints_batch", constraints_batch), \
+             patch.object(enrichment, "get_nearest_postes_batch", nearest_batch), \
+             patch.object(enrichment, "get_pvgis_data", pvgis):
+            outcomes = await enrichment.enrich_projects(db, ids)
+
+        assert list(outcomes) == ids
+        assert outcomes[upper]["status"] == outcomes[upper.lower()]["status"] == "enriched"
+        assert outcomes["not-a-uuid"]["error"] == "not found"
+        assert db.updates[0]["ids"] == [upper.lower()]  # written once
+
+    @pytest.mark.asyncio
+    async def test_pvgis_concurrency_is_bounded(self):
+        import asyncio
+
+        from app.services import enrichment
+
+        in_flight = peak = 0
+
+        async def pvgis(lat, lon):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {}
+
+        with patch.object(enrichment, "get_pvgis_data", pvgis):
+            results = await enrichment._pvgis_many([(2.0, 45.0)] * 20, concurrency=3)
+        assert len(results) == 20
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_invalid_ids_are_not_found(self):
+        from app.services import enrichment
+
+        outcomes = await enrichment.enrich_projects(self._db(), ["not-a-uuid"], commit=False)
+        assert outcomes["not-a-uuid"]["error"] == "not found"
+
+
+class TestStaleComponents:
+    """Which stored components a re-enrichment recomputes."""
+
+    def _stored(self, **stamps):
+        return {"versions": {**VERSIONS, **stamps}}
+
+    def test_nothing_stored_recomputes_all(self):
+        from app.services.enrichment import COMPONENTS, stale_components
+
+        assert stale_components(None, VERSIONS, True) == list(COMPONENTS)
+        assert stale_components({"pvgis": {}}, VERSIONS, True) == list(COMPONENTS)
+
+    def test_current_stamps(self):
+        from app.services.enrichment import stale_components
+
+        assert stale_components(self._stored(), VERSIONS, True) == []
+
+    def test_moved_dataset(self):
+        from app.services.enrichment import stale_components
+
+        assert stale_components(self._stored(), {**VERSIONS, "nearest_postes": "p2"}, True) == ["nearest_postes"]
+
+    def test_grid_value_is_stale_for_detailed_studies(self):
+        from app.services.enrichment import stale_components
+
+        stored = self._stored(pvgis=VERSIONS["irradiation_grid"])
+        assert stale_components(stored, VERSIONS, False) == []
+        assert stale_components(stored, VERSIONS, True) == ["pvgis"]
+
+    def test_latitude_fallback_is_always_stale(self):
+        from app.services.enrichment import stale_components
+
+        assert stale_components(self._stored(pvgis=None), VERSIONS, False) == ["pvgis"]
+
+
+class TestIncrementalEnrichment:
+    """Only components whose source data moved are recomputed and written."""
+
+    PID = "00000000-0000-0000-0000-000000000001"
+
+    def _db(self, enrichment=None):
+        return _PipelineDb([{"id": self.PID, "nom": "P1", "lon": 2.0, "lat": 45.0, **(enrichment or {})}])
+
+    def _sources(self, calls):
+        from app.services import enrichment
+
+        async def constraints_batch(db, points):
+            calls.append("constraints")
+            return [{"summary": {"total_constraints": 1}} for _ in points]
+
+        async def nearest_batch(db, points, limit=3):
+            calls.append("nearest_postes")
+            return [[{"distance_km": 2.5}] for _ in points]
+
+        async def pvgis(lat, lon):
+            calls.append("pvgis")
+            return {"ghi_kwh_m2_an": 1300, "source": "pvgis_api"}
+
+        return (
+            patch.object(enrichment, "get_constraints_batch", constraints_batch),
+            patch.object(enrichment, "get_nearest_postes_batch", nearest_batch),
+            patch.object(enrichment, "get_pvgis_data", pvgis),
+        )
+
+    def _stored(self):
+        return {
+            "pvgis": {"ghi_kwh_m2_an": 1200, "source": "pvgis_api"},
+            "constraints": {"summary": {"total_constraints": 0}},
+            "nearest_postes": [{"distance_km": 9.0}],
+            "versions": {"pvgis": VERSIONS["pvgis"], "constraints": "c1", "nearest_postes": "p0"},
+        }
+
+    async def _run(self, db, **kwargs):
+        from app.services import enrichment
+
+        calls = []
+        a, b, c = self._sources(calls)
+        with a, b, c:
+            outcome = (await enrichment.enrich_projects(db, [self.PID], commit=False, **kwargs))[self.PID]
+        return outcome, calls
+
+    async def test_first_enrichment_stamps_every_component(self, versions):
+        db = self._db()
+        outcome, calls = await self._run(db)
+
+        assert sorted(calls) == ["constraints", "nearest_postes", "pvgis"]
+        patch_ = json.loads(db.updates[0]["payloads"][0])
+        assert patch_["versions"] == {"pvgis": VERSIONS["pvgis"], "constraints": "c1", "nearest_postes": "p1"}
+
+    async def test_only_stale_component_is_recomputed(self, versions):
+        db = self._db(self._stored())
+        outcome, calls = await self._run(db)
+
+        assert calls == ["nearest_postes"]
+        assert outcome["status"] == "enriched"
+        assert outcome["refreshed"] == ["nearest_postes"]
+        assert outcome["enrichment"]["pvgis"]["ghi_kwh_m2_an"] == 1200  # kept
+        assert outcome["enrichment"]["versions"]["nearest_postes"] == "p1"
+        patch_ = json.loads(db.updates[0]["payloads"][0])
+        assert set(patch_) == {"nearest_postes", "versions", "enriched_at"}
+        assert patch_["versions"] == {"nearest_postes": "p1"}
+
+    async def test_current_enrichment_is_unchanged(self, versions):
+        versions["nearest_postes"] = "p0"
+        db = self._db({k: json.dumps(v) for k, v in self._stored().items()})  # asyncpg returns jsonb as text
+        outcome, calls = await self._run(db)
+
+        assert outcome["status"] == "unchanged"
+        assert outcome["enrichment"]["nearest_postes"] == [{"distance_km": 9.0}]
+        assert calls == [] and db.updates == []
+
+    async def test_force_recomputes_everything(self, versions):
+        versions["nearest_postes"] = "p0"
+        db = self._db(self._stored())
+        outcome, calls = await self._run(db, force=True)
+
+        assert sorted(outcome["refreshed"]) == ["constraints", "nearest_postes", "pvgis"]
+        assert len(db.updates) == 1
+
+    async def test_fallback_solar_data_is_not_stamped(self, versions):
+        from app.services import enrichment
+
+        db = self._db()
+        calls = []
+        a, b, _ = self._sources(calls)
+
+        async def fallback(lat, lon):
+            return {"ghi_kwh_m2_an": 1250, "source": "fallback_latitude"}
+
+        with a, b, patch.object(enrichment, "get_pvgis_data", fallback):
+            await enrichment.enrich_projects(db, [self.PID], commit=False)
+        assert json.loads(db.updates[0]["payloads"][0])["versions"]["pvgis"] is None
@@ -0,0 +1,85 @@
+"""Tests for the projet_enrichments store (no DB)."""
+import json
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from app.models import ProjetEnrichment
+from app.services.enrichment_store import (
+    enrichment_from_row,
+    filter_conditions,
+    load_enrichments,
+    save_enrichments,
+)
+
+
+class _Db:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        result = MagicMock()
+        result.mappings.return_value.all.return_value = self.rows
+        return result
+
+
+def _row(**values):
+    row = dict.fromkeys(("projet_id", "pvgis", "constraints", "nearest_postes", "versions", "enriched_at"))
+    row.update(values)
+    return row
+
+
+class TestDocument:
+    def test_row_to_enrichment(self):
+        at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        row = _row(pvgis=json.dumps({"ghi_kwh_m2_an": 1400}), versions={"pvgis": "v"}, enriched_at=at)
+        assert enrichment_from_row(row) == {
+            "pvgis": {"ghi_kwh_m2_an": 1400},
+            "versions": {"pvgis": "v"},
+            "enriched_at": at.isoformat(),
+        }
+
+    def test_missing_row(self):
+        assert enrichment_from_row(_row()) is None
+
+
+class TestLoad:
+    async def test_reads_only_requested_components(self):
+        db = _Db([_row(projet_id="p1", constraints={"summary": {"in_zone": 0}}, enriched_at="2026-03-01")])
+        loaded = await load_enrichments(db, ["p1", "p2"], ("constraints",))
+
+        sql, params = db.statements[0]
+        assert "constraints" in sql and "pvgis" not in sql and "nearest_postes" not in sql
+        assert params["ids"] == ["p1", "p2"]
+        assert loaded == {"p1": {"constraints": {"summary": {"in_zone": 0}}, "enriched_at": "2026-03-01"}}
+
+    async def test_no_ids_no_query(self):
+        db = _Db()
+        assert await load_enrichments(db, []) == {}
+        await save_enrichments(db, [], [])
+        assert db.statements == []
+
+    async def test_save_is_a_patch_upsert(self):
+        db = _Db()
+        await save_enrichments(db, ["p1"], [json.dumps({"nearest_postes": []})])
+        sql, params = db.statements[0]
+        assert "ON CONFLICT (projet_id)" in sql
+        assert "COALESCE(EXCLUDED.pvgis, e.pvgis)" in sql
+        assert params == {"ids": ["p1"], "payloads": ['{"nearest_postes": []}']}
+
+
+class TestFilters:
+    def test_conditions(self):
+        assert filter_conditions(ghi_min=1500, poste_max_km=None, hors_zone=True) == [
+            "e.ghi_kwh_m2_an >= :ghi_min",
+            "e.constraints_in_zone = 0",
+        ]
+        assert filter_conditions(hors_zone=False) == ["e.constraints_in_zone > 0"]
+        assert filter_conditions(ghi_min=None) == []
+
+    def test_metric_columns_are_generated(self):
+        columns = ProjetEnrichment.__table__.c
+        for name in ("ghi_kwh_m2_an", "productible_kwh_kwc_an", "nearest_poste_km", "constraints_in_zone"):
+            assert columns[name].computed is not None
+        assert columns["ghi_kwh_m2_an"].index
@@ -4,9 +4,13 @@ Tests the financial model that estimates CAPEX, OPEX, revenues,
 LCOE, and TRI for French ENR projects based on market benchmarks.
 Values updated for 2026-S1 financial constants (versioned JSON).
 """
+import math
+
+import numpy as np
 import pytest
 from app.services.financial import (
     estimate_financial,
+    estimate_financial_batch,
     _calc_capex,
     _calc_opex,
     _calc_revenus,
@@ -228,3 +232,70 @@ class TestEstimateFinancial:
         """Revenue should exceed OPEX for a viable project."""
         result = estimate_financial("solaire_sol", 10.0)
         assert result["revenus"]["annuel_eur"] > result["opex"]["annuel_eur"]
+
+
+# ─── Portfolio (vectorized) tests ─────────────────────────────
+
+
+class TestFinancialBatch:
+    """estimate_financial_batch must match estimate_financial exactly."""
+
+    def _scalar(self, filiere, puissance, productible, distance):
+        enrichment = {}
+        if productible is not None:
+            enrichment["pvgis"] = {"productible_kwh_kwc_an": productible}
+        if distance is not None:
+            enrichment["nearest_postes"] = [{"distance_km": distance}]
+        return estimate_financial(filiere, puissance, None, enrichment or None)
+
+    def test_matches_scalar_path(self):
+        rng = np.random.default_rng(42)
+        n = 1500
+        filieres = list(rng.choice(["solaire_sol", "eolien_onshore", "bess", "autre"], n))
+        puissances = np.round(rng.uniform(0.05, 300, n), 2)
+        productibles = [None if u < 0.3 else float(v) for u, v in zip(rng.random(n), rng.uniform(0, 1600, n))]
+        distances = [None if u < 0.3 else float(v) for u, v in zip(rng.random(n), rng.uniform(0, 60, n))]
+
+        batch = estimate_financial_batch(filieres, puissances, productibles, distances)
+        for i in range(n):
+            r = self._scalar(filieres[i], float(puissances[i]), productibles[i], distances[i])
+            payback = batch["payback_years"][i]
+            assert batch["capex_total_eur"][i] == r["capex"]["total_eur"]
+            assert batch["capex_eur_kwc"][i] == r["capex"]["eur_par_kwc"]
+            assert batch["raccordement_eur"][i] == r["capex"]["raccordement_eur"]
+            assert batch["opex_annuel_eur"][i] == r["opex"]["annuel_eur"]
+            assert batch["revenu_annuel_eur"][i] == r["revenus"]["annuel_eur"]
+            assert batch["lcoe_eur_mwh"][i] == r["lcoe_eur_mwh"]
+            assert batch["tri_pct"][i] == r["tri"]["tri_pct"]
+            assert (None if math.isnan(payback) else payback) == r["tri"]["payback_years"]
+            assert batch["rentable"][i] == r["tri"]["rentable"]
+            assert batch["lifetime_years"][i] == r["lifetime_years"]
+
+    def test_missing_inputs_use_benchmarks(self):
+        batch = estimate_financial_batch(["solaire_sol", "bess"], [10.0, 5.0])
+        r = estimate_financial("solaire_sol", 10.0)
+        assert batch["revenu_annuel_eur"][0] == r["revenus"]["annuel_eur"]
+        assert batch["production_mwh_an"][0] == r["revenus"]["production_mwh_an"]
+        assert math.isnan(batch["production_mwh_an"][1])
+        assert batch["lcoe_eur_mwh"][1] == 0.0
+
+    def test_empty(self):
+        batch = estimate_financial_batch([], [])
+        assert batch["tri_pct"].shape == (0,)
+
+
+class TestIrrSolver:
+    """Bracketed IRR shared by the scalar and batch paths."""
+
+    def test_known_irr(self):
+        # 1 000 000 now, 162 745.4 / year over 10 years → 10 %
+        result = _calc_tri(1_000_000, 162_745.4, 0, 10)
+        assert result["tri_pct"] == 10.0
+
+    def test_deeply_unprofitable_is_not_clamped(self):
+        # NPV root at about -12 %; a Newton overshoot used to report -50 %
+        result = _calc_tri(49_000, 1_100, 100, 15)
+        assert result["tri_pct"] == pytest.approx(-12.1, abs=0.05)
+
+    def test_bracket_bounds(self):
+        assert _calc_tri(1_000, 10_000, 0, 25)["tri_pct"] == 100.0
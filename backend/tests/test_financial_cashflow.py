@@ -0,0 +1,140 @@
+"""Tests for the year-by-year cash-flow model."""
+import numpy as np
+import pytest
+
+from app.services.financial import LIFETIME, estimate_financial
+from app.services.financial_cashflow import (
+    FLAT_ASSUMPTIONS,
+    YEAR_SERIES,
+    cashflow_columns,
+    evaluate_cashflows,
+    project_cashflows,
+)
+
+ENRICHED = {
+    "pvgis": {"productible_kwh_kwc_an": 1300},
+    "nearest_postes": [{"distance_km": 8.0}],
+}
+
+
+class TestFlatSpecialCase:
+    @pytest.mark.parametrize("filiere", ["solaire_sol", "eolien_onshore", "bess"])
+    def test_matches_estimate_financial(self, filiere):
+        expected = estimate_financial(filiere, 10.0, None, ENRICHED)
+        flat = project_cashflows(filiere, 10.0, ENRICHED, **FLAT_ASSUMPTIONS)
+        assert flat["tri_project_pct"] == expected["tri"]["tri_pct"]
+        assert flat["tri_equity_pct"] == flat["tri_project_pct"]
+        assert flat["capex_total_eur"] == expected["capex"]["total_eur"]
+        if filiere == "bess":
+            assert flat["lcoe_eur_mwh"] is None
+        else:
+            assert flat["lcoe_eur_mwh"] == expected["lcoe_eur_mwh"]
+        if expected["tri"]["payback_years"] <= expected["lifetime_years"]:
+            assert flat["payback_years"] == expected["tri"]["payback_years"]
+        assert flat["dscr_min"] is None
+        assert {y["cashflow_eur"] for y in flat["years"]} == {expected["tri"]["cashflow_annuel_eur"]}
+
+    def test_no_positive_cashflow_gives_zero_tri(self):
+        poor = {"pvgis": {"productible_kwh_kwc_an": 40}, "nearest_postes": [{"distance_km": 8.0}]}
+        expected = estimate_financial("solaire_sol", 10.0, None, poor)
+        flat = project_cashflows("solaire_sol", 10.0, poor, **FLAT_ASSUMPTIONS)
+        assert all(y["cashflow_eur"] < 0 for y in flat["years"])
+        assert flat["tri_project_pct"] == flat["tri_equity_pct"] == expected["tri"]["tri_pct"] == 0.0
+        assert flat["payback_years"] is None and not flat["rentable"]
+
+    def test_random_sweep_matches_estimate_financial(self):
+        rng = np.random.default_rng(0)
+        n = 3000
+        filieres = rng.choice(["solaire_sol", "eolien_onshore", "bess"], n).tolist()
+        puissances, productibles, distances = rng.uniform(0.5, 100, n), rng.uniform(20, 1800, n), rng.uniform(0, 60, n)
+        flat = evaluate_cashflows(cashflow_columns(filieres, puissances, productibles, distances, **FLAT_ASSUMPTIONS))
+        for i, filiere in enumerate(filieres):
+            enriched = {
+                "pvgis": {"productible_kwh_kwc_an": float(productibles[i])},
+                "nearest_postes": [{"distance_km": float(distances[i])}],
+            }
+            expected = estimate_financial(filiere, float(puissances[i]), None, enriched)
+            assert flat["tri_project_pct"][i] == expected["tri"]["tri_pct"], i
+            if filiere != "bess":
+                assert flat["lcoe_eur_mwh"][i] == expected["lcoe_eur_mwh"], i
+            cashflow = expected["tri"].get("cashflow_annuel_eur", 0.0)
+            # estimate_financial() does not cap the payback at the lifetime
+            if cashflow > 0 and expected["capex"]["total_eur"] / cashflow <= expected["lifetime_years"]:
+                assert flat["payback_years"][i] == expected["tri"]["payback_years"], i
+
+    @pytest.mark.parametrize("filiere, puissance", [("solaire_sol", 77.03), ("eolien_onshore", 29.26)])
+    def test_payback_at_end_of_life(self, filiere, puissance):
+        def enriched(productible):
+            return {"pvgis": {"productible_kwh_kwc_an": productible}, "nearest_postes": [{"distance_km": 37.5}]}
+
+        def ratio(productible):
+            result = estimate_financial(filiere, puissance, None, enriched(productible))
+            return result["capex"]["total_eur"] / result["tri"]["cashflow_annuel_eur"]
+
+        # Productible at which the CAPEX is paid back in exactly the lifetime
+        low, high = 300.0, 8000.0
+        for _ in range(100):
+            mid = (low + high) / 2
+            low, high = (mid, high) if ratio(mid) > LIFETIME[filiere] else (low, mid)
+        flat = project_cashflows(filiere, puissance, enriched(high), **FLAT_ASSUMPTIONS)
+        assert flat["payback_years"] == float(LIFETIME[filiere])
+
+
+class TestYearArrays:
+    def test_degradation_indexation_and_merchant_switch(self):
+        result = project_cashflows("solaire_sol", 10.0, ENRICHED, debt_share_pct=0, decommissioning_pct=0)
+        years = result["years"]
+        assert len(years) == LIFETIME["solaire_sol"]
+        assert years[1]["production_mwh"] < years[0]["production_mwh"]
+        assert years[1]["revenue_eur"] / years[0]["revenue_eur"] == pytest.approx(0.996 * 1.01, rel=1e-5)
+        assert years[20]["revenue_eur"] / years[19]["revenue_eur"] != pytest.approx(0.996 * 1.01, rel=1e-3)
+        assert years[1]["opex_eur"] / years[0]["opex_eur"] == pytest.approx(1.02, rel=1e-5)
+
+    def test_debt_service_and_dscr(self):
+        result = project_cashflows("solaire_sol", 10.0, ENRICHED, debt_share_pct=70, debt_tenor_years=18)
+        years = result["years"]
+        assert result["debt_eur"] == pytest.approx(0.7 * result["capex_total_eur"], abs=1)
+        serviced = [y["debt_service_eur"] for y in years]
+        assert len(set(serviced[:18])) == 1 and serviced[18:] == [0] * (len(years) - 18)
+        first = years[0]
+        assert result["dscr_min"] <= (first["revenue_eur"] - first["opex_eur"]) / first["debt_service_eur"] + 0.01
+        assert result["dscr_min"] <= result["dscr_avg"]
+        # Leverage below the project IRR raises the equity IRR
+        assert result["tri_equity_pct"] > result["tri_project_pct"]
+
+    def test_decommissioning_lowers_last_year(self):
+        kwargs = dict(debt_share_pct=0, degradation_pct=0, indexation_pct=0, opex_escalation_pct=0)
+        with_cost = project_cashflows("eolien_onshore", 10.0, **kwargs)
+        without = project_cashflows("eolien_onshore", 10.0, decommissioning_pct=0, **kwargs)
+        assert without["years"][-1]["cashflow_eur"] - with_cost["years"][-1]["cashflow_eur"] == pytest.approx(
+            0.05 * with_cost["capex_total_eur"], abs=2
+        )
+        assert with_cost["npv_eur"] < without["npv_eur"]
+
+    def test_unknown_assumption(self):
+        with pytest.raises(ValueError):
+            cashflow_columns(["solaire_sol"], [1.0], debt_ratio=0.5)
+
+
+class TestBatch:
+    def test_compact_float32_arrays(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        filieres = rng.choice(["solaire_sol", "eolien_onshore", "bess"], n).tolist()
+        columns = cashflow_columns(filieres, rng.uniform(1, 50, n), rng.uniform(1000, 1600, n))
+        result = evaluate_cashflows(columns, keep_years=True)
+        years = result["years"]
+        assert set(years) == set(YEAR_SERIES)
+        assert years["cashflow_eur"].dtype == np.float32
+        assert years["cashflow_eur"].shape == (n, max(LIFETIME.values()))
+        bess = np.array(filieres) == "bess"
+        assert not years["cashflow_eur"][bess, LIFETIME["bess"]:].any()
+
+    def test_batch_matches_single_project(self):
+        filieres = ["solaire_sol", "bess", "eolien_onshore"]
+        columns = cashflow_columns(filieres, [10.0, 5.0, 20.0], [1300, None, None], [8.0, None, 2.0])
+        batch = evaluate_cashflows(columns)
+        single = project_cashflows("solaire_sol", 10.0, ENRICHED)
+        assert batch["tri_project_pct"][0] == single["tri_project_pct"]
+        assert batch["npv_eur"][0] == pytest.approx(single["npv_eur"], rel=1e-5)
+        assert batch["dscr_min"][0] == single["dscr_min"]
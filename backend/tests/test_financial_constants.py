@@ -126,3 +126,12 @@ class TestValueRanges:
     def test_facteur_charge_range(self, constants):
         for filiere in FILIERES:
             assert 0.05 <= constants["facteur_charge"][filiere] <= 0.50
+
+    def test_cashflow_assumptions(self, constants):
+        cashflow = constants["cashflow"]
+        for filiere in FILIERES:
+            assert cashflow["contract_years"][filiere] <= constants["lifetime"][filiere]
+            assert constants["lifetime"][filiere] <= cashflow["max_years"]
+            assert 0 <= cashflow["decommissioning_pct_capex"][filiere] <= 20
+            assert 0 < cashflow["debt"]["tenor_years"][filiere] <= constants["lifetime"][filiere]
+        assert 0 <= cashflow["debt"]["share_pct"] <= 90
@@ -0,0 +1,84 @@
+"""Tests for the Monte Carlo financial simulation."""
+import copy
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.financial import DISCOUNT_RATE
+from app.services import financial_montecarlo
+from app.services.financial_montecarlo import montecarlo_config, simulate_financial
+
+ENRICHED = {
+    "pvgis": {"productible_kwh_kwc_an": 1350},
+    "nearest_postes": [{"distance_km": 3.0}],
+}
+
+
+class TestSimulation:
+    def test_reproducible_with_seed(self):
+        a = simulate_financial("solaire_sol", 10.0, ENRICHED, samples=2000, seed=7)
+        b = simulate_financial("solaire_sol", 10.0, ENRICHED, samples=2000, seed=7)
+        assert a["tri_pct"] == b["tri_pct"]
+        assert a["lcoe_eur_mwh"] == b["lcoe_eur_mwh"]
+
+    def test_percentiles_bracket_deterministic_case(self):
+        result = simulate_financial("solaire_sol", 10.0, ENRICHED, seed=1)
+        tri = result["tri_pct"]
+        assert tri["p10"] < tri["p50"] < tri["p90"]
+        assert tri["p10"] < result["deterministic"]["tri_pct"] < tri["p90"]
+        lcoe = result["lcoe_eur_mwh"]
+        assert lcoe["p10"] < result["deterministic"]["lcoe_eur_mwh"] < lcoe["p90"]
+
+    def test_histogram_and_probabilities(self):
+        result = simulate_financial("eolien_onshore", 20.0, samples=5000, seed=3)
+        hist = result["tri_pct"]["histogram"]
+        assert sum(hist["counts"]) == 5000
+        assert len(hist["edges"]) == montecarlo_config()["histogram_bins"] + 1
+        assert 0.0 <= result["prob_tri_above_discount_rate"] <= 1.0
+        assert result["samples"] == 5000
+
+    def test_pvgis_narrows_the_distribution(self):
+        measured = simulate_financial("solaire_sol", 10.0, {"pvgis": {"productible_kwh_kwc_an": 1226}}, seed=5)
+        benchmark = simulate_financial("solaire_sol", 10.0, None, seed=5)
+        assert measured["tri_pct"]["std"] < benchmark["tri_pct"]["std"]
+
+    def test_bess_has_no_lcoe(self):
+        result = simulate_financial("bess", 5.0, seed=2)
+        assert result["lcoe_eur_mwh"] is None
+        assert result["tri_pct"]["p50"] > DISCOUNT_RATE * 100
+
+    def test_sample_bounds(self):
+        with pytest.raises(ValueError):
+            simulate_financial("solaire_sol", 10.0, samples=montecarlo_config()["max_samples"] + 1)
+
+    def test_interactive_speed(self):
+        start = time.perf_counter()
+        simulate_financial("solaire_sol", 10.0, ENRICHED, samples=10_000)
+        assert time.perf_counter() - start < 0.5
+
+
+class TestConfig:
+    def test_price_mechanisms_exist(self):
+        cfg = montecarlo_config()
+        assert sum(cfg["prix_mecanisme"].values()) == pytest.approx(1.0)
+        assert set(cfg["prix_sigma_pct"]) == set(cfg["prix_mecanisme"])
+
+    def test_every_law_is_supported(self):
+        laws = {spec["dist"] for spec in montecarlo_config().values() if isinstance(spec, dict) and "dist" in spec}
+        assert laws <= {"triangular", "normal"}
+
+    def test_dist_is_honoured(self):
+        cfg = copy.deepcopy(montecarlo_config())
+        cfg["capex"] = cfg["raccordement"] = {"dist": "triangular", "low": "median", "mode": "median", "high": "median"}
+        cfg["opex_pct"] = {"dist": "normal", "sigma": 0.0}
+        with patch.object(financial_montecarlo, "montecarlo_config", return_value=cfg):
+            result = simulate_financial("bess", 5.0, samples=500, seed=1)
+        assert result["capex_total_eur"]["std"] == 0
+
+    def test_unknown_dist_is_rejected(self):
+        cfg = copy.deepcopy(montecarlo_config())
+        cfg["productible"]["dist"] = "lognormal"
+        with patch.object(financial_montecarlo, "montecarlo_config", return_value=cfg):
+            with pytest.raises(ValueError, match="lognormal"):
+                simulate_financial("solaire_sol", 10.0, ENRICHED, samples=100, seed=1)
@@ -0,0 +1,102 @@
+"""Tests for the deterministic sensitivity analysis (tornado + grid)."""
+from unittest.mock import patch
+
+import pytest
+
+from app.services import financial_sensitivity as fs
+from app.services.financial import CAPEX_BENCHMARKS, PRIX_VENTE, estimate_financial
+
+ENRICHED = {
+    "pvgis": {"productible_kwh_kwc_an": 1300},
+    "nearest_postes": [{"distance_km": 8.0}],
+}
+
+
+class TestTornado:
+    def test_base_matches_estimate_financial(self):
+        result = fs.sensitivity_analysis("solaire_sol", 10.0, ENRICHED)
+        expected = estimate_financial("solaire_sol", 10.0, None, ENRICHED)
+        assert result["base_value"] == expected["tri"]["tri_pct"]
+
+        lcoe = fs.sensitivity_analysis("solaire_sol", 10.0, ENRICHED, metric="lcoe_eur_mwh")
+        assert lcoe["base_value"] == expected["lcoe_eur_mwh"]
+
+    def test_sorted_by_swing(self):
+        tornado = fs.sensitivity_analysis("eolien_onshore", 20.0, ENRICHED)["tornado"]
+        swings = [t["swing"] for t in tornado]
+        assert swings == sorted(swings, reverse=True)
+        assert {t["driver"] for t in tornado} == set(fs.DRIVERS)
+
+    def test_low_and_high_inputs(self):
+        tornado = {t["driver"]: t for t in fs.sensitivity_analysis("solaire_sol", 10.0, ENRICHED)["tornado"]}
+        bench = CAPEX_BENCHMARKS["solaire_sol"]
+        assert (tornado["capex"]["low_input"], tornado["capex"]["high_input"]) == (bench["min"], bench["max"])
+        assert tornado["capex"]["low_value"] > tornado["capex"]["high_value"]
+        assert tornado["productible"]["low_input"] == pytest.approx(1170.0)
+        assert tornado["raccordement"]["base_input"] == 8.0
+
+    def test_each_price_mechanism(self):
+        result = fs.sensitivity_analysis("solaire_sol", 10.0, ENRICHED)
+        prix = PRIX_VENTE["solaire_sol"]
+        mechanisms = result["prix_mecanismes"]
+        assert mechanisms["cre_ao"] == result["base_value"]
+        cheapest = min(("cre_ao", "ppa", "marche"), key=lambda m: prix[m])
+        assert mechanisms[cheapest] == min(mechanisms.values())
+
+    def test_bess_has_no_productible_driver(self):
+        result = fs.sensitivity_analysis("bess", 10.0)
+        assert "productible" not in {t["driver"] for t in result["tornado"]}
+        assert "prix_mecanismes" not in result
+        assert (result["grid"]["x_driver"], result["grid"]["y_driver"]) == ("capex", "prix")
+        with pytest.raises(ValueError):
+            fs.sensitivity_analysis("bess", 10.0, grid=("capex", "productible"))
+
+    def test_raccordement_range_covers_actual_distance(self):
+        far = {"nearest_postes": [{"distance_km": 45.0}]}
+        tornado = {t["driver"]: t for t in fs.sensitivity_analysis("solaire_sol", 10.0, far)["tornado"]}
+        assert (tornado["raccordement"]["base_input"], tornado["raccordement"]["high_input"]) == (45.0, 45.0)
+        near = {t["driver"]: t for t in fs.sensitivity_analysis("solaire_sol", 10.0, ENRICHED)["tornado"]}
+        assert near["raccordement"]["high_input"] == 30.0
+
+
+class TestGrid:
+    def test_shape_and_center(self):
+        result = fs.sensitivity_analysis("solaire_sol", 10.0, ENRICHED, steps=5)
+        grid = result["grid"]
+        assert len(grid["matrix"]) == 5 and all(len(row) == 5 for row in grid["matrix"])
+        assert grid["x_values"][2] == CAPEX_BENCHMARKS["solaire_sol"]["median"]
+        assert grid["y_values"][2] == pytest.approx(1300.0)
+        assert grid["matrix"][2][2] == result["base_value"]
+        # TRI falls with CAPEX and rises with productible
+        assert grid["matrix"][4][0] > grid["matrix"][0][4]
+
+    def test_lifetime_axis_is_whole_years(self):
+        grid = fs.sensitivity_analysis("solaire_sol", 10.0, grid=("lifetime", "prix"), steps=4)["grid"]
+        assert all(v == int(v) for v in grid["x_values"])
+
+    def test_single_batched_evaluation(self):
+        with patch.object(fs, "evaluate_columns", wraps=fs.evaluate_columns) as evaluate:
+            result = fs.sensitivity_analysis("solaire_sol", 10.0, ENRICHED, steps=7)
+        assert evaluate.call_count == 1
+        assert len(evaluate.call_args[0][0]["capex_median"]) == result["cases_evaluated"]
+        assert result["cases_evaluated"] == 1 + 2 * len(fs.DRIVERS) + 3 + 49
+
+    @pytest.mark.parametrize("filiere, x, y, expected", [
+        ("solaire_sol", None, None, ("capex", "productible")),
+        ("bess", None, None, ("capex", "prix")),
+        ("bess", "prix", None, ("prix", "capex")),
+        ("eolien_onshore", None, "capex", ("productible", "capex")),
+        ("solaire_sol", "lifetime", "prix", ("lifetime", "prix")),
+    ])
+    def test_default_grid(self, filiere, x, y, expected):
+        assert fs.default_grid(filiere, x, y) == expected
+
+    @pytest.mark.parametrize("kwargs", [
+        {"metric": "npv"},
+        {"grid": ("capex", "capex")},
+        {"grid": ("capex", "taux")},
+        {"steps": 1},
+    ])
+    def test_invalid_arguments(self, kwargs):
+        with pytest.raises(ValueError):
+            fs.sensitivity_analysis("solaire_sol", 10.0, **kwargs)
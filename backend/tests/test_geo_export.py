@@ -0,0 +1,76 @@
+"""Tests for columnar geo exports (no DB)."""
+import io
+import json
+import struct
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.services.geo_export import EXPORT_LAYERS, arrow_schema, encode_batches, export_sql
+
+
+def _point_wkb(lon, lat):
+    return struct.pack("<BIdd", 1, 1, lon, lat)
+
+
+def _postes(start, n):
+    return [
+        {
+            "id": i,
+            "nom": f"Poste {i}",
+            "gestionnaire": "Enedis",
+            "tension_kv": 63.0,
+            "puissance_mw": None,
+            "capacite_disponible_mw": float(i),
+            "geometry": _point_wkb(2.0 + i / 100, 46.0),
+        }
+        for i in range(start, start + n)
+    ]
+
+
+async def _batches(*batches):
+    for rows in batches:
+        yield rows
+
+
+async def _collect(layer, fmt, *batches):
+    chunks = [chunk async for chunk in encode_batches(EXPORT_LAYERS[layer], fmt, _batches(*batches))]
+    return chunks
+
+
+class TestSchema:
+    def test_geoparquet_metadata(self):
+        schema = arrow_schema(EXPORT_LAYERS["natura2000"])
+        geo = json.loads(schema.metadata[b"geo"])
+        assert geo["primary_column"] == "geometry"
+        assert geo["columns"]["geometry"] == {"encoding": "WKB", "geometry_types": ["MultiPolygon"]}
+        assert schema.field("geometry").metadata[b"ARROW:extension:name"] == b"geoarrow.wkb"
+
+    def test_sql_user_filter(self):
+        assert ":user_id" in export_sql(EXPORT_LAYERS["projets"], user_filter=True)
+        assert "ST_AsBinary(t.geom) AS geometry" in export_sql(EXPORT_LAYERS["postes"])
+
+
+class TestEncoding:
+    async def test_parquet_round_trip(self):
+        chunks = await _collect("postes", "parquet", _postes(0, 3), _postes(3, 2))
+        assert len(chunks) > 1  # streamed, not buffered
+        table = pq.read_table(io.BytesIO(b"".join(chunks)))
+        assert table.num_rows == 5
+        assert table.column("capacite_disponible_mw").to_pylist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert b"geo" in table.schema.metadata
+
+    async def test_arrow_stream_round_trip(self):
+        chunks = await _collect("postes", "arrow", _postes(0, 4))
+        table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+        assert table.num_rows == 4
+        assert table.column("geometry")[0].as_py() == _point_wkb(2.0, 46.0)
+
+    async def test_empty_layer(self):
+        table = pq.read_table(io.BytesIO(b"".join(await _collect("postes", "parquet"))))
+        assert table.num_rows == 0
+
+    async def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            await _collect("postes", "fgb", _postes(0, 1))
@@ -1,7 +1,23 @@
 """Tests for GeoJSON/WMS layer management — Sprint 21."""
 
-from app.models.geo_layer import GeoLayer
-from app.routes.geo_layers import LAYER_CATALOG
+import io
+import json
+import uuid
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from app.models.geo_layer import GeoLayer, GeoLayerFeature
+from app.routes.geo_layers import LAYER_CATALOG, _proxy_cache_control
+from app.services.constraints import _layer_sql
+from app.services.user_layers import (
+    UploadError,
+    constraint_layer,
+    iter_features,
+    load_features,
+    tile_layer,
+)
+from app.services.vector_tiles import tile_sql
 
 
 class TestGeoLayerModel:
@@ -68,3 +84,120 @@ class TestLayerCatalog:
         categories = {e["category"] for e in LAYER_CATALOG}
         assert "environnement" in categories
         assert "foncier" in categories
+
+
+class TestProxyCacheControl:
+    def test_catalog_layer_is_public(self):
+        layer = GeoLayer(name="Natura 2000", layer_type="wms", user_id=None)
+        assert _proxy_cache_control(layer, 3600) == {"Cache-Control": "public, max-age=3600"}
+
+    def test_user_layer_is_private(self):
+        layer = GeoLayer(name="Mes zones", layer_type="wms", user_id=uuid.uuid4())
+        assert _proxy_cache_control(layer, 86400) == {"Cache-Control": "private, max-age=86400"}
+
+
+class _Upload:
+    """Minimal async UploadFile stand-in."""
+
+    def __init__(self, payload: bytes):
+        self._buffer = io.BytesIO(payload)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buffer.read(size)
+
+
+class _RecordingDb:
+    def __init__(self):
+        self.batches = []
+
+    async def execute(self, statement, params=None):
+        self.batches.append(len(params["geometries"]))
+
+
+class _PostgisDb:
+    """Rejects polygons without rings, like ST_GeomFromGeoJSON."""
+
+    def __init__(self):
+        self.rollbacks = 0
+
+    async def execute(self, statement, params=None):
+        geometries = params["geometries"] if "geometries" in params else [params["geometry"]]
+        if any(json.loads(g)["type"] == "Polygon" for g in geometries):
+            raise DBAPIError("INSERT ...", params, Exception("Invalid GeoJSON"))
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def _collection(n: int) -> bytes:
+    return json.dumps({
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [2.0 + i / 10, 46.5]}, "properties": {"name": f"f{i}"}}
+            for i in range(n)
+        ] + [{"type": "Feature", "geometry": None, "properties": {}}],
+    }).encode()
+
+
+class TestGeoLayerFeatureModel:
+    def test_tablename(self):
+        assert GeoLayerFeature.__tablename__ == "geo_layer_features"
+
+    def test_columns(self):
+        cols = {c.name for c in GeoLayerFeature.__table__.columns}
+        assert {"layer_id", "geom", "geom_l93", "properties"} <= cols
+
+
+class TestStreamingUpload:
+    async def test_iter_features(self):
+        features = [f async for f in iter_features(_Upload(_collection(3)))]
+        assert len(features) == 4
+        assert features[0]["properties"] == {"name": "f0"}
+
+    async def test_rejects_non_collection(self):
+        with pytest.raises(UploadError, match="FeatureCollection"):
+            [f async for f in iter_features(_Upload(b'{"type": "Feature", "geometry": null}'))]
+
+    async def test_rejects_invalid_json(self):
+        with pytest.raises(UploadError, match="Invalid JSON"):
+            [f async for f in iter_features(_Upload(b'{"type": "FeatureCollection", "features": ['))]
+
+    async def test_load_in_batches(self, monkeypatch):
+        monkeypatch.setattr("app.services.user_layers.INSERT_BATCH", 2)
+        db = _RecordingDb()
+        count = await load_features(db, uuid.uuid4(), _Upload(_collection(5)))
+        assert count == 5  # null geometry skipped
+        assert db.batches == [2, 2, 1]
+
+    async def test_size_limit(self):
+        with pytest.raises(UploadError, match="too large"):
+            await load_features(_RecordingDb(), uuid.uuid4(), _Upload(_collection(50)), max_bytes=100)
+
+    async def test_invalid_geometry_is_an_upload_error(self, monkeypatch):
+        monkeypatch.setattr("app.services.user_layers.INSERT_BATCH", 3)
+        doc = json.loads(_collection(5))
+        doc["features"].insert(0, {"type": "Feature", "geometry": None})
+        doc["features"][5]["geometry"] = {"type": "Polygon", "coordinates": [1]}
+        db = _PostgisDb()
+        with pytest.raises(UploadError, match="feature 5"):
+            await load_features(db, uuid.uuid4(), _Upload(json.dumps(doc).encode()))
+        assert db.rollbacks == 2
+
+    async def test_feature_limit(self):
+        with pytest.raises(UploadError, match="Too many features"):
+            await load_features(_RecordingDb(), uuid.uuid4(), _Upload(_collection(5)), max_features=3)
+
+
+class TestStoredLayerQueries:
+    def test_constraint_layer_is_filtered(self):
+        layer = GeoLayer(id=uuid.uuid4(), name="PLU", layer_type="geojson", feature_count=3)
+        sql = _layer_sql(constraint_layer(layer))
+        assert f"layer_id = '{layer.id}'" in sql
+        assert "FROM geo_layer_features" in sql
+        assert f"'layer:{layer.id}' AS layer" in sql
+
+    def test_tile_layer_is_filtered_and_versioned(self):
+        layer = GeoLayer(id=uuid.uuid4(), name="PLU", layer_type="geojson", feature_count=3)
+        tiles = tile_layer(layer)
+        assert f"t.layer_id = '{layer.id}'" in tile_sql(tiles, 12)
+        assert tiles.cache_version == f"{layer.id}-3"
@@ -0,0 +1,150 @@
+"""Tests for the offline irradiation grid (no DB, no network)."""
+import math
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.services import irradiation_grid as ig
+from app.services.scoring import _irradiation_source
+
+RES = 0.5  # coarse grid: 21 × 31 cells over France
+
+
+def _linear_grid(res=RES):
+    """Bands linear in lon/lat, so bilinear interpolation is exact."""
+    lons, lats = ig.cell_centers(res)
+    data = np.stack([
+        1000 + 100 * (51.5 - lats),  # GHI grows southwards
+        800 + 80 * (51.5 - lats) + lons,
+        10 + 0.5 * (51.5 - lats),
+    ]).astype(np.float32)
+    return data
+
+
+@pytest.fixture
+def grid_path(tmp_path):
+    with patch.object(ig, "grid_dir", return_value=tmp_path):
+        yield tmp_path
+
+
+class TestBilinear:
+    def test_exact_on_linear_field(self):
+        data = _linear_grid()
+        west, _, _, north = ig.EXTENT_WGS84
+        lons = np.array([2.35, -1.68, 7.26, 9.1])
+        lats = np.array([48.86, 48.11, 43.7, 42.2])
+        out = ig.bilinear(data[0], west, north, RES, lons, lats)
+        np.testing.assert_allclose(out, 1000 + 100 * (51.5 - lats), rtol=1e-5)
+
+    def test_nan_neighbours_are_skipped(self):
+        grid = np.array([[1.0, np.nan], [3.0, 5.0]])
+        out = ig.bilinear(grid, 0.0, 2.0, 1.0, np.array([1.0]), np.array([1.0]))
+        assert out[0] == pytest.approx(3.0)  # mean of the three valid corners
+
+    def test_outside_is_nan(self):
+        grid = np.ones((4, 4))
+        out = ig.bilinear(grid, 0.0, 4.0, 1.0, np.array([-0.1, 4.2, 2.0]), np.array([2.0, 2.0, 2.0]))
+        assert math.isnan(out[0]) and math.isnan(out[1]) and out[2] == 1.0
+
+    def test_edge_takes_edge_values(self):
+        grid = np.array([[1.0, 2.0], [3.0, 4.0]])
+        out = ig.bilinear(grid, 0.0, 2.0, 1.0, np.array([0.1]), np.array([1.9]))
+        assert out[0] == pytest.approx(1.0)
+
+
+class TestImport:
+    def test_grid_shape_has_no_rounding_overflow(self):
+        assert ig.grid_shape(0.05) == (210, 310)
+
+    def test_cells_are_averaged_per_cell(self):
+        data = ig.grid_from_cells(
+            [48.1, 48.2, 45.0], [2.1, 2.2, 99.0],
+            {"ghi_kwh_m2_an": [1200, 1300, 1500], "productible_kwh_kwc_an": [1000, 1100, 1200]},
+            RES,
+        )
+        r, c = int((51.5 - 48.1) // RES), int((2.1 + 5.5) // RES)
+        assert data[0, r, c] == pytest.approx(1250)
+        assert data[1, r, c] == pytest.approx(1050)
+        assert np.isnan(data[2, r, c])  # no temperature given
+        assert np.count_nonzero(~np.isnan(data[0])) == 1  # out-of-extent point ignored
+
+    def test_cells_csv(self, tmp_path):
+        path = tmp_path / "cells.csv"
+        path.write_text("lat,lon,ghi,E_y,T2m\n43.6,3.9,1650,1380,15.2\n,1,2,3,4\n")
+        lats, lons, values = ig.read_cells_csv(path)
+        assert list(lats) == [43.6] and list(lons) == [3.9]
+        assert values["productible_kwh_kwc_an"][0] == 1380
+        assert values["temperature_moyenne"][0] == 15.2
+
+    def test_ghi_ascii(self, tmp_path):
+        path = tmp_path / "ghi.asc"
+        rows = "\n".join(" ".join(str(1000 + 20 * r) for _ in range(40)) for r in range(30))
+        path.write_text(
+            "ncols 40\nnrows 30\nxllcorner -6\nyllcorner 40\ncellsize 0.5\nNODATA_value -9999\n" + rows
+        )
+        data = ig.grid_from_ghi_ascii(path, RES)
+        west, _, _, north = ig.EXTENT_WGS84
+        ghi = ig.bilinear(data[0], west, north, RES, np.array([2.0]), np.array([47.0]))[0]
+        # source row r has its centre at lat 55 - 0.5 r - 0.25 → r = 15.5 at 47.0
+        assert ghi == pytest.approx(1000 + 20 * 15.5, rel=1e-4)
+        prod = ig.bilinear(data[1], west, north, RES, np.array([2.0]), np.array([47.0]))[0]
+        assert prod == pytest.approx(ghi * ig.PRODUCTIBLE_PER_GHI, rel=1e-4)
+
+
+class TestReadSide:
+    def test_missing_grid(self, grid_path):
+        assert ig.get_grid() is None
+
+    def test_sample_records(self, grid_path):
+        data = _linear_grid()
+        data[:, 0, 0] = np.nan
+        ig.write_grid(data, RES, "test")
+        grid = ig.get_grid()
+
+        record = grid.sample(2.35, 48.86)
+        assert record["source"] == "irradiation_grid"
+        assert record["ghi_kwh_m2_an"] == pytest.approx(1000 + 100 * (51.5 - 48.86), abs=0.1)
+        assert record["grid_resolution_deg"] == RES
+        assert grid.sample(-5.4, 51.4) is None  # the only cell in reach has no data
+        assert grid.sample(-20.0, 30.0) is None
+
+    def test_reloads_when_rewritten(self, grid_path):
+        ig.write_grid(_linear_grid(), RES, "v1")
+        first = ig.get_grid()
+        assert ig.get_grid() is first
+        ig.write_grid(_linear_grid(), RES, "v2")
+        os.utime(grid_path / ig.MANIFEST, (1e9, 1e9))
+        assert ig.get_grid().manifest["source"] == "v2"
+
+
+class TestScreeningEnrichment:
+    async def test_grid_first_then_pvgis_for_uncovered(self, grid_path):
+        from app.services import enrichment
+
+        data = _linear_grid()
+        data[:, 20, :] = np.nan  # southern row (Corse) not covered
+        ig.write_grid(data, RES, "test")
+        calls = []
+
+        async def pvgis(lat, lon):
+            calls.append((lat, lon))
+            return {"ghi_kwh_m2_an": 1700, "source": "pvgis_api"}
+
+        points = [(2.35, 48.86), (9.1, 41.1)]
+        with patch.object(enrichment, "get_pvgis_data", pvgis):
+            screening = await enrichment._solar_many(points, detailed=False)
+            detailed = await enrichment._solar_many(points, detailed=True)
+
+        assert screening[0]["source"] == "irradiation_grid"
+        assert screening[1]["source"] == "pvgis_api"
+        assert [d["source"] for d in detailed] == ["pvgis_api", "pvgis_api"]
+        assert calls == [(41.1, 9.1), (48.86, 2.35), (41.1, 9.1)]
+
+
+class TestDataSource:
+    def test_labels(self):
+        assert _irradiation_source(False, "irradiation_grid") == "heuristic_latitude"
+        assert _irradiation_source(True, "irradiation_grid") == "irradiation_grid"
+        assert _irradiation_source(True, "pvgis_api") == "pvgis_real"
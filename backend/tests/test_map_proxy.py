@@ -0,0 +1,165 @@
+"""Tests for the WMS/WFS caching proxy against a local fake WMS server."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.services.map_proxy import (
+    DiskLRUCache,
+    MapProxy,
+    ProxyError,
+    tile_bbox_3857,
+    wfs_request,
+    wms_getmap_request,
+)
+from app.services.singleflight import SingleFlight
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+class _FakeOws(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {k.upper(): v[0] for k, v in parse_qs(parts.query).items()}
+        _FakeOws.requests.append((parts.path, query))
+        time.sleep(0.1)  # slow upstream, lets concurrent requests overlap
+        if parts.path.endswith("/broken"):
+            body, content_type = b"<ServiceExceptionReport/>", "text/xml"
+        elif query.get("REQUEST") == "GetMap":
+            body, content_type = PNG, "image/png"
+        else:
+            body, content_type = json.dumps({"type": "FeatureCollection", "features": []}).encode(), "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fake_ows():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOws)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    _FakeOws.requests.clear()
+    return MapProxy(DiskLRUCache(str(tmp_path), 1_000_000), ["127.0.0.1"])
+
+
+class TestRequests:
+    def test_tile_bbox(self):
+        minx, miny, maxx, maxy = tile_bbox_3857(0, 0, 0)
+        assert minx == -maxx and miny == -maxy
+        assert tile_bbox_3857(1, 1, 0)[0] == 0.0
+
+    def test_getmap_layer_from_path(self):
+        base, params = wms_getmap_request("https://ws.carmencarto.fr/WMS/119/natura2000", 6, 32, 22)
+        assert base == "https://ws.carmencarto.fr/WMS/119/natura2000"
+        assert params["LAYERS"] == "natura2000"
+        assert params["CRS"] == "EPSG:3857"
+
+    def test_getmap_keeps_vendor_params(self):
+        _, params = wms_getmap_request("https://data.geopf.fr/wms/ows?service=WMS&layers=PLU&apikey=x", 10, 1, 1)
+        assert params["LAYERS"] == "PLU"
+        assert params["apikey"] == "x"
+        assert "service" not in params
+
+    def test_plain_geojson_is_not_windowed(self):
+        url = "https://opendata.example/exports/geojson"
+        assert wfs_request(url, (0, 0, 1, 1)) == (url, {}, False)
+
+
+class TestDiskLRUCache:
+    def test_eviction_keeps_recent(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path), 250)
+        for key in ("a", "b"):
+            cache.set(key, "image/png", b"x" * 100)
+        assert cache.get("a") is not None  # a becomes most recent
+        cache.set("c", "image/png", b"x" * 100)
+        assert "a" in cache and "c" in cache and "b" not in cache
+        assert cache.size <= 250
+
+    def test_index_survives_restart(self, tmp_path):
+        DiskLRUCache(str(tmp_path), 1000).set("k", "image/png", PNG)
+        assert DiskLRUCache(str(tmp_path), 1000).get("k") == ("image/png", PNG)
+
+    async def test_concurrent_workers_keep_size_accounting(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path), 5_000)
+
+        def work(worker: int):
+            for i in range(200):
+                key = f"k{(worker * 7 + i) % 40}"
+                if i % 3:
+                    cache.get(key)
+                else:
+                    cache.set(key, "image/png", b"x" * (50 + i % 90))
+
+        await asyncio.gather(*(asyncio.to_thread(work, w) for w in range(8)))
+        on_disk = sum(p.stat().st_size for p in tmp_path.glob("*.bin"))
+        assert cache.size == sum(cache._entries.values()) == on_disk
+        assert cache.size <= 5_000
+
+
+class TestSingleFlight:
+    async def test_shares_one_call(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        assert await asyncio.gather(*(flight.do("k", work) for _ in range(5))) == [1] * 5
+
+
+class TestMapProxy:
+    async def test_concurrent_tiles_fetch_upstream_once(self, proxy, fake_ows):
+        results = await asyncio.gather(*(
+            proxy.wms_tile("layer", f"{fake_ows}/wms/natura2000", 8, 130, 90) for _ in range(8)
+        ))
+        assert all(r == ("image/png", PNG) for r in results)
+        assert len(_FakeOws.requests) == 1
+        assert _FakeOws.requests[0][1]["LAYERS"] == "natura2000"
+
+        await proxy.wms_tile("layer", f"{fake_ows}/wms/natura2000", 8, 130, 90)
+        assert len(_FakeOws.requests) == 1  # served from disk
+        await proxy.aclose()
+
+    async def test_wfs_window(self, proxy, fake_ows):
+        content_type, body = await proxy.wfs_features(
+            "rte", f"{fake_ows}/wfs?service=WFS&typeName=postes", (2.0, 48.0, 2.5, 48.5)
+        )
+        assert content_type == "application/json"
+        assert json.loads(body)["type"] == "FeatureCollection"
+        assert _FakeOws.requests[0][1]["TYPENAMES"] == "postes"
+        await proxy.aclose()
+
+    async def test_service_exception_is_not_cached(self, proxy, fake_ows):
+        for _ in range(2):
+            with pytest.raises(ProxyError) as exc:
+                await proxy.wms_tile("bad", f"{fake_ows}/wms/broken", 3, 1, 1)
+            assert exc.value.status_code == 502
+        assert len(_FakeOws.requests) == 2
+        await proxy.aclose()
+
+    async def test_unlisted_host_is_refused(self, tmp_path):
+        proxy = MapProxy(DiskLRUCache(str(tmp_path), 1000), ["ws.carmencarto.fr"])
+        with pytest.raises(ProxyError) as exc:
+            await proxy.wms_tile("x", "http://169.254.169.254/latest", 0, 0, 0)
+        assert exc.value.status_code == 403
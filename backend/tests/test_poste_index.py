@@ -0,0 +1,85 @@
+"""Tests for the in-process poste source spatial index."""
+import numpy as np
+import pytest
+
+from app.services.poste_index import EARTH_RADIUS_M, PosteIndex, chord_to_m, m_to_chord
+
+
+def _haversine_m(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def _rows(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    lons = rng.uniform(-4.5, 8.0, n)
+    lats = rng.uniform(42.5, 51.0, n)
+    return [
+        {
+            "id": i + 1, "nom": f"Poste {i + 1}", "gestionnaire": "Enedis",
+            "tension_kv": 20, "puissance_mw": 40, "capacite_disponible_mw": None,
+            "lon": lon, "lat": lat,
+        }
+        for i, (lon, lat) in enumerate(zip(lons, lats))
+    ]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return PosteIndex(_rows())
+
+
+class TestChord:
+    @pytest.mark.parametrize("distance_m", [0, 1.0, 1_000, 80_000, 1_000_000])
+    def test_round_trip(self, distance_m):
+        assert chord_to_m(m_to_chord(distance_m)) == pytest.approx(distance_m, abs=1e-6)
+
+
+class TestPosteIndex:
+    def test_nearest_matches_brute_force(self, index):
+        rng = np.random.default_rng(1)
+        for lon, lat in zip(rng.uniform(-4, 7.5, 50), rng.uniform(43, 50.5, 50)):
+            brute = _haversine_m(lon, lat, index.lon, index.lat)
+            poste, distance = index.nearest(lon, lat)[0]
+            assert poste["id"] == index.ids[np.argmin(brute)]
+            assert distance == pytest.approx(brute.min(), rel=1e-9, abs=1e-3)
+
+    def test_nearest_k_sorted(self, index):
+        result = index.nearest(2.35, 48.85, k=5)
+        distances = [d for _, d in result]
+        assert len(result) == 5
+        assert distances == sorted(distances)
+
+    def test_nearest_k_capped_to_size(self):
+        small = PosteIndex(_rows(n=3))
+        assert len(small.nearest(2.0, 47.0, k=10)) == 3
+
+    def test_nearest_many_matches_single(self, index):
+        lons = np.array([2.35, 5.37, np.nan, -1.55])
+        lats = np.array([48.85, 43.30, 45.0, 47.22])
+        dist, ids = index.nearest_many(lons, lats)
+        assert np.isnan(dist[2]) and ids[2] == -1
+        for i in (0, 1, 3):
+            poste, d = index.nearest(lons[i], lats[i])[0]
+            assert ids[i] == poste["id"]
+            assert dist[i] == pytest.approx(d)
+
+    def test_within_matches_brute_force(self, index):
+        lon, lat, radius = 2.35, 48.85, 60_000
+        brute = _haversine_m(lon, lat, index.lon, index.lat)
+        result = index.within(lon, lat, radius)
+        assert sorted(p["id"] for p, _ in result) == sorted(index.ids[brute <= radius].tolist())
+        assert all(d <= radius for _, d in result)
+
+    def test_count_within_many(self, index):
+        lons = np.array([2.35, 5.37])
+        lats = np.array([48.85, 43.30])
+        counts = index.count_within_many(lons, lats, 50_000)
+        for i in range(2):
+            assert counts[i] == len(index.within(lons[i], lats[i], 50_000))
+
+    def test_attributes_are_plain_floats(self, index):
+        poste, _ = index.nearest(2.35, 48.85)[0]
+        assert isinstance(poste["tension_kv"], float)
+        assert poste["capacite_disponible_mw"] is None
@@ -0,0 +1,47 @@
+"""Tests for the postes route helpers: clustering grid and ETags (no DB)."""
+from app.routes.geo import (
+    CLUSTER_MAX_CELLS_PER_SIDE,
+    _bbox_zoom,
+    _cluster_cell_m,
+    _etag_matches,
+    _mercator,
+)
+from app.services.vector_tiles import tile_size_m
+
+
+class TestBboxZoom:
+    def test_france_is_low_zoom(self):
+        assert _bbox_zoom(-5.5, 10.0) == 6
+
+    def test_small_bbox_is_high_zoom(self):
+        assert _bbox_zoom(2.30, 2.40) >= 13
+
+    def test_degenerate_bbox_is_clamped(self):
+        assert _bbox_zoom(2.0, 2.0) == 20
+
+
+class TestClusterCell:
+    def test_cell_follows_zoom(self):
+        assert _cluster_cell_m(12, 2.30, 48.80, 2.40, 48.90) == tile_size_m(12) / 4
+
+    def test_grid_is_bounded_for_wide_bbox(self):
+        west, south, east, north = -5.5, 41.0, 10.0, 51.5
+        cell = _cluster_cell_m(18, west, south, east, north)
+        x0, y0 = _mercator(west, south)
+        x1, y1 = _mercator(east, north)
+        assert (x1 - x0) / cell <= CLUSTER_MAX_CELLS_PER_SIDE
+        assert (y1 - y0) / cell <= CLUSTER_MAX_CELLS_PER_SIDE
+
+    def test_mercator_clamps_poles(self):
+        assert _mercator(0, 90) == _mercator(0, 89.9)
+
+
+class TestEtag:
+    def test_matches(self):
+        assert _etag_matches('"abc"', '"abc"')
+        assert _etag_matches('W/"abc", "def"', '"abc"')
+        assert _etag_matches("*", '"abc"')
+
+    def test_no_match(self):
+        assert not _etag_matches(None, '"abc"')
+        assert not _etag_matches('"abd"', '"abc"')
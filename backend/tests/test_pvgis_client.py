@@ -0,0 +1,136 @@
+"""Tests for the pooled PVGIS client against a local fake PVGIS server."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.config import settings
+from app.services import pvgis
+
+PVCALC = {
+    "outputs": {
+        "totals": {"fixed": {"E_y": 1320.0, "H(i)_y": 1610.0}},
+        "monthly": {"fixed": [{"H(i)_m": 130.0, "T2m": 12.0} for _ in range(12)]},
+    }
+}
+
+
+class _FakePvgis(BaseHTTPRequestHandler):
+    requests = []
+    fail = False
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        _FakePvgis.requests.append((parts.path, {k: v[0] for k, v in parse_qs(parts.query).items()}))
+        time.sleep(0.1)  # slow upstream, lets concurrent requests overlap
+        status, body = (500, b"{}") if _FakePvgis.fail else (200, json.dumps(PVCALC).encode())
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fake_pvgis():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakePvgis)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+async def client(fake_pvgis, monkeypatch):
+    """PVGIS client pointed at the fake server, cached in process only."""
+    _FakePvgis.requests.clear()
+    _FakePvgis.fail = False
+    monkeypatch.setattr(settings, "pvgis_base_url", fake_pvgis)
+    monkeypatch.setattr(settings, "pvgis_grid_deg", 0.05)
+    monkeypatch.setattr(pvgis._cache, "use_redis", False)
+    pvgis._cache.clear_local()
+    pvgis._cache.reset_stats()
+    await pvgis.close_pvgis()
+    yield pvgis._cache
+    await pvgis.close_pvgis()
+    pvgis._cache.clear_local()
+
+
+class TestGrid:
+    def test_snaps_to_cell_centre(self):
+        assert pvgis.snap_to_grid(43.61, 3.87, 0.05) == (43.625, 3.875)
+        assert pvgis.snap_to_grid(43.649, 3.851, 0.05) == (43.625, 3.875)
+
+    def test_negative_coordinates(self):
+        assert pvgis.snap_to_grid(-0.01, -1.52, 0.05) == (-0.025, -1.525)
+
+    def test_same_cell_same_key(self):
+        with patch.object(settings, "pvgis_grid_deg", 0.05):
+            assert pvgis._cache_key(43.61, 3.87) == pvgis._cache_key(43.64, 3.86)
+            assert pvgis._cache_key(43.61, 3.87) != pvgis._cache_key(43.66, 3.87)
+
+
+class TestPvgisClient:
+    async def test_concurrent_requests_in_one_cell_call_once(self, client):
+        points = [(43.61 + i * 0.004, 3.86 + i * 0.003) for i in range(8)]
+        results = await asyncio.gather(*(pvgis.get_pvgis_data(lat, lon) for lat, lon in points))
+
+        assert all(r["source"] == "pvgis_api" for r in results)
+        assert all(r["productible_kwh_kwc_an"] == 1320.0 for r in results)
+        assert len(_FakePvgis.requests) == 1
+        path, query = _FakePvgis.requests[0]
+        assert path.endswith("/PVcalc")
+        assert (float(query["lat"]), float(query["lon"])) == (43.625, 3.875)
+
+        stats = client.stats()
+        assert stats["loads"] == 1
+        assert stats["coalesced"] == 7
+
+    async def test_cached_cell_is_not_fetched_again(self, client):
+        await pvgis.get_pvgis_data(45.01, 4.99)
+        await pvgis.get_pvgis_data(45.02, 4.98)
+        await pvgis.get_pvgis_data(46.51, 4.99)  # another cell
+
+        assert len(_FakePvgis.requests) == 2
+        stats = client.stats()
+        assert stats["local_hits"] == 1
+        assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-3)
+
+    async def test_failure_falls_back_and_is_negatively_cached(self, client):
+        _FakePvgis.fail = True
+        first, second = await asyncio.gather(
+            pvgis.get_pvgis_data(47.5, 1.0), pvgis.get_pvgis_data(47.51, 1.01)
+        )
+        third = await pvgis.get_pvgis_data(47.52, 1.02)
+
+        assert first["source"] == second["source"] == third["source"] == "fallback_latitude"
+        assert len(_FakePvgis.requests) == 1
+        assert client.stats()["negative_hits"] == 1
+
+    async def test_callers_get_their_own_copy(self, client):
+        first = await pvgis.get_pvgis_data(44.0, 2.0)
+        first["source"] = "edited"
+        assert (await pvgis.get_pvgis_data(44.0, 2.0))["source"] == "pvgis_api"
+
+    async def test_client_is_reused(self, client):
+        http = pvgis._get_http()
+        await pvgis.get_pvgis_data(44.0, 2.0)
+        assert pvgis._get_http() is http
+        assert not http.is_closed
+
+
+class TestMetrics:
+    async def test_metrics_endpoint_reports_caches(self):
+        from app.routes.monitoring import monitoring_metrics
+
+        metrics = await monitoring_metrics()
+        assert "hit_rate" in metrics["caches"]["pvgis"]
+        assert "jwks" in metrics["caches"]
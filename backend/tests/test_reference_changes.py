@@ -0,0 +1,166 @@
+"""Tests for reference dataset change capture and incremental rescoring."""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models.reference_change import ReferenceChange
+from app.services import rescoring
+from app.services.reference_changes import DATASETS, diff_snapshots
+from app.services.rescoring import RESCORE_RADIUS_M
+
+
+class TestDiffSnapshots:
+    def test_no_change(self):
+        snap = {"FR1": ("h1", "POLYGON(...)"), "FR2": ("h2", "POLYGON(...)")}
+        assert diff_snapshots(snap, dict(snap)) == {}
+
+    def test_added(self):
+        changes = diff_snapshots({}, {"FR1": ("h1", "POINT(2 48)")})
+        assert changes == {"FR1": ("added", None)}
+
+    def test_removed_keeps_old_bbox(self):
+        changes = diff_snapshots({"FR1": ("h1", "POINT(2 48)")}, {})
+        assert changes == {"FR1": ("removed", "POINT(2 48)")}
+
+    def test_updated_when_hash_differs(self):
+        changes = diff_snapshots(
+            {"FR1": ("h1", "POINT(2 48)"), "FR2": ("h2", "POINT(3 45)")},
+            {"FR1": ("h1b", "POINT(2.1 48)"), "FR2": ("h2", "POINT(3 45)")},
+        )
+        assert changes == {"FR1": ("updated", "POINT(2 48)")}
+
+
+class TestRescoringConfig:
+    def test_every_dataset_has_radius(self):
+        assert set(RESCORE_RADIUS_M) == set(DATASETS)
+
+    def test_postes_radius_covers_proximite_plateau(self):
+        # proximite_reseau is flat beyond 80 km
+        from app.services.scoring import _proximite_from_distance_km
+        assert _proximite_from_distance_km(80.1) == _proximite_from_distance_km(500)
+        assert RESCORE_RADIUS_M["postes_sources"] >= 80_000
+
+
+class TestReferenceChangeModel:
+    def test_table(self):
+        assert ReferenceChange.__tablename__ == "reference_changes"
+        cols = set(ReferenceChange.__table__.columns.keys())
+        assert {"dataset", "feature_key", "change_type", "geom", "processed_at"} <= cols
+
+
+class _ChangesDb:
+    """Fake session: pending changes, and the affected projects PostGIS would return.
+
+    Every statement is recorded so tests can check the SQL and the
+    parameters that were issued.
+    """
+
+    def __init__(self, changes, affected):
+        self.changes = changes  # {id: dataset}
+        self.affected = affected  # {projet_id: [dataset, ...]}
+        self.statements = []
+        self.processed = None
+
+    def issued(self, prefix):
+        return [(sql, params) for sql, params in self.statements if sql.lstrip().startswith(prefix)]
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        result = MagicMock()
+        rows = []
+        if "WHERE processed_at IS NULL" in sql:
+            rows = [{"id": cid, "dataset": dataset} for cid, dataset in self.changes.items()]
+        elif sql.lstrip().startswith("WITH changes"):
+            rows = [{"id": pid, "datasets": datasets} for pid, datasets in self.affected.items()]
+        elif sql.lstrip().startswith("UPDATE reference_changes"):
+            self.processed = params["ids"]
+        result.mappings.return_value.all.return_value = rows
+        return result
+
+    async def commit(self):
+        pass
+
+
+def _normalized(sql):
+    return " ".join(sql.split())
+
+
+class TestAffectedProjects:
+    async def test_selects_within_each_dataset_radius(self):
+        db = _ChangesDb({}, {"p1": ["postes_sources"], "p2": ["natura2000", "znieff"]})
+        affected = await rescoring.affected_projects(db, [3, 5])
+
+        assert affected == {"p1": {"postes_sources"}, "p2": {"natura2000", "znieff"}}
+        [(sql, params)] = db.issued("WITH changes")
+        sql = _normalized(sql)
+        assert params == {"ids": [3, 5]}
+        assert "WHERE id = ANY(CAST(:ids AS int[]))" in sql
+        for dataset, radius in RESCORE_RADIUS_M.items():
+            assert f"WHEN '{dataset}' THEN {radius}" in sql
+        assert "ST_Transform(geom, 2154) AS geom_l93" in sql
+        assert "JOIN projets p ON ST_DWithin(p.geom_l93, c.geom_l93, c.radius_m)" in sql
+
+    async def test_no_changes_no_query(self):
+        db = _ChangesDb({}, {})
+        assert await rescoring.affected_projects(db, []) == {}
+        assert db.statements == []
+
+
+class TestRescoreChanged:
+    async def test_affected_projects_are_rescored(self):
+        db = _ChangesDb(
+            changes={1: "postes_sources", 2: "natura2000"},
+            affected={"near": ["postes_sources"], "edge": ["natura2000", "postes_sources"]},
+        )
+        scored = AsyncMock(side_effect=lambda db, ids: [{"projet_id": pid} for pid in ids])
+        refresh = AsyncMock(return_value=1)
+        with patch.object(rescoring, "calculate_scores_bulk", scored), \
+                patch.object(rescoring, "persist_scores", AsyncMock()), \
+                patch.object(rescoring, "_refresh_enrichment", refresh), \
+                patch.object(rescoring, "refresh_constraint_layers", AsyncMock()) as layers, \
+                patch.object(rescoring, "invalidate_poste_index") as invalidate:
+            stats = await rescoring.rescore_changed(db)
+
+        assert db.issued("WITH changes")[0][1] == {"ids": [1, 2]}
+        assert sorted(scored.call_args[0][1]) == ["edge", "near"]
+        assert refresh.call_args[0][1] == {"near": {"postes_sources"}, "edge": {"natura2000", "postes_sources"}}
+        assert stats["projects"] == 2 and stats["rescored"] == 2 and stats["enriched_refreshed"] == 1
+        assert stats["changes_by_dataset"] == {"postes_sources": 1, "natura2000": 1}
+        assert db.processed == [1, 2]
+        invalidate.assert_called_once()
+        layers.assert_awaited_once()
+
+    async def test_no_pending_change(self):
+        db = _ChangesDb({}, {})
+        stats = await rescoring.rescore_changed(db)
+        assert stats == {"changes": 0, "projects": 0, "enriched_refreshed": 0, "rescored": 0}
+        assert db.issued("WITH changes") == [] and db.processed is None
+
+
+class TestRefreshEnrichment:
+    async def test_batched_per_chunk(self):
+        n = rescoring.ENRICH_CHUNK + 50
+        affected = {f"p{i}": ({"postes_sources"} if i % 2 else {"natura2000"}) for i in range(n)}
+        affected["p0"] = {"postes_sources", "znieff"}
+        result = MagicMock()
+        result.mappings.return_value.all.return_value = [
+            {"id": pid, "lon": 2.0 + i / 1000, "lat": 46.0} for i, pid in enumerate(affected)
+        ]
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=result)
+        constraints = AsyncMock(side_effect=lambda db, points: [{"natura2000": []}] * len(points))
+        nearest = AsyncMock(side_effect=lambda db, points, limit: [[{"distance_km": 1.0}]] * len(points))
+        save = AsyncMock()
+        with patch.object(rescoring, "get_constraints_batch", constraints), \
+                patch.object(rescoring, "get_nearest_postes_batch", nearest), \
+                patch.object(rescoring, "save_enrichments", save):
+            assert await rescoring._refresh_enrichment(db, affected) == n
+
+        assert constraints.await_count == nearest.await_count == save.await_count == 2
+        assert sum(len(call.args[1]) for call in constraints.await_args_list) == n // 2
+        assert sum(len(call.args[1]) for call in nearest.await_args_list) == n // 2 + 1
+        ids, payloads = save.await_args_list[0].args[1:]
+        patches = dict(zip(ids, map(json.loads, payloads)))
+        assert set(patches["p0"]) == {"constraints", "nearest_postes"}
+        assert set(patches["p1"]) == {"nearest_postes"}
+        assert set(patches["p2"]) == {"constraints"}
@@ -0,0 +1,75 @@
+"""Tests for the persistent score store fingerprinting."""
+from decimal import Decimal
+
+import pytest
+
+from app.models.project_score import ProjectScore
+from app.services.score_store import canonical_id, compute_fingerprint
+
+BASE_INPUTS = {
+    "lon": 2.35,
+    "lat": 48.85,
+    "filiere": "solaire_sol",
+    "departement": "75",
+    "surface_ha": 12.5,
+    "puissance_mwc": 10,
+    "enriched_at": "2026-02-20T10:00:00+00:00",
+    "risk_set": "3:4,7:2",
+}
+
+
+class TestFingerprint:
+    def test_stable(self):
+        assert compute_fingerprint(BASE_INPUTS) == compute_fingerprint(dict(BASE_INPUTS))
+
+    def test_hex_sha256(self):
+        fp = compute_fingerprint(BASE_INPUTS)
+        assert len(fp) == 64
+        int(fp, 16)
+
+    def test_numeric_types_are_normalized(self):
+        other = {**BASE_INPUTS, "puissance_mwc": Decimal("10.0"), "surface_ha": Decimal("12.50")}
+        assert compute_fingerprint(other) == compute_fingerprint(BASE_INPUTS)
+
+    @pytest.mark.parametrize("field,value", [
+        ("lon", 2.351),
+        ("lat", 48.86),
+        ("filiere", "bess"),
+        ("departement", "13"),
+        ("surface_ha", 13),
+        ("puissance_mwc", 11),
+        ("enriched_at", "2026-02-21T10:00:00+00:00"),
+        ("risk_set", "3:5,7:2"),
+    ])
+    def test_any_input_change_changes_fingerprint(self, field, value):
+        changed = {**BASE_INPUTS, field: value}
+        assert compute_fingerprint(changed) != compute_fingerprint(BASE_INPUTS)
+
+    def test_missing_values(self):
+        fp = compute_fingerprint({"lon": None, "lat": None, "filiere": None})
+        assert len(fp) == 64
+
+    def test_weights_version_is_included(self, monkeypatch):
+        before = compute_fingerprint(BASE_INPUTS)
+        monkeypatch.setattr("app.services.score_store.WEIGHTS_VERSION", "changed")
+        assert compute_fingerprint(BASE_INPUTS) != before
+
+
+class TestCanonicalId:
+    def test_lowercases_and_hyphenates(self):
+        raw = "0A1B2C3D4E5F60718293A4B5C6D7E8F9"
+        assert canonical_id(raw) == "0a1b2c3d-4e5f-6071-8293-a4b5c6d7e8f9"
+
+    def test_invalid_raises(self):
+        with pytest.raises(ValueError):
+            canonical_id("not-a-uuid")
+
+
+class TestProjectScoreModel:
+    def test_tablename(self):
+        assert ProjectScore.__tablename__ == "project_scores"
+
+    def test_columns(self):
+        cols = {c.name for c in ProjectScore.__table__.columns}
+        for col in ("projet_id", "fingerprint", "score", "details", "weights", "data_sources", "computed_at"):
+            assert col in cols
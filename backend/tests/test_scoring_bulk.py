@@ -0,0 +1,248 @@
+"""Tests for the vectorized bulk scoring engine.
+
+Checks that every *_vec criterion returns exactly the same integers as
+the scalar scoring functions, and that the global score matches the
+weighted sum used by calculate_score().
+"""
+import math
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from app.routes import scoring as scoring_route
+from app.services.scoring import (
+    CRITERIA,
+    DEFAULT_WEIGHTS,
+    WEIGHTS,
+    _dept_number,
+    _filiere_code,
+    _global_scores,
+    _proximite_from_distance_km,
+    _score_accessibilite,
+    _score_accessibilite_vec,
+    _score_environnement,
+    _score_environnement_vec,
+    _score_irradiation,
+    _score_irradiation_vec,
+    _score_proximite_reseau_vec,
+    _score_risques_vec,
+    _score_urbanisme,
+    _score_urbanisme_vec,
+    _weight_matrix,
+    WEIGHT_PROFILES,
+    rank_columns,
+    scenario_weight_matrix,
+    scenario_weight_vector,
+    weight_profile_index,
+    what_if_scores,
+)
+
+FILIERES = ["solaire_sol", "eolien_onshore", "bess", None, "hydro"]
+DEPARTEMENTS = [None, "", "2A", "01", "05", "13", "28", "35", "45", "64", "69", "75", "93"]
+SURFACES = [None, 1.0, 4.99, 5.0, 19.9, 20.0, 49.0, 50.0, 99.0, 100.0, 150.0]
+
+
+class TestProximiteVec:
+    def test_matches_scalar(self):
+        distances = np.linspace(0, 120, 2401)
+        vec = _score_proximite_reseau_vec(distances)
+        for d, v in zip(distances, vec):
+            assert v == _proximite_from_distance_km(float(d)), d
+
+    def test_nan_is_zero(self):
+        assert _score_proximite_reseau_vec(np.array([math.nan]))[0] == 0
+
+
+class TestUrbanismeVec:
+    def test_matches_scalar(self):
+        for dept in DEPARTEMENTS:
+            for surface in SURFACES:
+                vec = _score_urbanisme_vec(
+                    np.array([_dept_number(dept)]),
+                    np.array([surface if surface is not None else math.nan]),
+                )
+                assert vec[0] == _score_urbanisme(dept, None, surface), (dept, surface)
+
+
+class TestEnvironnementVec:
+    @pytest.mark.parametrize("filiere", FILIERES)
+    def test_heuristic_matches_scalar(self, filiere):
+        for dept in DEPARTEMENTS:
+            vec = _score_environnement_vec(
+                np.array([_dept_number(dept)]), np.array([_filiere_code(filiere)]),
+                np.array([False]), np.array([0]), np.array([0]),
+            )
+            assert vec[0] == _score_environnement(dept, filiere, None)
+
+    @pytest.mark.parametrize("filiere", FILIERES)
+    def test_enriched_matches_scalar(self, filiere):
+        for in_zone in range(0, 5):
+            for nearby in range(0, 8):
+                enrichment = {"constraints": {"summary": {"in_zone": in_zone, "nearby": nearby}}}
+                vec = _score_environnement_vec(
+                    np.array([_dept_number("05")]), np.array([_filiere_code(filiere)]),
+                    np.array([True]), np.array([in_zone]), np.array([nearby]),
+                )
+                assert vec[0] == _score_environnement("05", filiere, enrichment)
+
+
+class TestIrradiationVec:
+    @pytest.mark.parametrize("filiere", FILIERES)
+    def test_latitude_matches_scalar(self, filiere):
+        lats = np.linspace(40.5, 51.5, 1101)
+        vec = _score_irradiation_vec(lats, np.full(lats.shape, _filiere_code(filiere)), np.full(lats.shape, math.nan))
+        for lat, v in zip(lats, vec):
+            assert v == _score_irradiation(float(lat), filiere, None), lat
+
+    @pytest.mark.parametrize("filiere", FILIERES)
+    def test_ghi_matches_scalar(self, filiere):
+        ghis = np.linspace(0, 2000, 2001)
+        vec = _score_irradiation_vec(np.full(ghis.shape, 46.0), np.full(ghis.shape, _filiere_code(filiere)), ghis)
+        for ghi, v in zip(ghis, vec):
+            enrichment = {"pvgis": {"ghi_kwh_m2_an": float(ghi)}}
+            assert v == _score_irradiation(46.0, filiere, enrichment), ghi
+
+    def test_missing_latitude(self):
+        vec = _score_irradiation_vec(np.array([math.nan]), np.array([0]), np.array([math.nan]))
+        assert vec[0] == 50
+
+
+class TestAccessibiliteVec:
+    def test_matches_scalar(self):
+        for surface in SURFACES:
+            for puissance in (None, 1.0, 10.0, 10.5, 50.0, 50.5, 200.0):
+                vec = _score_accessibilite_vec(
+                    np.array([surface if surface is not None else math.nan]),
+                    np.array([puissance if puissance is not None else math.nan]),
+                )
+                assert vec[0] == _score_accessibilite(surface, puissance)
+
+
+class TestRisquesVec:
+    def test_no_risk_is_75(self):
+        assert _score_risques_vec(np.array([math.nan]), np.array([0]))[0] == 75
+
+    def test_matches_formula(self):
+        for avg in (1.0, 2.5, 3.3, 5.0):
+            for count in (1, 4, 12):
+                expected = max(0, min(100, int(max(0, 100 - avg * 20) - min(count, 10) * 2)))
+                assert _score_risques_vec(np.array([avg]), np.array([count]))[0] == expected
+
+
+class TestGlobalScore:
+    def test_weight_matrix_uses_default_for_unknown(self):
+        w = _weight_matrix(["bess", "unknown"])
+        assert list(w[0]) == [WEIGHTS["bess"][c] for c in CRITERIA]
+        assert list(w[1]) == [DEFAULT_WEIGHTS[c] for c in CRITERIA]
+
+    def test_matches_scalar_weighted_sum(self):
+        rng = np.random.default_rng(0)
+        details = rng.integers(0, 101, size=(500, len(CRITERIA)))
+        filieres = [FILIERES[i % len(FILIERES)] for i in range(500)]
+        scores = _global_scores(details, _weight_matrix(filieres))
+        for row, filiere, score in zip(details, filieres, scores):
+            weights = WEIGHTS.get(filiere or "", DEFAULT_WEIGHTS)
+            total = sum(int(row[j]) * weights[c] for j, c in enumerate(CRITERIA))
+            assert score == max(0, min(100, round(total)))
+
+
+class TestWhatIf:
+    def test_default_overrides_reproduce_default_weights(self):
+        vec = scenario_weight_vector(dict(DEFAULT_WEIGHTS))
+        np.testing.assert_allclose(vec, [DEFAULT_WEIGHTS[c] for c in CRITERIA])
+
+    def test_partial_override_fills_remaining_proportionally(self):
+        vec = scenario_weight_vector({"proximite_reseau": 0.4})
+        assert vec.sum() == pytest.approx(1.0)
+        assert vec[CRITERIA.index("proximite_reseau")] == pytest.approx(0.4)
+        # Remaining criteria keep their default proportions
+        rest = [c for c in CRITERIA if c != "proximite_reseau"]
+        ratio = vec[CRITERIA.index(rest[0])] / DEFAULT_WEIGHTS[rest[0]]
+        for c in rest:
+            assert vec[CRITERIA.index(c)] / DEFAULT_WEIGHTS[c] == pytest.approx(ratio)
+
+    def test_full_vector_is_normalized(self):
+        vec = scenario_weight_vector({c: 2.0 for c in CRITERIA})
+        np.testing.assert_allclose(vec, np.full(6, 1 / 6))
+
+    @pytest.mark.parametrize("weights", [
+        {"unknown": 0.5},
+        {"urbanisme": -0.1},
+        {"urbanisme": 0.7, "risques": 0.6},
+        {c: 0.0 for c in CRITERIA},
+    ])
+    def test_invalid_vectors(self, weights):
+        with pytest.raises(ValueError):
+            scenario_weight_vector(weights)
+
+    def test_partial_override_keeps_filiere_proportions(self):
+        matrix = scenario_weight_matrix({"proximite_reseau": 0.4})
+        for profile, row in zip(WEIGHT_PROFILES, matrix):
+            base = WEIGHTS[profile] if profile else DEFAULT_WEIGHTS
+            assert row[CRITERIA.index("proximite_reseau")] == pytest.approx(0.4)
+            ratios = {row[CRITERIA.index(c)] / base[c] for c in CRITERIA if c != "proximite_reseau"}
+            assert max(ratios) == pytest.approx(min(ratios))
+
+    def test_empty_scenario_returns_baseline_scores(self):
+        rng = np.random.default_rng(3)
+        details = rng.integers(0, 101, size=(5000, 6)).astype(np.float64)
+        filieres = rng.choice(FILIERES, size=5000).tolist()
+        baseline = _global_scores(details, _weight_matrix(filieres))
+        out = what_if_scores(details, scenario_weight_matrix({})[None], weight_profile_index(filieres))
+        assert out.shape == (5000, 1)
+        np.testing.assert_array_equal(out[:, 0], baseline)
+
+    def test_matrix_product_matches_global_scores(self):
+        rng = np.random.default_rng(3)
+        details = rng.integers(0, 101, size=(200, 6)).astype(np.float64)
+        vec = scenario_weight_vector(dict(WEIGHTS["solaire_sol"]))
+        expected = _global_scores(details, np.tile(vec, (200, 1)))
+        scenario = scenario_weight_matrix(dict(WEIGHTS["solaire_sol"]))
+        out = what_if_scores(details, scenario[None], weight_profile_index(["bess"] * 200))
+        assert out.shape == (200, 1)
+        assert np.abs(out[:, 0] - expected).max() <= 1  # float summation order only
+
+    def test_complete_vector_applies_to_every_filiere(self):
+        details = np.array([[100, 0, 0, 0, 0, 0], [100, 0, 0, 0, 0, 0]], dtype=np.float64)
+        scenario = scenario_weight_matrix({"proximite_reseau": 1.0, **{c: 0.0 for c in CRITERIA[1:]}})
+        out = what_if_scores(details, scenario[None], weight_profile_index(["solaire_sol", "bess"]))
+        assert out[:, 0].tolist() == [100, 100]
+
+    def test_many_scenarios_shape(self):
+        details = np.full((5, 6), 50.0)
+        vectors = np.stack([scenario_weight_matrix({"risques": w}) for w in (0.1, 0.2, 0.3)])
+        out = what_if_scores(details, vectors, weight_profile_index(FILIERES))
+        assert out.shape == (5, 3)
+        assert (out == 50).all()
+
+    def test_rank_columns_competition_ranking(self):
+        ranks = rank_columns(np.array([[80, 10], [90, 10], [80, 30]]))
+        assert ranks[:, 0].tolist() == [2, 1, 2]
+        assert ranks[:, 1].tolist() == [2, 2, 1]
+
+
+class TestBatchScoreFallback:
+    async def test_one_bad_project_does_not_fail_the_batch(self):
+        async def bulk(db, ids):
+            if "bad" in ids:
+                raise RuntimeError("bad row")
+            return [{"projet_id": pid, "nom": pid, "score": 60} for pid in ids if pid != "missing"]
+
+        db = AsyncMock()
+        with patch.object(scoring_route, "calculate_scores_bulk", bulk), \
+                patch.object(scoring_route, "persist_scores", AsyncMock()):
+            scored, failed = await scoring_route._score_batch(db, ["a", "bad", "missing", "b"])
+
+        assert set(scored) == {"a", "b"}
+        assert failed == {"bad"}
+        assert db.rollback.await_count == 2  # bulk call, then the bad project
+
+    async def test_bulk_success_scores_in_one_call(self):
+        bulk = AsyncMock(return_value=[{"projet_id": "a", "nom": "A", "score": 70}])
+        with patch.object(scoring_route, "calculate_scores_bulk", bulk), \
+                patch.object(scoring_route, "persist_scores", AsyncMock()):
+            scored, failed = await scoring_route._score_batch(AsyncMock(), ["a", "missing"])
+
+        assert bulk.await_count == 1
+        assert set(scored) == {"a"} and not failed
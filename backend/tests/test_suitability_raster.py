@@ -0,0 +1,199 @@
+"""Tests for the Lambert-93 projection and the suitability raster (no DB)."""
+import json
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+
+from app.services import suitability_raster as sr
+from app.services.projection import from_lambert93, to_lambert93
+
+RES = 20_000.0  # coarse grid → a single 128×128 tile over France
+
+
+class TestProjection:
+    def test_paris_reference(self):
+        x, y = to_lambert93(2.3522, 48.8566)
+        assert x == pytest.approx(652_470, abs=5)
+        assert y == pytest.approx(6_862_037, abs=5)
+
+    def test_origin(self):
+        x, y = to_lambert93(3.0, 46.5)
+        assert x == pytest.approx(700_000, abs=0.01)
+        assert y == pytest.approx(6_600_000, abs=0.01)
+
+    def test_round_trip_vectorized(self):
+        lon = np.array([-4.5, 2.35, 7.7, 9.2])
+        lat = np.array([48.4, 48.85, 48.6, 42.0])
+        back_lon, back_lat = from_lambert93(*to_lambert93(lon, lat))
+        np.testing.assert_allclose(back_lon, lon, atol=1e-9)
+        np.testing.assert_allclose(back_lat, lat, atol=1e-9)
+
+
+def _build_synthetic(path, postes_lonlat):
+    shape = sr.grid_shape(RES)
+    grids = {
+        name: np.lib.format.open_memmap(path / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+        for name, dtype in sr.LAYERS.items()
+    }
+    lon, lat = np.array(postes_lonlat).T
+    x, y = to_lambert93(lon, lat)
+    ids = np.arange(1, len(lon) + 1, dtype=np.int32)
+    tree = cKDTree(np.column_stack([x, y]))
+    for ty in range(shape[0] // sr.TILE_SIZE):
+        for tx in range(shape[1] // sr.TILE_SIZE):
+            sr._fill_poste_tile(grids, RES, ty, tx, tree, ids)
+    for grid in grids.values():
+        grid.flush()
+    np.savez(path / sr.POSTES_SNAPSHOT, ids=ids, x=x, y=y,
+             names=np.array([f"Poste {i}" for i in ids]))
+    (path / sr.MANIFEST).write_text(json.dumps({"resolution_m": RES}))
+    return grids
+
+
+class TestGrid:
+    def test_shape_is_whole_tiles(self):
+        rows, cols = sr.grid_shape(250)
+        assert rows % sr.TILE_SIZE == 0 and cols % sr.TILE_SIZE == 0
+        assert cols * 250 >= sr.EXTENT_L93[2] - sr.EXTENT_L93[0]
+
+    def test_tile_centers_inside_bounds(self):
+        xs, ys = sr.tile_cell_centers(RES, 0, 0)
+        xmin, ymin, xmax, ymax = sr.tile_bounds(RES, 0, 0)
+        assert xs.min() > xmin and xs.max() < xmax
+        assert ys.min() > ymin and ys.max() < ymax
+        assert ys[0, 0] > ys[-1, 0]  # row 0 is north
+
+
+class TestLookup:
+    def test_lookup_nearest_poste(self, tmp_path):
+        _build_synthetic(tmp_path, [(2.35, 48.85), (5.37, 43.30)])
+        raster = sr.SuitabilityRaster(tmp_path)
+        cell = raster.lookup(2.36, 48.86)
+        assert cell["nearest_poste_id"] == 1
+        assert cell["nearest_poste_name"] == "Poste 1"
+        # Cell-centre distance is within one cell diagonal of the true distance
+        assert cell["nearest_poste_m"] < RES * 0.75
+        assert raster.lookup(5.4, 43.3)["nearest_poste_id"] == 2
+
+    def test_lookup_outside_extent(self, tmp_path):
+        _build_synthetic(tmp_path, [(2.35, 48.85)])
+        raster = sr.SuitabilityRaster(tmp_path)
+        assert raster.lookup(-30.0, 20.0) is None
+
+    def test_lookup_many_matches_lookup(self, tmp_path):
+        _build_synthetic(tmp_path, [(2.35, 48.85), (5.37, 43.30), (-1.55, 47.22)])
+        raster = sr.SuitabilityRaster(tmp_path)
+        lons = np.array([2.0, 5.0, -1.0])
+        lats = np.array([48.5, 43.5, 47.0])
+        many = raster.lookup_many(lons, lats)
+        for i, (lon, lat) in enumerate(zip(lons, lats)):
+            assert many["poste_id"][i] == raster.lookup(lon, lat)["nearest_poste_id"]
+
+
+class TestIncremental:
+    def _snapshot(self, ids, lonlat, names=None):
+        x, y = to_lambert93(*np.array(lonlat).T)
+        names = names or [f"Poste {i}" for i in ids]
+        return {"ids": np.array(ids, dtype=np.int32), "x": np.atleast_1d(x), "y": np.atleast_1d(y),
+                "names": np.array(names)}
+
+    def test_changed_postes(self):
+        old = self._snapshot([1, 2, 3], [(2.35, 48.85), (5.37, 43.30), (-1.55, 47.22)])
+        new = self._snapshot([1, 2, 4], [(2.35, 48.85), (5.40, 43.30), (3.0, 45.0)])
+        changed = sr._changed_postes(old, new)
+        # poste 2 moved (old + new position), 3 removed, 4 added; 1 untouched
+        assert changed.shape == (4, 2)
+
+    def test_reimport_with_new_ids_changes_nothing(self):
+        lonlat = [(2.35, 48.85), (5.37, 43.30), (-1.55, 47.22)]
+        names = ["Poste A", "Poste B", "Poste C"]
+        old = self._snapshot([1, 2, 3], lonlat, names)
+        new = self._snapshot([11, 12, 13], lonlat, names)
+        assert sr._changed_postes(old, new).shape == (0, 2)
+
+    def test_remap_poste_ids(self):
+        lonlat = [(2.35, 48.85), (5.37, 43.30)]
+        old = self._snapshot([1, 2], lonlat, ["Poste A", "Poste B"])
+        new = self._snapshot([7, 3], lonlat, ["Poste A", "Poste B"])
+        grid = np.array([[1, 2, -1], [2, 2, 5]] * sr.TILE_SIZE, dtype=np.int32)
+        sr._remap_poste_ids(grid, old, new)
+        assert grid[:2].tolist() == [[7, 3, -1], [3, 3, 5]]
+        assert (grid == 7).sum() == sr.TILE_SIZE
+
+    def test_no_change_no_tiles(self, tmp_path):
+        grids = _build_synthetic(tmp_path, [(2.35, 48.85)])
+        assert sr._affected_tiles(grids, RES, np.empty((0, 2))) == []
+
+    def test_affected_tiles_cover_change(self, tmp_path):
+        grids = _build_synthetic(tmp_path, [(2.35, 48.85)])
+        x, y = to_lambert93(5.37, 43.30)
+        tiles = sr._affected_tiles(grids, RES, np.array([[x, y]]))
+        assert tiles == [(0, 0)]
+
+
+class TestZonesVersion:
+    async def test_follows_dataset_versions(self):
+        versions = {"natura2000": "n1", "znieff": "z1"}
+
+        async def dataset_version(db, table):
+            return versions[table]
+
+        with patch.object(sr, "_existing_zone_tables", AsyncMock(return_value=["znieff", "natura2000"])), \
+                patch.object(sr, "dataset_version", side_effect=dataset_version):
+            first = await sr._zones_version(None)
+            assert await sr._zones_version(None) == first
+            versions["znieff"] = "z2"  # import_constraints logged a changed zone
+            assert await sr._zones_version(None) != first
+
+    async def test_none_without_zone_tables(self):
+        with patch.object(sr, "_existing_zone_tables", AsyncMock(return_value=[])):
+            assert await sr._zones_version(None) is None
+
+
+class TestBuild:
+    async def test_rebuild_does_not_touch_mapped_files(self, tmp_path):
+        def postes(lonlat):
+            lon, lat = np.array(lonlat).T
+            x, y = to_lambert93(lon, lat)
+            ids = np.arange(1, len(lon) + 1, dtype=np.int32)
+            return {"ids": ids, "x": np.atleast_1d(x), "y": np.atleast_1d(y),
+                    "names": np.array([f"Poste {i}" for i in ids])}
+
+        loads = [postes([(2.35, 48.85)]), postes([(2.35, 48.85), (5.37, 43.30)])]
+        with patch.object(sr, "raster_dir", return_value=tmp_path), \
+                patch.object(sr, "_load_postes", AsyncMock(side_effect=loads)), \
+                patch.object(sr, "_zones_version", AsyncMock(return_value=None)), \
+                patch.object(sr, "_existing_zone_tables", AsyncMock(return_value=[])):
+            await sr.build_raster(None, resolution_m=RES, full=True)
+            reader = sr.SuitabilityRaster(tmp_path)
+            before = reader.lookup(5.4, 43.3)["nearest_poste_id"]
+            await sr.build_raster(None, resolution_m=RES, full=True)
+
+        # The old mapping still reads the old, complete raster
+        assert before == 1
+        assert reader.lookup(5.4, 43.3)["nearest_poste_id"] == 1
+        assert sr.SuitabilityRaster(tmp_path).lookup(5.4, 43.3)["nearest_poste_id"] == 2
+        assert not list(tmp_path.glob(".build-*"))
+
+    async def test_reimport_with_new_ids_rebuilds_no_tile(self, tmp_path):
+        def postes(first_id):
+            lon, lat = np.array([(2.35, 48.85), (5.37, 43.30)]).T
+            x, y = to_lambert93(lon, lat)
+            return {"ids": np.array([first_id, first_id + 1], dtype=np.int32), "x": x, "y": y,
+                    "names": np.array(["Poste A", "Poste B"])}
+
+        with patch.object(sr, "raster_dir", return_value=tmp_path), \
+                patch.object(sr, "_load_postes", AsyncMock(side_effect=[postes(1), postes(101)])), \
+                patch.object(sr, "_zones_version", AsyncMock(return_value=None)), \
+                patch.object(sr, "_existing_zone_tables", AsyncMock(return_value=[])):
+            await sr.build_raster(None, resolution_m=RES, full=True)
+            with patch.object(sr, "_fill_poste_tile", wraps=sr._fill_poste_tile) as fill:
+                stats = await sr.build_raster(None, resolution_m=RES)
+
+        assert stats["mode"] == "incremental"
+        assert stats["poste_tiles_rebuilt"] == 0 and fill.call_count == 0
+        raster = sr.SuitabilityRaster(tmp_path)
+        assert raster.lookup(2.36, 48.86)["nearest_poste_id"] == 101
+        assert raster.lookup(5.4, 43.3)["nearest_poste_id"] == 102
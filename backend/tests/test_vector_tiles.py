@@ -0,0 +1,119 @@
+"""Tests for vector tile helpers and dataset versions (no DB)."""
+from app.services import dataset_versions, vector_tiles
+from app.services.vector_tiles import (
+    TILE_LAYERS,
+    cache_key,
+    render_tile,
+    simplify_tolerance_m,
+    tile_size_m,
+    tile_sql,
+    valid_tile,
+)
+
+
+class TestTileCoordinates:
+    def test_valid_range(self):
+        assert valid_tile(0, 0, 0)
+        assert valid_tile(10, 1023, 0)
+        assert not valid_tile(10, 1024, 0)
+        assert not valid_tile(-1, 0, 0)
+        assert not valid_tile(25, 0, 0)
+
+    def test_tolerance_halves_per_zoom(self):
+        assert abs(tile_size_m(0) - 40_075_016.69) < 1
+        assert simplify_tolerance_m(6) == simplify_tolerance_m(5) / 2
+
+
+class TestTileSql:
+    def test_low_zoom_polygons_use_display_geometry(self):
+        sql = tile_sql(TILE_LAYERS["natura2000"], 6)
+        assert "COALESCE(t.geom_display, t.geom)" in sql
+        assert "ST_SimplifyPreserveTopology" in sql
+        assert "AS nom" not in sql
+
+    def test_detail_zoom_adds_attributes_and_full_geometry(self):
+        sql = tile_sql(TILE_LAYERS["natura2000"], 12)
+        assert "geom_display" not in sql
+        assert "t.nom AS nom" in sql
+        assert "'natura2000'" in sql
+
+    def test_user_filter(self):
+        assert ":user_id" in tile_sql(TILE_LAYERS["projets"], 10, user_filter=True)
+        assert ":user_id" not in tile_sql(TILE_LAYERS["projets"], 10)
+
+    def test_cache_key_includes_version(self):
+        assert cache_key("postes", "abc", 7, 64, 44) == "tiles:postes:abc:7/64/44"
+
+
+class _FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class _FakeDb:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def execute(self, *args, **kwargs):
+        self.calls += 1
+        return _FakeResult(self.value)
+
+
+class TestRenderTile:
+    async def test_below_min_zoom_is_empty_without_query(self):
+        db = _FakeDb(b"x")
+        assert await render_tile(db, TILE_LAYERS["znieff"], 2, 1, 1) == b""
+        assert db.calls == 0
+
+    async def test_cache_hit_skips_rendering(self, monkeypatch):
+        async def version(db, dataset):
+            return "v1"
+
+        async def cached(key):
+            return b"tile" if key == "tiles:postes:v1:8/130/90" else None
+
+        monkeypatch.setattr(vector_tiles, "dataset_version", version)
+        monkeypatch.setattr(vector_tiles, "_get_cached", cached)
+        db = _FakeDb(b"fresh")
+        assert await render_tile(db, TILE_LAYERS["postes"], 8, 130, 90) == b"tile"
+        assert db.calls == 0
+
+    async def test_project_tiles_are_not_cached(self, monkeypatch):
+        async def fail(*args):
+            raise AssertionError("project tiles must not touch the cache")
+
+        monkeypatch.setattr(vector_tiles, "_get_cached", fail)
+        monkeypatch.setattr(vector_tiles, "_set_cached", fail)
+        db = _FakeDb(memoryview(b"mvt"))
+        assert await render_tile(db, TILE_LAYERS["projets"], 9, 260, 180, user_id="u") == b"mvt"
+
+
+class TestDatasetVersion:
+    def test_token_is_stable(self):
+        assert dataset_versions.version_token("a", 1, None) == dataset_versions.version_token("a", 1, None)
+        assert dataset_versions.version_token("a", 1) != dataset_versions.version_token("a", 2)
+
+    async def test_memoized(self, monkeypatch):
+        class _Result:
+            def mappings(self):
+                return self
+
+            def first(self):
+                return {"updated": None, "change_id": 3, "n": 10, "max_id": 12}
+
+        class _Db:
+            calls = 0
+
+            async def execute(self, *args, **kwargs):
+                _Db.calls += 1
+                return _Result()
+
+        dataset_versions.invalidate()
+        first = await dataset_versions.dataset_version(_Db(), "znieff")
+        assert await dataset_versions.dataset_version(_Db(), "znieff") == first
+        assert _Db.calls == 1
+        dataset_versions.invalidate("znieff")